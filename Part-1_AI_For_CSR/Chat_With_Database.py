@@ -6,6 +6,15 @@ from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_community.utilities import SQLDatabase
+from db_engine import create_readonly_engine
+from query_results import execute_select, summarize_for_llm, preview_text
+from query_guard import QueryGuard, QueryTooExpensive, table_row_estimates
+from query_profiler import QueryProfiler
+from analytics_engine import AnalyticsEngine
+from analytics_export import DEFAULT_OUT as ANALYTICS_DIR
+from rollups import rollup_hint
+from sql_guard import UnsafeSQL, validate_select
+from conversation_memory import ConversationMemory
 
 # ---------------- Setup ----------------
 load_dotenv()
@@ -19,7 +28,17 @@ with st.sidebar:
     temperature = st.slider("Temperature", 0.0, 1.0, 0.0, 0.1)
     show_sql = st.checkbox("Show generated SQL", value=False)
     show_schema = st.checkbox("Show schema", value=False)
+    show_profile = st.checkbox("Show query profile", value=False)
+    analytics_mode = st.checkbox(
+        "Analytics mode (Parquet snapshot)", value=False,
+        help="Answer reporting questions from the Parquet export (python analytics_export.py) with DuckDB "
+             "instead of the live database.",
+    )
     max_rows = st.number_input("Max rows per query", min_value=10, max_value=1000, value=200, step=10)
+    result_token_budget = st.number_input("Result tokens sent to LLM", min_value=100, max_value=4000, value=600, step=100)
+    max_query_secs = st.number_input("Query time budget (sec)", min_value=1, max_value=120, value=10, step=1)
+    max_repairs = st.number_input("SQL repair attempts", min_value=0, max_value=5, value=2, step=1)
+    history_token_budget = st.number_input("History tokens in SQL prompt", min_value=100, max_value=4000, value=500, step=100)
 
 # LLM selection
 if provider == "OpenAI":
@@ -30,10 +49,21 @@ if provider == "OpenAI":
 else:
     llm = ChatOllama(model="llama3.3", temperature=temperature)
 
-# DB connect (SQLite file in working dir)
-sqlite_uri = "sqlite:///./orders_testing.db"
+# DB connect: one read-only, pooled engine per process (not per rerun)
+DB_PATH = os.getenv("ORDERS_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "orders_testing.db"))
+
+@st.cache_resource(show_spinner=False)
+def get_engine(db_path: str):
+    # ORDERS_DB_IMMUTABLE=1 is only safe if nothing modifies the file while the app runs
+    return create_readonly_engine(db_path, immutable=os.getenv("ORDERS_DB_IMMUTABLE") == "1")
+
+@st.cache_resource(show_spinner=False)
+def get_db(db_path: str) -> SQLDatabase:
+    return SQLDatabase(get_engine(db_path))
+
 try:
-    db = SQLDatabase.from_uri(sqlite_uri)
+    engine = get_engine(DB_PATH)
+    db = get_db(DB_PATH)
 except Exception as e:
     st.error(f"Database connection failed: {e}")
     st.stop()
@@ -43,20 +73,54 @@ except Exception as e:
 def get_schema(_db: SQLDatabase) -> str:
     return _db.get_table_info()
 
-schema = get_schema(db)
+# Reporting snapshot (analytics_export.py); re-read every 10 minutes to pick up new exports
+@st.cache_resource(show_spinner=False, ttl=600)
+def get_analytics(root: str) -> AnalyticsEngine:
+    return AnalyticsEngine(root)
+
+if analytics_mode:
+    analytics = get_analytics(ANALYTICS_DIR)
+    if not analytics.tables:
+        st.warning(f"No Parquet snapshot in {ANALYTICS_DIR}. Run `python analytics_export.py` first; "
+                   "using the live database.")
+        get_analytics.clear()  # look again on the next rerun
+        analytics_mode = False
+
+# Daily rollups (rollups.py): tell the LLM to answer counts and totals from them; freshness re-read every minute
+@st.cache_data(show_spinner=False, ttl=60)
+def get_rollup_hint(db_path: str) -> str:
+    with engine.connect() as conn:
+        return rollup_hint(conn.connection.driver_connection)
+
+schema = analytics.schema_text() if analytics_mode else get_schema(db)
+if not analytics_mode and get_rollup_hint(DB_PATH):
+    schema = f"{schema}\n\n{get_rollup_hint(DB_PATH)}"
+dialect = "DuckDB (a reporting snapshot of the tables)" if analytics_mode else "SQLite"
+
+@st.cache_data(show_spinner=False)
+def get_row_estimates(db_path: str) -> dict:
+    with engine.connect() as conn:
+        return table_row_estimates(conn.connection.driver_connection)
+
+guard = QueryGuard(max_seconds=float(max_query_secs), row_estimates=get_row_estimates(DB_PATH))
+
+# Query profile and slow-query log, shared by all sessions of the process
+@st.cache_resource(show_spinner=False)
+def get_profiler() -> QueryProfiler:
+    return QueryProfiler()
+
+profiler = get_profiler()
+
+if show_profile:
+    with st.expander("Query profile (most total time first)", expanded=True):
+        st.caption(f"Queries over {profiler.slow_ms:g} ms are logged with their plan to the slow-query log.")
+        st.dataframe(profiler.top(10), use_container_width=True, hide_index=True)
 
 if show_schema:
     with st.expander("Database schema", expanded=False):
         st.code(schema, language="sql")
 
 # ---------------- Helpers ----------------
-def history_to_text(history_pairs, max_turns=6):
-    """Convert [(user, assistant), ...] → text, keep last N turns."""
-    if not history_pairs:
-        return "None"
-    trimmed = history_pairs[-max_turns:]
-    return "\n".join([f"User: {u}\nAssistant: {a}" for (u, a) in trimmed])
-
 FENCE_RE = re.compile(r"```(?:sql)?\s*([\s\S]*?)```", flags=re.IGNORECASE)
 
 def extract_sql_code(text: str) -> str:
@@ -66,22 +130,24 @@ def extract_sql_code(text: str) -> str:
         cleaned = cleaned[:-1]
     return cleaned.strip()
 
-MUTATING_RE = re.compile(r"^\s*(INSERT|UPDATE|DELETE|DROP|ALTER|CREATE|REPLACE|TRUNCATE)\b", re.I)
+@st.cache_data(show_spinner=False, ttl=60, max_entries=256)
+def cached_select(cache_key: str, sql: str, max_seconds: float):
+    # keyed on the normalized SQL, so re-asked questions skip the database entirely
+    return execute_select(engine, sql, guard=guard, profiler=profiler)
 
-def is_safe_select(sql: str) -> bool:
-    return (not MUTATING_RE.search(sql)) and bool(re.match(r"^\s*SELECT\b", sql, re.I))
-
-def enforce_limit(sql: str, max_rows: int) -> str:
-    if re.search(r"\bLIMIT\b", sql, re.I):
-        return sql
-    return sql + f" LIMIT {int(max_rows)}"
+@st.cache_data(show_spinner=False, ttl=60, max_entries=256)
+def cached_analytics_select(cache_key: str, sql: str, max_seconds: float):
+    return get_analytics(ANALYTICS_DIR).execute_select(sql, max_seconds=max_seconds)
 
 def run_query_safe(sql: str):
-    return db.run(sql)
+    checked = validate_select(sql, int(max_rows))
+    if analytics_mode:
+        return cached_analytics_select(checked.cache_key, checked.sql, float(max_query_secs))
+    return cached_select(checked.cache_key, checked.sql, float(max_query_secs))
 
 # ---------------- Prompts/Chains ----------------
 SQL_PROMPT = ChatPromptTemplate.from_template(
-    "You are a SQL expert for SQLite.\n"
+    "You are a SQL expert for {dialect}.\n"
     "Write ONLY a single-line SELECT statement (no comments, no prose, no code fences, no mutating operations) "
     "that answers the question using the provided schema and conversation history.\n\n"
     "Schema:\n{schema}\n\n"
@@ -98,13 +164,71 @@ NL_PROMPT = ChatPromptTemplate.from_template(
     "If the result is empty, state that clearly and suggest a clarifying question.\n\n"
     "User Question: {question}\n"
     "SQL Query: {sql}\n"
-    "SQL Result: {result}\n\n"
+    "SQL Result (summarized; aggregates cover all rows):\n{result}\n\n"
     "Answer:"
 )
 nl_chain = (NL_PROMPT | llm | StrOutputParser())
 
+REPAIR_PROMPT = ChatPromptTemplate.from_template(
+    "You are a SQL expert for {dialect}. A query you wrote for the question below was rejected.\n\n"
+    "Schema:\n{schema}\n\n"
+    "Question: {question}\n"
+    "Rejected SQL: {sql}\n"
+    "Problem: {problem}\n\n"
+    "Write ONLY a corrected single-line SELECT statement (no comments, no prose, no code fences) that "
+    "answers the same question without the problem: join on key columns, filter on indexed columns, "
+    "or aggregate instead of listing rows.\n"
+    "SQL:"
+)
+repair_chain = (REPAIR_PROMPT | llm | StrOutputParser())
+
+def run_with_repair(question: str, sql: str, attempts: list):
+    """Execute sql; on a cost-guard or execution error, ask the LLM for a fixed query.
+
+    Returns (final_sql, result). Every rejected query is appended to `attempts` as
+    (sql, problem). Raises the last error once the repair budget is spent, and
+    UnsafeSQL if a repaired query is not a read-only SELECT.
+    """
+    while True:
+        try:
+            return sql, run_query_safe(sql)
+        except Exception as e:
+            problem = str(e).split("\n")[0]
+            attempts.append((sql, problem))
+            if len(attempts) > int(max_repairs):
+                raise
+            print("Repairing SQL:", sql, "| Problem:", problem)
+            fixed = extract_sql_code(repair_chain.invoke(
+                {"dialect": dialect, "schema": schema, "question": question, "sql": sql, "problem": problem}
+            ))
+            try:
+                sql = validate_select(fixed, int(max_rows)).sql
+            except UnsafeSQL as unsafe:  # ends the loop; the caller refuses it like a first query
+                attempts.append((fixed, str(unsafe)))
+                raise
+
+def refuse_unsafe(question: str, sql: str, unsafe: UnsafeSQL):
+    """Show the guardrail refusal for sql and stop the script run."""
+    guardrail_msg = (
+        "⚠️ I generated a potentially unsafe SQL statement.\n\n"
+        "For this MVP, I only run **read-only SELECT queries**. "
+        f"({unsafe}) Please rephrase your request."
+    )
+    with st.chat_message("assistant"):
+        st.error(guardrail_msg)  # red warning style
+    st.session_state["messages"].append({"role": "assistant", "content": guardrail_msg})
+
+    # Print to console for debugging
+    print("----- GUARDRAIL BLOCKED -----")
+    print("User Prompt:", question)
+    print("Generated SQL (blocked):", sql)
+    print("Reason:", unsafe)
+    print("-----------------------------")
+    st.stop()
+
 # ---------------- Session State ----------------
-st.session_state.setdefault("chat_pairs", [])
+st.session_state.setdefault("memory", ConversationMemory())
+st.session_state["memory"].token_budget = int(history_token_budget)
 st.session_state.setdefault("messages", [])
 st.session_state.setdefault("last_sql", "")
 
@@ -112,11 +236,13 @@ st.session_state.setdefault("last_sql", "")
 for m in st.session_state["messages"]:
     with st.chat_message(m["role"]):
         st.markdown(m["content"])
+        if m.get("result") is not None:
+            st.dataframe(m["result"].to_pandas(), use_container_width=True, hide_index=True)
 
 cols = st.columns(2)
 with cols[0]:
     if st.button("Clear chat"):
-        st.session_state["chat_pairs"] = []
+        st.session_state["memory"].clear()
         st.session_state["messages"] = []
         st.session_state["last_sql"] = ""
         st.rerun()
@@ -131,8 +257,9 @@ if user_q:
         st.markdown(user_q)
 
     inputs = {
+        "dialect": dialect,
         "schema": schema,
-        "history_text": history_to_text(st.session_state["chat_pairs"]),
+        "history_text": st.session_state["memory"].render(),
         "question": user_q,
     }
 
@@ -140,54 +267,66 @@ if user_q:
     raw_sql = sql_chain.invoke(inputs)
     sql = extract_sql_code(raw_sql)
 
-    # Guardrails
-    if not is_safe_select(sql):
-        guardrail_msg = (
-            "⚠️ I generated a potentially unsafe SQL statement.\n\n"
-            "For this MVP, I only run **read-only SELECT queries**. "
-            "Please rephrase your request."
+    # Guardrails: one read-only statement, top-level LIMIT bounded to max_rows
+    try:
+        sql = validate_select(sql, int(max_rows)).sql
+    except UnsafeSQL as unsafe:
+        refuse_unsafe(user_q, sql, unsafe)
+
+    # 2) Execute (cost guard + time budget; failures go through the repair loop)
+    result = None
+    attempts = []
+    try:
+        sql, result = run_with_repair(user_q, sql, attempts)
+        result_text = summarize_for_llm(result, token_budget=int(result_token_budget))
+    except QueryTooExpensive as e:
+        too_expensive_msg = (
+            "⚠️ That question needs a query that is too expensive to run against the live database.\n\n"
+            f"{e}\n\nPlease narrow it down (for example a specific order, customer, state or date range)."
         )
         with st.chat_message("assistant"):
-            st.error(guardrail_msg)  # red warning style
-        st.session_state["messages"].append({"role": "assistant", "content": guardrail_msg})
-
-        # Print to console for debugging
-        print("----- GUARDRAIL BLOCKED -----")
+            st.warning(too_expensive_msg)
+        st.session_state["messages"].append({"role": "assistant", "content": too_expensive_msg})
+        print("----- QUERY TOO EXPENSIVE -----")
         print("User Prompt:", user_q)
-        print("Generated SQL (blocked):", sql)
-        print("-----------------------------")
+        for bad_sql, problem in attempts:
+            print("Rejected SQL:", bad_sql, "| Problem:", problem)
+        print("-------------------------------")
         st.stop()
-
-    # Enforce LIMIT
-    sql = enforce_limit(sql, max_rows)
-    st.session_state["last_sql"] = sql
-
-    # 2) Execute
-    try:
-        result = run_query_safe(sql)
+    except UnsafeSQL as unsafe:  # a repaired query failed validation
+        refuse_unsafe(user_q, attempts[-1][0], unsafe)
     except Exception as e:
-        result = f"Query execution error: {e}"
+        result_text = f"Query execution error: {e}"
+    st.session_state["last_sql"] = sql
 
     # 3) Natural language response
-    nl = nl_chain.invoke({"question": user_q, "sql": sql, "result": result})
+    nl = nl_chain.invoke({"question": user_q, "sql": sql, "result": result_text})
 
     # 4) Render assistant message
     parts = []
     if show_sql:
+        for bad_sql, problem in attempts:
+            parts.append(f"**Rejected SQL** ({problem})\n```sql\n{bad_sql}\n```")
         parts.append("**Generated SQL**\n```sql\n" + sql + "\n```")
     parts.append(nl)
     assistant_out = "\n\n".join(parts)
 
     with st.chat_message("assistant"):
         st.markdown(assistant_out)
+        if result is not None:
+            # st.dataframe is virtualized, so large results stay cheap to render
+            st.dataframe(result.to_pandas(), use_container_width=True, hide_index=True)
 
-    st.session_state["messages"].append({"role": "assistant", "content": assistant_out})
-    st.session_state["chat_pairs"].append((user_q, f"SQL: {sql}\nResult: {str(result)[:500]}"))
+    st.session_state["messages"].append({"role": "assistant", "content": assistant_out, "result": result})
+    history_result = preview_text(result) if result is not None else result_text
+    st.session_state["memory"].add(user_q, sql, history_result)
 
     # ----- Console logging -----
     print("----- CHAT LOG -----")
     print("User Prompt:", user_q)
     print("Generated SQL:", sql)
-    print("DB Output:", result)
+    if result is not None:
+        print(f"DB Output: {result.row_count} rows x {len(result.columns)} cols in {result.elapsed_ms:.1f} ms")
+    print("Result sent to LLM:", result_text)
     print("NLP Response:", nl)
     print("--------------------")
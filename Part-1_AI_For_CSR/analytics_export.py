@@ -0,0 +1,317 @@
+"""Incremental Parquet snapshots of the order, fulfillment and ticket tables for reporting.
+
+Reporting questions scan whole tables; run against the live SQLite files they compete
+with CSR traffic. `export_source` copies one table to `<out>/<name>/` as Parquet. Only
+rows whose key (sq_number / unique_id / Ticket_ID) is above the last exported one are
+read. They are streamed in chunks of `chunk_rows`, one Parquet row group each, into
+files of at most `file_rows` rows named `<name>-<first key>-<last key>.parquet`.
+
+The watermark is the highest key in those file names. A run that dies halfway leaves
+its unfinished file as `.tmp`, so the next run starts after the last complete file
+with no gap and no duplicate.
+
+Keys only grow with inserts. Rows updated after they were exported (a status change,
+a refund) keep their exported values until `--full` rewrites the table.
+
+The Part-2 service databases are exported when their paths are given, with the
+options or with the environment variables the services read (CSR_ORDERS_DB,
+CSR_FULFILLMENT_DB, CSR_TICKETS_DB). A resharded one (`<db>.shard-<i>-of-<n>.db`
+files next to its path) is exported shard by shard into the same folder, as
+`<name>-shard<i>of<n>-...` files with a watermark each: ids only grow within a
+shard. When the shard layout differs from the one already exported, the table is
+rewritten. Status columns stored as integer codes, i.e. declared
+`INTEGER REFERENCES <lookup>(code)` with a (code, name) lookup table, are exported
+as their names.
+
+    python analytics_export.py [--out analytics] [--full] [--chunk-rows 100000] [--file-rows 1000000]
+        [--svc-orders-db PATH] [--fulfillment-db PATH] [--tickets-db PATH]
+
+analytics_engine.py queries the files with DuckDB; the app's "Analytics mode" uses it.
+"""
+import argparse
+import glob
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT = os.getenv("ANALYTICS_DIR", os.path.join(HERE, "analytics"))
+DEFAULT_ORDERS_DB = os.getenv("ORDERS_DB_PATH", os.path.join(HERE, "orders_testing.db"))
+# export name -> (environment variable of the Part-2 services, table, key)
+SERVICE_TABLES = {
+    "svc_orders": ("CSR_ORDERS_DB", "orders", "unique_id"),
+    "svc_fulfillment": ("CSR_FULFILLMENT_DB", "fulfillment", "unique_id"),
+    "svc_tickets": ("CSR_TICKETS_DB", "tickets", "Ticket_ID"),
+}
+
+log = logging.getLogger("analytics_export")
+FILE_RE = re.compile(r"^(?P<name>.+)-(?P<first>\d+)-(?P<last>\d+)\.parquet$")
+SHARD_RE = re.compile(r"\.shard-(?P<index>\d+)-of-(?P<count>\d+)\.db$")
+
+
+@dataclass(frozen=True)
+class Source:
+    name: str      # folder under the export root, and the table name in analytics queries
+    db_path: str
+    table: str
+    key: str       # INTEGER key that grows with every insert: the watermark
+
+
+@dataclass
+class ExportResult:
+    name: str
+    rows: int
+    files: int
+    watermark: int
+    seconds: float
+
+
+def find_shards(db_path: str) -> List[str]:
+    """The shard files of db_path in index order, or [db_path] if it isn't sharded.
+
+    Same layout as the Part-2 reshard tool writes: `orders.shard-0-of-4.db` … next
+    to `orders.db`.
+    """
+    root, _ = os.path.splitext(db_path)
+    found: Dict[int, Dict[int, str]] = {}
+    for path in glob.glob(glob.escape(root) + ".shard-*-of-*.db"):
+        m = SHARD_RE.search(path)
+        if m:
+            found.setdefault(int(m["count"]), {})[int(m["index"])] = path
+    if not found:
+        return [db_path]
+    if len(found) > 1:
+        raise RuntimeError(f"{db_path}: shard files of several layouts ({sorted(found)} shards)")
+    (count, files), = found.items()
+    if len(files) != count:
+        raise RuntimeError(f"{db_path}: {count - len(files)} of {count} shard files are missing")
+    return [files[i] for i in range(count)]
+
+
+def service_dbs_from_env() -> Dict[str, str]:
+    """Export name -> database path of the Part-2 services configured in the environment."""
+    return {name: os.environ[env] for name, (env, _, _) in SERVICE_TABLES.items() if os.getenv(env)}
+
+
+def default_sources(orders_db: str = DEFAULT_ORDERS_DB,
+                    service_dbs: Optional[Dict[str, str]] = None) -> List[Source]:
+    """The Part-1 tables, plus the Part-2 service tables (svc_*) whose database paths are given.
+
+    service_dbs maps an export name of SERVICE_TABLES to its database path (default:
+    the CSR_* environment variables). A service database counts as existing when its
+    file or its shard files do; a missing one is logged and skipped.
+    """
+    sources = [Source(t, orders_db, t, "sq_number") for t in ("customers", "orders", "order_lines")]
+    if service_dbs is None:
+        service_dbs = service_dbs_from_env()
+    for name, (_, table, key) in SERVICE_TABLES.items():
+        path = service_dbs.get(name)
+        if not path:
+            continue
+        if all(os.path.exists(p) for p in find_shards(path)):
+            sources.append(Source(name, path, table, key))
+        else:
+            log.warning("skipping %s: %s not found (nor its shard files)", name, os.path.abspath(path))
+    return sources
+
+
+def source_parts(src: Source) -> List[Tuple[str, str]]:
+    """(file prefix, database file) for each shard of src; [(name, db_path)] if it isn't sharded."""
+    paths = find_shards(src.db_path)
+    if len(paths) == 1:
+        return [(src.name, paths[0])]
+    return [(f"{src.name}-shard{i}of{len(paths)}", p) for i, p in enumerate(paths)]
+
+
+def arrow_type(declared: str) -> pa.DataType:
+    """Arrow type for a declared SQLite column type (SQLite's affinity rules)."""
+    t = (declared or "").upper()
+    if "INT" in t:
+        return pa.int64()
+    if any(s in t for s in ("CHAR", "CLOB", "TEXT")):
+        return pa.string()
+    if "BLOB" in t:
+        return pa.binary()
+    if not t:
+        return pa.string()  # untyped column: values are kept as text
+    return pa.float64()
+
+
+def _coerce(value, type_: pa.DataType):
+    # SQLite lets any value into any column; what doesn't fit the column type becomes NULL
+    try:
+        if pa.types.is_integer(type_):
+            return int(value)
+        if pa.types.is_floating(type_):
+            return float(value)
+        if pa.types.is_string(type_):
+            return str(value)
+    except (TypeError, ValueError):
+        return None
+    return value
+
+
+def _array(values: List, type_: pa.DataType) -> pa.Array:
+    try:
+        return pa.array(values, type=type_)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        return pa.array([None if v is None else _coerce(v, type_) for v in values], type=type_)
+
+
+def coded_columns(conn, table: str) -> Dict[str, str]:
+    """Status column -> lookup table, for the columns this database stores as integer codes.
+
+    Those reference a lookup table (code, name); the Part-2 status-code migration
+    creates both.
+    """
+    coded = {}
+    for _, _, ref, column, to, *_ in conn.execute(f"PRAGMA foreign_key_list({table})"):
+        names = {r[1] for r in conn.execute(f"PRAGMA table_info({ref})")}
+        if to == "code" and {"code", "name"} <= names:
+            coded[column] = ref
+    return coded
+
+
+def table_schema(conn, table: str) -> pa.Schema:
+    coded = coded_columns(conn, table)
+    return pa.schema([(name, pa.string() if name in coded else arrow_type(declared))
+                      for _, name, declared, *_ in conn.execute(f"PRAGMA table_info({table})")])
+
+
+def select_list(conn, table: str, names: Iterable[str]) -> str:
+    """Columns to read, with coded statuses turned back into their names."""
+    coded = coded_columns(conn, table)
+    return ", ".join(f"(SELECT name FROM {coded[n]} WHERE code = {table}.{n}) AS {n}" if n in coded else n
+                     for n in names)
+
+
+def exported_files(folder: str, prefix: Optional[str] = None) -> List[tuple]:
+    """(first key, last key, path) of the complete files in folder (with that prefix), by key."""
+    if not os.path.isdir(folder):
+        return []
+    out = []
+    for f in os.listdir(folder):
+        m = FILE_RE.match(f)
+        if m and (prefix is None or m["name"] == prefix):
+            out.append((int(m["first"]), int(m["last"]), os.path.join(folder, f)))
+    return sorted(out)
+
+
+def exported_prefixes(folder: str) -> set:
+    return {FILE_RE.match(os.path.basename(path))["name"] for *_, path in exported_files(folder)}
+
+
+def watermark(folder: str, prefix: Optional[str] = None) -> int:
+    files = exported_files(folder, prefix)
+    return files[-1][1] if files else 0
+
+
+def _batches(cur, schema: pa.Schema, chunk_rows: int) -> Iterable[pa.RecordBatch]:
+    while True:
+        rows = cur.fetchmany(chunk_rows)
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        yield pa.RecordBatch.from_arrays([_array(list(c), f.type) for c, f in zip(columns, schema)], schema=schema)
+
+
+def _export_part(src: Source, prefix: str, db_path: str, target: str, last: int,
+                 chunk_rows: int, file_rows: int, compression: str) -> Tuple[int, int]:
+    """Rows above `last` of one database file into target; (rows, files) written."""
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    rows = files = 0
+    writer: Optional[pq.ParquetWriter] = None
+    try:
+        schema = table_schema(conn, src.table)
+        key_idx = schema.get_field_index(src.key)
+        # one SELECT = one read transaction: the snapshot is consistent even while the services write
+        cur = conn.execute(
+            f"SELECT {select_list(conn, src.table, schema.names)} FROM {src.table} "
+            f"WHERE {src.key} > ? ORDER BY {src.key}", (last,))
+        first = in_file = 0
+        tmp = ""
+        for batch in _batches(cur, schema, chunk_rows):
+            keys = batch.column(key_idx)
+            if writer is None:
+                first, in_file = keys[0].as_py(), 0
+                tmp = os.path.join(target, f"{prefix}-{first}.tmp")
+                writer = pq.ParquetWriter(tmp, schema, compression=compression)
+            writer.write_batch(batch)
+            in_file += batch.num_rows
+            rows += batch.num_rows
+            last = keys[-1].as_py()
+            if in_file >= file_rows:
+                writer.close()
+                writer = None
+                os.replace(tmp, os.path.join(target, f"{prefix}-{first}-{last}.parquet"))
+                files += 1
+        if writer is not None:
+            writer.close()
+            writer = None
+            os.replace(tmp, os.path.join(target, f"{prefix}-{first}-{last}.parquet"))
+            files += 1
+    finally:
+        if writer is not None:
+            writer.close()
+        conn.close()
+    return rows, files
+
+
+def export_source(src: Source, out: str, full: bool = False, chunk_rows: int = 100_000,
+                  file_rows: int = 1_000_000, compression: str = "zstd") -> ExportResult:
+    start = time.perf_counter()
+    folder = os.path.join(out, src.name)
+    parts = source_parts(src)
+    if not full and exported_prefixes(folder) - {prefix for prefix, _ in parts}:
+        log.warning("%s: shard layout changed since the last export, rewriting it", src.name)
+        full = True
+    target = folder + ".full" if full else folder
+    if full:
+        shutil.rmtree(target, ignore_errors=True)
+    os.makedirs(target, exist_ok=True)
+    for f in os.listdir(target):
+        if f.endswith(".tmp"):
+            os.remove(os.path.join(target, f))
+    rows = files = 0
+    for prefix, db_path in parts:
+        last = 0 if full else watermark(folder, prefix)
+        r, f = _export_part(src, prefix, db_path, target, last, chunk_rows, file_rows, compression)
+        rows, files = rows + r, files + f
+    if full:
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(target, folder)
+    return ExportResult(src.name, rows, files, max(watermark(folder, p) for p, _ in parts), time.perf_counter() - start)
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Export the order, fulfillment and ticket tables to Parquet.")
+    ap.add_argument("--out", default=DEFAULT_OUT)
+    ap.add_argument("--orders-db", default=DEFAULT_ORDERS_DB)
+    env = service_dbs_from_env()
+    for name, option in (("svc_orders", "--svc-orders-db"), ("svc_fulfillment", "--fulfillment-db"),
+                         ("svc_tickets", "--tickets-db")):
+        ap.add_argument(option, dest=name, default=env.get(name),
+                        help=f"Part-2 database to export as {name} (default: ${SERVICE_TABLES[name][0]})")
+    ap.add_argument("--full", action="store_true", help="rewrite every table instead of appending new rows")
+    ap.add_argument("--chunk-rows", type=int, default=100_000, help="rows per read and Parquet row group")
+    ap.add_argument("--file-rows", type=int, default=1_000_000, help="rows per Parquet file")
+    ap.add_argument("--only", nargs="*", help="export only these names")
+    args = ap.parse_args(argv)
+    service_dbs = {name: getattr(args, name) for name in SERVICE_TABLES}
+    for src in default_sources(args.orders_db, service_dbs):
+        if args.only and src.name not in args.only:
+            continue
+        r = export_source(src, args.out, full=args.full, chunk_rows=args.chunk_rows, file_rows=args.file_rows)
+        print(f"{r.name:<16} +{r.rows:>10,} rows in {r.files} file(s), watermark {r.watermark}, {r.seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Reporting group-bys on the live SQLite database vs. the Parquet snapshot with DuckDB.
+
+Builds orders (--rows / 3) and order_lines (--rows) tables with the schema of
+orders_testing.db and synthetic rows in a temp folder, exports them with
+analytics_export.py, then times two reporting queries on both paths:
+
+* revenue per fulfillment status over all lines (one table);
+* revenue per ship state (lines joined to their orders).
+
+The live path runs execute_select on the read-only engine without the query guard,
+which would reject these full scans. The analytics path runs AnalyticsEngine.execute_select.
+
+    python benchmarks/bench_analytics.py [--rows 10000000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+from analytics_engine import AnalyticsEngine  # noqa: E402
+from analytics_export import Source, export_source  # noqa: E402
+from db_engine import create_readonly_engine  # noqa: E402
+from query_results import execute_select  # noqa: E402
+
+QUERIES = {
+    "revenue by fulfillment status": (
+        "SELECT Fulfillment_Status, COUNT(*) AS lines, SUM(Total_Price) AS revenue "
+        "FROM order_lines GROUP BY Fulfillment_Status ORDER BY revenue DESC"
+    ),
+    "revenue by ship state (join)": (
+        "SELECT o.Ship_State, COUNT(*) AS lines, SUM(l.Total_Price) AS revenue "
+        "FROM order_lines l JOIN orders o ON o.Order_ID = l.Order_ID GROUP BY o.Ship_State ORDER BY revenue DESC"
+    ),
+}
+STATES = ["CA", "TX", "NY", "FL", "WA", "IL", "GA", "NC", "OH", "PA"]
+LINE_STATUSES = ["pending", "allocated", "shipped", "cancelled", "returned"]
+FULFILLMENT_STATUSES = ["unassigned", "assigned", "picking", "packed", "shipped", "delivered", "cancelled", "returned"]
+
+
+def schema(table: str) -> str:
+    with sqlite3.connect(f"file:{os.path.join(ROOT, 'orders_testing.db')}?mode=ro", uri=True) as conn:
+        return conn.execute("SELECT sql FROM sqlite_master WHERE name = ?", (table,)).fetchone()[0]
+
+
+def build(path: str, lines: int) -> None:
+    rnd = random.Random(3)
+    orders = max(1, lines // 3)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute(schema("orders"))
+    conn.execute(schema("order_lines"))
+    conn.execute("CREATE INDEX idx_lines_order ON order_lines(Order_ID)")
+    conn.executemany(
+        "INSERT INTO orders (Order_ID, Customer_ID, Order_Total_Price, Order_Final_Price, Ship_State, "
+        "Payment_Method, Order_Status) VALUES (?, ?, 5000, 5000, ?, 'Card', 'shipped')",
+        ((f"ORD-{i:08d}", i % 5000, rnd.choice(STATES)) for i in range(orders)),
+    )
+    conn.executemany(
+        "INSERT INTO order_lines (Order_ID, Order_Line_Id, Item_ID, Quantity, Unit_price, Total_Price, "
+        "Order_Line_Status, Fulfillment_Status) VALUES (?, ?, 'TSHIRT-CLASSIC', 1, ?, ?, ?, ?)",
+        ((f"ORD-{i % orders:08d}", f"L{i:09d}", p, p, rnd.choice(LINE_STATUSES), rnd.choice(FULFILLMENT_STATUSES))
+         for i, p in ((i, 999 + i % 7000) for i in range(lines))),
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, repeat: int):
+    samples, out = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), out
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db, out = os.path.join(tmp, "orders.db"), os.path.join(tmp, "analytics")
+        start = time.perf_counter()
+        build(db, args.rows)
+        print(f"built {args.rows:,} order lines in {time.perf_counter() - start:.0f}s "
+              f"({os.path.getsize(db) / 1e6:,.0f} MB)")
+        for table in ("orders", "order_lines"):
+            r = export_source(Source(table, db, table, "sq_number"), out)
+            size = sum(os.path.getsize(os.path.join(out, table, f)) for f in os.listdir(os.path.join(out, table)))
+            print(f"exported {table:<12} {r.rows:>12,} rows, {r.files} files, {size / 1e6:,.0f} MB, {r.seconds:.1f}s")
+
+        engine = create_readonly_engine(db)
+        analytics = AnalyticsEngine(out)
+        print(f"\n{'query':<32}{'SQLite s':>10}{'DuckDB s':>10}{'speed-up':>10}")
+        for name, sql in QUERIES.items():
+            live_s, live = timed(lambda: execute_select(engine, sql), args.repeat)
+            duck_s, duck = timed(lambda: analytics.execute_select(sql), args.repeat)
+            assert sorted(live.rows) == sorted(tuple(r) for r in duck.rows), (live.rows, duck.rows)
+            print(f"{name:<32}{live_s:>10.2f}{duck_s:>10.2f}{live_s / duck_s:>9.0f}x")
+        engine.dispose()
+        print(f"\nmedians of {args.repeat} warm runs; both paths return the same rows")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10_000_000, help="order lines")
+    ap.add_argument("--repeat", type=int, default=3)
+    main(ap.parse_args())
@@ -0,0 +1,91 @@
+"""SQL-prompt tokens per turn over a 30-turn session: raw history vs. ConversationMemory.
+
+Replays a scripted CSR session against orders_testing.db. The old history is the
+original `history_to_text` (last 6 turns, `str(db.run())[:500]` per result); the new
+one is `ConversationMemory` fed the same turns. No LLM is called.
+
+    python benchmarks/bench_conversation_memory.py [--turns 30] [--budget 500]
+"""
+import argparse
+import os
+import statistics
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from langchain_community.utilities import SQLDatabase  # noqa: E402
+
+from conversation_memory import ConversationMemory  # noqa: E402
+from db_engine import create_readonly_engine  # noqa: E402
+from query_results import execute_select, preview_text  # noqa: E402
+from tokens import count_tokens  # noqa: E402
+
+PROMPT = (
+    "You are a SQL expert for SQLite.\n"
+    "Write ONLY a single-line SELECT statement (no comments, no prose, no code fences, no mutating operations) "
+    "that answers the question using the provided schema and conversation history.\n\n"
+    "Schema:\n{schema}\n\nConversation History:\n{history_text}\n\nLatest Question: {question}\nSQL:"
+)
+SCRIPT = [
+    ("Show the orders for customer {cid}",
+     "SELECT * FROM orders WHERE Customer_ID = {cid}"),
+    ("What lines are on {oid}?",
+     "SELECT * FROM order_lines WHERE Order_ID = '{oid}'"),
+    ("Which of those lines have shipped?",
+     "SELECT Order_Line_Id, Item_Description FROM order_lines WHERE Order_ID = '{oid}' AND Order_Line_Status = 'shipped'"),
+    ("How many orders are in {state}?",
+     "SELECT count(*) FROM orders WHERE Ship_State = '{state}'"),
+    ("List paid orders in {state} with their totals",
+     "SELECT Order_ID, Order_Final_Price FROM orders WHERE Ship_State = '{state}' AND Order_Status = 'paid'"),
+]
+
+
+def history_to_text(history_pairs, max_turns=6):
+    if not history_pairs:
+        return "None"
+    trimmed = history_pairs[-max_turns:]
+    return "\n".join([f"User: {u}\nAssistant: {a}" for (u, a) in trimmed])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", type=int, default=30)
+    ap.add_argument("--budget", type=int, default=500)
+    args = ap.parse_args()
+
+    engine = create_readonly_engine(os.path.join(HERE, "..", "orders_testing.db"))
+    db = SQLDatabase(engine)
+    schema = db.get_table_info()
+    order_ids = [r[0] for r in execute_select(engine, "SELECT Order_ID FROM orders ORDER BY sq_number").rows]
+    states = ["NY", "CA", "TX", "OR", "NC"]
+
+    pairs, memory = [], ConversationMemory(token_budget=args.budget)
+    rows = []
+    for turn in range(args.turns):
+        q_tmpl, sql_tmpl = SCRIPT[turn % len(SCRIPT)]
+        slot = turn // len(SCRIPT)
+        params = {"cid": 20 + slot, "oid": order_ids[slot * 7 % len(order_ids)], "state": states[slot % len(states)]}
+        question, sql = q_tmpl.format(**params), sql_tmpl.format(**params) + " LIMIT 200"
+
+        old_hist, new_hist = history_to_text(pairs), memory.render()
+        old_total = count_tokens(PROMPT.format(schema=schema, history_text=old_hist, question=question))
+        new_total = count_tokens(PROMPT.format(schema=schema, history_text=new_hist, question=question))
+        rows.append((turn + 1, count_tokens(old_hist), count_tokens(new_hist), old_total, new_total))
+
+        pairs.append((question, f"SQL: {sql}\nResult: {str(db.run(sql))[:500]}"))
+        memory.add(question, sql, preview_text(execute_select(engine, sql)))
+    engine.dispose()
+
+    print(f"{'turn':>4}{'old history':>13}{'new history':>13}{'old prompt':>12}{'new prompt':>12}")
+    for r in rows:
+        if r[0] in (1, 2, 3, 5) or r[0] % 5 == 0:
+            print(f"{r[0]:>4}{r[1]:>13}{r[2]:>13}{r[3]:>12}{r[4]:>12}")
+    print(f"mean history tokens: old {statistics.mean(r[1] for r in rows):.0f}, "
+          f"new {statistics.mean(r[2] for r in rows):.0f} (budget {args.budget}); "
+          f"schema alone is {count_tokens(schema)} tokens")
+    print("final memory:\n" + memory.render())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Prompt size and latency of stringified `db.run()` output vs. `QueryResult` summaries.
+
+Builds a 1k-row order_lines table in a temp SQLite file and times both paths from
+query execution to the finished answer prompt (the LLM call itself is excluded;
+its latency scales with the prompt tokens reported here).
+
+    python benchmarks/bench_query_results.py [--rows 1000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import create_engine  # noqa: E402
+from langchain_community.utilities import SQLDatabase  # noqa: E402
+
+from query_results import execute_select, summarize_for_llm  # noqa: E402
+from tokens import count_tokens  # noqa: E402
+
+PROMPT = (
+    "You are a helpful assistant. Using the user's question, the SQL query, and the SQL result, "
+    "produce a concise, accurate answer grounded ONLY in the result (no speculation). "
+    "If the result is empty, state that clearly and suggest a clarifying question.\n\n"
+    "User Question: {question}\nSQL Query: {sql}\nSQL Result: {result}\n\nAnswer:"
+)
+QUESTION = "Show me all order lines with their status and price"
+SQL = (
+    "SELECT Order_ID, Order_Line_Id, Item_ID, Item_Description, Quantity, Unit_price, "
+    "Total_Price, Order_Line_Status FROM order_lines"
+)
+
+
+def build_db(path: str, rows: int) -> None:
+    rnd = random.Random(7)
+    items = [("CAP-LOGO", "Logo Cap", 2499), ("TSHIRT-CLASSIC", "Classic Tee", 1999),
+             ("JACKET-DENIM", "Denim Jacket", 8999), ("SOCKS-3PK", "Socks 3-Pack", 999)]
+    statuses = ["pending", "allocated", "shipped", "cancelled", "returned"]
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE order_lines (sq_number INTEGER PRIMARY KEY, Order_ID TEXT, Order_Line_Id TEXT, "
+        "Item_ID TEXT, Item_Description TEXT, Quantity INTEGER, Unit_price INTEGER, "
+        "Total_Price INTEGER, Order_Line_Status TEXT)"
+    )
+    data = []
+    for i in range(rows):
+        item_id, desc, price = rnd.choice(items)
+        qty = rnd.randint(1, 4)
+        order_id = f"ORD-2025-{i // 3 + 1:06d}"
+        data.append((order_id, f"{order_id}-L{i % 3 + 1:02d}", item_id, desc, qty, price,
+                     qty * price, rnd.choice(statuses)))
+    conn.executemany(
+        "INSERT INTO order_lines (Order_ID, Order_Line_Id, Item_ID, Item_Description, Quantity, "
+        "Unit_price, Total_Price, Order_Line_Status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        data,
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, repeat: int):
+    samples, out = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1000)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--budget", type=int, default=600)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        build_db(path, args.rows)
+        engine = create_engine(f"sqlite:///{path}")
+        db = SQLDatabase(engine)
+
+        def old_path():
+            result = db.run(SQL)
+            return PROMPT.format(question=QUESTION, sql=SQL, result=result)
+
+        def new_path():
+            result = execute_select(engine, SQL)
+            return PROMPT.format(question=QUESTION, sql=SQL,
+                                 result=summarize_for_llm(result, token_budget=args.budget))
+
+        old_ms, old_prompt = timed(old_path, args.repeat)
+        new_ms, new_prompt = timed(new_path, args.repeat)
+        engine.dispose()
+
+    print(f"{args.rows} result rows, median of {args.repeat} runs (LLM call excluded)")
+    print(f"{'path':<22}{'prompt chars':>14}{'prompt tokens':>15}{'latency ms':>12}")
+    for name, prompt, ms in (("db.run() string", old_prompt, old_ms),
+                             ("QueryResult summary", new_prompt, new_ms)):
+        print(f"{name:<22}{len(prompt):>14}{count_tokens(prompt):>15}{ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
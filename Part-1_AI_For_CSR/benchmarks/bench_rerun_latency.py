@@ -0,0 +1,75 @@
+"""Per-rerun database cost: engine built at import (old) vs. cached read-only engine (new).
+
+Streamlit re-executes the whole script on every interaction. The old script called
+`SQLDatabase.from_uri(...)` each time, which builds a new engine and reflects the
+schema before the query can run. The new one builds the engine and `SQLDatabase`
+once per process via `st.cache_resource`; a rerun only checks a pooled connection
+out. This script replays both sequences against orders_testing.db.
+
+    python benchmarks/bench_rerun_latency.py [--reruns 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from langchain_community.utilities import SQLDatabase  # noqa: E402
+
+from db_engine import create_readonly_engine  # noqa: E402
+from query_results import execute_select  # noqa: E402
+
+DB_PATH = os.path.join(HERE, "..", "orders_testing.db")
+SQL = (
+    "SELECT o.Order_ID, o.Order_Status, c.Customer_Name FROM orders o "
+    "JOIN customers c ON c.Customer_ID = o.Customer_ID WHERE o.Ship_State = 'NY' LIMIT 200"
+)
+
+
+def median_ms(samples):
+    return statistics.median(samples) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reruns", type=int, default=50)
+    args = ap.parse_args()
+
+    old = []
+    for _ in range(args.reruns):
+        start = time.perf_counter()
+        db = SQLDatabase.from_uri(f"sqlite:///{DB_PATH}")
+        db.run(SQL)
+        old.append(time.perf_counter() - start)
+        db._engine.dispose()
+
+    start = time.perf_counter()
+    engine = create_readonly_engine(DB_PATH)
+    SQLDatabase(engine)
+    execute_select(engine, SQL)
+    first = time.perf_counter() - start
+    new = []
+    for _ in range(args.reruns):
+        start = time.perf_counter()
+        execute_select(engine, SQL)
+        new.append(time.perf_counter() - start)
+
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("DELETE FROM orders WHERE 1 = 0")
+        write_check = "NOT blocked"
+    except Exception as e:
+        write_check = f"blocked ({str(e).splitlines()[0]})"
+    engine.dispose()
+
+    print(f"{args.reruns} reruns, median per rerun")
+    print(f"  from_uri on every rerun     : {median_ms(old):8.2f} ms")
+    print(f"  cached read-only engine     : {median_ms(new):8.2f} ms  (first run incl. setup {first * 1000:.2f} ms)")
+    print(f"  write through cached engine : {write_check}")
+
+
+if __name__ == "__main__":
+    main()
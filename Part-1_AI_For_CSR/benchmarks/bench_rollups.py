@@ -0,0 +1,251 @@
+"""Dashboard questions on the base tables vs. the daily rollups from rollups.py.
+
+Builds orders (--rows / 3) and order_lines (--rows) tables with the schema of
+orders_testing.db over --days days, and a tickets database with the Part-2 schema
+(--rows / 10 tickets), in a temp folder. Then it:
+
+* times a full rollup build;
+* times each question on the base tables and on the rollups, and checks that both
+  return the same rows;
+* updates --updates recent orders (status changes that leave
+  last_updated_timestamp alone, plus line changes), adds, reassigns and deletes
+  tickets, and times the incremental refresh against a full rebuild.
+
+Queries run through execute_select on the read-only engine without the query guard,
+which would reject the base-table scans.
+
+    python benchmarks/bench_rollups.py [--rows 10000000] [--days 365] [--updates 1000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+from db_engine import create_readonly_engine  # noqa: E402
+from query_results import execute_select  # noqa: E402
+from rollups import refresh  # noqa: E402
+
+STATES = ["CA", "TX", "NY", "FL", "WA", "IL", "GA", "NC", "OH", "PA", "AZ", "CO", "MA", "MI", "NJ", "OR", "VA"]
+ORDER_STATUSES = ["created", "paid", "allocated", "partially_shipped", "shipped", "cancelled", "returned"]
+LINE_STATUSES = ["pending", "allocated", "shipped", "cancelled", "returned"]
+FULFILLMENT_STATUSES = ["unassigned", "assigned", "picking", "packed", "shipped", "delivered", "cancelled", "returned"]
+CSRS = ["Joe", "Amber", "Max", "Priya", "Luis", "Mei", "Sam", "Nora"]
+END = datetime(2025, 10, 1)
+# Part-2 services/tickets/Storage/support_tickets.db
+TICKETS_SCHEMA = """
+CREATE TABLE tickets (
+    Ticket_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Cust_Email TEXT NOT NULL,
+    Order_ID TEXT NOT NULL,
+    Call_Timestamp TEXT NOT NULL,
+    CSR_Name TEXT NOT NULL,
+    Ticket_Notes TEXT NOT NULL
+);
+CREATE INDEX idx_tickets_email ON tickets (Cust_Email);
+CREATE INDEX idx_tickets_order ON tickets (Order_ID);
+CREATE INDEX idx_tickets_timestamp ON tickets (Call_Timestamp);
+"""
+
+# name -> (base-table SQL, rollup SQL); {today} / {week} are filled in with the last day of data
+QUERIES = {
+    "cancelled orders today by state": (
+        "SELECT Ship_State, COUNT(*) AS orders FROM orders WHERE Order_Status = 'cancelled' "
+        "AND Ordered_Timestamp >= '{today}' GROUP BY Ship_State ORDER BY Ship_State",
+        "SELECT Ship_State, SUM(orders) AS orders FROM rollup_orders_daily WHERE Order_Status = 'cancelled' "
+        "AND day >= '{today}' GROUP BY Ship_State ORDER BY Ship_State",
+    ),
+    "returned line value this week by state": (
+        "SELECT o.Ship_State, SUM(l.Total_Price) AS refunds FROM orders o JOIN order_lines l ON l.Order_ID = o.Order_ID "
+        "WHERE l.Fulfillment_Status = 'returned' AND o.Ordered_Timestamp >= '{week}' GROUP BY o.Ship_State ORDER BY 1",
+        "SELECT Ship_State, SUM(total_price) AS refunds FROM rollup_order_lines_daily "
+        "WHERE Fulfillment_Status = 'returned' AND day >= '{week}' GROUP BY Ship_State ORDER BY 1",
+    ),
+    "orders and revenue by status, all time": (
+        "SELECT Order_Status, COUNT(*) AS orders, SUM(Order_Final_Price) AS revenue FROM orders "
+        "GROUP BY Order_Status ORDER BY 1",
+        "SELECT Order_Status, SUM(orders) AS orders, SUM(final_price) AS revenue FROM rollup_orders_daily "
+        "GROUP BY Order_Status ORDER BY 1",
+    ),
+    "units by fulfillment status, all time": (
+        "SELECT Fulfillment_Status, SUM(Quantity) AS units FROM order_lines GROUP BY 1 ORDER BY 1",
+        "SELECT Fulfillment_Status, SUM(quantity) AS units FROM rollup_order_lines_daily GROUP BY 1 ORDER BY 1",
+    ),
+}
+# asked of the tickets database
+TICKET_QUERIES = {
+    "tickets per CSR this week": (
+        "SELECT CSR_Name, COUNT(*) AS tickets FROM tickets WHERE Call_Timestamp >= '{week}' GROUP BY 1 ORDER BY 1",
+        "SELECT CSR_Name, SUM(tickets) AS tickets FROM rollup_tickets_daily WHERE day >= '{week}' GROUP BY 1 ORDER BY 1",
+    ),
+    "tickets per day, all time": (
+        "SELECT substr(Call_Timestamp, 1, 10) AS day, COUNT(*) AS tickets FROM tickets GROUP BY 1 ORDER BY 1",
+        "SELECT day, SUM(tickets) AS tickets FROM rollup_tickets_daily GROUP BY 1 ORDER BY 1",
+    ),
+}
+
+
+def schema(db_path: str, table: str):
+    with sqlite3.connect(f"file:{db_path}?mode=ro", uri=True) as conn:
+        return [sql for (sql,) in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND sql IS NOT NULL", (table,))]
+
+
+def ts(rnd: random.Random, days: int) -> str:
+    return (END - timedelta(seconds=rnd.randrange(days * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def build(db: str, tickets_db: str, lines: int, days: int) -> None:
+    rnd = random.Random(5)
+    orders = max(1, lines // 3)
+    conn = sqlite3.connect(db)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    for table in ("orders", "order_lines"):
+        for sql in schema(os.path.join(ROOT, "orders_testing.db"), table):
+            conn.execute(sql)
+    conn.executemany(
+        "INSERT INTO orders (Order_ID, Customer_ID, Order_Total_Price, Discount_Applied, Order_Final_Price, Ship_State, "
+        "Payment_Method, Order_Status, Ordered_Timestamp, last_updated_timestamp) "
+        "VALUES (?, ?, 5000, 500, 4500, ?, 'Card', ?, ?, ?)",
+        ((f"ORD-{i:08d}", i % 5000, rnd.choice(STATES), rnd.choice(ORDER_STATUSES), t, t)
+         for i, t in ((i, ts(rnd, days)) for i in range(orders))),
+    )
+    conn.executemany(
+        "INSERT INTO order_lines (Order_ID, Order_Line_Id, Item_ID, Quantity, Unit_price, Total_Price, "
+        "Order_Line_Status, Fulfillment_Status) VALUES (?, ?, 'TSHIRT-CLASSIC', ?, 999, ?, ?, ?)",
+        ((f"ORD-{i % orders:08d}", f"L{i:09d}", q, 999 * q, rnd.choice(LINE_STATUSES), rnd.choice(FULFILLMENT_STATUSES))
+         for i, q in ((i, 1 + i % 3) for i in range(lines))),
+    )
+    conn.commit()
+    conn.close()
+
+    conn = sqlite3.connect(tickets_db)
+    conn.executescript(TICKETS_SCHEMA)
+    add_tickets(conn, rnd, max(1, lines // 10), days)
+    conn.close()
+
+
+def add_tickets(conn, rnd: random.Random, n: int, days: int) -> None:
+    """n tickets; like the services, some with ISO 8601 call times ('T' separator, UTC offset)."""
+    def call_time(i):
+        t = ts(rnd, days)
+        return t.replace(" ", "T") + ".000000+00:00" if i % 4 == 0 else t
+
+    conn.executemany(
+        "INSERT INTO tickets (Cust_Email, Order_ID, Call_Timestamp, CSR_Name, Ticket_Notes) VALUES (?, ?, ?, ?, 'note')",
+        ((f"user{i % 5000:04d}@example.com", f"ORD-{i:08d}", call_time(i), rnd.choice(CSRS)) for i in range(n)),
+    )
+    conn.commit()
+
+
+def touch_tickets(tickets_db: str, n: int) -> None:
+    """n new tickets, n reassigned to another CSR, n // 10 deleted."""
+    rnd = random.Random(11)
+    conn = sqlite3.connect(tickets_db)
+    add_tickets(conn, rnd, n, 3)
+    (top,) = conn.execute("SELECT MAX(Ticket_ID) FROM tickets").fetchone()
+    conn.executemany("UPDATE tickets SET CSR_Name = ? WHERE Ticket_ID = ?",
+                     ((rnd.choice(CSRS), rnd.randint(1, top)) for _ in range(n)))
+    conn.executemany("DELETE FROM tickets WHERE Ticket_ID = ?", ((rnd.randint(1, top),) for _ in range(n // 10)))
+    conn.commit()
+    conn.close()
+
+
+def touch_recent(db: str, n: int) -> None:
+    """Status changes on n orders of the last three days, and a fulfillment change on one line of each.
+
+    The status updates don't set last_updated_timestamp: the rollup trigger does.
+    """
+    rnd = random.Random(9)
+    conn = sqlite3.connect(db)
+    since = (END - timedelta(days=3)).strftime("%Y-%m-%d")
+    ids = [i for (i,) in conn.execute("SELECT Order_ID FROM orders WHERE Ordered_Timestamp >= ?", (since,))]
+    picked = rnd.sample(ids, min(n, len(ids)))
+    conn.executemany(
+        "UPDATE orders SET Order_Status = ? WHERE Order_ID = ?",
+        ((rnd.choice(ORDER_STATUSES), i) for i in picked),
+    )
+    conn.executemany(
+        "UPDATE order_lines SET Fulfillment_Status = ? WHERE sq_number = "
+        "(SELECT MIN(sq_number) FROM order_lines WHERE Order_ID = ?)",
+        ((rnd.choice(FULFILLMENT_STATUSES), i) for i in picked),
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, repeat: int):
+    samples, out = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), out
+
+
+def compare(engine, tickets_engine, args) -> None:
+    today = (END - timedelta(days=1)).strftime("%Y-%m-%d")
+    week = (END - timedelta(days=7)).strftime("%Y-%m-%d")
+    print(f"\n{'question':<42}{'base ms':>10}{'rollup ms':>11}{'speed-up':>10}")
+    cases = [(name, engine, sqls) for name, sqls in QUERIES.items()]
+    cases += [(name, tickets_engine, sqls) for name, sqls in TICKET_QUERIES.items()]
+    for name, engine, (base, rolled) in cases:
+        base, rolled = base.format(today=today, week=week), rolled.format(today=today, week=week)
+        base_s, base_r = timed(lambda: execute_select(engine, base), args.repeat)
+        roll_s, roll_r = timed(lambda: execute_select(engine, rolled), args.repeat)
+        assert base_r.rows == roll_r.rows, (name, base_r.rows, roll_r.rows)
+        print(f"{name:<42}{base_s * 1000:>10.1f}{roll_s * 1000:>11.2f}{base_s / roll_s:>9.0f}x")
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db, tickets_db = os.path.join(tmp, "orders.db"), os.path.join(tmp, "support_tickets.db")
+        start = time.perf_counter()
+        build(db, tickets_db, args.rows, args.days)
+        print(f"built {args.rows:,} order lines, {args.rows // 3:,} orders, {args.rows // 10:,} tickets over "
+              f"{args.days} days in {time.perf_counter() - start:.0f}s ({os.path.getsize(db) / 1e6:,.0f} MB)")
+
+        start = time.perf_counter()
+        refresh(db, full=True, tickets_db=tickets_db)  # first run also creates the indexes and triggers
+        print(f"first rollup build (with indexes): {time.perf_counter() - start:.1f}s")
+        full_s, _ = timed(lambda: refresh(db, full=True, tickets_db=tickets_db), 1)
+        sizes = {}
+        for path, tables in ((db, ("rollup_orders_daily", "rollup_order_lines_daily")),
+                             (tickets_db, ("rollup_tickets_daily",))):
+            with sqlite3.connect(path) as conn:
+                sizes.update({t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in tables})
+        print(f"full rollup rebuild: {full_s:.1f}s; rollup rows: {sizes}")
+
+        engine, tickets_engine = create_readonly_engine(db), create_readonly_engine(tickets_db)
+        compare(engine, tickets_engine, args)
+
+        touch_recent(db, args.updates)
+        touch_tickets(tickets_db, args.updates)
+        start = time.perf_counter()
+        out = refresh(db, tickets_db=tickets_db)
+        incr_s = time.perf_counter() - start
+        print(f"\nafter {args.updates:,} order updates and {args.updates:,} new, reassigned and "
+              f"{args.updates // 10:,} deleted tickets: incremental refresh "
+              f"{incr_s * 1000:.0f} ms ({out}) vs. full rebuild {full_s * 1000:,.0f} ms")
+        compare(engine, tickets_engine, args)  # rollups still match the base tables
+        engine.dispose()
+        tickets_engine.dispose()
+        print(f"\nmedians of {args.repeat} warm runs; base tables and rollups return the same rows")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10_000_000, help="order lines")
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--updates", type=int, default=1000)
+    ap.add_argument("--repeat", type=int, default=3)
+    main(ap.parse_args())
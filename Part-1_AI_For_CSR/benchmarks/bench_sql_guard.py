@@ -0,0 +1,56 @@
+"""Per-query overhead of the token-based SQL validator (target: well under 1 ms).
+
+    python benchmarks/bench_sql_guard.py [--number 2000]
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sql_guard import UnsafeSQL, validate_select  # noqa: E402
+
+QUERIES = [
+    "SELECT * FROM orders",
+    "SELECT Order_Status, count(*) FROM orders GROUP BY Order_Status ORDER BY 2 DESC",
+    "SELECT o.Order_ID, c.Customer_Name FROM orders o JOIN customers c ON c.Customer_ID = o.Customer_ID "
+    "WHERE o.Ship_State = 'NY' AND o.Order_Status IN ('paid', 'allocated') LIMIT 5000",
+    "WITH t AS (SELECT Customer_ID, sum(Order_Final_Price) AS s FROM orders GROUP BY 1) "
+    "SELECT c.Customer_Name, t.s FROM t JOIN customers c ON c.Customer_ID = t.Customer_ID "
+    "WHERE t.Customer_ID IN (SELECT Customer_ID FROM orders WHERE Order_Status = 'returned' LIMIT 10) "
+    "ORDER BY t.s DESC",
+    "SELECT * FROM orders; DROP TABLE orders",
+]
+
+# The regex guardrails the validator replaced, for reference.
+MUTATING_RE = re.compile(r"^\s*(INSERT|UPDATE|DELETE|DROP|ALTER|CREATE|REPLACE|TRUNCATE)\b", re.I)
+
+
+def old_guard(sql):
+    ok = (not MUTATING_RE.search(sql)) and bool(re.match(r"^\s*SELECT\b", sql, re.I))
+    return sql if re.search(r"\bLIMIT\b", sql, re.I) else sql + " LIMIT 200", ok
+
+
+def new_guard(sql):
+    try:
+        return validate_select(sql, 200)
+    except UnsafeSQL:
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--number", type=int, default=2000)
+    args = ap.parse_args()
+    print(f"{'query':<60}{'regex µs':>10}{'validator µs':>14}")
+    for sql in QUERIES:
+        old = min(timeit.repeat(lambda: old_guard(sql), number=args.number, repeat=5)) / args.number
+        new = min(timeit.repeat(lambda: new_guard(sql), number=args.number, repeat=5)) / args.number
+        label = sql if len(sql) <= 57 else sql[:56] + "…"
+        print(f"{label:<60}{old * 1e6:>10.1f}{new * 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
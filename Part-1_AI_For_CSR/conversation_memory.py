@@ -0,0 +1,171 @@
+"""Token-budgeted conversation memory for the SQL prompt.
+
+`history_to_text` replayed the last 6 turns verbatim (question, SQL and up to 500
+characters of result each), so every SQL prompt grew with turn count and result size.
+`ConversationMemory` keeps only the most recent turns verbatim and folds everything
+older into a small entity state: the customer and order being discussed and the
+filters currently in effect. The rendered history, headers included, never exceeds
+its token budget (counted with the same tokenizer), and what is stored per session
+is bounded by it too.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sql_guard import UnsafeSQL, render, tokenize
+from tokens import count_tokens, truncate_tokens
+
+ORDER_ID_RE = re.compile(r"\bORD-\d{4}-\d{6}\b|\bORD-\d+\b", re.I)
+EMAIL_RE = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b")
+CUSTOMER_ID_RE = re.compile(r"\bCustomer_ID\s*=\s*(\d+)", re.I)
+CUSTOMER_NAME_RE = re.compile(r"\bCustomer_Name\s*(?:=|LIKE)\s*'([^']+)'", re.I)
+CLAUSE_END = {"GROUP", "ORDER", "LIMIT", "HAVING", "WINDOW", "UNION", "EXCEPT", "INTERSECT"}
+STATE_HEADER = "Known context:\n"
+TURNS_HEADER = "Recent turns:\n"
+ELLIPSIS = " …"
+MAX_FILTER_TOKENS = 80
+
+
+@dataclass
+class Turn:
+    question: str
+    sql: str
+    result: str
+
+
+@dataclass
+class EntityState:
+    customer: Dict[str, str] = field(default_factory=dict)  # id / name / email
+    order_id: Optional[str] = None
+    filters: Optional[str] = None
+    earlier_questions: List[str] = field(default_factory=list)
+
+    def render(self, max_questions: int = 3) -> str:
+        parts = []
+        if self.customer:
+            parts.append("current customer: " + ", ".join(f"{k}={v}" for k, v in self.customer.items()))
+        if self.order_id:
+            parts.append(f"current Order_ID: {self.order_id}")
+        if self.filters:
+            parts.append(f"filters in effect: {self.filters}")
+        if self.earlier_questions:
+            recent = self.earlier_questions[-max_questions:]
+            parts.append("earlier questions: " + " | ".join(recent))
+        return "\n".join(parts)
+
+
+def where_clause(sql: str) -> Optional[str]:
+    """Top-level WHERE predicates of sql, or None."""
+    try:
+        tokens = tokenize(sql)
+    except UnsafeSQL:
+        return None
+    depth, start, end = 0, None, len(tokens)
+    for i, tok in enumerate(tokens):
+        if tok.text == "(":
+            depth += 1
+        elif tok.text == ")":
+            depth -= 1
+        elif depth == 0 and tok.kind == "word":
+            word = tok.text.upper()
+            if word == "WHERE" and start is None:
+                start = i + 1
+            elif start is not None and word in CLAUSE_END:
+                end = i
+                break
+    if start is None or start >= end:
+        return None
+    return render(tokens[start:end])
+
+
+def _shorten(text: str, max_tokens: int) -> str:
+    """text cut to at most max_tokens tokens, with an ellipsis if it was cut."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    room = max_tokens - count_tokens(ELLIPSIS)
+    while room > 0:
+        cut = truncate_tokens(text, room).rstrip() + ELLIPSIS
+        if count_tokens(cut) <= max_tokens:
+            return cut
+        room -= 1
+    return truncate_tokens(text, max_tokens)
+
+
+class ConversationMemory:
+    def __init__(self, token_budget: int = 500, recent_turns: int = 2):
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+        self.turns: List[Turn] = []
+        self.state = EntityState()
+
+    def add(self, question: str, sql: str, result: str) -> None:
+        # A turn longer than the whole budget is never rendered in full; store only what can be
+        limit = self.token_budget
+        self.turns.append(Turn(_shorten(question, limit), _shorten(sql, limit), _shorten(result, limit)))
+        self._update_state(question, sql, result)
+        while len(self.turns) > self.recent_turns:
+            old = self.turns.pop(0)
+            self.state.earlier_questions = self.state.earlier_questions[-9:] + [_shorten(old.question, 30)]
+
+    def _update_state(self, question: str, sql: str, result: str) -> None:
+        text = f"{question}\n{sql}"
+        orders = ORDER_ID_RE.findall(text) or ORDER_ID_RE.findall(result)
+        # Only a single order in the result counts as "the" order under discussion
+        if orders and len({o.upper() for o in orders}) == 1:
+            self.state.order_id = orders[0].upper()
+        for key, regex, source in (
+            ("id", CUSTOMER_ID_RE, sql),
+            ("name", CUSTOMER_NAME_RE, sql),
+            ("email", EMAIL_RE, text),
+        ):
+            found = regex.findall(source)
+            if found:
+                if key in ("id", "email") and self.state.customer.get(key) not in (None, found[-1]):
+                    self.state.customer = {}  # a different customer: drop the stale details
+                self.state.customer[key] = found[-1]
+        # the latest query's filters, or none: an unfiltered query must not inherit the previous ones
+        filters = where_clause(sql)
+        self.state.filters = _shorten(filters, MAX_FILTER_TOKENS) if filters else None
+
+    def clear(self) -> None:
+        self.turns = []
+        self.state = EntityState()
+
+    def render(self) -> str:
+        """History text for the SQL prompt, at most `token_budget` tokens."""
+        if not self.turns and not self.state.render():
+            return "None"
+        state = self.state.render()
+        if state:
+            # the context may take at most half the budget; the rest is for the turns
+            state = _shorten(state, self.token_budget // 2 - count_tokens(STATE_HEADER))
+        budget = self.token_budget - count_tokens(self._join(state, []))
+        if self.turns:
+            budget -= count_tokens(TURNS_HEADER) + 1  # +1 for the newline before it
+        blocks: List[str] = []
+        for turn in reversed(self.turns):
+            block = f"User: {turn.question}\nAssistant: SQL: {turn.sql}\nResult: {turn.result}"
+            cost = count_tokens(block) + 1  # and the newline joining it
+            if cost > budget:
+                if blocks:
+                    break
+                # always keep the latest turn, trimmed to what is left
+                block = _shorten(block, max(budget - 1, 0))
+                cost = count_tokens(block) + 1
+            blocks.insert(0, block)
+            budget -= cost
+        out = self._join(state, blocks)
+        # Tokens can merge across the joins; cut the rare overshoot rather than exceed the budget
+        return out if count_tokens(out) <= self.token_budget else _shorten(out, self.token_budget)
+
+    @staticmethod
+    def _join(state: str, blocks: List[str]) -> str:
+        out = []
+        if state:
+            out.append(STATE_HEADER + state)
+        if blocks:
+            out.append(TURNS_HEADER + "\n".join(blocks))
+        return "\n".join(out)
+
+    def token_count(self) -> int:
+        return count_tokens(self.render())
@@ -0,0 +1,63 @@
+"""Read-only, pooled SQLite engine for the Part-1 assistant.
+
+The assistant only ever runs SELECTs, so the database is opened with `mode=ro` and
+`PRAGMA query_only`: writes fail inside SQLite itself, whatever the SQL guardrails
+let through. Connections are pooled and tuned for reads (memory-mapped I/O and a
+large page cache), and the app builds the engine once per process.
+"""
+import os
+import sqlite3
+from urllib.parse import quote
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+DEFAULT_MMAP_BYTES = 256 * 1024 * 1024
+DEFAULT_CACHE_KIB = 64 * 1024
+
+
+def readonly_uri(db_path: str, immutable: bool = False) -> str:
+    """SQLite URI that opens db_path read-only.
+
+    `immutable=1` also skips file locking and change detection. Only use it when nothing
+    else writes to the file while the app runs, otherwise reads may be stale or corrupt.
+    """
+    uri = f"file:{quote(os.path.abspath(db_path))}?mode=ro"
+    if immutable:
+        uri += "&immutable=1"
+    return uri
+
+
+def create_readonly_engine(
+    db_path: str,
+    immutable: bool = False,
+    mmap_bytes: int = DEFAULT_MMAP_BYTES,
+    cache_kib: int = DEFAULT_CACHE_KIB,
+    pool_size: int = 4,
+):
+    if not os.path.exists(db_path):
+        # mode=ro never creates the file, but fail with a clearer message than "unable to open"
+        raise FileNotFoundError(f"SQLite database not found: {db_path}")
+    uri = readonly_uri(db_path, immutable=immutable)
+
+    def connect():
+        # Streamlit runs each session in its own thread; pooled connections move between them.
+        return sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    engine = create_engine(
+        "sqlite://",
+        creator=connect,
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=pool_size,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _tune(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA query_only = ON")
+        cur.execute(f"PRAGMA mmap_size = {int(mmap_bytes)}")
+        cur.execute(f"PRAGMA cache_size = -{int(cache_kib)}")
+        cur.close()
+
+    return engine
@@ -0,0 +1,150 @@
+"""Pre-execution cost check and hard time budget for LLM-generated SQL.
+
+A LIMIT on the outer query does not bound the work SQLite does underneath it, so a
+cross join or an unindexed scan over `order_lines` can still run for minutes. The
+guard inspects `EXPLAIN QUERY PLAN` before running anything and, while the query
+runs, aborts it through SQLite's progress handler once the time budget is spent.
+Both failures raise `QueryTooExpensive`, whose message is written so it can be fed
+straight back to the LLM for a repaired query.
+"""
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+class QueryTooExpensive(Exception):
+    """Raised when a query is predicted to be, or turns out to be, too costly to run."""
+
+
+SCAN_RE = re.compile(r"^SCAN (\w+)(?: USING (COVERING )?INDEX (\w+))?", re.I)
+ALIAS_RE = re.compile(r"(?:\bFROM|\bJOIN|,)\s+(\w+)(?:\s+AS)?(?:\s+(\w+))?", re.I)
+NOT_ALIAS = {
+    "WHERE", "ON", "USING", "JOIN", "LEFT", "RIGHT", "INNER", "OUTER", "CROSS", "NATURAL",
+    "FULL", "GROUP", "ORDER", "LIMIT", "HAVING", "UNION", "EXCEPT", "INTERSECT", "WINDOW",
+}
+
+
+def table_row_estimates(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Approximate row counts per table. max(rowid) is an O(log n) lookup, unlike count(*)."""
+    counts = {}
+    tables = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+    for (name,) in tables:
+        try:
+            n = conn.execute(f'SELECT max(rowid) FROM "{name}"').fetchone()[0]
+        except sqlite3.OperationalError:  # WITHOUT ROWID table
+            n = conn.execute(f'SELECT count(*) FROM "{name}"').fetchone()[0]
+        counts[name.lower()] = int(n or 0)
+    return counts
+
+
+def alias_map(sql: str, tables: Dict[str, int]) -> Dict[str, str]:
+    """Map aliases used in the query (and table names themselves) to table names."""
+    mapping = {t: t for t in tables}
+    for table, alias in ALIAS_RE.findall(sql):
+        table = table.lower()
+        if table in tables and alias and alias.upper() not in NOT_ALIAS:
+            mapping[alias.lower()] = table
+    return mapping
+
+
+def explain_plan(conn: sqlite3.Connection, sql: str) -> List[Tuple[int, int, str]]:
+    return [(r[0], r[1], r[3]) for r in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+
+
+@dataclass
+class QueryGuard:
+    max_scan_rows: int = 500_000       # largest table a single full scan may touch
+    max_join_rows: int = 2_000_000     # largest estimated nested-loop product of full scans
+    max_seconds: float = 10.0          # hard wall-clock budget enforced while running
+    unknown_rows: int = 1_000          # assumed size of CTEs / subqueries in the plan
+    check_every: int = 1_000           # SQLite VM instructions between budget checks
+    row_estimates: Optional[Dict[str, int]] = field(default=None, repr=False)
+
+    def _estimates(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        if self.row_estimates is None:
+            self.row_estimates = table_row_estimates(conn)
+        return self.row_estimates
+
+    def problems(self, conn: sqlite3.Connection, sql: str) -> List[str]:
+        """Reasons the plan looks too expensive; empty if it is fine to run."""
+        rows = self._estimates(conn)
+        aliases = alias_map(sql, rows)
+        scans_by_parent: Dict[int, List[Tuple[str, int]]] = {}
+        found = []
+        for _id, parent, detail in explain_plan(conn, sql):
+            m = SCAN_RE.match(detail)
+            if not m or m.group(1).upper() == "CONSTANT":
+                continue
+            name = m.group(1).lower()
+            table = aliases.get(name)
+            n = rows.get(table, self.unknown_rows) if table else self.unknown_rows
+            scans_by_parent.setdefault(parent, []).append((table or name, n))
+            if table and n > self.max_scan_rows:
+                found.append(
+                    f"full scan of table {table} (~{n:,} rows); filter on an indexed column "
+                    f"(e.g. a key or ID) or aggregate a narrower slice"
+                )
+        for scans in scans_by_parent.values():
+            if len(scans) < 2:
+                continue
+            product = 1
+            for _, n in scans:
+                product *= max(n, 1)
+            if product > self.max_join_rows:
+                names = " x ".join(t for t, _ in scans)
+                found.append(
+                    f"cartesian product / unindexed join {names} (~{product:,} row combinations); "
+                    f"join on key columns (Order_ID, Customer_ID) instead of a cross join"
+                )
+        return found
+
+    def check(self, conn: sqlite3.Connection, sql: str) -> None:
+        found = self.problems(conn, sql)
+        if found:
+            raise QueryTooExpensive("Query too expensive, please narrow it: " + "; ".join(found))
+
+    @contextmanager
+    def time_budget(self, conn: sqlite3.Connection):
+        """Abort the running statement once `max_seconds` have elapsed; yields its VMCounter."""
+        try:
+            with vm_counter(conn, self.check_every, deadline=time.perf_counter() + self.max_seconds) as counter:
+                yield counter
+        except Exception as e:  # sqlite3.OperationalError, possibly wrapped by SQLAlchemy
+            if "interrupted" in str(e).lower():
+                raise QueryTooExpensive(
+                    f"Query too expensive, please narrow it: it ran longer than the "
+                    f"{self.max_seconds:g}s budget and was stopped"
+                ) from e
+            raise
+
+
+@dataclass
+class VMCounter:
+    """SQLite VM instructions run so far, counted in units of `every` by the progress handler."""
+    every: int
+    ticks: int = 0
+
+    @property
+    def steps(self) -> int:
+        return self.ticks * self.every
+
+
+@contextmanager
+def vm_counter(conn: sqlite3.Connection, every: int = 1_000, deadline: Optional[float] = None):
+    """Count the VM instructions of what runs inside; abort it past `deadline` (perf_counter)."""
+    counter = VMCounter(every)
+
+    def handler():
+        counter.ticks += 1
+        return 1 if deadline is not None and time.perf_counter() > deadline else 0
+
+    conn.set_progress_handler(handler, every)
+    try:
+        yield counter
+    finally:
+        conn.set_progress_handler(None, 0)
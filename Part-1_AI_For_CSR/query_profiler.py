@@ -0,0 +1,143 @@
+"""Profile of the LLM-generated SQL the assistant runs, with a slow-query log.
+
+`execute_select(..., profiler=...)` reports every query it runs: time spent executing
+and fetching, rows returned and SQLite VM instructions (counted by the progress handler
+the query guard installs anyway). Python's sqlite3 has no per-statement "rows scanned"
+counter, so the VM instruction count stands in for it: a full scan shows up as many
+instructions for few rows.
+
+Queries are grouped by their tokens with literals replaced by ?, so the same question
+asked about different customers (or in a different letter case) adds up to one
+statement. Queries slower than `slow_ms` (SLOW_QUERY_MS, 50 ms by default, like the
+Part-2 services) are written, with their `EXPLAIN QUERY PLAN`, to a rotating
+JSON-lines log (SLOW_QUERY_LOG) whose folder is created with the first slow query;
+`top()` is what the "Query profile" sidebar panel shows.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+
+from query_guard import explain_plan
+from sql_guard import Token, UnsafeSQL, render, tokenize
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "50"))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", os.path.join(HERE, "logs", "slow_queries.log"))
+SORT_KEYS = ("total_ms", "mean_ms", "max_ms", "calls", "vm_steps", "rows")
+
+
+def normalize_sql(sql: str) -> str:
+    """One line, keywords upper-cased, string and number literals replaced by ?."""
+    try:
+        tokens = tokenize(sql)
+    except UnsafeSQL:
+        return " ".join(sql.split())
+    return render([Token("param", "?") if t.kind in ("string", "number") else t for t in tokens])
+
+
+@dataclass
+class StatementStats:
+    statement: str
+    calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+    vm_steps: int = 0
+    slow: int = 0
+    plan: Optional[List[str]] = None  # of the last slow call
+    last_sql: str = ""
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "statement": self.statement,
+            "calls": self.calls,
+            "total_ms": round(self.total_ms, 2),
+            "mean_ms": round(self.mean_ms, 2),
+            "max_ms": round(self.max_ms, 2),
+            "rows": self.rows,
+            "vm_steps": self.vm_steps,
+            "slow": self.slow,
+            "plan": "; ".join(self.plan) if self.plan else "",
+        }
+
+
+class _SlowQueryFile(RotatingFileHandler):
+    """Rotating log whose folder is created when the first line is written."""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class QueryProfiler:
+    """Per-statement totals plus a rotating log of slow queries; nothing is written until one is slow."""
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS, log_path: Optional[str] = SLOW_QUERY_LOG,
+                 max_statements: int = 500, max_bytes: int = 5 * 1024 * 1024, backups: int = 3):
+        self.slow_ms = slow_ms
+        self.max_statements = max_statements
+        self.stats: Dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+        self.log: Optional[logging.Logger] = None
+        if log_path:
+            self.log = logging.getLogger(f"part1.slow_queries.{os.path.abspath(log_path)}")
+            self.log.propagate = False
+            self.log.setLevel(logging.INFO)
+            if not self.log.handlers:
+                self.log.addHandler(_SlowQueryFile(log_path, maxBytes=max_bytes, backupCount=backups,
+                                                  encoding="utf-8", delay=True))
+
+    def record(self, conn, sql: str, elapsed_ms: float, rows: int, vm_steps: int) -> None:
+        """Add one run of sql; conn (the raw sqlite3 connection) is used for the plan of slow ones."""
+        statement = normalize_sql(sql)
+        slow = elapsed_ms >= self.slow_ms
+        plan = None
+        if slow:
+            try:
+                plan = [detail for _, _, detail in explain_plan(conn, sql)]
+            except Exception as e:
+                plan = [f"(no plan: {e})"]
+        with self._lock:
+            stats = self.stats.get(statement)
+            if stats is None:
+                if len(self.stats) >= self.max_statements:
+                    # bounded: forget the statement that has cost the least so far
+                    del self.stats[min(self.stats, key=lambda k: self.stats[k].total_ms)]
+                stats = self.stats[statement] = StatementStats(statement)
+            stats.calls += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.rows += rows
+            stats.vm_steps += vm_steps
+            stats.last_sql = sql
+            if slow:
+                stats.slow += 1
+                stats.plan = plan
+        if slow and self.log is not None:
+            self.log.info(json.dumps({
+                "ts": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "ms": round(elapsed_ms, 2),
+                "rows": rows,
+                "vm_steps": vm_steps,
+                "statement": statement,
+                "sql": " ".join(sql.split()),
+                "plan": plan,
+            }, ensure_ascii=False))
+
+    def top(self, n: int = 10, sort: str = "total_ms") -> List[Dict]:
+        with self._lock:
+            rows = [s.to_dict() for s in self.stats.values()]
+        return sorted(rows, key=lambda r: r[sort], reverse=True)[:n]
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats.clear()
@@ -0,0 +1,171 @@
+"""Columnar query execution for the Part-1 assistant.
+
+`SQLDatabase.run` hands back `str(list_of_tuples)`: no column names, no types, and
+every row gets pasted into the answer prompt. `execute_select` returns a `QueryResult`
+instead, which the UI renders as a table and `summarize_for_llm` condenses into a
+token-budgeted block (header, top rows, per-column aggregates). With a
+`query_profiler.QueryProfiler`, every query run is also added to its profile.
+"""
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from query_guard import vm_counter
+from tokens import count_tokens
+
+
+@dataclass
+class QueryResult:
+    columns: List[str]
+    rows: List[tuple]
+    elapsed_ms: float = 0.0
+    types: List[str] = field(default_factory=list)
+
+    def __post_init__(self):
+        if not self.types:
+            self.types = [_infer_type(self.column(i)) for i in range(len(self.columns))]
+
+    @property
+    def row_count(self) -> int:
+        return len(self.rows)
+
+    def column(self, idx: int) -> List[Any]:
+        return [r[idx] for r in self.rows]
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        return [dict(zip(self.columns, r)) for r in self.rows]
+
+    def unique_columns(self) -> List[str]:
+        """Column names made unique (joins like `SELECT *` repeat names such as Order_ID)."""
+        seen: Dict[str, int] = {}
+        out = []
+        for c in self.columns:
+            seen[c] = seen.get(c, 0) + 1
+            out.append(c if seen[c] == 1 else f"{c}_{seen[c]}")
+        return out
+
+    def to_pandas(self):
+        import pandas as pd
+        return pd.DataFrame.from_records(self.rows, columns=self.unique_columns())
+
+    def to_arrow(self):
+        import pyarrow as pa
+        return pa.table({c: self.column(i) for i, c in enumerate(self.unique_columns())})
+
+
+def _infer_type(values: List[Any]) -> str:
+    seen = {type(v) for v in values if v is not None}
+    if not seen:
+        return "null"
+    if seen <= {int, bool}:
+        return "int"
+    if seen <= {int, float, bool}:
+        return "float"
+    if seen == {bytes}:
+        return "bytes"
+    return "str"
+
+
+def execute_select(engine, sql: str, guard=None, profiler=None) -> QueryResult:
+    """Run a SELECT on a SQLAlchemy engine and return columns + typed rows.
+
+    With a `query_guard.QueryGuard`, the plan is cost-checked first and execution
+    (including the fetch) runs under its time budget. With a profiler, the run is
+    recorded (time, rows, VM instructions; the plan if it was slow).
+    """
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        raw = conn.connection.driver_connection
+        if guard is not None:
+            guard.check(raw, sql)
+            budget = guard.time_budget(raw)
+        else:
+            budget = vm_counter(raw)
+        with budget as counter:
+            run_start = time.perf_counter()
+            cur = conn.exec_driver_sql(sql)
+            columns = list(cur.keys())
+            rows = [tuple(r) for r in cur.fetchall()]
+            run_ms = (time.perf_counter() - run_start) * 1000
+        if profiler is not None:
+            profiler.record(raw, sql, run_ms, len(rows), counter.steps)
+    return QueryResult(columns, rows, elapsed_ms=(time.perf_counter() - start) * 1000)
+
+
+# ---------------- LLM summary ----------------
+def _fmt(v: Any, max_len: int = 40) -> str:
+    if v is None:
+        return "NULL"
+    if isinstance(v, float):
+        v = round(v, 4)
+    s = str(v).replace("\n", " ")
+    return s if len(s) <= max_len else s[: max_len - 1] + "…"
+
+
+def _aggregates(result: QueryResult, top_k: int = 3) -> List[str]:
+    lines = []
+    for i, (name, typ) in enumerate(zip(result.columns, result.types)):
+        values = [v for v in result.column(i) if v is not None]
+        nulls = result.row_count - len(values)
+        null_txt = f", nulls={nulls}" if nulls else ""
+        if not values:
+            lines.append(f"{name}: all NULL")
+        elif typ in ("int", "float"):
+            total = sum(values)
+            lines.append(
+                f"{name}: min={_fmt(min(values))}, max={_fmt(max(values))}, "
+                f"sum={_fmt(total)}, avg={_fmt(total / len(values))}{null_txt}"
+            )
+        else:
+            counts = Counter(_fmt(v) for v in values)
+            if len(counts) == len(values):
+                lines.append(f"{name}: {len(counts)} distinct (all unique){null_txt}")
+                continue
+            top = ", ".join(f"{k}={n}" for k, n in counts.most_common(top_k))
+            lines.append(f"{name}: {len(counts)} distinct (top: {top}){null_txt}")
+    return lines
+
+
+def summarize_for_llm(result: QueryResult, token_budget: int = 600, aggregates: bool = True) -> str:
+    """Compact text view of a result that fits in roughly `token_budget` tokens.
+
+    Small results are rendered in full. Larger ones keep the header, as many leading
+    rows as the budget allows and one aggregate line per column, so the model can
+    still answer "how many"/"total"/"most common" questions about the hidden rows.
+    """
+    if not result.columns:
+        return "(no columns)"
+    if not result.rows:
+        return "columns: " + " | ".join(result.columns) + "\n(0 rows)"
+
+    header = " | ".join(result.columns)
+    row_lines = [" | ".join(_fmt(v) for v in r) for r in result.rows]
+    full = f"columns: {header}\n" + "\n".join(row_lines) + f"\n({result.row_count} rows)"
+    # cheap length check first: tokenizing a 1k-row dump just to reject it is the slow part
+    if len(full) <= token_budget * 8 and count_tokens(full) <= token_budget:
+        return full
+
+    agg = "aggregates over all rows:\n" + "\n".join(_aggregates(result)) if aggregates else ""
+    fixed = count_tokens(header) + count_tokens(agg) + 20
+    shown: List[str] = []
+    used = fixed
+    for line in row_lines:
+        cost = count_tokens(line) + 1
+        if used + cost > token_budget:
+            break
+        shown.append(line)
+        used += cost
+    return (
+        f"columns: {header}\n"
+        + "\n".join(shown)
+        + f"\n(showing {len(shown)} of {result.row_count} rows)"
+        + (f"\n{agg}" if agg else "")
+    )
+
+
+def preview_text(result: Optional[QueryResult], token_budget: int = 120) -> str:
+    """Very short summary used when a past result is carried in the chat history."""
+    if result is None:
+        return "None"
+    return summarize_for_llm(result, token_budget=token_budget, aggregates=False)
@@ -0,0 +1,279 @@
+"""Daily rollup tables for the questions CSRs and supervisors ask all day.
+
+"Refunds this week by state", "orders cancelled today" or "tickets per CSR" are
+otherwise a full-scan aggregate over orders / order_lines / tickets for every
+question. `refresh` keeps small tables up to date next to their source tables:
+
+* rollup_orders_daily       order day x Ship_State x Order_Status: orders and price totals;
+* rollup_order_lines_daily  order day x Ship_State x Fulfillment_Status: lines, units, totals;
+* rollup_tickets_daily      call day x CSR_Name: tickets, in the Part-2 tickets database
+                            (--tickets-db or CSR_TICKETS_DB; each file of a sharded one).
+
+Refreshes are incremental. The order days of orders whose last_updated_timestamp is
+at or after the last refresh (watermark in rollup_watermarks) are recomputed; a
+status change moves an order between buckets of the same day. Triggers created with
+the tables mark an order as updated when one of its rolled-up columns changes
+without last_updated_timestamp being set, or when one of its lines is inserted or
+changed, so writers that don't maintain the timestamp are picked up too. In the
+tickets database, triggers record the call days of inserted, reassigned, re-dated
+and deleted tickets in rollup_tickets_changed, and those days are recomputed.
+`--full` rebuilds everything (e.g. after deleting orders, which the watermark
+doesn't see).
+
+    python rollups.py [--db orders_testing.db] [--tickets-db PATH] [--full] [--every 60]
+
+The app adds `rollup_hint` to the schema in the SQL prompt, so the LLM answers
+these questions from the rollups of the database it queries.
+"""
+import argparse
+import sqlite3
+import time
+import os
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from analytics_export import DEFAULT_ORDERS_DB, find_shards
+
+# same variable as the Part-2 services' config; no tickets rollup unless set or passed
+DEFAULT_TICKETS_DB = os.getenv("CSR_TICKETS_DB")
+
+WATERMARKS = """
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+  name         TEXT PRIMARY KEY,
+  value        TEXT NOT NULL,
+  refreshed_at TEXT NOT NULL
+);
+"""
+
+SCHEMA = WATERMARKS + """
+CREATE TABLE IF NOT EXISTS rollup_orders_daily (
+  day          TEXT NOT NULL,      -- date(Ordered_Timestamp), 'YYYY-MM-DD'
+  Ship_State   TEXT NOT NULL,      -- '' when unknown
+  Order_Status TEXT NOT NULL,
+  orders       INTEGER NOT NULL,
+  total_price  INTEGER NOT NULL,   -- SUM(Order_Total_Price)
+  discount     INTEGER NOT NULL,   -- SUM(Discount_Applied)
+  final_price  INTEGER NOT NULL,   -- SUM(Order_Final_Price)
+  PRIMARY KEY (day, Ship_State, Order_Status)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_order_lines_daily (
+  day                TEXT NOT NULL,  -- date(orders.Ordered_Timestamp)
+  Ship_State         TEXT NOT NULL,
+  Fulfillment_Status TEXT NOT NULL,
+  lines              INTEGER NOT NULL,
+  quantity           INTEGER NOT NULL,
+  total_price        INTEGER NOT NULL,
+  PRIMARY KEY (day, Ship_State, Fulfillment_Status)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_orders_updated ON orders(last_updated_timestamp);
+CREATE INDEX IF NOT EXISTS idx_orders_ordered ON orders(Ordered_Timestamp);
+-- a change to a rolled-up column that didn't set last_updated_timestamp sets it
+CREATE TRIGGER IF NOT EXISTS trg_orders_touch_upd
+AFTER UPDATE OF Order_Status, Ship_State, Ordered_Timestamp, Order_Total_Price, Discount_Applied, Order_Final_Price
+ON orders WHEN NEW.last_updated_timestamp IS OLD.last_updated_timestamp BEGIN
+  UPDATE orders SET last_updated_timestamp = datetime('now') WHERE rowid = NEW.rowid;
+END;
+-- a line change marks its order as updated, so the next refresh recomputes that day
+CREATE TRIGGER IF NOT EXISTS trg_lines_touch_order_ins AFTER INSERT ON order_lines BEGIN
+  UPDATE orders SET last_updated_timestamp = datetime('now') WHERE Order_ID = NEW.Order_ID;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_lines_touch_order_upd AFTER UPDATE ON order_lines BEGIN
+  UPDATE orders SET last_updated_timestamp = datetime('now') WHERE Order_ID IN (OLD.Order_ID, NEW.Order_ID);
+END;
+"""
+
+ORDERS_SQL = """
+INSERT INTO rollup_orders_daily
+SELECT substr(Ordered_Timestamp, 1, 10), COALESCE(Ship_State, ''), Order_Status, COUNT(*),
+       SUM(Order_Total_Price), SUM(Discount_Applied), SUM(Order_Final_Price)
+FROM orders
+WHERE Ordered_Timestamp >= :start AND Ordered_Timestamp < :end
+GROUP BY 1, 2, 3
+"""
+LINES_SQL = """
+INSERT INTO rollup_order_lines_daily
+SELECT substr(o.Ordered_Timestamp, 1, 10), COALESCE(o.Ship_State, ''), l.Fulfillment_Status, COUNT(*),
+       SUM(l.Quantity), SUM(l.Total_Price)
+FROM orders o JOIN order_lines l ON l.Order_ID = o.Order_ID
+WHERE o.Ordered_Timestamp >= :start AND o.Ordered_Timestamp < :end
+GROUP BY 1, 2, 3
+"""
+
+TICKETS_SCHEMA = WATERMARKS + """
+CREATE TABLE IF NOT EXISTS rollup_tickets_daily (
+  day      TEXT NOT NULL,           -- date(Call_Timestamp), 'YYYY-MM-DD'
+  CSR_Name TEXT NOT NULL,
+  tickets  INTEGER NOT NULL,
+  PRIMARY KEY (day, CSR_Name)
+) WITHOUT ROWID;
+-- call days whose counts changed since the last refresh
+CREATE TABLE IF NOT EXISTS rollup_tickets_changed (day TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS trg_tickets_rollup_ins AFTER INSERT ON tickets BEGIN
+  INSERT OR IGNORE INTO rollup_tickets_changed VALUES (substr(NEW.Call_Timestamp, 1, 10));
+END;
+CREATE TRIGGER IF NOT EXISTS trg_tickets_rollup_upd AFTER UPDATE OF Call_Timestamp, CSR_Name ON tickets BEGIN
+  INSERT OR IGNORE INTO rollup_tickets_changed VALUES (substr(OLD.Call_Timestamp, 1, 10));
+  INSERT OR IGNORE INTO rollup_tickets_changed VALUES (substr(NEW.Call_Timestamp, 1, 10));
+END;
+CREATE TRIGGER IF NOT EXISTS trg_tickets_rollup_del AFTER DELETE ON tickets BEGIN
+  INSERT OR IGNORE INTO rollup_tickets_changed VALUES (substr(OLD.Call_Timestamp, 1, 10));
+END;
+"""
+
+# Call_Timestamp is 'YYYY-MM-DD HH:MM:SS' or ISO 8601 ('YYYY-MM-DDTHH:MM:SS...'): both sort by day
+TICKETS_SQL = """
+INSERT INTO rollup_tickets_daily
+SELECT substr(Call_Timestamp, 1, 10), CSR_Name, COUNT(*)
+FROM tickets
+WHERE Call_Timestamp >= :start AND Call_Timestamp < :end
+GROUP BY 1, 2
+"""
+
+HINT = """
+Pre-aggregated rollup tables, refreshed up to {refreshed}. Prefer them over the base tables
+for counts and totals by day, state, status or CSR (filter day with 'YYYY-MM-DD' strings, e.g. day >= date('now', '-6 days'));
+use the base tables only for single orders, tickets, customers or items:
+"""
+# rollup table -> its line in the hint, for the tables the database has
+TABLE_HINTS = {
+    "rollup_orders_daily":
+        "- rollup_orders_daily: one row per order day x Ship_State x Order_Status (orders, total_price, discount, final_price).",
+    "rollup_order_lines_daily":
+        "- rollup_order_lines_daily: one row per order day x Ship_State x Fulfillment_Status (lines, quantity, total_price).",
+    "rollup_tickets_daily":
+        "- rollup_tickets_daily: one row per call day x CSR_Name (tickets).",
+}
+
+
+def _watermarks(conn) -> Dict[str, str]:
+    return dict(conn.execute("SELECT name, value FROM rollup_watermarks"))
+
+
+def _set_watermark(conn, name: str, value) -> None:
+    conn.execute(
+        "INSERT INTO rollup_watermarks (name, value, refreshed_at) VALUES (?, ?, datetime('now')) "
+        "ON CONFLICT(name) DO UPDATE SET value = excluded.value, refreshed_at = excluded.refreshed_at",
+        (name, str(value)),
+    )
+
+
+def _day_ranges(days: Iterable[str]) -> List[Dict[str, str]]:
+    out = []
+    for d in sorted(days):
+        nxt = (date.fromisoformat(d) + timedelta(days=1)).isoformat()
+        out.append({"start": d, "end": nxt})
+    return out
+
+
+def refresh_orders(conn, full: bool = False) -> int:
+    """Recompute the order and line rollups of changed order days; returns the days recomputed."""
+    since = None if full else _watermarks(conn).get("orders")
+    (newest,) = conn.execute("SELECT MAX(last_updated_timestamp) FROM orders").fetchone()
+    if newest is None:
+        return 0
+    if since is None:
+        conn.execute("DELETE FROM rollup_orders_daily")
+        conn.execute("DELETE FROM rollup_order_lines_daily")
+        days = [d for (d,) in conn.execute(
+            "SELECT DISTINCT substr(Ordered_Timestamp, 1, 10) FROM orders WHERE Ordered_Timestamp IS NOT NULL")]
+    else:
+        # >=: rows written later in the same second as the last refresh are not missed
+        days = [d for (d,) in conn.execute(
+            "SELECT DISTINCT substr(Ordered_Timestamp, 1, 10) FROM orders "
+            "WHERE last_updated_timestamp >= ? AND Ordered_Timestamp IS NOT NULL", (since,))]
+    ranges = _day_ranges(days)
+    if since is not None:
+        conn.executemany("DELETE FROM rollup_orders_daily WHERE day = :start", ranges)
+        conn.executemany("DELETE FROM rollup_order_lines_daily WHERE day = :start", ranges)
+    for r in ranges:
+        conn.execute(ORDERS_SQL, r)
+        conn.execute(LINES_SQL, r)
+    _set_watermark(conn, "orders", newest)
+    return len(ranges)
+
+
+def refresh_tickets(conn, full: bool = False) -> int:
+    """Recompute the ticket counts of changed call days; returns the days recomputed."""
+    # no watermark yet: a new rollup, or a new shard file written by the reshard tool
+    if full or "tickets" not in _watermarks(conn):
+        conn.execute("DELETE FROM rollup_tickets_daily")
+        days = [d for (d,) in conn.execute(
+            "SELECT DISTINCT substr(Call_Timestamp, 1, 10) FROM tickets WHERE Call_Timestamp IS NOT NULL")]
+    else:
+        days = [d for (d,) in conn.execute("SELECT day FROM rollup_tickets_changed WHERE day IS NOT NULL")]
+    ranges = _day_ranges(days)
+    conn.executemany("DELETE FROM rollup_tickets_daily WHERE day = :start", ranges)
+    for r in ranges:
+        conn.execute(TICKETS_SQL, r)
+    conn.execute("DELETE FROM rollup_tickets_changed")
+    (newest,) = conn.execute("SELECT COALESCE(MAX(Ticket_ID), 0) FROM tickets").fetchone()
+    _set_watermark(conn, "tickets", newest)
+    return len(ranges)
+
+
+def _in_transaction(conn, fn, *args):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        out = fn(conn, *args)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return out
+
+
+def _refresh_db(db_path: str, schema: str, fn, full: bool) -> int:
+    """Create the rollups of one database if needed and refresh them, in one write transaction."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA busy_timeout = 5000")
+        conn.executescript(schema)
+        return _in_transaction(conn, fn, full)
+    finally:
+        conn.close()
+
+
+def refresh(db_path: str = DEFAULT_ORDERS_DB, full: bool = False,
+            tickets_db: Optional[str] = DEFAULT_TICKETS_DB) -> Dict[str, int]:
+    """Bring the order rollups of db_path, and the ticket rollups of tickets_db if given, up to date."""
+    out = {"order_days": _refresh_db(db_path, SCHEMA, refresh_orders, full)}
+    if tickets_db:
+        out["ticket_days"] = sum(_refresh_db(path, TICKETS_SCHEMA, refresh_tickets, full)
+                                 for path in find_shards(tickets_db))
+    return out
+
+
+def rollup_hint(conn) -> str:
+    """Text for the SQL prompt describing the rollups, or '' if the database has none."""
+    try:
+        row = conn.execute("SELECT MIN(refreshed_at) FROM rollup_watermarks").fetchone()
+    except sqlite3.OperationalError:  # no rollup tables
+        return ""
+    if not row or row[0] is None:
+        return ""
+    present = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    lines = [line for table, line in TABLE_HINTS.items() if table in present]
+    return "\n".join([HINT.format(refreshed=f"{row[0]} UTC").strip(), *lines])
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Refresh the daily rollup tables.")
+    ap.add_argument("--db", default=DEFAULT_ORDERS_DB)
+    ap.add_argument("--tickets-db", default=DEFAULT_TICKETS_DB,
+                    help="Part-2 support_tickets.db to roll up as well (default: $CSR_TICKETS_DB)")
+    ap.add_argument("--full", action="store_true", help="rebuild instead of refreshing incrementally")
+    ap.add_argument("--every", type=float, help="keep refreshing every N seconds")
+    args = ap.parse_args(argv)
+    full = args.full
+    while True:
+        start = time.perf_counter()
+        out = refresh(args.db, full=full, tickets_db=args.tickets_db)
+        print(f"refreshed {out} in {(time.perf_counter() - start) * 1000:.0f} ms")
+        if not args.every:
+            break
+        full = False
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Token-based validation of LLM-generated SQL.
+
+The old guardrails were regexes on the statement prefix: a second statement after a
+`;` went unnoticed, and `LIMIT` anywhere in the text (a subquery, a string literal)
+counted as a limit on the whole result. `validate_select` tokenizes the query the
+way SQLite does (strings, quoted identifiers and comments are single tokens) and:
+
+* accepts exactly one read-only SELECT/WITH statement,
+* clamps or injects the LIMIT of the top-level query only,
+* returns a normalized text usable as a cache key.
+"""
+import re
+from dataclasses import dataclass
+from typing import List, NamedTuple, Optional, Tuple
+
+
+class UnsafeSQL(ValueError):
+    """The SQL is not a single read-only SELECT statement."""
+
+
+class Token(NamedTuple):
+    kind: str   # word | number | string | ident | param | op
+    text: str
+
+
+TOKEN_RE = re.compile(
+    r"""
+     (?P<ws>\s+)
+    |(?P<comment>--[^\n]*|/\*.*?(?:\*/|\Z))
+    |(?P<string>[xX]?'(?:[^']|'')*')
+    |(?P<ident>"(?:[^"]|"")*"|`(?:[^`]|``)*`|\[[^\]]*\])
+    |(?P<number>0[xX][0-9a-fA-F]+|(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+    |(?P<param>[?:@$]\w*)
+    |(?P<word>[A-Za-z_][\w$]*)
+    |(?P<op>->>|->|<>|<=|>=|==|!=|\|\||<<|>>|[-+*/%<>=&|~,.();])
+    """,
+    re.S | re.X,
+)
+
+# Statements/keywords that change the database or connection state.
+MUTATING = {
+    "INSERT", "UPDATE", "DELETE", "DROP", "ALTER", "CREATE", "TRUNCATE", "ATTACH", "DETACH",
+    "PRAGMA", "VACUUM", "REINDEX", "ANALYZE", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT",
+    "RELEASE", "UPSERT",
+}
+FORBIDDEN_FUNCTIONS = {"LOAD_EXTENSION", "WRITEFILE", "READFILE", "EDIT"}
+KEYWORDS = {
+    "SELECT", "DISTINCT", "ALL", "FROM", "WHERE", "GROUP", "BY", "HAVING", "ORDER", "ASC", "DESC",
+    "LIMIT", "OFFSET", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "OUTER", "CROSS", "NATURAL", "ON",
+    "USING", "AS", "AND", "OR", "NOT", "IN", "IS", "NULL", "LIKE", "GLOB", "BETWEEN", "EXISTS",
+    "CASE", "WHEN", "THEN", "ELSE", "END", "UNION", "INTERSECT", "EXCEPT", "WITH", "RECURSIVE",
+    "OVER", "PARTITION", "WINDOW", "ROWS", "RANGE", "CAST", "COLLATE", "ESCAPE", "NULLS", "FIRST",
+    "LAST", "VALUES", "FILTER", "MATERIALIZED",
+}
+NO_SPACE_BEFORE = {",", ")", ".", ";"}
+NO_SPACE_AFTER = {"(", "."}
+
+
+def tokenize(sql: str) -> List[Token]:
+    """Split sql into tokens, dropping whitespace and comments."""
+    tokens = []
+    pos, end = 0, len(sql)
+    match = TOKEN_RE.match
+    while pos < end:
+        m = match(sql, pos)
+        if m is None:
+            ch = sql[pos]
+            if ch in "'\"`[":
+                raise UnsafeSQL(f"Unterminated quote starting at position {pos}.")
+            raise UnsafeSQL(f"Unexpected character {ch!r} at position {pos}.")
+        kind = m.lastgroup
+        if kind not in ("ws", "comment"):
+            tokens.append(Token(kind, m.group()))
+        pos = m.end()
+    return tokens
+
+
+def _upper(tok: Token) -> str:
+    return tok.text.upper() if tok.kind == "word" else ""
+
+
+def render(tokens: List[Token]) -> str:
+    """Join tokens into one line; keywords upper-cased, everything else verbatim."""
+    out = []
+    prev: Optional[Token] = None
+    for tok in tokens:
+        text = tok.text.upper() if tok.kind == "word" and tok.text.upper() in KEYWORDS else tok.text
+        if prev is not None and tok.text not in NO_SPACE_BEFORE and prev.text not in NO_SPACE_AFTER:
+            # keep `count(*)` / `max(x)` tight, but `IN (…)` / `AS (…)` spaced
+            if not (tok.text == "(" and prev.kind in ("word", "ident") and _upper(prev) not in KEYWORDS):
+                out.append(" ")
+        out.append(text)
+        prev = tok
+    return "".join(out)
+
+
+@dataclass
+class ValidatedSQL:
+    sql: str          # single-line statement to execute, with the enforced LIMIT
+    cache_key: str    # normalized text: same query, same key
+    limit: int
+
+
+def _split_statement(tokens: List[Token]) -> List[Token]:
+    for i, tok in enumerate(tokens):
+        if tok.text == ";":
+            if any(t.text != ";" for t in tokens[i + 1:]):
+                raise UnsafeSQL("Multiple SQL statements are not allowed.")
+            return tokens[:i]
+    return tokens
+
+
+def _check_read_only(tokens: List[Token]) -> None:
+    if not tokens:
+        raise UnsafeSQL("Empty SQL statement.")
+    first = _upper(tokens[0])
+    if first not in ("SELECT", "WITH"):
+        raise UnsafeSQL(f"Only SELECT queries are allowed (statement starts with {tokens[0].text!r}).")
+    depth = 0
+    for i, tok in enumerate(tokens):
+        if tok.text == "(":
+            depth += 1
+        elif tok.text == ")":
+            depth -= 1
+            if depth < 0:
+                raise UnsafeSQL("Unbalanced parentheses.")
+        word = _upper(tok)
+        if not word:
+            continue
+        is_call = i + 1 < len(tokens) and tokens[i + 1].text == "("
+        if word in FORBIDDEN_FUNCTIONS and is_call:
+            raise UnsafeSQL(f"Function {tok.text}() is not allowed.")
+        if word in MUTATING or (word == "REPLACE" and not is_call):
+            raise UnsafeSQL(f"Mutating keyword {word} is not allowed in a read-only query.")
+    if depth != 0:
+        raise UnsafeSQL("Unbalanced parentheses.")
+
+
+def _top_level_limit(tokens: List[Token]) -> Optional[int]:
+    """Index of the LIMIT keyword that belongs to the outermost query, if any."""
+    depth, found = 0, None
+    for i, tok in enumerate(tokens):
+        if tok.text == "(":
+            depth += 1
+        elif tok.text == ")":
+            depth -= 1
+        elif depth == 0 and _upper(tok) == "LIMIT":
+            found = i
+    return found
+
+
+def _with_limit(tokens: List[Token], max_rows: int) -> Tuple[List[Token], int]:
+    limit_tok = Token("number", str(int(max_rows)))
+    i = _top_level_limit(tokens)
+    if i is None:
+        return tokens + [Token("word", "LIMIT"), limit_tok], max_rows
+    clause = tokens[i + 1:]
+    # LIMIT n | LIMIT n OFFSET m | LIMIT m, n
+    if len(clause) == 1 and clause[0].kind == "number":
+        count_at = i + 1
+    elif len(clause) == 3 and clause[0].kind == "number" and _upper(clause[1]) == "OFFSET" \
+            and clause[2].kind == "number":
+        count_at = i + 1
+    elif len(clause) == 3 and clause[0].kind == "number" and clause[1].text == "," \
+            and clause[2].kind == "number":
+        count_at = i + 3
+    else:
+        # LIMIT with an expression or parameter: bound the whole query from outside instead
+        wrapped = [Token("word", "SELECT"), Token("op", "*"), Token("word", "FROM"), Token("op", "(")]
+        wrapped += tokens + [Token("op", ")"), Token("word", "LIMIT"), limit_tok]
+        return wrapped, max_rows
+    text = tokens[count_at].text
+    requested = int(text, 16) if text[:2].lower() == "0x" else int(float(text))
+    if requested < 0 or requested > max_rows:
+        tokens = tokens[:count_at] + [limit_tok] + tokens[count_at + 1:]
+        return tokens, max_rows
+    return tokens, requested
+
+
+def validate_select(sql: str, max_rows: int) -> ValidatedSQL:
+    """Validate a single read-only query and bound its top-level LIMIT to max_rows.
+
+    Raises UnsafeSQL with a user-facing reason if the query is rejected.
+    """
+    tokens = _split_statement(tokenize(sql))
+    _check_read_only(tokens)
+    tokens, limit = _with_limit(tokens, max_rows)
+    text = render(tokens)
+    return ValidatedSQL(sql=text, cache_key=text, limit=limit)
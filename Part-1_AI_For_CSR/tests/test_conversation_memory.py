@@ -0,0 +1,41 @@
+from conversation_memory import ConversationMemory, where_clause
+from tokens import count_tokens
+
+
+def test_where_clause_stops_at_the_next_clause():
+    sql = "SELECT * FROM orders WHERE Order_Status = 'shipped' AND (a = 1 OR b = 2) ORDER BY 1 LIMIT 5"
+    assert where_clause(sql) == "Order_Status = 'shipped' AND (a = 1 OR b = 2)"
+    assert where_clause("SELECT COUNT(*) FROM orders") is None
+
+
+def test_unfiltered_query_clears_the_filters():
+    memory = ConversationMemory()
+    memory.add("shipped orders?", "SELECT * FROM orders WHERE Order_Status = 'shipped'", "3 rows")
+    assert "filters in effect: Order_Status = 'shipped'" in memory.render()
+    memory.add("how many orders in total?", "SELECT COUNT(*) FROM orders", "42")
+    assert memory.state.filters is None
+    assert "filters in effect" not in memory.render()
+
+
+def test_order_and_customer_are_tracked():
+    memory = ConversationMemory()
+    memory.add("status of ORD-1234?", "SELECT * FROM orders WHERE Order_ID = 'ORD-1234'", "shipped")
+    memory.add("and customer 7?", "SELECT * FROM customers WHERE Customer_ID = 7", "Ann")
+    assert memory.state.order_id == "ORD-1234"
+    assert memory.state.customer == {"id": "7"}
+    memory.add("customer 8?", "SELECT * FROM customers WHERE Customer_ID = 8", "Bob")
+    assert memory.state.customer == {"id": "8"}
+
+
+def test_render_stays_within_the_budget():
+    memory = ConversationMemory(token_budget=120, recent_turns=2)
+    for i in range(6):
+        memory.add(f"question {i} " + "word " * 200, f"SELECT * FROM orders WHERE Customer_ID = {i}", "row " * 300)
+    text = memory.render()
+    assert count_tokens(text) <= 120
+    assert len(memory.turns) == 2
+    assert memory.state.earlier_questions
+
+
+def test_empty_memory_renders_none():
+    assert ConversationMemory().render() == "None"
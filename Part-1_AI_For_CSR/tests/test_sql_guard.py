@@ -0,0 +1,63 @@
+import pytest
+
+from sql_guard import UnsafeSQL, tokenize, validate_select
+
+
+def test_strings_comments_and_identifiers_are_single_tokens():
+    tokens = tokenize("SELECT 'a;b' AS \"x y\" -- DROP TABLE t\nFROM t /* ; */")
+    assert [t.kind for t in tokens] == ["word", "string", "word", "ident", "word", "word"]
+
+
+def test_limit_is_injected_when_missing():
+    v = validate_select("select * from orders", 100)
+    assert v.sql == "SELECT * FROM orders LIMIT 100"
+    assert v.limit == 100
+
+
+@pytest.mark.parametrize("sql, limit, expected", [
+    ("SELECT * FROM orders LIMIT 10", 10, "SELECT * FROM orders LIMIT 10"),
+    ("SELECT * FROM orders LIMIT 5000", 100, "SELECT * FROM orders LIMIT 100"),
+    ("SELECT * FROM orders LIMIT 5000 OFFSET 20", 100, "SELECT * FROM orders LIMIT 100 OFFSET 20"),
+    ("SELECT * FROM orders LIMIT 20, 5000", 100, "SELECT * FROM orders LIMIT 20, 100"),
+])
+def test_top_level_limit_is_clamped(sql, limit, expected):
+    assert validate_select(sql, 100).sql == expected
+    assert validate_select(sql, 100).limit == limit
+
+
+def test_limit_in_a_subquery_or_string_does_not_count():
+    v = validate_select("SELECT * FROM (SELECT * FROM orders LIMIT 5) WHERE note = 'LIMIT 3'", 100)
+    assert v.sql.endswith("LIMIT 100")
+
+
+@pytest.mark.parametrize("limit", ["?", "-1", "10 + 5"])
+def test_limit_expression_is_bounded_from_outside(limit):
+    v = validate_select(f"SELECT * FROM orders LIMIT {limit}", 100)
+    assert v.sql.startswith("SELECT * FROM (SELECT * FROM orders LIMIT ")
+    assert v.sql.endswith(") LIMIT 100")
+
+
+def test_same_query_same_cache_key():
+    a = validate_select("select  *\nfrom orders where id = 1;", 100)
+    b = validate_select("SELECT * FROM orders WHERE id = 1", 100)
+    assert a.cache_key == b.cache_key
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM orders",
+    "SELECT 1; DROP TABLE orders",
+    "WITH x AS (SELECT 1) DELETE FROM orders",
+    "SELECT load_extension('evil')",
+    "SELECT * FROM orders WHERE (a = 1",
+    "SELECT * FROM orders)",
+    "REPLACE INTO orders VALUES (1)",
+    "PRAGMA table_info(orders)",
+    "",
+])
+def test_rejected(sql):
+    with pytest.raises(UnsafeSQL):
+        validate_select(sql, 100)
+
+
+def test_keywords_inside_strings_and_replace_function_are_allowed():
+    validate_select("SELECT replace(name, 'a', 'b') FROM t WHERE note = 'DELETE me; DROP'", 100)
@@ -0,0 +1,36 @@
+"""Token counting shared by the Part-1 prompt builders."""
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # tiktoken missing or its BPE file can't be fetched (offline): fall back to an estimate
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Number of LLM tokens in text (cl100k_base), or ~4 chars/token if tiktoken is unavailable."""
+    if not text:
+        return 0
+    enc = _encoder()
+    if enc is None:
+        return (len(text) + 3) // 4
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of text that count_tokens puts at max_tokens or fewer."""
+    if max_tokens <= 0:
+        return ""
+    enc = _encoder()
+    if enc is None:
+        return text[: max_tokens * 4]
+    ids = enc.encode(text, disallowed_special=())
+    cut = enc.decode(ids[:max_tokens])
+    while cut and count_tokens(cut) > max_tokens:  # a split multi-byte character decodes to more tokens
+        cut = cut[:-1]
+    return cut
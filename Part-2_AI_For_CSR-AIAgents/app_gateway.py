@@ -1,10 +1,59 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from services.common.direct_mcp import StatelessMcpHttp, create_mcp
+from services.common.metrics import instrument, readiness
+from services.common.startup import migrate, warm_up
+from services.common.mcp_registry import combined_tools_app
 from services.tickets.app import app as tickets_app
 from services.orders.app import app as orders_app
 from services.fulfillment.app import app as fulfillment_app
+from services.policies.app import app as policies_app
+from services.policies.app import get_service as get_policy_service
+from services.fulfillment.service import FulfillmentService
+from services.orders.service import OrderService
+from services.tickets.service import TicketService
 
-gateway = FastAPI(title="CSR Assist Gateway (Mounted Apps)", version="1.0.0")
+SERVICES = {
+    "/tickets": tickets_app,
+    "/orders": orders_app,
+    "/fulfillment": fulfillment_app,
+    "/policies": policies_app,
+}
 
-gateway.mount("/tickets", tickets_app)
-gateway.mount("/orders", orders_app)
-gateway.mount("/fulfillment", fulfillment_app)
+
+# Runs in every worker process (see serve_gateway.py): migrations under the startup lock, then per-worker caches
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    migrate()
+    warm_up()
+    async with mcp_http.run():
+        yield
+
+
+gateway = FastAPI(title="CSR Assist Gateway (Mounted Apps)", version="1.0.0", lifespan=lifespan)
+instrument(gateway, "gateway")  # /metrics has the series of every mounted service too (one registry)
+
+for prefix, service_app in SERVICES.items():
+    gateway.mount(prefix, service_app)
+
+# One MCP server with the tools of every service: a single handshake/tool list per
+# conversation instead of one per service. The tool list is built once at startup and
+# calls go straight to the route functions (see services/common/direct_mcp.py).
+tools_app = combined_tools_app(SERVICES)
+tools_app.state.metrics_service = "gateway-mcp"
+mcp = create_mcp(tools_app, name="CSR Assist Tools")
+mcp.mount_sse(gateway, mount_path="/mcp")  # SSE, like the per-service servers
+# The same tools over stateless streamable HTTP: works whichever worker gets the request
+mcp_http = StatelessMcpHttp(mcp)
+gateway.add_route("/mcp-http", mcp_http, methods=["POST"])
+
+
+# Readiness of every mounted service's databases
+@gateway.get("/healthz", include_in_schema=False)
+def health():
+    return readiness({
+        "orders_db": OrderService().ping,
+        "tickets_db": TicketService().ping,
+        "fulfillment_db": FulfillmentService().ping,
+        "policies_db": get_policy_service().ping,
+    })
@@ -0,0 +1,132 @@
+"""Ingest rate of warehouse status updates: one PUT per order vs. the bulk feed endpoint.
+
+Builds a fulfillment database of --orders orders (two lines each, the bundled
+schema, synthetic rows) in a temp folder, serves the fulfillment app on it with
+uvicorn and sends --updates status/tracking updates:
+
+* single: PUT /FulfillmentStatus/{order_id}?status=... over one keep-alive session
+  (what the warehouse system does today; status only, no tracking number);
+* ndjson / csv: POST /FulfillmentStatus/bulk with the updates as one feed each.
+
+    python benchmarks/bench_bulk_fulfillment.py [--orders 20000] [--updates 20000] [--single 2000]
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+import requests  # noqa: E402
+import uvicorn  # noqa: E402
+
+from services.fulfillment.app import app, get_service  # noqa: E402
+from services.fulfillment.service import DB_PATH, FulfillmentService  # noqa: E402
+
+STATUSES = ("In-Progress", "Shipped", "Cancelled")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def build(path: str, orders: int) -> None:
+    with sqlite3.connect(f"file:{os.path.join(ROOT, DB_PATH)}?mode=ro", uri=True) as src:
+        schema = src.execute("SELECT sql FROM sqlite_master WHERE name = 'fulfillment'").fetchone()[0]
+    with sqlite3.connect(path) as conn:
+        conn.execute(schema)
+        conn.execute("CREATE INDEX idx_fulfillment_order ON fulfillment (Order_ID)")
+        conn.executemany(
+            "INSERT INTO fulfillment (Order_ID, Cust_Email, Fulfillment_Order_ID, Created_Timestamp, Item_ID, "
+            "Item_Name, Quantity, Fulfillment_Order_Status, Tracking_Nbr, Ship_Date) "
+            "VALUES (?, ?, ?, '2025-09-25 11:00:00', ?, 'Blue Pants', 1, 'Created', '', '')",
+            [(f"ORD-{i // 2:06d}", f"user{i % 997}@example.com", f"FUL-{i // 2:06d}", f"ITEM{i % 2}")
+             for i in range(orders * 2)],
+        )
+
+
+def updates(n: int, orders: int, seed: int):
+    rnd = random.Random(seed)
+    return [{"order_id": f"ORD-{rnd.randrange(orders):06d}", "status": rnd.choice(STATUSES),
+             "tracking_nbr": f"TRK{seed}{i:07d}", "ship_date": "2025-10-01"} for i in range(n)]
+
+
+def run_single(base: str, rows) -> float:
+    with requests.Session() as http:
+        start = time.perf_counter()
+        for row in rows:
+            r = http.put(f"{base}/FulfillmentStatus/{row['order_id']}", params={"status": row["status"]})
+            r.raise_for_status()
+        return time.perf_counter() - start
+
+
+def run_bulk(base: str, body: bytes, content_type: str) -> float:
+    with requests.Session() as http:
+        start = time.perf_counter()
+        r = http.post(f"{base}/FulfillmentStatus/bulk", params={"errors_only": "true"}, data=body,
+                      headers={"Content-Type": content_type})
+        r.raise_for_status()
+        elapsed = time.perf_counter() - start
+    assert r.json()["updated"] == r.json()["received"], r.json()
+    return elapsed
+
+
+def to_csv(rows) -> bytes:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue().encode()
+
+
+def main(args):
+    logging.getLogger("uvicorn").setLevel(logging.WARNING)
+    tmp = tempfile.mkdtemp()
+    try:
+        db = os.path.join(tmp, "fulfillment.db")
+        build(db, args.orders)
+        app.dependency_overrides[get_service] = lambda: FulfillmentService(db)
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.01)
+        base = f"http://127.0.0.1:{port}"
+
+        single = run_single(base, updates(args.single, args.orders, 1))
+        ndjson = run_bulk(base, "\n".join(json.dumps(r) for r in updates(args.updates, args.orders, 2)).encode(),
+                          "application/x-ndjson")
+        csv_s = run_bulk(base, to_csv(updates(args.updates, args.orders, 3)), "text/csv")
+        server.should_exit = True
+
+        print(f"{'path':<28}{'updates':>9}{'seconds':>10}{'rows/s':>10}")
+        for name, n, s in (("single PUT (keep-alive)", args.single, single),
+                           ("bulk NDJSON", args.updates, ndjson),
+                           ("bulk CSV", args.updates, csv_s)):
+            print(f"{name:<28}{n:>9,}{s:>10.2f}{n / s:>10,.0f}")
+        print(f"bulk NDJSON is {(args.updates / ndjson) / (args.single / single):.0f}x the single-PUT rate")
+    finally:
+        app.dependency_overrides.clear()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--orders", type=int, default=20_000, help="orders in the synthetic database (2 lines each)")
+    ap.add_argument("--updates", type=int, default=20_000, help="rows per bulk feed")
+    ap.add_argument("--single", type=int, default=2_000, help="single PUTs (slow; a sample is enough for a rate)")
+    main(ap.parse_args())
@@ -0,0 +1,155 @@
+"""Sync lag and throughput of the CDC worker (services/sync) under a steady write load.
+
+Builds an orders and a fulfillment database of --lines order lines (the bundled
+schemas, synthetic rows) in a temp folder, installs the change logs, then for
+--seconds a writer thread updates --rate lines per second (every 10 ms, one
+transaction per database: order cancellations / quantity changes in orders,
+status / tracking updates in fulfillment) while the worker runs. Reports the
+achieved write rate, the worker's apply rate, the lag of the batches (age of
+their oldest and newest change at commit) and checks both databases agree.
+
+    python benchmarks/bench_cdc_sync.py [--rate 10000] [--seconds 5] [--lines 50000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+from services.fulfillment.service import DB_PATH as FULFILLMENT_DB  # noqa: E402
+from services.orders.service import DB_PATH as ORDERS_DB  # noqa: E402
+from services.sync.cdc import FULFILLMENT_TO_ORDERS  # noqa: E402
+from services.sync.worker import SyncWorker  # noqa: E402
+
+FULFILLMENT_STATUSES = ("Created", "In-Progress", "Shipped")
+
+
+def schema(path: str, table: str) -> str:
+    with sqlite3.connect(f"file:{os.path.join(ROOT, path)}?mode=ro", uri=True) as conn:
+        return conn.execute("SELECT sql FROM sqlite_master WHERE name = ?", (table,)).fetchone()[0]
+
+
+def build(tmp: str, lines: int):
+    orders, fulfillment = os.path.join(tmp, "orders.db"), os.path.join(tmp, "fulfillment.db")
+    rows = [(f"ORD-{i // 2:06d}", f"user{i % 997}@example.com", f"FUL-{i // 2:06d}", "2025-09-25 11:00:00",
+             f"ITEM{i % 2}", "Blue Pants", 1 + i % 3) for i in range(lines)]
+    with sqlite3.connect(orders) as conn:
+        conn.execute(schema(ORDERS_DB, "orders"))
+        conn.executemany(
+            "INSERT INTO orders (Order_ID, Cust_Email, Fulfillment_Order_ID, Created_Timestamp, Item_ID, Item_Name, "
+            "Quantity, Order_Status, Tracking_Nbr, Ship_Date, Item_Price, Shipping_price, Discount_Applied, "
+            "Total_Price, Appeasement_Applied, Returned_qty, Refund_Amount) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, 'Sent To Fulfillment', '', '', 70, 6, 0, 146, 0, 0, 0)",
+            rows,
+        )
+    with sqlite3.connect(fulfillment) as conn:
+        conn.execute(schema(FULFILLMENT_DB, "fulfillment"))
+        conn.executemany(
+            "INSERT INTO fulfillment (Order_ID, Cust_Email, Fulfillment_Order_ID, Created_Timestamp, Item_ID, "
+            "Item_Name, Quantity, Fulfillment_Order_Status, Tracking_Nbr, Ship_Date) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, 'Created', '', '')",
+            rows,
+        )
+    return orders, fulfillment
+
+
+def writer(orders, fulfillment, lines, rate, seconds, counts):
+    o = sqlite3.connect(orders, isolation_level=None)
+    f = sqlite3.connect(fulfillment, isolation_level=None)
+    for conn in (o, f):
+        conn.execute("PRAGMA busy_timeout = 5000")
+    rnd = random.Random(7)
+    per_tick = max(1, rate // 100)
+    start = time.perf_counter()
+    tick = 0
+    while time.perf_counter() - start < seconds:
+        keys = [(f"ORD-{n // 2:06d}", f"ITEM{n % 2}") for n in (rnd.randrange(lines) for _ in range(per_tick))]
+        half = per_tick // 2
+        o.execute("BEGIN IMMEDIATE")
+        o.executemany(
+            "UPDATE orders SET Quantity = Quantity + 1 WHERE Order_ID = ? AND Item_ID = ?", keys[:half // 2])
+        o.executemany(
+            "UPDATE orders SET Order_Status = 'Cancelled' WHERE Order_ID = ? AND Item_ID = ?", keys[half // 2:half])
+        o.execute("COMMIT")
+        f.execute("BEGIN IMMEDIATE")
+        f.executemany(
+            "UPDATE fulfillment SET Fulfillment_Order_Status = ?, Tracking_Nbr = ? WHERE Order_ID = ? AND Item_ID = ?",
+            [(rnd.choice(FULFILLMENT_STATUSES), f"TRK{tick}", *k) for k in keys[half:]],
+        )
+        f.execute("COMMIT")
+        counts["updates"] += per_tick
+        tick += 1
+        time.sleep(max(0.0, start + tick * 0.01 - time.perf_counter()))
+    counts["elapsed"] = time.perf_counter() - start
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        orders, fulfillment = build(tmp, args.lines)
+        worker = SyncWorker(orders, fulfillment, batch_size=args.batch)
+        worker.install()
+        batches = []
+        stop = threading.Event()
+
+        def on_batch(results):
+            batches.extend(r for r in results if r.applied)
+
+        sync = threading.Thread(target=worker.run, kwargs={"interval": args.interval, "stop": stop,
+                                                             "on_batch": on_batch})
+        sync.start()
+        counts = {"updates": 0}
+        writer(orders, fulfillment, args.lines, args.rate, args.seconds, counts)
+        done_writing = time.perf_counter()
+        while True:  # until the worker has drained both logs
+            with sqlite3.connect(orders) as o, sqlite3.connect(fulfillment) as f:
+                left = sum(c.execute("SELECT COUNT(*) FROM change_log").fetchone()[0] for c in (o, f))
+            if not left:
+                break
+            time.sleep(0.05)
+        drain = time.perf_counter() - done_writing
+        stop.set()
+        sync.join()
+        worker.close()
+
+        applied = sum(b.applied for b in batches)
+        busy = sum(b.seconds for b in batches)
+        lags = sorted(b.lag for b in batches)
+        newest = sorted(b.newest_lag for b in batches)
+        print(f"writes          {counts['updates']:,} line updates in {counts['elapsed']:.1f}s "
+              f"= {counts['updates'] / counts['elapsed']:,.0f}/s (target {args.rate:,}/s)")
+        print(f"change-log rows {applied:,} applied in {len(batches)} batches, "
+              f"{applied / busy:,.0f} rows/s while applying, worker busy {busy / counts['elapsed']:.0%}")
+        print(f"lag (oldest change per batch)  p50 {statistics.median(lags) * 1000:7.1f} ms   "
+              f"p99 {lags[int(len(lags) * 0.99)] * 1000:7.1f} ms   max {lags[-1] * 1000:7.1f} ms")
+        print(f"lag (newest change per batch)  p50 {statistics.median(newest) * 1000:7.1f} ms")
+        print(f"caught up {drain * 1000:.0f} ms after the last write")
+
+        # both sides agree on the synced columns
+        mapping = FULFILLMENT_TO_ORDERS.values["Fulfillment_Order_Status"]
+        with sqlite3.connect(orders) as o:
+            o.execute("ATTACH ? AS f", (fulfillment,))
+            rows = o.execute(
+                "SELECT o.Order_Status, f.Fulfillment_Order_Status, o.Tracking_Nbr = f.Tracking_Nbr, "
+                "o.Quantity = f.Quantity FROM orders o JOIN f.fulfillment f USING (Order_ID, Item_ID)"
+            ).fetchall()
+        bad = sum(1 for os_, fs, trk, qty in rows
+                  if not (trk and qty and (os_ == mapping.get(fs) or (os_, fs) == ("Cancelled", "Cancelled"))))
+        print(f"consistency     {len(rows) - bad:,} of {len(rows):,} lines agree")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rate", type=int, default=10_000, help="line updates per second")
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--lines", type=int, default=50_000)
+    ap.add_argument("--batch", type=int, default=5000)
+    ap.add_argument("--interval", type=float, default=0.05)
+    main(ap.parse_args())
@@ -0,0 +1,130 @@
+"""Throughput of the compiled return/cancel eligibility rules over 1M order lines.
+
+Two measurements on the same synthetic lines (statuses, ship dates and items drawn
+from the shapes in orders.db, plus some non-returnable item names):
+
+* engine only: EligibilityEngine.is_eligible (verdict) and check_line (verdict plus
+  reasons, what the MCP tools return) over in-memory rows;
+* end to end: OrderService.check_eligibility against a temporary SQLite copy,
+  including the batched SELECTs (and the fulfillment lookup for cancels).
+
+    python benchmarks/bench_eligibility.py [--lines 1000000] [--lines-per-order 2]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from services.orders.eligibility import CANCEL_RULES, RETURN_RULES, EligibilityEngine  # noqa: E402
+from services.orders.service import OrderService  # noqa: E402
+
+AS_OF = date(2025, 10, 15)
+STATUSES = ["Created", "Sent To Fulfillment", "Shipped", "Shipped", "Shipped", "Cancelled"]
+FULFILLMENT = ["Created", "In-Progress", "Shipped", "Cancelled"]
+ITEMS = [
+    ("PRDBLPNT001M", "Blue Pants"), ("PRDWTSHIRT002M", "White Cotton Shirt"), ("PRDCLHAT003R", "Summer Hat"),
+    ("PRDCLGLV001M", "Golf Gloves"), ("PRDCLSHE001L", "Running Shoe"), ("PRDGFTCRD050", "Digital Gift Card"),
+    ("PRDMUGENG001", "Engraved Coffee Mug"), ("PRDFLWR001", "Fresh Flowers Bouquet"),
+]
+
+
+def make_lines(n, per_order, seed=7):
+    rnd = random.Random(seed)
+    lines = []
+    for i in range(n):
+        item_id, item_name = ITEMS[rnd.randrange(len(ITEMS))]
+        status = rnd.choice(STATUSES)
+        qty = rnd.randint(1, 3)
+        shipped = status == "Shipped"
+        lines.append({
+            "Order_ID": f"ORD-{i // per_order:07d}",
+            "Item_ID": item_id,
+            "Item_Name": item_name,
+            "Quantity": qty,
+            "Order_Status": status,
+            "Ship_Date": (AS_OF - timedelta(days=rnd.randint(0, 60))).isoformat() if shipped else "",
+            "Returned_qty": rnd.randint(0, qty) if shipped else 0,
+            "Fulfillment_Status": rnd.choice(FULFILLMENT),
+        })
+    return lines
+
+
+def write_dbs(lines, orders_db, fulfillment_db):
+    conn = sqlite3.connect(orders_db)
+    conn.execute(
+        """
+        CREATE TABLE orders (
+            unique_id INTEGER PRIMARY KEY AUTOINCREMENT, Order_ID TEXT, Cust_Email TEXT,
+            Fulfillment_Order_ID TEXT, Created_Timestamp TEXT, Item_ID TEXT, Item_Name TEXT,
+            Quantity INTEGER, Order_Status TEXT, Tracking_Nbr TEXT, Ship_Date TEXT, Item_Price INTEGER,
+            Shipping_price INTEGER, Discount_Applied INTEGER, Total_Price INTEGER,
+            Appeasement_Applied INTEGER, Returned_qty INTEGER, Refund_Amount INTEGER
+        )
+        """
+    )
+    conn.executemany(
+        "INSERT INTO orders (Order_ID, Cust_Email, Fulfillment_Order_ID, Created_Timestamp, Item_ID, Item_Name, "
+        "Quantity, Order_Status, Tracking_Nbr, Ship_Date, Item_Price, Shipping_price, Discount_Applied, "
+        "Total_Price, Appeasement_Applied, Returned_qty, Refund_Amount) "
+        "VALUES (?, 'user@example.com', '', '2025-09-01 09:00:00', ?, ?, ?, ?, '', ?, 50, 5, 0, 55, 0, ?, 0)",
+        ((l["Order_ID"], l["Item_ID"], l["Item_Name"], l["Quantity"], l["Order_Status"], l["Ship_Date"],
+          l["Returned_qty"]) for l in lines),
+    )
+    conn.execute("CREATE INDEX idx_orders_order_id ON orders (Order_ID)")
+    conn.commit()
+    conn.close()
+    conn = sqlite3.connect(fulfillment_db)
+    conn.execute("CREATE TABLE fulfillment (Order_ID TEXT, Item_ID TEXT, Fulfillment_Order_Status TEXT)")
+    conn.executemany("INSERT INTO fulfillment VALUES (?, ?, ?)",
+                     ((l["Order_ID"], l["Item_ID"], l["Fulfillment_Status"]) for l in lines))
+    conn.execute("CREATE INDEX idx_fulfillment_order_id ON fulfillment (Order_ID)")
+    conn.commit()
+    conn.close()
+
+
+def report(label, action, n_lines, secs):
+    n_rules = len(RETURN_RULES if action == "return" else CANCEL_RULES)
+    print(f"  {label:<22}{action:<8}{secs:8.2f} s{n_lines / secs:>14,.0f} lines/s{n_lines * n_rules / secs:>14,.0f} rules/s")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", type=int, default=1_000_000)
+    ap.add_argument("--lines-per-order", type=int, default=2)
+    args = ap.parse_args()
+
+    lines = make_lines(args.lines, args.lines_per_order)
+    engine = EligibilityEngine(AS_OF)
+    print(f"{args.lines:,} lines, {args.lines // args.lines_per_order:,} orders")
+    for action in ("return", "cancel"):
+        start = time.perf_counter()
+        eligible = sum(engine.is_eligible(action, line) for line in lines)
+        report("verdict only", action, len(lines), time.perf_counter() - start)
+        start = time.perf_counter()
+        explained = sum(engine.check_line(action, line)["eligible"] for line in lines)
+        report("verdict + reasons", action, len(lines), time.perf_counter() - start)
+        assert eligible == explained
+        print(f"  {'':<22}{'':<8}{eligible / len(lines):.1%} of lines eligible")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        orders_db, fulfillment_db = os.path.join(tmp, "orders.db"), os.path.join(tmp, "fulfillment.db")
+        write_dbs(lines, orders_db, fulfillment_db)
+        svc = OrderService(db_path=orders_db, fulfillment_db_path=fulfillment_db)
+        order_ids = list(dict.fromkeys(l["Order_ID"] for l in lines))
+        del lines
+        for action in ("return", "cancel"):
+            start = time.perf_counter()
+            results = svc.check_eligibility(action, order_ids, as_of=AS_OF)
+            report("OrderService (SQLite)", action, args.lines, time.perf_counter() - start)
+            print(f"  {'':<22}{'':<8}{sum(r['eligible'] for r in results) / len(results):.1%} of orders eligible")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Gateway throughput with 1, 2 and 4 worker processes (serve_gateway.py).
+
+Copies the bundled databases to a temp folder and starts serve_gateway.py on a free
+port for each worker count, with CSR_*_DB pointing at the copies and the offline
+policy embedder. Then --clients client processes send requests over --concurrency
+connections in total for --seconds. The requests rotate through:
+
+* GET /orders/orders/{id}/status
+* GET /tickets/fetchticket/?order_id={id}
+* GET /policies/policies/search?query=...
+* POST /mcp-http tools/call get_order_status (stateless MCP over streamable HTTP)
+
+It reports requests per second, median and p95 latency, and errors. Each worker runs
+on one core at most, so throughput can only grow up to the number of cores. The
+clients need cores of their own too.
+
+    python benchmarks/bench_gateway_workers.py [--workers 1 2 4] [--seconds 10] [--concurrency 32] [--clients 2]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+from local_server import free_port  # noqa: E402
+from services.common.config import FULFILLMENT_DB, ORDERS_DB, POLICIES_DB, TICKETS_DB  # noqa: E402
+
+QUERIES = ["return window after ship date", "refund for a cancelled order", "shipping delays", "damaged item"]
+MCP_HEADERS = {"Accept": "application/json, text/event-stream"}
+
+
+def copy_databases(folder: str) -> dict:
+    env = {"POLICY_EMBEDDER": "hashing", "CSR_STARTUP_LOCK": os.path.join(folder, "startup.lock")}
+    for var, path in [("CSR_ORDERS_DB", ORDERS_DB), ("CSR_TICKETS_DB", TICKETS_DB),
+                      ("CSR_FULFILLMENT_DB", FULFILLMENT_DB), ("CSR_POLICIES_DB", POLICIES_DB)]:
+        env[var] = shutil.copy(path, folder)
+    return env
+
+
+def order_ids(orders_db: str):
+    with sqlite3.connect(orders_db) as conn:
+        return [oid for (oid,) in conn.execute("SELECT DISTINCT Order_ID FROM orders ORDER BY Order_ID")]
+
+
+def start_gateway(workers: int, port: int, env: dict) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "serve_gateway.py"), "--workers", str(workers), "--port", str(port),
+         "--log-level", "warning"],
+        env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/healthz", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"gateway with {workers} workers did not start")
+
+
+def request(client: httpx.AsyncClient, n: int, oid: str):
+    kind = n % 4
+    if kind == 0:
+        return client.get(f"/orders/orders/{oid}/status")
+    if kind == 1:
+        return client.get("/tickets/fetchticket/", params={"order_id": oid})
+    if kind == 2:
+        return client.get("/policies/policies/search", params={"query": QUERIES[n % len(QUERIES)], "k": 4})
+    body = {"jsonrpc": "2.0", "id": n, "method": "tools/call",
+            "params": {"name": "get_order_status", "arguments": {"order_id": oid}}}
+    return client.post("/mcp-http", json=body, headers=MCP_HEADERS)
+
+
+async def client_loop(port: int, connections: int, seconds: float, ids, offset: int):
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=connections)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+        end = time.perf_counter() + seconds
+
+        async def run(c):
+            nonlocal errors
+            n = offset + c
+            while time.perf_counter() < end:
+                start = time.perf_counter()
+                try:
+                    r = await request(client, n, ids[n % len(ids)])
+                    ok = r.status_code == 200 and (n % 4 != 3 or '"isError":false' in r.text)
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                errors += not ok
+                n += connections
+
+        await asyncio.gather(*(run(c) for c in range(connections)))
+    return latencies, errors
+
+
+def client_process(args):
+    return asyncio.run(client_loop(*args))
+
+
+def bench(workers: int, env: dict, ids, args) -> dict:
+    port = free_port()
+    proc = start_gateway(workers, port, env)
+    try:
+        per_client = max(1, args.concurrency // args.clients)
+        with multiprocessing.Pool(args.clients) as pool:
+            pool.map(client_process, [(port, per_client, 1.0, ids, i * 7919) for i in range(args.clients)])  # warm-up
+            results = pool.map(client_process, [(port, per_client, args.seconds, ids, i * 7919)
+                                                for i in range(args.clients)])
+    finally:
+        proc.terminate()
+        proc.wait(30)
+    latencies = sorted(x for lat, _ in results for x in lat)
+    return {
+        "req/s": len(latencies) / args.seconds,
+        "p50 ms": statistics.median(latencies) * 1000,
+        "p95 ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "errors": sum(e for _, e in results),
+    }
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = copy_databases(tmp)
+        ids = order_ids(env["CSR_ORDERS_DB"])
+        print(f"{os.cpu_count()} CPU(s); {args.clients} client processes, {args.concurrency} connections, "
+              f"{args.seconds:g}s per run\n")
+        print(f"{'workers':>7}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}")
+        first = None
+        for workers in args.workers:
+            r = bench(workers, env, ids, args)
+            first = first or r
+            print(f"{workers:>7}{r['req/s']:>10,.0f}{r['p50 ms']:>9.1f}{r['p95 ms']:>9.1f}{r['errors']:>8}"
+                  f"   (x{r['req/s'] / first['req/s']:.2f})")
+        print("\nrequests rotate through order status, tickets by order, policy search and MCP tools/call")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--concurrency", type=int, default=32, help="open connections, split over the clients")
+    ap.add_argument("--clients", type=int, default=2, help="client processes")
+    main(ap.parse_args())
@@ -0,0 +1,79 @@
+"""Per-call overhead of MCP tool dispatch: HTTP loopback (FastApiMCP) vs. direct.
+
+Both servers are built on the same service apps and called through their tool
+executor, the function the MCP session handler awaits for every tools/call. The
+script first checks that both paths return identical text for each call, then times
+them on the bundled databases (read-only tools only).
+
+    python benchmarks/bench_mcp_dispatch.py [--calls 2000]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # the services use DB paths relative to the project folder
+
+from fastapi_mcp import FastApiMCP  # noqa: E402
+
+from services.common.direct_mcp import DirectFastApiMCP  # noqa: E402
+from services.orders.app import app as orders_app  # noqa: E402
+from services.tickets.app import app as tickets_app  # noqa: E402
+
+CALLS = [
+    (orders_app, "get_order_status", {"order_id": "ORD-010"}),
+    (orders_app, "get_order_details", {"order_id": "ORD-010"}),
+    (orders_app, "get_order_details", {"order_id": "ORD-010", "fields": "Item_ID,Order_Status", "format": "table"}),
+    (orders_app, "check_return_eligibility", {"order_id": "ORD-010"}),
+    (tickets_app, "get_customer_tickets", {"customer_email": "user010@example.com"}),
+]
+
+
+async def run(server, tool, args):
+    try:
+        content = await server._execute_api_tool(server._http_client, tool, args, server.operation_map)
+        return content[0].text
+    except Exception as e:
+        return f"ERROR {e}"
+
+
+async def main(args):
+    servers = {
+        app: {"http": FastApiMCP(app), "direct": DirectFastApiMCP(app)}
+        for app in {c[0] for c in CALLS}
+    }
+    # Same answers (including the error path) before comparing speed
+    for app, tool, targs in CALLS + [(orders_app, "get_order_status", {"order_id": "ORD-404"})]:
+        http = await run(servers[app]["http"], tool, targs)
+        direct = await run(servers[app]["direct"], tool, targs)
+        assert http == direct, (tool, targs, http, direct)
+
+    print(f"{'tool':<26}{'http (ASGI) us':>16}{'direct us':>12}{'speed-up':>10}")
+    for app, tool, targs in CALLS:
+        medians = {}
+        for mode in ("http", "direct"):
+            server = servers[app][mode]
+            for _ in range(50):
+                await run(server, tool, targs)
+            times = []
+            for _ in range(args.calls):
+                start = time.perf_counter()
+                await run(server, tool, targs)
+                times.append(time.perf_counter() - start)
+            medians[mode] = statistics.median(times) * 1e6
+        label = tool + (" (table)" if "format" in targs else "")
+        print(f"{label:<26}{medians['http']:>16.0f}{medians['direct']:>12.0f}"
+              f"{medians['http'] / medians['direct']:>9.1f}x")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=2000)
+    logging.getLogger("fastapi_mcp").setLevel(logging.CRITICAL)  # the 404 check is logged as an error
+    asyncio.run(main(ap.parse_args()))
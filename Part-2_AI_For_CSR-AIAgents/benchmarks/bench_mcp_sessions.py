@@ -0,0 +1,80 @@
+"""MCP session setup and per-call overhead: one server per service vs. the gateway's /mcp.
+
+Starts the four service apps and the gateway with uvicorn on free local ports and
+talks to them with the MCP SSE client, the transport the n8n workflow uses:
+
+* session setup: connect + initialize + list_tools, for every server an agent needs;
+* tool call: get_order_status on an open session.
+
+    python benchmarks/bench_mcp_sessions.py [--sessions 20] [--calls 200]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # the services use DB paths relative to the project folder
+
+from mcp import ClientSession  # noqa: E402
+from mcp.client.sse import sse_client  # noqa: E402
+
+from app_gateway import SERVICES, gateway  # noqa: E402
+from local_server import serve  # noqa: E402
+
+
+async def open_sessions(urls):
+    """Connect, initialize and list tools on every url; returns (seconds, tool count)."""
+    start = time.perf_counter()
+    tools = 0
+    for url in urls:
+        async with sse_client(url) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                tools += len((await session.list_tools()).tools)
+    return time.perf_counter() - start, tools
+
+
+async def call_latency(url, calls):
+    async with sse_client(url) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            await session.list_tools()
+            times = []
+            for _ in range(calls):
+                start = time.perf_counter()
+                result = await session.call_tool("get_order_status", {"order_id": "ORD-010"})
+                times.append(time.perf_counter() - start)
+                assert not result.isError, result
+    return times
+
+
+def ms(xs):
+    return f"{statistics.median(xs) * 1000:8.2f} ms (p95 {sorted(xs)[int(len(xs) * 0.95)] * 1000:.2f})"
+
+
+async def main(args):
+    per_service = {prefix: serve(app) + "/mcp" for prefix, app in SERVICES.items()}
+    gateway_url = serve(gateway) + "/mcp"
+
+    for label, urls in (("per-service servers", list(per_service.values())), ("gateway /mcp", [gateway_url])):
+        await open_sessions(urls)  # warm-up
+        runs = [await open_sessions(urls) for _ in range(args.sessions)]
+        print(f"{label:<20} {len(urls)} session(s), {runs[0][1]} tools: setup {ms([r[0] for r in runs])}")
+
+    for label, url in (("per-service servers", per_service["/orders"]), ("gateway /mcp", gateway_url)):
+        times = await call_latency(url, args.calls)
+        print(f"{label:<20} get_order_status call: {ms(times)}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=20)
+    ap.add_argument("--calls", type=int, default=200)
+    logging.getLogger("mcp").setLevel(logging.WARNING)
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,68 @@
+"""Cost of the metrics instrumentation on the bundled databases.
+
+* SQLite: OrderService.get_order_lines with the instrumented connection
+  (services/common/metrics.py connect) vs. a plain sqlite3 connection;
+* HTTP: GET /orders/{id}/status through the orders routes with and without
+  MetricsMiddleware (in-process ASGI client; both apps also run the instrumented
+  SQLite connection).
+
+    python benchmarks/bench_metrics_overhead.py [--calls 3000]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # the services use DB paths relative to the project folder
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from services.common.mcp_registry import combined_tools_app  # noqa: E402
+from services.common.metrics import MetricsMiddleware  # noqa: E402
+from services.orders import app as orders_module  # noqa: E402
+from services.orders.service import OrderService  # noqa: E402
+
+
+class PlainOrderService(OrderService):
+    def _connect(self, path=None):
+        return sqlite3.connect(path or self.db_path)
+
+
+def median_us(fn, calls):
+    for _ in range(100):
+        fn()
+    times = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e6
+
+
+def main(args):
+    plain, instrumented = PlainOrderService(), OrderService()
+    assert plain.get_order_lines("ORD-010") == instrumented.get_order_lines("ORD-010")
+    a = median_us(lambda: plain.get_order_lines("ORD-010"), args.calls)
+    b = median_us(lambda: instrumented.get_order_lines("ORD-010"), args.calls)
+    print(f"get_order_lines       plain {a:7.1f} us   instrumented {b:7.1f} us   (+{b - a:.1f} us)")
+
+    # The orders routes in an app without the middleware, called with and without it wrapped around
+    plain_app = combined_tools_app({"": orders_module.app})
+    without_mw = TestClient(plain_app)
+    with_mw = TestClient(MetricsMiddleware(combined_tools_app({"": orders_module.app}), service="bench"))
+    path = "/orders/ORD-010/status"
+    assert without_mw.get(path).json() == with_mw.get(path).json()
+    c = median_us(lambda: without_mw.get(path), args.calls)
+    d = median_us(lambda: with_mw.get(path), args.calls)
+    print(f"GET {path}  plain {c:7.1f} us   instrumented {d:7.1f} us   (+{d - c:.1f} us)")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=3000)
+    main(ap.parse_args())
@@ -0,0 +1,144 @@
+"""End-to-end chat turn latency: n8n-style tool path vs. the in-repo orchestrator.
+
+Both paths use the same stub model (services/orchestrator/llm.py StubLLM, with
+--llm-latency seconds per model call) and the same agent loop, and are called by
+chat_client.collect_reply over HTTP, as streamlit_app.py does:
+
+* n8n-style: the webhook runs the agent like the n8n workflow does: for every turn
+  each MCP Client Tool node opens an SSE session to its service server (initialize +
+  list tools), tool calls go one after the other over MCP, memory is in-process;
+* orchestrator: services/orchestrator/app.py: tools dispatched in-process to the route
+  functions, the calls of one model step run concurrently, memory in SQLite.
+
+n8n itself is not started; the first path reproduces its tool transport on the same
+services, so the difference is the hops and the sequential tool calls, not the model.
+
+    python benchmarks/bench_orchestrator_turn.py [--turns 20] [--llm-latency 0.3]
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # the services use DB paths relative to the project folder
+os.environ.setdefault("POLICY_EMBEDDER", "hashing")
+
+from fastapi import Body, FastAPI  # noqa: E402
+from fastapi.responses import StreamingResponse  # noqa: E402
+from mcp import ClientSession  # noqa: E402
+from mcp.client.sse import sse_client  # noqa: E402
+
+from local_server import serve  # noqa: E402
+from chat_client import collect_reply  # noqa: E402
+from services.orchestrator import app as orchestrator_module  # noqa: E402
+from services.orchestrator.agent import Orchestrator  # noqa: E402
+from services.orchestrator.llm import StubLLM  # noqa: E402
+from services.orchestrator.memory import SessionMemory  # noqa: E402
+from services.orchestrator.tools import TOOL_APPS, ToolRegistry  # noqa: E402
+
+MESSAGES = [
+    "Can ORD-010 be returned?",
+    "What is the status of ORD-006? Any tickets for user006@example.com?",
+    "Please cancel ORD-007",
+    "Show me ticket 6",
+]
+
+
+class McpSseTools:
+    """Tool calls the way the n8n MCP Client Tool nodes make them (one SSE server per service)."""
+
+    def __init__(self, registry: ToolRegistry, servers):
+        self.specs = registry.specs
+        self.servers = servers  # tool name -> MCP SSE url
+
+    async def call_many(self, calls):
+        results = {}
+        for url in dict.fromkeys(self.servers[c.name] for c in calls):
+            # each tool node connects and lists its tools per execution
+            async with sse_client(url) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    await session.list_tools()
+                    for c in calls:
+                        if self.servers[c.name] == url:
+                            r = await session.call_tool(c.name, c.arguments)
+                            results[c.id] = "\n".join(x.text for x in r.content)
+        return [results[c.id] for c in calls]
+
+
+class InProcessMemory:
+    def __init__(self, window=5):
+        self.window, self.history = window, {}
+
+    def load(self, session_id):
+        return list(self.history.get(session_id, [])[-self.window * 2:])
+
+    def append(self, session_id, user_text, assistant_text):
+        self.history.setdefault(session_id, []).extend(
+            [{"role": "user", "content": user_text}, {"role": "assistant", "content": assistant_text}])
+
+
+def webhook_app(orchestrator):
+    app = FastAPI()
+
+    @app.post("/webhook/{webhook_id}")
+    async def webhook(webhook_id: str, payload: dict = Body(...)):
+        async def body():
+            async for c in orchestrator.run(payload):
+                yield json.dumps(c) + "\n"
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    return app
+
+
+def main(args):
+    registry = ToolRegistry()
+    llm = StubLLM(latency=args.llm_latency)
+
+    # n8n-style path: one MCP server per service, like the Tickets/Orders/... tool nodes
+    servers = {}
+    for prefix, service_app in TOOL_APPS.items():
+        url = serve(service_app) + "/mcp"
+        for route in service_app.routes:
+            if getattr(route, "operation_id", None) in registry.names:
+                servers[route.operation_id] = url
+    n8n_style = webhook_app(Orchestrator(llm, McpSseTools(registry, servers), InProcessMemory()))
+
+    memory_db = os.path.join(tempfile.mkdtemp(), "memory.db")
+    orchestrator = Orchestrator(llm, registry, SessionMemory(memory_db))
+    orchestrator_module.app.dependency_overrides[orchestrator_module.get_orchestrator] = lambda: orchestrator
+
+    urls = {
+        "n8n-style (MCP/SSE, sequential)": serve(n8n_style) + "/webhook/bench",
+        "orchestrator (direct, parallel)": serve(orchestrator_module.app) + "/webhook/bench",
+    }
+    answers = {}
+    print(f"stub LLM latency {args.llm_latency:.2f}s per call, {args.turns} turns")
+    for label, url in urls.items():
+        collect_reply(url, {"sessionId": "warm-up", "chatInput": MESSAGES[0]}, 60)
+        times = []
+        for i in range(args.turns):
+            message = MESSAGES[i % len(MESSAGES)]
+            payload = {"sessionId": f"bench-{i % 3}", "action": "sendMessage", "chatInput": message}
+            text, error, stats = collect_reply(url, payload, 60)
+            assert error is None, error
+            answers.setdefault(message, set()).add(text)
+            times.append(stats.total)
+        times.sort()
+        print(f"{label:<34} turn {statistics.median(times) * 1000:8.1f} ms "
+              f"(p95 {times[int(len(times) * 0.95)] * 1000:.1f})")
+    assert all(len(v) == 1 for v in answers.values()), answers  # same answers on both paths
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", type=int, default=20)
+    ap.add_argument("--llm-latency", type=float, default=0.0)
+    logging.getLogger("mcp").setLevel(logging.WARNING)
+    main(ap.parse_args())
@@ -0,0 +1,76 @@
+"""Cold-start time of policy retrieval: rebuild-on-restart vs. the persistent index.
+
+The n8n in-memory vector store is empty after every restart, so the PDFs have to be
+parsed and re-embedded before the first policy question can be answered. The policy
+service keeps the index on disk and only re-embeds documents whose hash changed.
+
+    python benchmarks/bench_policy_cold_start.py [--repeat 5] [--openai]
+
+Uses the offline hashing embedder unless --openai is given (which calls the API).
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+from services.policies import service as policy_service  # noqa: E402
+from services.policies.embeddings import HashingEmbedder, OpenAIEmbedder  # noqa: E402
+
+QUERY = "Can a customer return an item 30 days after the ship date?"
+
+
+def fresh_process_state():
+    # What a restarted process starts with: nothing loaded in memory
+    policy_service._VECTOR_CACHE.clear()
+    policy_service._RESULT_CACHE.clear()
+    policy_service._SCHEMA_READY.clear()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--openai", action="store_true")
+    args = ap.parse_args()
+    embedder = OpenAIEmbedder() if args.openai else HashingEmbedder()
+    docs = os.path.join(ROOT, "Documentation")
+
+    rebuild, warm, unchanged = [], [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.repeat):
+            db = os.path.join(tmp, f"rebuild-{i}.db")
+            fresh_process_state()
+            start = time.perf_counter()
+            svc = policy_service.PolicyService(db_path=db, docs_dir=docs, embedder=embedder)
+            svc.ingest()
+            svc.search(QUERY)
+            rebuild.append(time.perf_counter() - start)
+
+        db = os.path.join(tmp, "persistent.db")
+        policy_service.PolicyService(db_path=db, docs_dir=docs, embedder=embedder).ingest()
+        for _ in range(args.repeat):
+            fresh_process_state()
+            start = time.perf_counter()
+            svc = policy_service.PolicyService(db_path=db, docs_dir=docs, embedder=embedder)
+            svc.search(QUERY)
+            warm.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            stats = svc.ingest()
+            unchanged.append(time.perf_counter() - start)
+            assert not stats["indexed"], stats
+
+    ms = lambda xs: statistics.median(xs) * 1000  # noqa: E731
+    print(f"embedder: {embedder.name}, median of {args.repeat}")
+    print(f"  re-embed on every restart, then first answer : {ms(rebuild):9.2f} ms")
+    print(f"  persistent index, first answer after restart : {ms(warm):9.2f} ms")
+    print(f"  incremental ingest with no changed documents : {ms(unchanged):9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
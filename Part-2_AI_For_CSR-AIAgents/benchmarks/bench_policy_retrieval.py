@@ -0,0 +1,92 @@
+"""Recall@k and per-query latency of policy retrieval: vector vs. BM25 vs. hybrid.
+
+Each question is labelled with phrases that appear only in the passages that answer
+it; a question counts as recalled at k when one of the top-k chunks contains one.
+Latency is measured with an empty result cache (miss) and for a re-asked question
+that differs only in case/punctuation (hit).
+
+    python benchmarks/bench_policy_retrieval.py [--repeat 20] [--openai]
+
+Runs offline on the deterministic hashing embedder unless --openai is given.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+from services.policies import service as policy_service  # noqa: E402
+from services.policies.embeddings import HashingEmbedder, OpenAIEmbedder  # noqa: E402
+
+QUESTIONS = [
+    ("Is this item returnable after 30 days?", ["within 30 days"]),
+    ("Can I cancel an order that is Sent To Fulfillment?", ["'Sent To Fulfillment' status"]),
+    ("Can a shipped order be cancelled?", ["cancelled only when", "can be cancelled based on"]),
+    ("Are shipping charges refunded on a return?", ["refundable only if the return"]),
+    ("How long does it take to get my refund?", ["7-10 business days"]),
+    ("Which items are non-returnable?", ["non-returnable"]),
+    ("customer wants to return perishable goods", ["perishable goods"]),
+    ("how is the refund amount calculated with appeasement", ["Refund_Amount = Item_Price"]),
+    ("expedited shipping delivery time", ["expedited shipping takes"]),
+    ("customer already has an open ticket for this issue", ["existing open ticket"]),
+    ("What payment methods do you accept?", ["payment methods are accepted"]),
+    ("I received a damaged product", ["received a damaged product"]),
+    ("When will my order arrive?", ["estimated delivery time"]),
+    ("order status workflow Created In-Progress Shipped", ["move through the following statuses"]),
+    ("Can the CSR override the return window?", ["override the return period", "override this period"]),
+    ("Which payment method receives the refund?", ["original payment method"]),
+    ("Can I give an appeasement for shipping charges?", ["provide appeasement"]),
+    ("returned_qty quantity check for return creation", ["Quantity – Returned_qty"]),
+]
+KS = (1, 3)
+
+
+def recalled(hits, phrases):
+    return any(p.lower() in h["text"].lower() for h in hits for p in phrases)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--openai", action="store_true")
+    args = ap.parse_args()
+    embedder = OpenAIEmbedder() if args.openai else HashingEmbedder()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        svc = policy_service.PolicyService(
+            db_path=os.path.join(tmp, "policies.db"), docs_dir=os.path.join(ROOT, "Documentation"), embedder=embedder
+        )
+        svc.ingest()
+        print(f"embedder: {embedder.name}, {len(QUESTIONS)} questions, {len(svc._load_index()[1])} chunks")
+        print(f"{'mode':<8}" + "".join(f"{'recall@' + str(k):>11}" for k in KS)
+              + f"{'miss p50 ms':>13}{'miss p95 ms':>13}{'hit p50 ms':>12}")
+        for mode in policy_service.SEARCH_MODES:
+            found = {k: 0 for k in KS}
+            for question, phrases in QUESTIONS:
+                hits = svc.search(question, k=max(KS), mode=mode)
+                for k in KS:
+                    found[k] += recalled(hits[:k], phrases)
+
+            miss, hit = [], []
+            for _ in range(args.repeat):
+                for question, _ in QUESTIONS:
+                    policy_service._RESULT_CACHE.clear()
+                    start = time.perf_counter()
+                    svc.search(question, k=max(KS), mode=mode)
+                    miss.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    svc.search(question.upper() + " ?", k=max(KS), mode=mode)
+                    hit.append(time.perf_counter() - start)
+            miss.sort()
+            print(f"{mode:<8}" + "".join(f"{found[k] / len(QUESTIONS):>11.2f}" for k in KS)
+                  + f"{statistics.median(miss) * 1000:>13.3f}{miss[int(len(miss) * 0.95)] * 1000:>13.3f}"
+                  + f"{statistics.median(hit) * 1000:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Cost of the query profiler (services/common/query_log.py), and what it reports.
+
+On a temporary orders table of --rows rows, an indexed lookup and an unindexed
+lookup (full scan) are timed through the instrumented connection with the query
+hooks installed vs. removed. Then the profiler's top statements are printed: the
+scan stands out by vm_steps and by its plan.
+
+    python benchmarks/bench_query_profiler.py [--rows 200000] [--calls 300]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+from services.common import query_log  # noqa: E402
+from services.common.metrics import connect  # noqa: E402
+
+INDEXED = "SELECT Order_Status FROM orders WHERE Order_ID = ?"
+SCAN = "SELECT Order_Status FROM orders WHERE Cust_Email = ?"
+
+
+def build(path: str, rows: int) -> None:
+    conn = connect(path)
+    conn.execute("CREATE TABLE orders (Order_ID TEXT, Cust_Email TEXT, Order_Status TEXT)")
+    conn.executemany(
+        "INSERT INTO orders VALUES (?, ?, ?)",
+        ((f"ORD-{i:07d}", f"user{i % 5000}@example.com", "Shipped") for i in range(rows)),
+    )
+    conn.execute("CREATE INDEX idx_orders_order_id ON orders (Order_ID)")
+    conn.commit()
+    conn.close()
+
+
+def median_us(conn, sql, arg, calls):
+    times = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        conn.execute(sql, (arg,)).fetchall()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e6
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "orders.db")
+        build(path, args.rows)
+        conn = connect(path)
+        profiler = query_log.QueryProfiler(slow_ms=args.slow_ms, log_path=os.path.join(tmp, "slow.log"))
+        for label, sql, arg, calls in (("indexed lookup", INDEXED, "ORD-0000042", args.calls * 10),
+                                       ("full scan", SCAN, "user42@example.com", args.calls)):
+            query_log.QUERY_HOOKS[:] = []
+            off = median_us(conn, sql, arg, calls)
+            query_log.QUERY_HOOKS[:] = [profiler]
+            on = median_us(conn, sql, arg, calls)
+            print(f"{label:15s} hooks off {off:9.1f} us   profiler on {on:9.1f} us   ({(on - off) / off:+.1%})")
+        query_log.QUERY_HOOKS[:] = []
+        print()
+        for s in profiler.top(2):
+            print(f"{s['calls']:5d} calls  mean {s['mean_ms']:7.3f} ms  vm_steps {s['vm_steps']:>11,}  "
+                  f"rows {s['rows']:>7,}  slow {s['slow']:4d}  plan {s['plan']}\n      {s['statement']}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--calls", type=int, default=300)
+    ap.add_argument("--slow-ms", type=float, default=5.0)
+    main(ap.parse_args())
@@ -0,0 +1,148 @@
+"""Write throughput of OrderService and TicketService on 1, 4 and 16 shards.
+
+Builds an orders database (--orders orders, one line each, the bundled schema plus
+an Order_ID index) and an empty tickets database in a temp folder, reshards copies
+of both with services/common/reshard.py, then runs --threads writer threads per
+layout:
+
+* tickets: TicketService.add_ticket for random orders (a commit each);
+* orders: OrderService.cancel_order on distinct orders (read + update + commit).
+
+SQLite allows one writer per file, so on one file the threads queue on its lock;
+with N shards up to N commits run at once. It also times a customer query (tickets
+by email), which has to ask every shard (scatter-gather).
+
+    python benchmarks/bench_sharding.py [--shards 1 4 16] [--threads 16] [--writes 4000] [--dir /tmp]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+from services.common import sharding  # noqa: E402
+from services.common.reshard import TABLES, ShardedTable, reshard  # noqa: E402
+from services.orders.service import DB_PATH as ORDERS_DB, OrderService  # noqa: E402
+from services.tickets.service import DB_PATH as TICKETS_DB, TicketService  # noqa: E402
+
+EMAILS = 2000
+
+
+def schema(db_path: str, table: str):
+    with sqlite3.connect(f"file:{os.path.join(ROOT, db_path)}?mode=ro", uri=True) as conn:
+        return [sql for (sql,) in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND sql IS NOT NULL", (table,))]
+
+
+def build(folder: str, orders: int) -> None:
+    with sqlite3.connect(os.path.join(folder, "orders.db")) as conn:
+        for sql in schema(ORDERS_DB, "orders"):
+            conn.execute(sql)
+        conn.execute("CREATE INDEX idx_orders_order_id ON orders (Order_ID)")
+        conn.executemany(
+            "INSERT INTO orders (Order_ID, Cust_Email, Created_Timestamp, Item_ID, Item_Name, Quantity, "
+            "Order_Status, Item_Price, Shipping_price, Discount_Applied, Total_Price, Appeasement_Applied, "
+            "Returned_qty, Refund_Amount) VALUES (?, ?, '2025-09-25 11:00:00', 'ITEM1', 'Blue Pants', 1, "
+            "'Created', 4000, 500, 0, 4500, 0, 0, 0)",
+            [(f"ORD-{i:07d}", f"user{i % EMAILS}@example.com") for i in range(orders)],
+        )
+    with sqlite3.connect(os.path.join(folder, "support_tickets.db")) as conn:
+        for sql in schema(TICKETS_DB, "tickets"):
+            conn.execute(sql)
+
+
+def run_threads(threads: int, work) -> float:
+    """work(thread_no) in `threads` threads started together; returns the wall time."""
+    barrier = threading.Barrier(threads + 1)
+    errors = []
+
+    def run(n):
+        barrier.wait()
+        try:
+            work(n)
+        except Exception as e:  # noqa: BLE001 - reported below
+            errors.append(e)
+
+    pool = [threading.Thread(target=run, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in pool:
+        t.join()
+    if errors:
+        raise errors[0]
+    return time.perf_counter() - start
+
+
+def bench_layout(base: str, folder: str, shards: int, args) -> dict:
+    shutil.copytree(base, folder)
+    orders_db, tickets_db = os.path.join(folder, "orders.db"), os.path.join(folder, "support_tickets.db")
+    if shards > 1:
+        reshard(ShardedTable(orders_db, "orders", TABLES["orders"].key_columns), shards)
+        reshard(ShardedTable(tickets_db, "tickets", TABLES["tickets"].key_columns), shards)
+    orders, tickets = OrderService(orders_db, os.path.join(folder, "none.db")), TicketService(tickets_db)
+    assert len(orders.shards) == len(tickets.shards) == shards
+    per_thread = args.writes // args.threads
+
+    def add_tickets(n):
+        rnd = random.Random(n)
+        for _ in range(per_thread):
+            i = rnd.randrange(args.orders)
+            tickets.add_ticket(f"user{i % EMAILS}@example.com", f"ORD-{i:07d}", "Customer called about the order.",
+                               "Joe")
+
+    def cancel_orders(n):
+        for k in range(per_thread):
+            assert orders.cancel_order(f"ORD-{n + k * args.threads:07d}")
+
+    out = {
+        "tickets/s": per_thread * args.threads / run_threads(args.threads, add_tickets),
+        "cancels/s": per_thread * args.threads / run_threads(args.threads, cancel_orders),
+    }
+    samples = []
+    for i in range(200):
+        start = time.perf_counter()
+        tickets.get_customer_tickets(f"user{i % EMAILS}@example.com")
+        samples.append(time.perf_counter() - start)
+    out["by email ms"] = statistics.median(samples) * 1000
+    (count,) = sqlite3.connect(tickets.shards.paths[0]).execute("SELECT COUNT(*) FROM tickets").fetchone()
+    out["tickets in shard 0"] = count
+    return out
+
+
+def main(args):
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        base = os.path.join(tmp, "base")
+        os.makedirs(base)
+        build(base, args.orders)
+        print(f"{args.orders:,} orders; {args.threads} writer threads, {args.writes:,} writes per test\n")
+        print(f"{'shards':>6}{'tickets/s':>12}{'cancels/s':>12}{'by email ms':>13}{'shard 0 rows':>14}")
+        first = None
+        for shards in args.shards:
+            sharding.shard_paths.cache_clear()  # a new layout per run, as after a restart
+            r = bench_layout(base, os.path.join(tmp, f"s{shards}"), shards, args)
+            first = first or r
+            print(f"{shards:>6}{r['tickets/s']:>12,.0f}{r['cancels/s']:>12,.0f}{r['by email ms']:>13.2f}"
+                  f"{r['tickets in shard 0']:>14,}"
+                  f"   (x{r['tickets/s'] / first['tickets/s']:.1f} / x{r['cancels/s'] / first['cancels/s']:.1f})")
+        print("\nby email: median of 200 customer queries, which ask every shard in parallel")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--shards", type=int, nargs="+", default=[1, 4, 16])
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--orders", type=int, default=50_000)
+    ap.add_argument("--writes", type=int, default=4000, help="writes per test, split over the threads")
+    ap.add_argument("--dir", help="where to put the databases (default: the system temp folder)")
+    main(ap.parse_args())
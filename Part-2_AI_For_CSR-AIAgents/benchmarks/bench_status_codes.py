@@ -0,0 +1,126 @@
+"""Size and status-filter speed of a fulfillment table: text statuses vs. integer codes.
+
+Builds a fulfillment table of --rows lines (the bundled schema, synthetic rows,
+statuses skewed like a live table: mostly Shipped, few Cancelled) with an index on
+the status column in a temp folder, measures it, migrates a copy with
+services/common/migrate_status_codes.py and measures that again:
+
+* file size, and the size of the status index (dbstat, if SQLite was built with it);
+* count of one status through the index (text: = 'Cancelled', coded: = 4);
+* count of one status matched case-insensitively, as text columns with mixed
+  spellings force (lower(status) = 'cancelled' cannot use the index);
+* rows per status (GROUP BY, index scan).
+
+    python benchmarks/bench_status_codes.py [--rows 10000000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+from services.common.migrate_status_codes import migrate  # noqa: E402
+from services.common.statuses import FULFILLMENT_STATUS  # noqa: E402
+from services.fulfillment.service import DB_PATH  # noqa: E402
+
+WEIGHTS = {"Shipped": 80, "Created": 10, "In-Progress": 8, "Cancelled": 2}
+
+
+def build(path: str, rows: int) -> None:
+    with sqlite3.connect(f"file:{os.path.join(ROOT, DB_PATH)}?mode=ro", uri=True) as src:
+        schema = src.execute("SELECT sql FROM sqlite_master WHERE name = 'fulfillment'").fetchone()[0]
+    rnd = random.Random(5)
+    names, weights = list(WEIGHTS), list(WEIGHTS.values())
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute(schema)
+    step = 100_000
+    for start in range(0, rows, step):
+        statuses = rnd.choices(names, weights, k=min(step, rows - start))
+        conn.executemany(
+            "INSERT INTO fulfillment (Order_ID, Cust_Email, Fulfillment_Order_ID, Created_Timestamp, Item_ID, "
+            "Item_Name, Quantity, Fulfillment_Order_Status, Tracking_Nbr, Ship_Date) "
+            "VALUES (?, ?, ?, '2025-09-25 11:00:00', ?, 'Blue Pants', 1, ?, '', '')",
+            ((f"ORD-{i // 2:08d}", f"user{i % 997}@example.com", f"FUL-{i // 2:08d}", f"ITEM{i % 2}", s)
+             for i, s in enumerate(statuses, start)),
+        )
+    conn.execute("CREATE INDEX idx_fulfillment_fulfillment_order_status ON fulfillment (Fulfillment_Order_Status)")
+    conn.commit()
+    conn.close()
+
+
+def index_bytes(conn) -> str:
+    try:
+        (n,) = conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = 'idx_fulfillment_fulfillment_order_status'")\
+            .fetchone()
+        return f"{n / 1e6:,.1f} MB"
+    except sqlite3.OperationalError:
+        return "n/a"
+
+
+def timed(conn, sql, params, repeat):
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = conn.execute(sql, params).fetchall()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, result
+
+
+def measure(path: str, coded: bool, repeat: int):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    column = "Fulfillment_Order_Status"
+    value = FULFILLMENT_STATUS.to_db("Cancelled", coded)
+    out = {"file": f"{os.path.getsize(path) / 1e6:,.1f} MB", "index": index_bytes(conn)}
+    out["= Cancelled"], n = timed(conn, f"SELECT COUNT(*) FROM fulfillment WHERE {column} = ?", (value,), repeat)
+    if coded:
+        # a code needs no case folding: any spelling normalizes to the same integer
+        out["any case"], _ = timed(conn, f"SELECT COUNT(*) FROM fulfillment WHERE {column} = ?",
+                                   (FULFILLMENT_STATUS.code("CANCELLED"),), repeat)
+    else:
+        out["any case"], _ = timed(conn, f"SELECT COUNT(*) FROM fulfillment WHERE lower({column}) = ?",
+                                   ("cancelled",), repeat)
+    out["group by"], _ = timed(conn, f"SELECT {column}, COUNT(*) FROM fulfillment GROUP BY 1", (), repeat)
+    conn.close()
+    return out, n[0][0]
+
+
+def main(args):
+    tmp = tempfile.mkdtemp()
+    try:
+        text_db, coded_db = os.path.join(tmp, "text.db"), os.path.join(tmp, "coded.db")
+        start = time.perf_counter()
+        build(text_db, args.rows)
+        print(f"built {args.rows:,} rows in {time.perf_counter() - start:.0f}s")
+        shutil.copy(text_db, coded_db)
+        start = time.perf_counter()
+        migrate(coded_db, "fulfillment")
+        print(f"migrated in {time.perf_counter() - start:.0f}s (incl. VACUUM)")
+
+        text, n_text = measure(text_db, False, args.repeat)
+        coded, n_coded = measure(coded_db, True, args.repeat)
+        assert n_text == n_coded, (n_text, n_coded)
+        print(f"\n{'':<22}{'text':>14}{'coded':>14}")
+        for key in ("file", "index"):
+            print(f"{key + ' size':<22}{text[key]:>14}{coded[key]:>14}")
+        for key in ("= Cancelled", "any case", "group by"):
+            print(f"{key + ' (ms)':<22}{text[key]:>14,.1f}{coded[key]:>14,.1f}")
+        print(f"\n{n_text:,} Cancelled lines; timings are medians of {args.repeat} warm runs")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10_000_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    main(ap.parse_args())
@@ -0,0 +1,48 @@
+"""Perceived latency of a chat message: blocking vs. streamed webhook replies.
+
+Starts stub_n8n_server.py with uvicorn on a free local port and sends the same
+message through chat_client.stream_reply in each response format. For a blocking
+reply the first text appears when the whole run is over (TTFT = total); a streamed
+reply shows tool steps and the first token while the agent is still running.
+
+    python benchmarks/bench_streaming_ttft.py [--messages 10]
+"""
+import argparse
+import os
+import statistics
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+
+from local_server import serve  # noqa: E402
+from chat_client import ReplyStats, collect_reply  # noqa: E402
+from stub_n8n_server import app  # noqa: E402
+
+PAYLOAD = {"sessionId": "bench", "action": "sendMessage", "chatInput": "Is ORD-010 returnable?"}
+
+
+def main(args):
+    url = serve(app) + "/webhook/stub"
+    texts = {}
+    print(f"{'format':<8}{'first token ms':>16}{'total ms':>10}{'steps':>7}")
+    for output in ("json", "ndjson", "sse"):
+        ttft, total = [], []
+        for _ in range(args.messages):
+            stats = ReplyStats()
+            text, error, _ = collect_reply(f"{url}?format={output}", PAYLOAD, 30, stats=stats)
+            assert error is None, error
+            texts[output] = text
+            ttft.append(stats.ttft)
+            total.append(stats.total)
+        print(f"{output:<8}{statistics.median(ttft) * 1000:>16.0f}{statistics.median(total) * 1000:>10.0f}"
+              f"{len(stats.steps):>7}")
+    assert len(set(texts.values())) == 1, texts  # same answer in every format
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=10)
+    main(ap.parse_args())
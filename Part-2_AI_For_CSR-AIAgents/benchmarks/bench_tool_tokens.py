@@ -0,0 +1,68 @@
+"""Tokens per MCP tool call: full model output vs. fields= projection and format=table.
+
+Calls the tools the way the agent does, through the MCP server's in-process dispatch
+(which JSON-dumps the response with indent=2), on the bundled orders and tickets databases.
+Tokens are counted with tiktoken's cl100k_base when available, else ~4 chars/token.
+
+    python benchmarks/bench_tool_tokens.py
+"""
+import asyncio
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # the services use DB paths relative to the project folder
+
+from services.orders.app import mcp as orders_mcp  # noqa: E402
+from services.tickets.app import mcp as tickets_mcp  # noqa: E402
+
+try:
+    import tiktoken
+
+    _enc = tiktoken.get_encoding("cl100k_base")
+except Exception:  # not installed, or the BPE file can't be fetched offline
+    _enc = None
+
+
+def count_tokens(text):
+    return len(_enc.encode(text)) if _enc else (len(text) + 3) // 4
+
+
+ORDER_FIELDS = "Item_ID,Item_Name,Quantity,Order_Status,Ship_Date,Returned_qty"
+CALLS = [
+    (orders_mcp, "get_order_details", {"order_id": "ORD-010"}),
+    (orders_mcp, "get_order_details", {"order_id": "ORD-010", "fields": ORDER_FIELDS}),
+    (orders_mcp, "get_order_details", {"order_id": "ORD-010", "format": "table"}),
+    (orders_mcp, "get_order_details", {"order_id": "ORD-010", "fields": ORDER_FIELDS, "format": "table"}),
+    (tickets_mcp, "get_customer_tickets", {"customer_email": "user010@example.com"}),
+    (tickets_mcp, "get_customer_tickets",
+     {"customer_email": "user010@example.com", "fields": "Ticket_ID,Call_Timestamp,Ticket_Notes", "format": "table"}),
+    (tickets_mcp, "get_ticket_details", {"ticket_id": 1}),
+    (tickets_mcp, "get_ticket_details", {"ticket_id": 1, "fields": "Ticket_ID,Ticket_Notes"}),
+]
+
+
+async def call(mcp, tool, args):
+    return await mcp.call_tool(tool, args)
+
+
+async def main():
+    print(f"{'tool':<22}{'arguments':<58}{'chars':>7}{'tokens':>8}")
+    baseline = {}
+    for mcp, tool, args in CALLS:
+        text = await call(mcp, tool, args)
+        tokens = count_tokens(text)
+        extra = {k: v for k, v in args.items() if k in ("fields", "format")}
+        note = ""
+        if not extra:
+            baseline[tool] = tokens
+        elif tool in baseline:
+            note = f"  ({tokens / baseline[tool]:.0%} of full)"
+        shown = ", ".join(f"{k}={v}" for k, v in args.items())
+        print(f"{tool:<22}{shown[:57]:<58}{len(text):>7}{tokens:>8}{note}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
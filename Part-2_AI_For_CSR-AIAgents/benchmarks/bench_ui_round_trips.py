@@ -0,0 +1,97 @@
+"""Agent round trips for a scripted CSR session through the Streamlit UI.
+
+Drives a Streamlit app with streamlit.testing's AppTest against stub_n8n_server.py
+and replays: type a vague message, click the "Cancel ORD-007" quick action, click
+"Yes, proceed". When a click does not reach the webhook (the button was rendered in a
+block that does not run again on the rerun the click triggers), the CSR retypes it as
+a chat message, as users did. Reported per app:
+
+* clicks lost and messages retyped;
+* webhook calls by action (each sendMessage is a full agent turn: LLM planning + tools);
+* longest script run while the agent was working (how long the page is blocked).
+
+    python benchmarks/bench_ui_round_trips.py [--app streamlit_app.py]
+
+To compare with an earlier version of the UI, pass its file as --app (for example
+one written out with `git show <commit>:Part-2_AI_For_CSR-AIAgents/streamlit_app.py`).
+"""
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from local_server import serve  # noqa: E402
+import stub_n8n_server  # noqa: E402
+
+SCRIPT = [("type", "hello"), ("click", "Cancel ORD-007"), ("click", "✅ Yes, proceed")]
+RETYPED = {"✅ Yes, proceed": "Yes, proceed with the cancellation of ORD-007"}
+
+
+class Session:
+    def __init__(self, app_path):
+        self.at = AppTest.from_file(app_path, default_timeout=60)
+        self.longest_run = 0.0
+        self.run()
+
+    def run(self, widget=None):
+        start = time.perf_counter()
+        (widget or self.at).run()
+        self.longest_run = max(self.longest_run, time.perf_counter() - start)
+
+    def settle(self, secs=15):
+        """Rerun until no webhook call is running (polling, as the page's fragment does)."""
+        deadline = time.time() + secs
+        while time.time() < deadline:
+            state = self.at.session_state
+            if "inflight" not in state or state["inflight"] is None:  # the older UI has no queue
+                return
+            time.sleep(0.1)
+            self.run()
+
+    def button(self, label):
+        return next((b for b in self.at.button if b.label == label), None)
+
+
+def replay(app_path):
+    stub_n8n_server.CALLS.clear()
+    session = Session(app_path)
+    lost = retyped = 0
+    for step, value in SCRIPT:
+        if step == "type":
+            session.run(session.at.chat_input[0].set_value(value))
+            session.settle()
+            continue
+        before = sum(stub_n8n_server.CALLS.values())
+        button = session.button(value)
+        assert button is not None, f"no button {value!r}"
+        session.run(button.click())
+        session.settle()
+        if sum(stub_n8n_server.CALLS.values()) == before:
+            lost += 1
+            retyped += 1
+            session.run(session.at.chat_input[0].set_value(RETYPED.get(value, value)))
+            session.settle()
+    return lost, retyped, dict(stub_n8n_server.CALLS), session.longest_run
+
+
+def main(args):
+    os.environ["N8N_WEBHOOK_URL_TEST"] = serve(stub_n8n_server.app) + "/webhook/stub?format=json"  # a reply every UI version parses
+    lost, retyped, calls, longest = replay(args.app)
+    full_turns = calls.get("sendMessage", 0)
+    print(f"app: {args.app}")
+    print(f"clicks lost: {lost}, messages retyped: {retyped}")
+    print(f"webhook calls: {sum(calls.values())} {calls} -> {full_turns} full agent turn(s) from typed text")
+    print(f"longest script run: {longest * 1000:.0f} ms "
+          f"(stub agent turn: {stub_n8n_server.THINK_SECS + stub_n8n_server.TOOL_SECS:.1f}s + tokens)")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--app", default=os.path.join(ROOT, "streamlit_app.py"))
+    main(ap.parse_args())
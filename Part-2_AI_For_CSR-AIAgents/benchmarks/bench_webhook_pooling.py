@@ -0,0 +1,82 @@
+"""Webhook call overhead: a new connection per message vs. the pooled WebhookClient.
+
+Starts stub_n8n_server.py (delays set to 0, so only the HTTP overhead is left) with
+uvicorn on a free local port and sends consecutive chat messages:
+
+* requests.post: a new TCP connection for every message (the old post_webhook);
+* WebhookClient: one keep-alive session, the connection is reused.
+
+Then the webhook is taken away (a closed port) to show what a message costs while
+n8n is down: connect retries with backoff, until the circuit breaker opens and
+messages fail at once.
+
+    python benchmarks/bench_webhook_pooling.py [--messages 200]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+for var in ("STUB_THINK_SECS", "STUB_TOOL_SECS", "STUB_TOKEN_SECS"):
+    os.environ[var] = "0"
+
+import requests  # noqa: E402
+
+from local_server import free_port, serve  # noqa: E402
+from chat_client import WebhookClient, collect_reply  # noqa: E402
+from stub_n8n_server import app  # noqa: E402
+
+PAYLOAD = {"sessionId": "bench", "action": "sendMessage", "chatInput": "Is ORD-010 returnable?"}
+
+
+def ms(xs):
+    xs = sorted(xs)
+    return f"{statistics.median(xs) * 1000:8.2f} ms (p95 {xs[int(len(xs) * 0.95)] * 1000:.2f})"
+
+
+def timed(send, n):
+    times = []
+    for _ in range(n):
+        start = time.perf_counter()
+        send()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main(args):
+    url = serve(app) + "/webhook/stub"
+    client = WebhookClient()
+
+    for output in ("json", "ndjson"):
+        def fresh():
+            text, error, _ = collect_reply(f"{url}?format={output}", PAYLOAD, 30)
+            assert error is None, error
+
+        def pooled():
+            text, error, _ = collect_reply(f"{url}?format={output}", PAYLOAD, 30,
+                                           session=client.session, breaker=client.breaker)
+            assert error is None, error
+
+        for label, send in (("new connection", fresh), ("pooled keep-alive", pooled)):
+            timed(send, 20)  # warm-up
+            print(f"{label + ' (' + output + ')':<28} {ms(timed(send, args.messages))} per message")
+
+    down = f"http://127.0.0.1:{free_port()}/webhook/stub"  # nothing listens here
+    client = WebhookClient(retries=2, failure_threshold=3, reset_after=60)
+    for label, breaker in (("n8n down, no breaker", None), ("n8n down, breaker", client.breaker)):
+        def send():
+            try:
+                collect_reply(down, PAYLOAD, 30, session=client.session, breaker=breaker)
+            except requests.exceptions.ConnectionError:  # includes CircuitOpenError
+                pass
+        print(f"{label:<28} {ms(timed(send, 10))} per message")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=200)
+    main(ap.parse_args())
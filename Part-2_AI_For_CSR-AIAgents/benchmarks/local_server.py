@@ -0,0 +1,22 @@
+"""Run an ASGI app on a free local port in a background thread, for the benchmarks."""
+import socket
+import threading
+import time
+
+import uvicorn
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(app):
+    """Start app with uvicorn in a daemon thread; returns its base URL once it listens."""
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
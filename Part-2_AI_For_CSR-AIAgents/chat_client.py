@@ -0,0 +1,461 @@
+# chat_client.py
+"""Webhook client for the CSR agent, used by streamlit_app.py.
+
+The n8n Webhook node either answers once the whole agent run has finished
+(Response Mode "When Last Node Finishes": one JSON document) or streams it
+(Response Mode "Streaming": one JSON chunk per line while the agent runs,
+{"type": "begin" | "item" | "end" | "error", "content": ..., "metadata": {...}}).
+`stream_reply` accepts both, as well as the same chunks sent as server-sent events
+("data: {...}" lines), and yields `ChatEvent`s as they arrive:
+
+* token  - a piece of the agent's answer ("item" chunks, or the whole blocking reply)
+* status - a workflow node started ("begin" chunks), e.g. the Orders tool node
+* tool   - a tool call, e.g. "Looking up ORD-010…" ("tool" chunks)
+* error  - the webhook failed or the workflow reported an error
+
+n8n itself only sends begin / item / end (and error). "tool" is an extension of
+services/orchestrator, whose tool calls are not workflow nodes; a stream without
+it shows the node names instead.
+
+`ReplyStats` records time-to-first-token and total time of each message.
+stub_n8n_server.py is a local stand-in for the webhook that streams in this format.
+
+`WebhookClient` is the per-process client the UI shares between reruns and
+sessions: a pooled keep-alive `requests.Session`, bounded retries with jittered
+backoff for connection failures and 502/503 answers, and a `CircuitBreaker` that
+fails fast while n8n is down instead of tying up the worker for the full timeout.
+
+`dispatch` runs a call on a worker thread and returns a `PendingCall` the UI polls,
+so the page stays responsive (and queued clicks are not lost) while the agent runs.
+
+With tracing on (CSR_TRACE, see services/common/tracing.py) each call is a "chat
+turn" span and the webhook request carries its `traceparent` header, so the
+agent, tool and SQLite spans on the server side land in the same trace.
+"""
+import json
+import re
+import threading
+import time
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass, field
+from typing import Iterator, List, NamedTuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services.common import tracing
+
+STREAM_ACCEPT = "application/x-ndjson, text/event-stream, application/json"
+CHUNK_TYPES = {"begin", "item", "end", "error", "tool"}  # "tool": services/orchestrator only
+
+
+class ChatEvent(NamedTuple):
+    kind: str  # token / tool / status / error
+    text: str
+
+
+@dataclass
+class ReplyStats:
+    """Timings of one webhook call, in seconds from the start of the request."""
+    started: float = field(default_factory=time.perf_counter)
+    first_token: Optional[float] = None
+    finished: Optional[float] = None
+    streamed: bool = False
+    steps: List[str] = field(default_factory=list)  # node starts and tool calls, as shown
+    trace_id: Optional[str] = None
+
+    @property
+    def ttft(self) -> Optional[float]:
+        return None if self.first_token is None else self.first_token - self.started
+
+    @property
+    def total(self) -> Optional[float]:
+        return None if self.finished is None else self.finished - self.started
+
+    def summary(self) -> str:
+        if self.total is None:
+            return ""
+        text = f"total {self.total:.2f}s"
+        if self.ttft is not None:
+            text = f"first token {self.ttft:.2f}s · {text}"
+        if self.trace_id:
+            text += f" · trace {self.trace_id[:12]}"
+        return text
+
+
+def extract_text(raw: str):
+    """
+    Returns (agent_text, data_json_or_none) for a (non-streamed) webhook response body.
+    - Accepts JSON arrays like: [{"output": "..."}] and returns the first item's 'output' (or similar)
+    - Accepts JSON dicts and prefers common keys
+    - Falls back to raw text if not JSON
+    """
+    data = None
+    try:
+        data = json.loads(raw)
+    except Exception:
+        data = None
+
+    if isinstance(data, list) and len(data) > 0:
+        first = data[0]
+        if isinstance(first, dict):
+            for k in ["output", "answer", "message", "text", "result"]:
+                if k in first and isinstance(first[k], (str, int, float, bool)):
+                    return str(first[k]), data
+            try:
+                return "```json\n" + json.dumps(first, indent=2) + "\n```", data
+            except Exception:
+                return str(first), data
+        try:
+            return "```json\n" + json.dumps(data, indent=2) + "\n```", data
+        except Exception:
+            return str(data), data
+
+    if isinstance(data, dict):
+        for k in ["output", "answer", "result", "message", "text"]:
+            if k in data and isinstance(data[k], (str, int, float, bool)):
+                return str(data[k]), data
+        try:
+            return "```json\n" + json.dumps(data, indent=2) + "\n```", data
+        except Exception:
+            return str(data), data
+
+    return raw.strip(), None
+
+
+def safe_parse_response(resp):
+    """(agent_text, data_json_or_none) for a requests response."""
+    return extract_text(resp.text)
+
+
+def _as_chunk(line: str):
+    """The n8n stream chunk on this line, or None if the line is something else."""
+    try:
+        chunk = json.loads(line)
+    except ValueError:
+        return None
+    if isinstance(chunk, dict) and chunk.get("type") in CHUNK_TYPES:
+        return chunk
+    return None
+
+
+def _chunk_event(chunk: dict) -> Optional[ChatEvent]:
+    kind = chunk["type"]
+    content = chunk.get("content")
+    if kind == "item":
+        return ChatEvent("token", content) if content else None
+    if kind == "tool":
+        return ChatEvent("tool", str(content or ""))
+    if kind == "error":
+        return ChatEvent("error", f"Workflow error: {content or 'unknown error'}")
+    if kind == "begin":
+        node = (chunk.get("metadata") or {}).get("nodeName")
+        return ChatEvent("status", f"{node}…") if node else None
+    return None  # end
+
+
+def parse_stream(lines: Iterator[str], stats: Optional[ReplyStats] = None) -> Iterator[ChatEvent]:
+    """ChatEvents for the lines of a webhook response body, as they arrive.
+
+    The first non-blank line decides the format: SSE ("data: ..."), n8n chunks
+    (NDJSON), or anything else, which is read to the end and parsed as one reply.
+    """
+    stats = stats if stats is not None else ReplyStats()
+    lines = iter(lines)
+    mode = None
+    for line in lines:
+        if mode is None:
+            if not line.strip():
+                continue
+            if line.startswith(("data:", "event:", "id:", ":")):
+                mode = "sse"
+            elif _as_chunk(line) is not None:
+                mode = "ndjson"
+            else:
+                # Blocking reply: the rest of the body is one JSON document (or text)
+                text, _ = extract_text("\n".join([line, *lines]))
+                if text:
+                    stats.first_token = time.perf_counter()
+                    yield ChatEvent("token", text)
+                return
+            stats.streamed = True
+        if mode == "sse":
+            if not line.startswith("data:"):
+                continue  # event names, ids, keep-alive comments, blank separators
+            line = line[5:].strip()
+        chunk = _as_chunk(line)
+        if chunk is None:
+            continue
+        event = _chunk_event(chunk)
+        if event is None:
+            continue
+        if event.kind == "token" and stats.first_token is None:
+            stats.first_token = time.perf_counter()
+        elif event.kind in ("tool", "status"):
+            stats.steps.append(event.text)
+        yield event
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of calling the webhook while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Stops calling a failing webhook for a while.
+
+    After `failure_threshold` consecutive failures (connection errors, timeouts,
+    5xx answers) the circuit opens and calls fail at once with CircuitOpenError.
+    `reset_after` seconds later one trial call is let through (half-open): success
+    closes the circuit, failure opens it again. Thread-safe; shared by all sessions.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_after: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_after:
+                return "half-open"
+            return "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_after - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._trial:
+                raise CircuitOpenError(
+                    f"n8n webhook unavailable after {self._failures} failed calls; "
+                    f"not calling it for another {max(remaining, 0):.0f}s"
+                )
+            self._trial = True  # half-open: let this one call through
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+def make_session(pool_size: int = 10, retries: int = 2, backoff: float = 0.3) -> requests.Session:
+    """requests.Session with a keep-alive connection pool and bounded retries.
+
+    Retries cover failed connects and 502/503 answers (n8n restarting or behind a
+    proxy), with exponential backoff plus up to `backoff` seconds of jitter. Read
+    errors are not retried: the workflow may already have run, and a second run
+    could repeat an order update.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=retries,
+        status_forcelist=(502, 503),
+        allowed_methods=frozenset({"POST"}),
+        backoff_factor=backoff,
+        backoff_jitter=backoff,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def stream_reply(
+    url: str,
+    payload: dict,
+    timeout: float,
+    stats: Optional[ReplyStats] = None,
+    session: Optional[requests.Session] = None,
+    breaker: Optional[CircuitBreaker] = None,
+) -> Iterator[ChatEvent]:
+    """POST payload to the webhook and yield ChatEvents as the reply arrives.
+
+    Works with both streaming and blocking webhooks; timings go to stats.
+    timeout is a number or a (connect, read) tuple, as for requests.
+    Raises requests.exceptions.RequestException if the request itself fails
+    (CircuitOpenError if the breaker is open).
+    """
+    stats = stats if stats is not None else ReplyStats()
+    post = session.post if session is not None else requests.post
+    if breaker is not None:
+        breaker.before_call()
+    ok = False
+    headers = {"Content-Type": "application/json", "Accept": STREAM_ACCEPT}
+    try:
+        with tracing.start_span("webhook POST", url=url) as span, post(
+            url,
+            json=payload,
+            headers={**headers, "traceparent": span.traceparent} if span is not None else headers,
+            timeout=timeout,
+            stream=True,
+        ) as resp:
+            if span is not None:
+                span.set(status=resp.status_code)
+            if not resp.ok:
+                ok = resp.status_code < 500  # 4xx: n8n is up, the request is wrong
+                yield ChatEvent("error", f"n8n error: {resp.status_code} — {resp.text}")
+                return
+            resp.encoding = resp.encoding or "utf-8"
+            # chunk_size=None: hand lines over as soon as they arrive instead of per 512 bytes
+            yield from parse_stream(resp.iter_lines(chunk_size=None, decode_unicode=True), stats)
+            ok = True
+    except GeneratorExit:
+        ok = True  # the caller stopped reading; not a webhook failure
+        raise
+    finally:
+        stats.finished = time.perf_counter()
+        if breaker is not None:
+            if ok:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+
+
+class WebhookClient:
+    """Pooled session + circuit breaker for the n8n webhook, one per process."""
+
+    def __init__(self, pool_size: int = 10, retries: int = 2, connect_timeout: float = 3.05,
+                 failure_threshold: int = 3, reset_after: float = 30.0):
+        self.session = make_session(pool_size=pool_size, retries=retries)
+        self.breaker = CircuitBreaker(failure_threshold, reset_after)
+        self.connect_timeout = connect_timeout
+
+    def stream_reply(self, url: str, payload: dict, timeout: float,
+                     stats: Optional[ReplyStats] = None) -> Iterator[ChatEvent]:
+        """stream_reply through the pool; timeout applies between received chunks."""
+        return stream_reply(url, payload, (self.connect_timeout, timeout), stats=stats,
+                            session=self.session, breaker=self.breaker)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def collect_reply(url: str, payload: dict, timeout: float, **kwargs):
+    """Whole reply of a webhook call: (text, error_text_or_none, stats)."""
+    stats = kwargs.pop("stats", None) or ReplyStats()
+    parts, error = [], None
+    for event in stream_reply(url, payload, timeout, stats=stats, **kwargs):
+        if event.kind == "token":
+            parts.append(event.text)
+        elif event.kind == "error":
+            error = event.text
+    return "".join(parts), error, stats
+
+
+# Regex helpers (optional: parse model-suggested actions/options from text)
+ACTION_RE  = re.compile(r"^ACTION:\s*(\{[\s\S]*\})\s*$",  re.MULTILINE)
+OPTIONS_RE = re.compile(r"^OPTIONS:\s*(\[[\s\S]*\])\s*$", re.MULTILINE)
+
+
+def extract_action_block(text: str):
+    """The ACTION: {...} the agent asks the CSR to confirm, or None."""
+    if not text:
+        return None
+    m = ACTION_RE.search(text)
+    if not m:
+        return None
+    try:
+        return json.loads(m.group(1))
+    except json.JSONDecodeError:
+        return None
+
+
+def extract_options_block(text: str):
+    """The OPTIONS: [{label, intent, args?}, ...] quick actions in the agent's text."""
+    if not text:
+        return []
+    m = OPTIONS_RE.search(text)
+    if not m:
+        return []
+    try:
+        data = json.loads(m.group(1))
+        if isinstance(data, list):
+            norm = []
+            for opt in data:
+                if isinstance(opt, dict) and "label" in opt and "intent" in opt:
+                    norm.append({
+                        "label": opt["label"],
+                        "intent": opt["intent"],
+                        "args": opt.get("args", {})
+                    })
+            return norm
+        return []
+    except Exception:
+        return []
+
+
+class PendingCall:
+    """A webhook call running on a worker thread while the UI keeps rerunning.
+
+    The worker only appends to this object (no Streamlit calls off the script
+    thread); the UI reads `text`, `status` and `done` on each rerun.
+    """
+
+    def __init__(self, event: dict, payload: dict):
+        self.event = event
+        self.payload = payload
+        self.stats = ReplyStats()
+        self.parts: List[str] = []
+        self.status = ""
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    @property
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def run(self, client: WebhookClient, url: str, timeout: float) -> None:
+        with tracing.start_span("chat turn", service="streamlit", session_id=self.payload.get("sessionId"),
+                                action=self.payload.get("action")) as span:
+            if span is not None:
+                self.stats.trace_id = span.trace_id
+            try:
+                for event in client.stream_reply(url, self.payload, timeout, stats=self.stats):
+                    if event.kind == "token":
+                        self.parts.append(event.text)
+                    elif event.kind == "tool":
+                        self.status = f"🔧 {event.text}"
+                    elif event.kind == "status":
+                        self.status = event.text
+                    elif event.kind == "error":
+                        self.error = event.text
+            except requests.exceptions.RequestException as e:
+                self.error = f"Request failed: {e}"
+            except Exception as e:  # never lose the message to an unexpected worker error
+                self.error = f"Unexpected error: {e}"
+            if span is not None:
+                span.set(ttft_ms=None if self.stats.ttft is None else round(self.stats.ttft * 1000, 1))
+                if self.error:
+                    span.status = "error"
+                    span.set(error=self.error)
+
+
+def dispatch(executor: Executor, client: WebhookClient, url: str, timeout: float,
+             event: dict, payload: dict) -> PendingCall:
+    """Start the webhook call for event on executor; poll the returned PendingCall."""
+    call = PendingCall(event, payload)
+    call.future = executor.submit(call.run, client, url, timeout)
+    return call
@@ -0,0 +1,79 @@
+# serve_gateway.py
+"""Run the gateway (app_gateway.py) in several worker processes.
+
+    python serve_gateway.py [--workers 4] [--host 127.0.0.1] [--port 8000] [--server uvicorn|gunicorn]
+
+One worker process per CPU core (the default) lets requests use every core. A single
+uvicorn process runs the gateway's Python code on one core only.
+
+The migrations (services/common/startup.py) are run once here, before any worker is
+started. Each worker then runs the gateway's lifespan. That lifespan finds the
+migrations already applied under the startup lock and warms the worker's own caches.
+The data paths come from services/common/config.py (CSR_ORDERS_DB, ...), so every
+worker opens the same files whatever folder the launcher was started from.
+
+MCP clients should use http://HOST:PORT/mcp-http (streamable HTTP, stateless). An
+SSE session on /mcp lives in one worker only, and its follow-up POSTs may reach
+another worker.
+
+--server gunicorn runs the same uvicorn workers under gunicorn's process manager,
+which restarts workers that die (Linux/macOS, `pip install gunicorn`).
+"""
+import argparse
+import logging
+import os
+
+from services.common.config import BASE_DIR
+from services.common.startup import migrate
+
+APP = "app_gateway:gateway"
+
+
+def serve_uvicorn(args) -> None:
+    import uvicorn
+
+    uvicorn.run(APP, host=args.host, port=args.port, workers=args.workers, app_dir=str(BASE_DIR),
+                log_level=args.log_level)
+
+
+def serve_gunicorn(args) -> None:
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("--server gunicorn needs gunicorn: pip install gunicorn")
+
+    class GatewayApplication(BaseApplication):
+        def load_config(self):
+            for key, value in {
+                "bind": f"{args.host}:{args.port}",
+                "workers": args.workers,
+                "worker_class": "uvicorn.workers.UvicornWorker",
+                "loglevel": args.log_level,
+                "graceful_timeout": 10,
+            }.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app_gateway import gateway  # imported in each worker (no preload): nothing is shared across fork
+            return gateway
+
+    GatewayApplication().run()
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Run the CSR gateway in several worker processes.")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--server", choices=["uvicorn", "gunicorn"], default="uvicorn")
+    ap.add_argument("--log-level", default="info")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(levelname)s:     %(name)s: %(message)s")
+    os.chdir(BASE_DIR)  # ./logs and the app import resolve the same way in every worker
+    migrate()
+    (serve_gunicorn if args.server == "gunicorn" else serve_uvicorn)(args)
+
+
+if __name__ == "__main__":
+    main()
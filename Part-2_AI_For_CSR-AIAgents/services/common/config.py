@@ -0,0 +1,27 @@
+"""Where the services keep their data.
+
+Paths are taken from the Part-2 folder, not the current directory. The apps, every
+worker of a multi-worker run and the command-line tools therefore open the same
+files wherever they are started from. Each path can be moved with an environment
+variable; relative values are also taken from the Part-2 folder.
+"""
+import os
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+
+def data_path(env: str, default: str) -> str:
+    value = Path(os.getenv(env) or default)
+    return str(value if value.is_absolute() else BASE_DIR / value)
+
+
+ORDERS_DB = data_path("CSR_ORDERS_DB", "services/orders/Storage/orders.db")
+TICKETS_DB = data_path("CSR_TICKETS_DB", "services/tickets/Storage/support_tickets.db")
+FULFILLMENT_DB = data_path("CSR_FULFILLMENT_DB", "services/fulfillment/Storage/fulfillment.db")
+POLICIES_DB = data_path("CSR_POLICIES_DB", "services/policies/Storage/policies.db")
+POLICY_DOCS_DIR = data_path("CSR_POLICY_DOCS", "Documentation")
+MEMORY_DB = data_path("CSR_MEMORY_DB", "services/orchestrator/Storage/memory.db")
+STARTUP_LOCK = data_path("CSR_STARTUP_LOCK", "services/.startup.lock")
+SLOW_QUERY_LOG = data_path("CSR_SLOW_QUERY_LOG", "logs/slow_queries.log")
+TRACE_FILE = data_path("CSR_TRACE_FILE", "traces/spans.jsonl")
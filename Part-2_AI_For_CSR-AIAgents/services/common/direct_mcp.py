@@ -0,0 +1,194 @@
+"""MCP tool calls dispatched straight to the route functions.
+
+FastApiMCP executes a tool by sending an HTTP request (over an in-process ASGI
+transport) to its own app: the arguments are encoded into a URL/JSON body, routed,
+decoded and validated, and the response is JSON-encoded and decoded again before
+it is returned to the agent. `DirectFastApiMCP` keeps the same tool list and
+schemas but calls the endpoint function itself:
+
+* path/query parameters are validated with the route's own Path/Query definitions,
+  the request body with its Pydantic model;
+* `Depends` dependencies (the `get_service` factories) are called as-is;
+* the result goes through the route's response_model (exclude_unset/none honoured),
+  unless the route returns a JSONResponse itself (projected rows), and HTTPException
+  becomes the same "Error calling ..." error as the HTTP path.
+
+Set MCP_DISPATCH=http to fall back to FastApiMCP's HTTP dispatch.
+"""
+import inspect
+import json
+import os
+import time
+from copy import copy
+from typing import Any, Dict, Optional, Tuple
+
+import mcp.types as types
+from fastapi import FastAPI, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.params import Depends
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from fastapi_mcp import FastApiMCP
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+from pydantic import BaseModel, TypeAdapter, ValidationError, create_model
+from pydantic.fields import FieldInfo
+from starlette.concurrency import run_in_threadpool
+
+from . import tracing
+from .metrics import record_call
+
+
+class DirectRoute:
+    """Argument validation, dependencies and response encoding for one APIRoute."""
+
+    def __init__(self, route: APIRoute):
+        self.route = route
+        self.endpoint = route.endpoint
+        self.is_async = inspect.iscoroutinefunction(route.endpoint)
+        self.dependencies: Dict[str, Any] = {}
+        self.body_name: Optional[str] = None
+        self.body_model: Optional[type] = None
+        fields: Dict[str, Tuple[Any, FieldInfo]] = {}
+        self.locations: Dict[str, str] = {}  # argument name -> "path" / "query", for error locs
+        for name, param in inspect.signature(route.endpoint).parameters.items():
+            default, annotation = param.default, param.annotation
+            if isinstance(default, Depends):
+                self.dependencies[name] = default.dependency
+            elif inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+                self.body_name, self.body_model = name, annotation
+            elif isinstance(default, FieldInfo):
+                info = copy(default)
+                if info.alias and not info.validation_alias:
+                    info.validation_alias = info.alias  # FastAPI resolves `alias` itself; pydantic needs this
+                fields[name] = (annotation, info)
+                in_ = getattr(default, "in_", None)
+                self.locations[info.alias or name] = getattr(in_, "value", "query")
+            else:
+                fields[name] = (annotation, ... if default is inspect.Parameter.empty else default)
+        self.params_model = create_model(f"{route.operation_id}_params", **fields)
+        # Argument names as the tool schema exposes them (the alias, e.g. `format`)
+        self.param_names = {
+            info.alias or name for name, info in self.params_model.model_fields.items()
+        }
+        self.response = TypeAdapter(route.response_model) if route.response_model is not None else None
+
+    async def _resolve(self, dependency):
+        if inspect.iscoroutinefunction(dependency):
+            return await dependency()
+        return dependency()
+
+    def _encode(self, result) -> Any:
+        route = self.route
+        if result is None and route.status_code == 204:
+            return None
+        if isinstance(result, JSONResponse):  # already encoded, as FastAPI sends it unchanged
+            return json.loads(result.body)
+        if self.response is None:
+            return jsonable_encoder(result)
+        value = self.response.validate_python(result, from_attributes=True)
+        return self.response.dump_python(
+            value,
+            mode="json",
+            by_alias=route.response_model_by_alias,
+            exclude_unset=route.response_model_exclude_unset,
+            exclude_none=route.response_model_exclude_none,
+            exclude_defaults=route.response_model_exclude_defaults,
+        )
+
+    async def call(self, arguments: Dict[str, Any]) -> Tuple[int, Any]:
+        """(status_code, JSON-able payload) for the tool arguments."""
+        params = {k: v for k, v in arguments.items() if k in self.param_names}
+        body = {k: v for k, v in arguments.items() if k not in self.param_names}
+        errors = []
+        kwargs: Dict[str, Any] = {}
+        try:
+            kwargs.update(self.params_model.model_validate(params))
+        except ValidationError as e:
+            errors += [{**err, "loc": (self.locations.get(err["loc"][0], "query"), *err["loc"])}
+                       for err in e.errors(include_url=False)]
+        if self.body_model is not None:
+            try:
+                kwargs[self.body_name] = self.body_model.model_validate(body)
+            except ValidationError as e:
+                errors += [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+        if errors:
+            # same shape as FastAPI's 422 response
+            return 422, {"detail": jsonable_encoder(errors)}
+        for name, dependency in self.dependencies.items():
+            kwargs[name] = await self._resolve(dependency)
+        try:
+            if self.is_async:
+                result = await self.endpoint(**kwargs)
+            else:
+                # sync endpoints do blocking SQLite I/O: keep them off the event loop, as FastAPI does
+                result = await run_in_threadpool(self.endpoint, **kwargs)
+        except HTTPException as e:
+            return e.status_code, {"detail": e.detail}
+        return self.route.status_code or 200, self._encode(result)
+
+
+class DirectFastApiMCP(FastApiMCP):
+    def setup_server(self) -> None:
+        super().setup_server()
+        self.metrics_service = getattr(self.fastapi.state, "metrics_service", self.fastapi.title)
+        self.direct_routes = {
+            route.operation_id: DirectRoute(route)
+            for route in self.fastapi.routes
+            if isinstance(route, APIRoute) and route.operation_id in self.operation_map
+        }
+
+    async def call_tool(self, tool_name: str, arguments: Optional[Dict[str, Any]] = None,
+                        traceparent: Optional[str] = None) -> str:
+        """Run a tool in-process; returns the text an MCP client would receive.
+
+        Raises the same "Error calling ..." Exception as the MCP path for an error
+        status, and KeyError for a tool that is not a route of this app.
+        """
+        target = self.direct_routes[tool_name]
+        start = time.perf_counter()
+        with tracing.start_span(f"tool {tool_name}", traceparent=traceparent, service=self.metrics_service) as span:
+            status, payload = await target.call(dict(arguments or {}))
+            if span is not None:
+                span.set(status=status)
+        # not an HTTP request, so the metrics middleware doesn't see it
+        record_call(self.metrics_service, tool_name, status, time.perf_counter() - start)
+        if status >= 400:
+            raise Exception(
+                f"Error calling {tool_name}. Status code: {status}. Response: {json.dumps(payload, ensure_ascii=False, separators=(',', ':'))}"
+            )
+        return "" if payload is None else json.dumps(payload, indent=2, ensure_ascii=False)
+
+    # fastapi-mcp's hook for MCP tools/call requests
+    async def _execute_api_tool(self, client, tool_name, arguments, operation_map, http_request_info=None):
+        if tool_name not in self.direct_routes:
+            return await super()._execute_api_tool(client, tool_name, arguments, operation_map, http_request_info)
+        # MCP clients that send a traceparent header on the tool-call request join the caller's trace
+        headers = http_request_info.headers if http_request_info is not None else {}
+        text = await self.call_tool(tool_name, arguments, traceparent=headers.get("traceparent"))
+        return [types.TextContent(type="text", text=text)]
+
+
+class StatelessMcpHttp:
+    """Streamable HTTP MCP endpoint without sessions, as an ASGI app.
+
+    The SSE transport keeps each client session in the process that opened it. With
+    several workers, a client's next POST may reach a worker that has never seen the
+    session. Here every POST carries a complete JSON-RPC exchange, so any worker can
+    answer it. Enter `run()` in the app's lifespan.
+    """
+
+    def __init__(self, mcp: FastApiMCP):
+        self.manager = StreamableHTTPSessionManager(app=mcp.server, stateless=True)
+
+    def run(self):
+        return self.manager.run()
+
+    async def __call__(self, scope, receive, send):
+        await self.manager.handle_request(scope, receive, send)
+
+
+def create_mcp(app: FastAPI, **kwargs) -> FastApiMCP:
+    """MCP server for app: direct dispatch unless MCP_DISPATCH=http."""
+    if os.getenv("MCP_DISPATCH", "direct").lower() == "http":
+        return FastApiMCP(app, **kwargs)
+    return DirectFastApiMCP(app, **kwargs)
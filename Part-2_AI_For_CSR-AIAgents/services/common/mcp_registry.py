@@ -0,0 +1,43 @@
+"""One MCP tool registry for all services.
+
+Each service app mounts its own FastApiMCP, so an agent needs one MCP session per
+service. `combined_tools_app` copies the tool routes (the ones in the OpenAPI schema)
+of every service into a single FastAPI app under the same prefixes the gateway mounts
+them at; a FastApiMCP built on it lists all tools once and dispatches into that app
+in-process.
+"""
+from collections import Counter
+from typing import Dict
+
+from fastapi import APIRouter, FastAPI
+from fastapi.routing import APIRoute
+
+
+def tool_routes(app: FastAPI) -> APIRouter:
+    """Router with the app's schema-visible API routes (skips /mcp, /healthz, docs)."""
+    router = APIRouter()
+    router.routes.extend(
+        r for r in app.router.routes if isinstance(r, APIRoute) and r.include_in_schema
+    )
+    return router
+
+
+def combined_tools_app(apps: Dict[str, FastAPI], title: str = "CSR Assist Tools") -> FastAPI:
+    """FastAPI app serving the tool routes of every app in apps ({prefix: app}).
+
+    Raises ValueError if two services use the same operation_id (= MCP tool name).
+    """
+    ids = Counter(
+        r.operation_id
+        for app in apps.values()
+        for r in tool_routes(app).routes
+        if r.operation_id
+    )
+    duplicates = sorted(name for name, n in ids.items() if n > 1)
+    if duplicates:
+        raise ValueError(f"Duplicate MCP tool names across services: {', '.join(duplicates)}")
+
+    combined = FastAPI(title=title, version="1.0.0")
+    for prefix, app in apps.items():
+        combined.include_router(tool_routes(app), prefix=prefix)
+    return combined
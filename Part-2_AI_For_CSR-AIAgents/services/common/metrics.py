@@ -0,0 +1,381 @@
+"""Prometheus metrics for the gateway and the services.
+
+* `instrument(app, service)` adds a middleware recording request count, latency
+  (per operation_id, i.e. per MCP tool) and in-flight requests, and a /metrics route;
+* `connect(db_path)` opens SQLite with a cursor that records query time and rows
+  returned per database and statement type; the services' `_connect` use it;
+* `record_cache(cache, hit)` and `register_lru_cache` count cache lookups, so
+  hit ratios are hits / (hits + misses);
+* `readiness(checks)` is the body of a real /healthz probe.
+
+With tracing on (services/common/tracing.py), `instrument` also opens a span per
+request and the cursor one per statement, under the current span. The cursor also
+feeds the query hooks of services/common/query_log.py (profiler, slow-query log,
+served on /debug/queries).
+
+MCP tool calls dispatched directly to the route functions (direct_mcp.py) bypass
+HTTP; they are recorded by the dispatcher under the same request metrics with
+transport="mcp".
+"""
+import os
+import sqlite3
+import time
+from typing import Callable, Dict, List, Literal, Optional
+
+from fastapi import FastAPI, Query, Response
+from fastapi.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily
+
+from . import query_log, tracing
+
+# Tool calls are milliseconds; agent turns through the orchestrator take seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+
+REQUESTS = Counter(
+    "csr_requests_total", "Requests handled, by service, operation_id and status.",
+    ["service", "operation", "method", "status", "transport"],
+)
+REQUEST_LATENCY = Histogram(
+    "csr_request_duration_seconds", "Request latency by service and operation_id.",
+    ["service", "operation", "transport"], buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge("csr_requests_in_flight", "Requests being handled.", ["service"])
+DB_QUERY_LATENCY = Histogram(
+    "csr_db_query_duration_seconds", "SQLite statement execution time.",
+    ["db", "statement"], buckets=QUERY_BUCKETS,
+)
+DB_ROWS = Counter("csr_db_rows_returned_total", "Rows fetched from SQLite.", ["db", "statement"])
+CACHE_LOOKUPS = Counter("csr_cache_lookups_total", "Cache lookups by cache and result (hit/miss).",
+                        ["cache", "result"])
+
+
+# ---------- HTTP ----------
+
+SCOPE_KEY = "csr.metrics"  # per-request state shared with the middleware of mounted apps
+
+def operation_label(scope) -> str:
+    """operation_id of the matched route (the MCP tool name), its path, or 'unmatched'."""
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"  # 404s: don't create one label per requested path
+    return getattr(route, "operation_id", None) or getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (streaming responses pass through untouched).
+
+    An instrumented app mounted in another one (a service behind the gateway) sees
+    the same request again. Only the outermost middleware records it, under the
+    service and route of the innermost instrumented app, so every request is
+    counted once.
+    """
+
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].endswith("/metrics"):
+            await self.app(scope, receive, send)
+            return
+        outer = scope.get(SCOPE_KEY)
+        if outer is not None:
+            # mounted: move the in-flight request to this service and let the outer middleware record it
+            IN_FLIGHT.labels(outer["service"]).dec()
+            IN_FLIGHT.labels(self.service).inc()
+            outer.update(service=self.service, scope=scope)
+            await self.app(scope, receive, send)
+            return
+        state = scope[SCOPE_KEY] = {"service": self.service, "scope": scope}
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        IN_FLIGHT.labels(self.service).inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            service = state["service"]
+            IN_FLIGHT.labels(service).dec()
+            operation = operation_label(state["scope"])
+            REQUESTS.labels(service, operation, scope["method"], str(status["code"]), "http").inc()
+            REQUEST_LATENCY.labels(service, operation, "http").observe(elapsed)
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
+def instrument(app: FastAPI, service: str) -> None:
+    """Record request metrics for app under `service` and serve them on /metrics."""
+    app.state.metrics_service = service
+    app.add_middleware(tracing.TracingMiddleware, service=service)
+    app.add_middleware(MetricsMiddleware, service=service)
+    app.add_api_route("/metrics", metrics_response, methods=["GET"], include_in_schema=False)
+    app.add_api_route("/debug/queries", debug_queries, methods=["GET"], include_in_schema=False)
+
+
+def debug_queries(
+    n: int = Query(20, ge=1, le=500, description="number of statements"),
+    sort: Literal[query_log.SORT_KEYS] = Query("total_ms", description="order by"),
+    reset: bool = Query(False, description="clear the totals after reading them"),
+):
+    """Top statements of this process (GET /debug/queries)."""
+    profiler = query_log.PROFILER
+    if profiler is None:
+        return {"enabled": False, "statements": []}
+    statements = profiler.top(n, sort)
+    if reset:
+        profiler.reset()
+    return {"enabled": True, "slow_ms": profiler.slow_ms, "statements": statements}
+
+
+def record_call(service: str, operation: str, status: int, elapsed: float, transport: str = "mcp") -> None:
+    """Request metrics for a call that did not go through the HTTP middleware."""
+    REQUESTS.labels(service, operation, "CALL", str(status), transport).inc()
+    REQUEST_LATENCY.labels(service, operation, transport).observe(elapsed)
+
+
+# ---------- SQLite ----------
+
+def _db_label(database) -> str:
+    path = str(database)
+    if path.startswith("file:"):
+        path = path[5:].split("?", 1)[0]
+    return os.path.splitext(os.path.basename(path))[0] or "memory"
+
+
+def _statement(sql: str) -> str:
+    words = sql.lstrip().split(None, 1)
+    return words[0].upper() if words else "EMPTY"
+
+
+def _sql_text(sql: str, limit: int = 200) -> str:
+    text = " ".join(sql.split())
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    _statement = "NONE"
+    _pending: Optional[query_log.QueryRecord] = None  # statement being fetched, while query hooks are set
+
+    def _step(self, method, *args):
+        """Call method with this cursor's statement as the one the progress handler counts for."""
+        if self._pending is None:
+            return method(*args)
+        conn = self.connection
+        outer, conn.active = conn.active, self._pending
+        try:
+            return method(*args)
+        finally:
+            conn.active = outer
+
+    def _run(self, method, sql, parameters, many=False):
+        self._finish()
+        self._statement = _statement(sql)
+        conn = self.connection
+        db = conn.db_label
+        if query_log.QUERY_HOOKS:
+            self._pending = conn.profile(query_log.QueryRecord(db, sql, parameters, conn, many=many))
+        start = time.perf_counter()
+        try:
+            if not tracing.enabled():
+                return self._step(method, sql, parameters)
+            with tracing.start_span(f"sqlite {self._statement}", root=False, db=db, sql=_sql_text(sql)):
+                return self._step(method, sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            DB_QUERY_LATENCY.labels(db, self._statement).observe(elapsed)
+            record = self._pending
+            if record is not None:
+                record.seconds += elapsed
+                record.rowcount = self.rowcount
+                if self.description is None:  # nothing to fetch (writes, DDL, errors)
+                    self._finish()
+                if self._statement in _TRANSACTION_END:
+                    conn.finish_statements()
+
+    def _finish(self) -> None:
+        """Hand the finished statement to the query hooks."""
+        record, self._pending = self._pending, None
+        if record is not None:
+            self.connection.finish(record)
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(super().executemany, sql, seq_of_parameters, many=True)
+
+    def _fetched(self, n: int, start: float, done: bool) -> None:
+        if n:
+            DB_ROWS.labels(self.connection.db_label, self._statement).inc(n)
+        if self._pending is not None:
+            self._pending.seconds += time.perf_counter() - start
+            self._pending.rows += n
+            if done:
+                self._finish()
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._step(super().fetchone)
+        self._fetched(row is not None, start, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = self._step(super().fetchmany, size)
+        self._fetched(len(rows), start, len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._step(super().fetchall)
+        self._fetched(len(rows), start, True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = self._step(super().__next__)
+        except StopIteration:
+            self._fetched(0, start, True)
+            raise
+        self._fetched(1, start, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+_TRANSACTION_END = {"COMMIT", "END", "ROLLBACK"}
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors record metrics and feed the query hooks.
+
+    One progress handler per connection counts VM instructions for the statement
+    being stepped (`active`). A statement that is not fetched to the end (a
+    single-row lookup) is reported when its cursor runs again or is closed, when the
+    transaction ends, or when the connection leaves its `with` block or is closed.
+    """
+
+    def __init__(self, database, *args, **kwargs):
+        super().__init__(database, *args, **kwargs)
+        self.db_label = _db_label(database)
+        self.active: Optional[query_log.QueryRecord] = None
+        self.pending: List[query_log.QueryRecord] = []  # profiled, not reported yet
+        self._counting = False
+
+    def _tick(self) -> int:
+        if self.active is not None:
+            self.active.vm_steps += query_log.VM_STEP_TICK
+        return 0  # non-zero would abort the statement
+
+    def profile(self, record: query_log.QueryRecord) -> query_log.QueryRecord:
+        if not self._counting:
+            self.set_progress_handler(self._tick, query_log.VM_STEP_TICK)
+            self._counting = True
+        self.pending.append(record)
+        return record
+
+    def finish(self, record: query_log.QueryRecord) -> None:
+        if not record.reported:
+            self.pending.remove(record)
+            query_log.report(record)
+
+    def finish_statements(self) -> None:
+        pending, self.pending = self.pending, []
+        for record in pending:
+            query_log.report(record)
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        super().commit()
+        self.finish_statements()
+
+    def rollback(self):
+        super().rollback()
+        self.finish_statements()
+
+    def __exit__(self, *exc_info):
+        try:
+            return super().__exit__(*exc_info)
+        finally:
+            self.finish_statements()
+
+    def close(self):
+        self.finish_statements()  # before closing: the slow-query log explains on this connection
+        super().close()
+
+
+def connect(database, **kwargs) -> sqlite3.Connection:
+    """sqlite3.connect with query time / rows returned metrics."""
+    return sqlite3.connect(database, factory=InstrumentedConnection, **kwargs)
+
+
+# ---------- Caches ----------
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+class _LruCacheCollector:
+    """Reads functools.lru_cache statistics at scrape time (no cost per lookup)."""
+
+    def __init__(self):
+        self.caches: Dict[str, Callable] = {}
+
+    def collect(self):
+        family = CounterMetricFamily("csr_lru_cache_lookups", "functools.lru_cache lookups by result.",
+                                     labels=["cache", "result"])
+        for name, fn in self.caches.items():
+            info = fn.cache_info()
+            family.add_metric([name, "hit"], info.hits)
+            family.add_metric([name, "miss"], info.misses)
+        yield family
+
+
+_LRU_CACHES = _LruCacheCollector()
+REGISTRY.register(_LRU_CACHES)
+
+
+def register_lru_cache(name: str, fn: Callable) -> Callable:
+    _LRU_CACHES.caches[name] = fn
+    return fn
+
+
+# ---------- Health ----------
+
+def readiness(checks: Dict[str, Callable[[], None]]) -> JSONResponse:
+    """Run each check (raises on failure); 200 if all pass, else 503, with per-check details."""
+    results: Dict[str, Dict[str, Optional[object]]] = {}
+    ok = True
+    for name, check in checks.items():
+        start = time.perf_counter()
+        try:
+            check()
+            results[name] = {"status": "ok"}
+        except Exception as e:
+            ok = False
+            results[name] = {"status": "error", "error": str(e)}
+        results[name]["ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return JSONResponse({"status": "ok" if ok else "unavailable", "checks": results},
+                        status_code=200 if ok else 503)
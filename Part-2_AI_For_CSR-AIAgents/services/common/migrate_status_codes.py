@@ -0,0 +1,140 @@
+"""Migrate status columns from free text to integer codes with a lookup table.
+
+    python -m services.common.migrate_status_codes [--orders-db PATH] [--fulfillment-db PATH] [--dry-run]
+
+For each status column in services/common/statuses.py the table is rebuilt in one
+transaction: the column becomes `INTEGER REFERENCES <lookup>(code)`, every stored
+spelling is mapped to its code, and the table's indexes and triggers are re-created,
+plus an index on the status column. The lookup table (code, name) is created next
+to it. The database is vacuumed afterwards to give the freed pages back.
+
+Stored values outside the vocabulary abort the migration and are listed. Already
+migrated columns are skipped. Stop the services while migrating; they detect the
+layout when they first touch a database.
+"""
+import argparse
+import os
+import sqlite3
+import time
+from typing import Dict, List
+
+from .config import FULFILLMENT_DB, ORDERS_DB
+from .statuses import STATUS_COLUMNS, StatusVocabulary, UnknownStatus, is_coded
+
+DEFAULT_DBS = {"orders": ORDERS_DB, "fulfillment": FULFILLMENT_DB}
+
+
+def _split_columns(body: str) -> List[str]:
+    """Top-level comma-separated parts of a CREATE TABLE body."""
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(body):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            parts.append(body[start:i])
+            start = i + 1
+    parts.append(body[start:])
+    return parts
+
+
+def coded_table_sql(create_sql: str, table: str, new_table: str, column: str, vocabulary: StatusVocabulary) -> str:
+    head, body = create_sql[:create_sql.index("(")], create_sql[create_sql.index("(") + 1:create_sql.rindex(")")]
+    parts = _split_columns(body)
+    for i, part in enumerate(parts):
+        words = part.split()
+        if words and words[0].strip('"[]`').lower() == column.lower():
+            parts[i] = f"\n    {column} INTEGER REFERENCES {vocabulary.table}(code)"
+            break
+    else:
+        raise ValueError(f"{table} has no column {column}")
+    return head.replace(table, new_table, 1) + "(" + ",".join(parts).rstrip() + "\n)"
+
+
+def unknown_values(conn, table: str, column: str, vocabulary: StatusVocabulary) -> Dict[str, int]:
+    out = {}
+    for value, n in conn.execute(f"SELECT {column}, COUNT(*) FROM {table} WHERE {column} IS NOT NULL GROUP BY 1"):
+        try:
+            vocabulary.normalize(value)
+        except UnknownStatus:
+            out[value] = n
+    return out
+
+
+def migrate_column(conn, table: str, column: str, vocabulary: StatusVocabulary) -> str:
+    """Rebuild table with column coded; returns what was done. conn must be in autocommit mode."""
+    if is_coded(conn, vocabulary):
+        return f"{table}.{column}: already coded"
+    unknown = unknown_values(conn, table, column, vocabulary)
+    if unknown:
+        listed = ", ".join(f"{v!r} ({n})" for v, n in sorted(unknown.items(), key=str))
+        raise UnknownStatus(f"{table}.{column} has values outside the vocabulary: {listed}")
+    create_sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+    others = [sql for (sql,) in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL "
+        "ORDER BY type", (table,))]
+    columns = [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+    stored = [v for (v,) in conn.execute(f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL")]
+    case = "CASE " + column + "".join(f" WHEN ? THEN {vocabulary.code(v)}" for v in stored) + " END"
+    select = ", ".join(case if c == column else c for c in columns)
+    new_table = f"{table}__coded"
+    start = time.perf_counter()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(vocabulary.lookup_sql())
+        conn.executemany(f"INSERT OR IGNORE INTO {vocabulary.table} (code, name) VALUES (?, ?)",
+                         vocabulary.lookup_rows())
+        conn.execute(coded_table_sql(create_sql, table, new_table, column, vocabulary))
+        conn.execute(f"INSERT INTO {new_table} ({', '.join(columns)}) SELECT {select} FROM {table}", stored)
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+        for sql in others:
+            conn.execute(sql)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column.lower()} ON {table} ({column})")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return f"{table}.{column}: {rows:,} rows coded in {time.perf_counter() - start:.1f}s"
+
+
+def migrate(db_path: str, table: str, dry_run: bool = False, vacuum: bool = True) -> List[str]:
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        done = []
+        for (t, column), vocabulary in STATUS_COLUMNS.items():
+            if t != table:
+                continue
+            if dry_run:
+                unknown = unknown_values(conn, table, column, vocabulary)
+                state = "already coded" if is_coded(conn, vocabulary) else (
+                    f"unknown values {unknown}" if unknown else "ready to migrate")
+                done.append(f"{table}.{column}: {state}")
+                continue
+            done.append(migrate_column(conn, table, column, vocabulary))
+        if vacuum and not dry_run:
+            conn.execute("VACUUM")
+        return done
+    finally:
+        conn.close()
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Store status columns as integer codes with lookup tables.")
+    ap.add_argument("--orders-db", default=DEFAULT_DBS["orders"])
+    ap.add_argument("--fulfillment-db", default=DEFAULT_DBS["fulfillment"])
+    ap.add_argument("--dry-run", action="store_true", help="only check the stored values")
+    ap.add_argument("--no-vacuum", action="store_true")
+    args = ap.parse_args(argv)
+    for table, path in (("orders", args.orders_db), ("fulfillment", args.fulfillment_db)):
+        before = os.path.getsize(path)
+        for line in migrate(path, table, dry_run=args.dry_run, vacuum=not args.no_vacuum):
+            print(line)
+        if not args.dry_run:
+            print(f"{path}: {before:,} -> {os.path.getsize(path):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Field projection and compact table output for the read endpoints.
+
+Every MCP tool result is pasted into the agent's context, so the read tools accept
+`fields=` (only these columns are SELECTed and returned) and `format=table` (one
+header line plus one line per row instead of a JSON object per row).
+
+The routes keep their full response model, so the tool schema still describes a
+complete row. Only a projected result, which that model would reject, is returned
+as-is through `projected`.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+TABLE_SEP = "|"
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> List[str]:
+    """Validate a comma-separated field list against allowed; None/empty means all fields.
+
+    Field names are matched case-insensitively and returned in the canonical spelling and
+    in the order requested. Raises ValueError naming the allowed fields on an unknown one.
+    """
+    if not fields or not fields.strip():
+        return list(allowed)
+    canonical = {name.lower(): name for name in allowed}
+    selected: List[str] = []
+    unknown = []
+    for raw in fields.split(","):
+        name = raw.strip()
+        if not name:
+            continue
+        match = canonical.get(name.lower())
+        if match is None:
+            unknown.append(name)
+        elif match not in selected:
+            selected.append(match)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    return selected or list(allowed)
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    text = str(value)
+    if TABLE_SEP in text or "\n" in text:
+        text = text.replace("\\", "\\\\").replace(TABLE_SEP, "\\" + TABLE_SEP).replace("\n", "\\n")
+    return text
+
+
+def to_table(rows: Iterable[Dict], columns: Sequence[str]) -> str:
+    """Header line plus one `|`-separated line per row; empty cell for NULL."""
+    lines = [TABLE_SEP.join(columns)]
+    lines.extend(TABLE_SEP.join(_cell(row.get(c)) for c in columns) for row in rows)
+    return "\n".join(lines)
+
+
+def projected(rows: Union[Dict, List[Dict]]) -> JSONResponse:
+    """Rows holding only the `fields=` columns, sent without the route's response model."""
+    return JSONResponse(jsonable_encoder(rows))
@@ -0,0 +1,218 @@
+"""Query profiler and slow-query log for the services' SQL.
+
+The instrumented SQLite cursor (metrics.connect) hands a `QueryRecord` to every
+function in QUERY_HOOKS once a statement is finished, i.e. executed *and* fetched
+(for SQLite most of the work of a SELECT happens while rows are stepped through):
+
+* sql / parameters, time spent executing and fetching, rows returned (or rowcount);
+* vm_steps - SQLite virtual-machine instructions, counted by a progress handler in
+  units of VM_STEP_TICK. Python's sqlite3 doesn't expose the per-statement scan
+  counters, so this stands in for "rows scanned": a full scan shows up as a large
+  vm_steps next to a small number of rows returned.
+
+`QueryProfiler` (installed unless CSR_QUERY_PROFILE=off) aggregates them per
+normalized statement (literals replaced by ?) and writes statements slower than
+CSR_SLOW_QUERY_MS, with their `EXPLAIN QUERY PLAN`, to a rotating JSON-lines log
+(CSR_SLOW_QUERY_LOG, by default logs/slow_queries.log in the Part-2 folder; its
+folder is created with the first slow statement). GET
+/debug/queries on every instrumented app lists the top statements of the process,
+to find the next index to add. Part-1's assistant keeps its own profiler with the
+same threshold and log format (Part-1_AI_For_CSR/query_profiler.py).
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import SLOW_QUERY_LOG
+
+PROFILE = os.getenv("CSR_QUERY_PROFILE", "on").lower() != "off"
+SLOW_QUERY_MS = float(os.getenv("CSR_SLOW_QUERY_MS", "50"))
+VM_STEP_TICK = 1000  # progress handler granularity, in VM instructions
+
+SORT_KEYS = ("total_ms", "mean_ms", "max_ms", "calls", "vm_steps", "rows")
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_PARAM_RE = re.compile(r"[:@$]\w+")
+
+
+@lru_cache(maxsize=1024)  # the services run a few dozen distinct statements
+def normalize_sql(sql: str) -> str:
+    """Statement text with literals and placeholders replaced by ?, so calls group together."""
+    text = " ".join(sql.split())
+    text = _STRING_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _PARAM_RE.sub("?", text)
+    return _IN_LIST_RE.sub("(?...)", text)
+
+
+@dataclass(eq=False)  # compared by identity: the connection keeps a list of pending ones
+class QueryRecord:
+    """One finished statement, as seen by the instrumented cursor."""
+    db: str
+    sql: str
+    parameters: Any
+    connection: sqlite3.Connection = field(repr=False)
+    many: bool = False
+    seconds: float = 0.0
+    rows: int = 0
+    rowcount: int = -1
+    vm_steps: int = 0
+    reported: bool = False
+
+    def explain(self) -> List[str]:
+        """EXPLAIN QUERY PLAN of the statement (a plain cursor, so it isn't profiled itself)."""
+        if self.many:
+            return []
+        try:
+            cur = sqlite3.Cursor(self.connection)
+            return [r[3] for r in cur.execute("EXPLAIN QUERY PLAN " + self.sql, self.parameters).fetchall()]
+        except sqlite3.Error as e:
+            return [f"(no plan: {e})"]
+
+
+QUERY_HOOKS: List[Callable[[QueryRecord], None]] = []
+
+
+def add_query_hook(hook: Callable[[QueryRecord], None]) -> None:
+    QUERY_HOOKS.append(hook)
+
+
+def remove_query_hook(hook: Callable[[QueryRecord], None]) -> None:
+    if hook in QUERY_HOOKS:
+        QUERY_HOOKS.remove(hook)
+
+
+def report(record: QueryRecord) -> None:
+    """Hand a finished statement to the query hooks, once."""
+    if record.reported:
+        return
+    record.reported = True
+    for hook in list(QUERY_HOOKS):
+        try:
+            hook(record)
+        except Exception:
+            pass  # profiling must never break a query
+
+
+@dataclass
+class StatementStats:
+    db: str
+    statement: str
+    calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+    vm_steps: int = 0
+    slow: int = 0
+    plan: Optional[List[str]] = None  # of the last slow call
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "db": self.db,
+            "statement": self.statement,
+            "calls": self.calls,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.mean_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "vm_steps": self.vm_steps,
+            "slow": self.slow,
+            "plan": self.plan,
+        }
+
+
+class _SlowQueryFile(RotatingFileHandler):
+    """Rotating log whose folder is created when the first line is written."""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class QueryProfiler:
+    """Per-statement totals plus a rotating log of slow statements with their plans.
+
+    Statements are grouped with `normalize`; a subclass can group them differently.
+    Nothing is written to disk until a statement is slow.
+    """
+
+    normalize = staticmethod(normalize_sql)
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS, log_path: Optional[str] = SLOW_QUERY_LOG,
+                 max_statements: int = 500, max_bytes: int = 5 * 1024 * 1024, backups: int = 3):
+        self.slow_ms = slow_ms
+        self.max_statements = max_statements
+        self.stats: Dict[Tuple[str, str], StatementStats] = {}
+        self._lock = threading.Lock()
+        self.log: Optional[logging.Logger] = None
+        if log_path:
+            self.log = logging.getLogger(f"csr.slow_queries.{os.path.abspath(log_path)}")
+            self.log.propagate = False
+            self.log.setLevel(logging.INFO)
+            if not self.log.handlers:
+                self.log.addHandler(_SlowQueryFile(log_path, maxBytes=max_bytes, backupCount=backups,
+                                                  encoding="utf-8", delay=True))
+
+    def __call__(self, record: QueryRecord) -> None:
+        ms = record.seconds * 1000
+        statement = self.normalize(record.sql)
+        slow = ms >= self.slow_ms
+        plan = record.explain() if slow else None
+        rows = record.rows if record.rowcount < 0 else max(record.rows, record.rowcount)
+        key = (record.db, statement)
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                if len(self.stats) >= self.max_statements:
+                    # bounded: forget the statement that has cost the least so far
+                    del self.stats[min(self.stats, key=lambda k: self.stats[k].total_ms)]
+                stats = self.stats[key] = StatementStats(record.db, statement)
+            stats.calls += 1
+            stats.total_ms += ms
+            stats.max_ms = max(stats.max_ms, ms)
+            stats.rows += rows
+            stats.vm_steps += record.vm_steps
+            if slow:
+                stats.slow += 1
+                stats.plan = plan
+        if slow and self.log is not None:
+            self.log.info(json.dumps({
+                "ts": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "db": record.db,
+                "ms": round(ms, 3),
+                "rows": rows,
+                "vm_steps": record.vm_steps,
+                "statement": statement,
+                "sql": " ".join(record.sql.split()),
+                "plan": plan,
+            }, ensure_ascii=False, default=str))
+
+    def top(self, n: int = 20, sort: str = "total_ms") -> List[Dict]:
+        with self._lock:
+            rows = [s.to_dict() for s in self.stats.values()]
+        return sorted(rows, key=lambda r: r[sort], reverse=True)[:n]
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats.clear()
+
+
+PROFILER: Optional[QueryProfiler] = None
+if PROFILE:
+    PROFILER = QueryProfiler()
+    add_query_hook(PROFILER)
+
@@ -0,0 +1,168 @@
+"""Spread a service database over N shard files, or merge its shards back into one.
+
+    python -m services.common.reshard {orders,tickets} --shards N [--db PATH] [--batch 5000]
+
+Reads every row of the current layout (the single file, or its shard files; see
+services/common/sharding.py) and writes it to the shard its routing key hashes to
+under the new layout. Each new file gets the full schema. Indexes and triggers are
+created after the rows are loaded, so a CDC trigger doesn't log the move as a change.
+Tables the sharded table references with a foreign key (status lookup tables) are
+copied whole into every shard.
+
+The new files are written as `.tmp` and renamed when all of them are complete. The
+old files are then renamed to `<file>.old`; delete them once the services run fine
+on the new layout. `--shards 1` merges back into the plain file. Stop the services
+while resharding, and start them again afterwards: they read the layout at start.
+"""
+import argparse
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+from .config import ORDERS_DB, TICKETS_DB
+from .sharding import ID_BITS, find_shards, shard_file, shard_index
+
+
+@dataclass(frozen=True)
+class ShardedTable:
+    db_path: str
+    table: str
+    key_columns: Tuple[str, ...]  # the first non-empty one is the routing key
+
+
+TABLES = {
+    "orders": ShardedTable(ORDERS_DB, "orders", ("Order_ID",)),
+    # same routing as TicketService._shard_key
+    "tickets": ShardedTable(TICKETS_DB, "tickets", ("Order_ID", "Cust_Email")),
+}
+
+
+def target_paths(db_path: str, count: int) -> List[str]:
+    return [db_path] if count == 1 else [shard_file(db_path, i, count) for i in range(count)]
+
+
+def _schema(conn, table: str) -> Tuple[List[str], List[str], List[str]]:
+    """CREATE statements: (tables, indexes/triggers/views, referenced tables to copy whole)."""
+    tables, later = [], []
+    for kind, name, sql in conn.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' "
+            "ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 ELSE 2 END, rowid"):
+        (tables if kind == "table" else later).append(sql)
+    referenced = sorted({r[2] for r in conn.execute(f"PRAGMA foreign_key_list({table})")})
+    return tables, later, referenced
+
+
+def _id_tops(paths: Sequence[str], table: str) -> Dict[int, int]:
+    """Highest rowid in each shard id range over all of paths."""
+    tops: Dict[int, int] = {}
+    for path in paths:
+        with sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True) as conn:
+            for block, top in conn.execute(f"SELECT rowid >> {ID_BITS}, MAX(rowid) FROM {table} GROUP BY 1"):
+                tops[block] = max(top, tops.get(block, 0))
+    return tops
+
+
+def reshard(spec: ShardedTable, count: int, batch: int = 5000) -> List[str]:
+    """Rewrite spec's table into `count` shards; returns one report line per new file."""
+    if count < 1:
+        raise ValueError("--shards must be at least 1")
+    sources = find_shards(spec.db_path)
+    if not os.path.exists(sources[0]):
+        raise FileNotFoundError(sources[0])
+    if len(sources) == count:
+        return [f"{spec.db_path}: already {count} shard(s)"]
+    targets = target_paths(spec.db_path, count)
+    for path in targets:
+        if os.path.exists(path) and path not in sources:
+            raise FileExistsError(f"{path} exists but is not part of the current layout; move it away first")
+    with sqlite3.connect(f"file:{os.path.abspath(sources[0])}?mode=ro", uri=True) as conn:
+        tables, later, referenced = _schema(conn, spec.table)
+        columns = [r[1] for r in conn.execute(f"PRAGMA table_info({spec.table})")]
+        has_sequence = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone() is not None
+    key_idx = [columns.index(c) for c in spec.key_columns]
+    insert = f"INSERT INTO {spec.table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+    start = time.perf_counter()
+    outs = []
+    for path in targets:
+        if os.path.exists(path + ".tmp"):
+            os.remove(path + ".tmp")
+        out = sqlite3.connect(path + ".tmp", isolation_level=None)
+        out.execute("PRAGMA journal_mode = OFF")  # a fresh .tmp file: a crash just means running again
+        out.execute("PRAGMA synchronous = OFF")
+        out.execute("BEGIN")
+        for sql in tables:
+            out.execute(sql)
+        outs.append(out)
+    rows = [0] * count
+    try:
+        for source in sources:
+            with sqlite3.connect(f"file:{os.path.abspath(source)}?mode=ro", uri=True) as conn:
+                if source == sources[0]:
+                    for ref in referenced:
+                        copied = conn.execute(f"SELECT * FROM {ref}").fetchall()
+                        if copied:
+                            marks = ", ".join("?" * len(copied[0]))
+                            for out in outs:
+                                out.executemany(f"INSERT INTO {ref} VALUES ({marks})", copied)
+                cur = conn.execute(f"SELECT {', '.join(columns)} FROM {spec.table}")
+                while True:
+                    chunk = cur.fetchmany(batch)
+                    if not chunk:
+                        break
+                    by_shard: Dict[int, list] = {}
+                    for row in chunk:
+                        key = next((row[i] for i in key_idx if row[i]), "")
+                        by_shard.setdefault(shard_index(str(key), count), []).append(row)
+                    for i, part in by_shard.items():
+                        outs[i].executemany(insert, part)
+                        rows[i] += len(part)
+        tops = _id_tops(sources, spec.table) if has_sequence else {}
+        for i, out in enumerate(outs):
+            for sql in later:
+                out.execute(sql)
+            if has_sequence:
+                seq = max(i << ID_BITS, tops.get(i, 0))
+                out.execute("DELETE FROM sqlite_sequence WHERE name = ?", (spec.table,))
+                out.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (spec.table, seq))
+            out.execute("COMMIT")
+    finally:
+        for out in outs:
+            out.close()
+
+    total, read = sum(rows), 0
+    for source in sources:
+        with sqlite3.connect(f"file:{os.path.abspath(source)}?mode=ro", uri=True) as conn:
+            read += conn.execute(f"SELECT COUNT(*) FROM {spec.table}").fetchone()[0]
+    if read != total:
+        raise RuntimeError(f"{spec.table}: {read:,} rows in the old files but {total:,} written; "
+                           "the old files are untouched")
+    for source in sources:
+        os.replace(source, source + ".old")
+    for path in targets:
+        os.replace(path + ".tmp", path)
+    elapsed = time.perf_counter() - start
+    return [f"{path}: {n:,} rows" for path, n in zip(targets, rows)] + [
+        f"{spec.table}: {total:,} rows from {len(sources)} into {count} file(s) in {elapsed:.1f}s; "
+        f"old files renamed to *.old"]
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Reshard the orders or tickets database.")
+    ap.add_argument("service", choices=sorted(TABLES))
+    ap.add_argument("--shards", type=int, required=True, help="number of shard files (1 = a single file)")
+    ap.add_argument("--db", help="the service's database path (default: the service's DB_PATH)")
+    ap.add_argument("--batch", type=int, default=5000, help="rows per read")
+    args = ap.parse_args(argv)
+    spec = TABLES[args.service]
+    if args.db:
+        spec = ShardedTable(args.db, spec.table, spec.key_columns)
+    for line in reshard(spec, args.shards, args.batch):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
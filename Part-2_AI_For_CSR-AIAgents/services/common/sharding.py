@@ -0,0 +1,105 @@
+"""Hash sharding of a service database across N SQLite files.
+
+A service configured with `db_path = .../orders.db` uses that single file until it
+is resharded. `python -m services.common.reshard` then writes
+`orders.shard-0-of-4.db` … `orders.shard-3-of-4.db` next to it, and `ShardSet`
+picks them up on the next start. Each file holds the full schema. Rows are spread
+by `shard_index(key)`, a CRC-32 of the routing key (Order_ID; a ticket without an
+order is routed by its Cust_Email). The hash is stable across processes and
+machines.
+
+* Lookups by Order_ID open exactly one shard.
+* Lookups by a generated id open the shard that created it (`id >> ID_BITS`), and
+  the others in parallel only if the row has moved since.
+* Customer queries (by email) run on every shard in parallel (`gather`); their
+  results are merged by id, the order of the unsharded query.
+
+AUTOINCREMENT ids stay unique across shards: the reshard tool starts shard i's
+sequence at i << ID_BITS. Moved rows keep their ids, so an id's range says which
+shard created the row, not where it lives now.
+"""
+import glob
+import os
+import re
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+ID_BITS = 40  # 2**40 ids per shard, 2**23 shards before SQLite's 2**63 limit
+SHARD_RE = re.compile(r"\.shard-(?P<index>\d+)-of-(?P<count>\d+)\.db$")
+GATHER_THREADS = int(os.getenv("CSR_SHARD_THREADS", "16"))
+
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+def shard_file(db_path: str, index: int, count: int) -> str:
+    root, _ = os.path.splitext(db_path)
+    return f"{root}.shard-{index}-of-{count}.db"
+
+
+def find_shards(db_path: str) -> List[str]:
+    """The shard files of db_path in index order, or [db_path] if it isn't sharded."""
+    root, _ = os.path.splitext(db_path)
+    found: Dict[int, Dict[int, str]] = {}
+    for path in glob.glob(glob.escape(root) + ".shard-*-of-*.db"):
+        m = SHARD_RE.search(path)
+        if m:
+            found.setdefault(int(m["count"]), {})[int(m["index"])] = path
+    if not found:
+        return [db_path]
+    if len(found) > 1:
+        raise RuntimeError(f"{db_path}: shard files of several layouts ({sorted(found)} shards); "
+                           "finish or undo the reshard first")
+    (count, files), = found.items()
+    missing = set(range(count)) - set(files)
+    if missing:
+        raise RuntimeError(f"{db_path}: shard(s) {sorted(missing)} of {count} are missing")
+    return [files[i] for i in range(count)]
+
+
+@lru_cache(maxsize=64)
+def shard_paths(db_path: str) -> tuple:
+    # Read once per process: restart the services after resharding
+    return tuple(find_shards(db_path))
+
+
+def shard_index(key: str, count: int) -> int:
+    return zlib.crc32(key.encode("utf-8")) % count if count > 1 else 0
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=GATHER_THREADS, thread_name_prefix="shard")
+    return _pool
+
+
+class ShardSet:
+    """The files behind one service database, and routing of keys to them."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.paths: Sequence[str] = shard_paths(db_path)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def path(self, key: str) -> str:
+        return self.paths[shard_index(key, len(self.paths))]
+
+    def group(self, keys: Iterable[str]) -> Dict[str, List[str]]:
+        """Keys by the shard that holds them, in first-seen order."""
+        by_path: Dict[str, List[str]] = {}
+        for key in keys:
+            by_path.setdefault(self.path(key), []).append(key)
+        return by_path
+
+    def gather(self, fn: Callable[[str], T], paths: Optional[Sequence[str]] = None) -> List[T]:
+        """fn(path) on each shard (all by default), in parallel; results in shard order."""
+        paths = list(self.paths if paths is None else paths)
+        if len(paths) == 1:
+            return [fn(paths[0])]
+        return list(_executor().map(fn, paths))
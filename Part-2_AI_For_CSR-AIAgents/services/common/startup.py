@@ -0,0 +1,108 @@
+"""Startup work of the gateway: migrations once per deployment, warm-up per worker.
+
+Under several workers (serve_gateway.py, `uvicorn --workers`, gunicorn) each process
+runs the gateway's lifespan. `migrate` takes an exclusive lock on STARTUP_LOCK
+(CSR_STARTUP_LOCK) first. The first worker applies the migrations. The others wait
+for the lock and then find nothing left to do, because every migration is
+idempotent and cheap once applied. serve_gateway.py runs them before it starts the
+workers. The bundled databases ship with the indexes the migrations add, so starting
+the gateway on them doesn't rewrite the files.
+
+The sync worker's change capture (services/sync/cdc.py: change_log, triggers, WAL) is
+installed only with CSR_CDC=on. Without a running worker to drain it, every write
+would grow change_log forever.
+
+`warm_up` fills the caches each worker keeps for itself. These are the shard layout,
+the status-code layout of each database and the policy vectors and BM25 index. It
+also opens every database once. The services open their SQLite connections per
+call, so no connection is ever shared between processes.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Tuple
+
+from .config import FULFILLMENT_DB, ORDERS_DB, STARTUP_LOCK, TICKETS_DB
+from .metrics import connect
+from .sharding import shard_paths
+from .statuses import FULFILLMENT_STATUS, ORDER_STATUS, coded
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock; workers starting together may both run the (idempotent) migrations
+    fcntl = None
+
+log = logging.getLogger("csr.startup")
+CDC = os.getenv("CSR_CDC", "off").lower() == "on"
+
+
+@contextmanager
+def startup_lock(path: str = STARTUP_LOCK):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)  # released when the file is closed, even if the worker dies
+        yield
+
+
+def _line_key_indexes() -> None:
+    # Every order and fulfillment lookup is by Order_ID; the same index the sync worker creates
+    for path, table in [(p, "orders") for p in shard_paths(ORDERS_DB)] + [(FULFILLMENT_DB, "fulfillment")]:
+        with connect(path) as conn:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_order_item ON {table} (Order_ID, Item_ID)")
+
+
+def _change_capture() -> None:
+    # Same install as `python -m services.sync.worker` does on start: every orders shard and fulfillment
+    from ..sync.worker import SyncWorker
+    worker = SyncWorker(ORDERS_DB, FULFILLMENT_DB)
+    try:
+        worker.install()
+    finally:
+        worker.close()
+
+
+def _policy_index() -> None:
+    # Re-embeds only documents that changed; without it each worker would build the index on its first search
+    from ..policies.app import get_service
+    get_service().ingest()
+
+
+MIGRATIONS: List[Tuple[str, Callable[[], None]]] = [
+    ("order line indexes", _line_key_indexes),
+    ("policy index", _policy_index),
+]
+if CDC:
+    MIGRATIONS.append(("change capture", _change_capture))
+
+
+def migrate() -> None:
+    with startup_lock():
+        for name, fn in MIGRATIONS:
+            start = time.perf_counter()
+            try:
+                fn()
+            except Exception:  # both are speed-ups the services also work without: log, keep starting
+                log.exception("migration %s failed", name)
+                continue
+            log.info("migration %s: %.0f ms", name, (time.perf_counter() - start) * 1000)
+
+
+def warm_up() -> None:
+    from ..fulfillment.service import FulfillmentService
+    from ..orders.service import OrderService
+    from ..policies.app import get_service
+    from ..tickets.service import TicketService
+
+    start = time.perf_counter()
+    OrderService().ping()
+    TicketService().ping()
+    FulfillmentService().ping()
+    for path in shard_paths(ORDERS_DB):
+        coded(path, ORDER_STATUS)
+    coded(FULFILLMENT_DB, FULFILLMENT_STATUS)
+    shard_paths(TICKETS_DB)
+    chunks = get_service().warm_up()
+    log.info("worker %d warmed up in %.0f ms (%d policy chunks)", os.getpid(),
+             (time.perf_counter() - start) * 1000, chunks)
@@ -0,0 +1,127 @@
+"""Status vocabulary shared by the services, and how statuses are stored in SQLite.
+
+Each status column has a fixed list of names with stable integer codes. `normalize`
+maps any spelling a caller or a feed sends ("shipped", "IN_PROGRESS", "in progress")
+onto the canonical name and rejects values outside the vocabulary.
+
+A database can store a status column as text (the bundled databases) or, after
+`python -m services.common.migrate_status_codes`, as the integer code with a lookup
+table (code, name) next to it. The services read and write both layouts: `from_db`
+turns either stored value into the name, `to_db` gives what to store for a name.
+The APIs only ever speak names.
+"""
+import os
+import re
+import sqlite3
+from enum import Enum
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple, Type, Union
+
+
+class OrderStatus(str, Enum):
+    CREATED = "Created"
+    SENT_TO_FULFILLMENT = "Sent To Fulfillment"
+    SHIPPED = "Shipped"
+    CANCELLED = "Cancelled"
+
+
+class FulfillmentOrderStatus(str, Enum):
+    CREATED = "Created"
+    IN_PROGRESS = "In-Progress"
+    SHIPPED = "Shipped"
+    CANCELLED = "Cancelled"
+
+
+class UnknownStatus(ValueError):
+    pass
+
+
+def _key(value: str) -> str:
+    # case, spaces, '-' and '_' don't matter: "In-Progress" == "in_progress" == "IN PROGRESS"
+    return re.sub(r"[\s_\-]+", "", value).lower()
+
+
+class StatusVocabulary:
+    def __init__(self, table: str, statuses: Type[Enum], codes: Dict[Enum, int],
+                 aliases: Optional[Dict[str, Enum]] = None):
+        self.table = table  # lookup table (code, name) in coded databases
+        self.statuses = statuses
+        self.codes: Dict[str, int] = {s.value: codes[s] for s in statuses}
+        self.names: Dict[int, str] = {c: n for n, c in self.codes.items()}
+        self._keys: Dict[str, str] = {_key(n): n for n in self.codes}
+        self._keys.update({_key(a): s.value for a, s in (aliases or {}).items()})
+
+    def normalize(self, value: Union[str, Enum]) -> str:
+        """Canonical name for value; UnknownStatus if it isn't in the vocabulary."""
+        if isinstance(value, Enum):
+            value = value.value
+        name = self._keys.get(_key(str(value)))
+        if name is None:
+            raise UnknownStatus(f"Unknown status {value!r}; expected one of: {', '.join(self.codes)}")
+        return name
+
+    def code(self, value: Union[str, Enum]) -> int:
+        return self.codes[self.normalize(value)]
+
+    def from_db(self, value):
+        """Name for a stored value: an integer code, or text as stored (None stays None)."""
+        if isinstance(value, int):
+            return self.names.get(value, value)
+        return value
+
+    def to_db(self, value: Union[str, Enum], coded: bool) -> Union[int, str]:
+        return self.code(value) if coded else self.normalize(value)
+
+    def lookup_sql(self) -> str:
+        return f"CREATE TABLE IF NOT EXISTS {self.table} (code INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)"
+
+    def lookup_rows(self) -> Iterable[Tuple[int, str]]:
+        return sorted(self.names.items())
+
+
+ORDER_STATUS = StatusVocabulary(
+    "order_status",
+    OrderStatus,
+    {OrderStatus.CREATED: 1, OrderStatus.SENT_TO_FULFILLMENT: 2, OrderStatus.SHIPPED: 3, OrderStatus.CANCELLED: 4},
+    aliases={"Canceled": OrderStatus.CANCELLED, "Sent": OrderStatus.SENT_TO_FULFILLMENT},
+)
+
+FULFILLMENT_STATUS = StatusVocabulary(
+    "fulfillment_order_status",
+    FulfillmentOrderStatus,
+    {FulfillmentOrderStatus.CREATED: 1, FulfillmentOrderStatus.IN_PROGRESS: 2,
+     FulfillmentOrderStatus.SHIPPED: 3, FulfillmentOrderStatus.CANCELLED: 4},
+    aliases={"Canceled": FulfillmentOrderStatus.CANCELLED, "Picking": FulfillmentOrderStatus.IN_PROGRESS,
+             "Packed": FulfillmentOrderStatus.IN_PROGRESS},
+)
+
+# (table, column) -> vocabulary of every status column the services own
+STATUS_COLUMNS: Dict[Tuple[str, str], StatusVocabulary] = {
+    ("orders", "Order_Status"): ORDER_STATUS,
+    ("fulfillment", "Fulfillment_Order_Status"): FULFILLMENT_STATUS,
+}
+
+
+def status_columns(table: str) -> Dict[str, StatusVocabulary]:
+    return {c: v for (t, c), v in STATUS_COLUMNS.items() if t == table}
+
+
+def is_coded(conn, vocabulary: StatusVocabulary) -> bool:
+    """True if the database behind conn stores this vocabulary's column as codes."""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                       (vocabulary.table,)).fetchone()
+    return row is not None
+
+
+@lru_cache(maxsize=64)
+def _coded(path: str, table: str) -> bool:
+    if not os.path.exists(path):
+        return False
+    with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as conn:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                            (table,)).fetchone() is not None
+
+
+def coded(db_path: str, vocabulary: StatusVocabulary) -> bool:
+    """is_coded for a database file, looked up once per process (restart the services after migrating)."""
+    return _coded(os.path.abspath(db_path), vocabulary.table)
@@ -0,0 +1,195 @@
+"""Minimal tracing of a chat turn, with W3C trace-context propagation and no collector.
+
+A span is one timed step (the webhook call, an HTTP request, an agent model call, a
+tool call, a SQLite statement). The current span lives in a contextvar, so spans
+opened while it is active become its children; across processes the context travels
+in the standard `traceparent` header (00-<trace_id>-<span_id>-01):
+
+    streamlit_app.py (chat.turn) -> webhook -> every FastAPI request -> SQLite
+
+Finished spans are appended as JSON lines to CSR_TRACE_FILE (default
+traces/spans.jsonl in the Part-2 folder), or printed to stderr with
+CSR_TRACE=console. Tracing is off unless CSR_TRACE=file or console; then
+`python -m services.common.waterfall` prints a latency waterfall per turn.
+"""
+import json
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from .config import TRACE_FILE
+
+TRACE_MODE = os.getenv("CSR_TRACE", "off").lower()  # off / file / console
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "service", "start", "end", "attrs", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], service: str, attrs: Dict):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.service = service
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attrs = attrs
+        self.status = "ok"
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "start": self.start,
+            "duration_ms": round(((self.end or time.time()) - self.start) * 1000, 3),
+            "status": self.status,
+            "attrs": self.attrs,
+        }
+
+
+class JsonlExporter:
+    """One JSON line per span, appended (processes can share the file: writes are O_APPEND)."""
+
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class ConsoleExporter:
+    def export(self, span: Span) -> None:
+        d = span.to_dict()
+        print(f"[trace {d['trace_id'][:8]}] {d['service']}:{d['name']} {d['duration_ms']:.1f} ms {d['attrs']}",
+              file=sys.stderr)
+
+
+_exporter = None
+if TRACE_MODE == "file":
+    _exporter = JsonlExporter()
+elif TRACE_MODE == "console":
+    _exporter = ConsoleExporter()
+
+_current: ContextVar[Optional[Span]] = ContextVar("csr_current_span", default=None)
+_service: ContextVar[str] = ContextVar("csr_trace_service", default=os.getenv("CSR_TRACE_SERVICE", "app"))
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+def set_exporter(exporter) -> None:
+    """Replace the exporter (None turns tracing off), e.g. for benchmarks."""
+    global _exporter
+    _exporter = exporter
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(trace_id, parent span_id) from a traceparent header, or None if absent/invalid."""
+    m = TRACEPARENT_RE.match((header or "").strip().lower())
+    return (m.group(1), m.group(2)) if m else None
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_traceparent() -> Optional[str]:
+    span = _current.get()
+    return span.traceparent if span is not None else None
+
+
+@contextmanager
+def start_span(name: str, traceparent: Optional[str] = None, service: Optional[str] = None,
+               root: bool = True, **attrs) -> Iterator[Optional[Span]]:
+    """Time the block as a span (yields None when tracing is off).
+
+    The parent is the current span, else the remote parent in `traceparent`, else
+    the span starts a new trace; root=False skips the block if there is no parent
+    (e.g. SQLite statements outside any request).
+    """
+    if _exporter is None:
+        yield None
+        return
+    parent = _current.get()
+    if parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        remote = parse_traceparent(traceparent)
+        if remote is None and not root:
+            yield None
+            return
+        trace_id, parent_id = remote or (secrets.token_hex(16), None)
+    span = Span(name, trace_id, parent_id, service or (parent.service if parent else _service.get()), attrs)
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "error"
+        span.attrs.setdefault("error", f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current.reset(token)
+        span.end = time.time()
+        exporter = _exporter
+        if exporter is not None:
+            try:
+                exporter.export(span)
+            except Exception:
+                pass  # tracing must never break a request
+
+
+class TracingMiddleware:
+    """Server span per HTTP request, continuing the caller's traceparent (pure ASGI)."""
+
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if _exporter is None or scope["type"] != "http" or scope["path"].endswith("/metrics"):
+            await self.app(scope, receive, send)
+            return
+        from .metrics import operation_label  # the metrics module imports this one
+
+        header = None
+        for key, value in scope.get("headers") or ():
+            if key == b"traceparent":
+                header = value.decode("latin-1")
+                break
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        with start_span(f"{scope['method']} {scope['path']}", traceparent=header, service=self.service) as span:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                operation = operation_label(scope)
+                if operation != "unmatched":
+                    span.name = operation
+                span.set(method=scope["method"], path=scope["path"], status=status["code"])
@@ -0,0 +1,100 @@
+"""Latency waterfall per chat turn, from the spans services/common/tracing.py wrote.
+
+    python -m services.common.waterfall                  # last turn
+    python -m services.common.waterfall --last 5
+    python -m services.common.waterfall --trace 4bf92f35 # trace id prefix (shown in the UI caption)
+    python -m services.common.waterfall --session <sessionId>
+
+Each row is one span, indented under its parent, with its start offset from the
+beginning of the turn, its duration and a bar on the turn's time axis.
+"""
+import argparse
+import json
+import os
+from collections import defaultdict
+from typing import Dict, List
+
+from .tracing import TRACE_FILE
+
+BAR_WIDTH = 40
+NAME_WIDTH = 56
+
+
+def load_spans(path: str) -> Dict[str, List[dict]]:
+    """trace_id -> spans, skipping lines that don't parse (a span being written)."""
+    traces: Dict[str, List[dict]] = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                span = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            traces[span["trace_id"]].append(span)
+    return traces
+
+
+def _label(span: dict, parent_service: str) -> str:
+    attrs = span.get("attrs") or {}
+    if attrs.get("sql"):
+        return f"{attrs.get('db')}: {attrs['sql']}"
+    label = span["name"]
+    if attrs.get("path") and attrs["path"] not in label:
+        label += f" {attrs['path']}"
+    # the service only where the turn crosses into another one
+    return label if span["service"] == parent_service else f"{label} [{span['service']}]"
+
+
+def render(spans: List[dict]) -> str:
+    ids = {s["span_id"] for s in spans}
+    children: Dict[str, List[dict]] = defaultdict(list)
+    roots = []
+    for s in spans:
+        # a parent missing from the file (e.g. n8n, which doesn't export spans) makes a root
+        (children[s["parent_id"]] if s["parent_id"] in ids else roots).append(s)
+    t0 = min(s["start"] for s in spans)
+    t1 = max(s["start"] + s["duration_ms"] / 1000 for s in spans)
+    total_ms = max((t1 - t0) * 1000, 1e-6)
+    root = min(roots, key=lambda s: s["start"])
+    attrs = root.get("attrs") or {}
+    session = f"  session {attrs['session_id']}" if attrs.get("session_id") else ""
+    lines = [f"trace {root['trace_id']}  {total_ms:.1f} ms  {len(spans)} spans{session}"]
+
+    def walk(span: dict, depth: int, parent_service: str = "") -> None:
+        offset = (span["start"] - t0) * 1000
+        begin = int(offset / total_ms * BAR_WIDTH)
+        width = max(1, round(span["duration_ms"] / total_ms * BAR_WIDTH))
+        bar = " " * begin + "█" * min(width, BAR_WIDTH - begin)
+        name = ("  " * depth + _label(span, parent_service))[:NAME_WIDTH]
+        flag = " !" if span.get("status") == "error" else ""
+        lines.append(f"{name:<{NAME_WIDTH}} {offset:9.1f} {span['duration_ms']:9.1f} ms |{bar:<{BAR_WIDTH}}|{flag}")
+        for child in sorted(children[span["span_id"]], key=lambda s: s["start"]):
+            walk(child, depth + 1, span["service"])
+
+    lines.append(f"{'span':<{NAME_WIDTH}} {'start':>9} {'duration':>12}")
+    for r in sorted(roots, key=lambda s: s["start"]):
+        walk(r, 0)
+    return "\n".join(lines)
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--file", default=TRACE_FILE, help="span file (CSR_TRACE_FILE)")
+    ap.add_argument("--trace", help="trace id or prefix")
+    ap.add_argument("--session", help="only turns of this sessionId")
+    ap.add_argument("--last", type=int, default=1, help="number of most recent turns to print")
+    args = ap.parse_args(argv)
+    if not os.path.exists(args.file):
+        ap.exit(1, f"No spans in {args.file}: run the services and the UI with CSR_TRACE=file\n")
+
+    traces = sorted(load_spans(args.file).values(), key=lambda spans: min(s["start"] for s in spans))
+    if args.trace:
+        traces = [t for t in traces if t[0]["trace_id"].startswith(args.trace.lower())]
+    if args.session:
+        traces = [t for t in traces if any((s.get("attrs") or {}).get("session_id") == args.session for s in t)]
+    if not traces:
+        ap.exit(1, "No matching trace\n")
+    print("\n\n".join(render(t) for t in traces[-args.last:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,26 @@
-from fastapi_mcp import FastApiMCP
-from fastapi import FastAPI, Depends, HTTPException, Query, Path
-from typing import Optional
-from .schemas import FulfillmentDetail, FulfillmentStatus
+from fastapi import FastAPI, Depends, HTTPException, Query, Path, Request
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional, Tuple
+from ..common.direct_mcp import create_mcp
+from ..common.metrics import instrument, readiness
+from .feed import CsvFeed, RowError, feed_format, iter_lines, parse_ndjson
+from .schemas import BulkRowResult, BulkUpdateResponse, FulfillmentDetail, FulfillmentStatus, StatusUpdate
 from .service import FulfillmentService
 
+BULK_CHUNK_ROWS = 1000  # feed rows per write transaction
+
 app = FastAPI(title="Fulfillment Service", version="1.0.0")
+instrument(app, "fulfillment")
 
 
 def get_service() -> FulfillmentService:
     return FulfillmentService()
 
 
+# Readiness: the fulfillment table answers a cheap query
 @app.get("/healthz", include_in_schema=False)
-def health():
-    return {"status": "ok"}
+def health(svc: FulfillmentService = Depends(get_service)):
+    return readiness({"fulfillment_db": svc.ping})
 
 
 # --- Primary, correctly spelled endpoint (exposed to OpenAPI/MCP) ---
@@ -60,24 +67,98 @@ def get_fulfillment_status_compat(
     summary="Update fulfillment status for an order",
     description=(
         "Update the fulfillment status for the given order_id. "
-        "Returns true if an update occurred, otherwise 404."
+        "Returns true if an update occurred, otherwise 404; 400 for an unknown status."
     ),
 )
 def update_fulfillment_status(
     order_id: str = Path(..., description="Order ID (e.g., 'ORD-010')."),
     status: str = Query(
         ...,
-        description="New status value (e.g., 'Created', 'In-Progress', 'Shipped', 'Cancelled').",
+        description="New status value: 'Created', 'In-Progress', 'Shipped' or 'Cancelled' (case-insensitive).",
     ),
     svc: FulfillmentService = Depends(get_service),
 ):
-    ok = svc.update_fulfillment_status(order_id, status)
+    try:
+        ok = svc.update_fulfillment_status(order_id, status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not ok:
         raise HTTPException(status_code=404, detail="Fulfillment status not found")
     return ok
 
 
+# --- Warehouse status feed (not an agent tool: hidden from OpenAPI/MCP) ---
+# Body: NDJSON (application/x-ndjson) or CSV (text/csv, header line first) rows of
+# order_id, status, tracking_nbr, ship_date. Rows are validated as they stream in and
+# applied BULK_CHUNK_ROWS at a time, one transaction per chunk. Each rejected row is
+# listed with its line number and, if it named one, its order_id.
+@app.post(
+    "/FulfillmentStatus/bulk",
+    response_model=BulkUpdateResponse,
+    response_model_exclude_none=True,
+    include_in_schema=False,
+)
+async def bulk_update_fulfillment_status(
+    request: Request,
+    errors_only: bool = Query(False, description="Only list rows that were not updated."),
+    svc: FulfillmentService = Depends(get_service),
+):
+    fmt = feed_format(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Send application/x-ndjson or text/csv")
+    csv_feed = CsvFeed() if fmt == "csv" else None
+    results: List[BulkRowResult] = []
+    counts = {"received": 0, "updated": 0, "not_found": 0, "invalid": 0}
+    pending: List[Tuple[int, StatusUpdate]] = []
+
+    def add(row: BulkRowResult) -> None:
+        counts[row.result] += 1
+        if not errors_only or row.result != "updated":
+            results.append(row)
+
+    async def flush() -> None:
+        matched = await run_in_threadpool(svc.bulk_update_status, [
+            (u.order_id, u.status.value, u.tracking_nbr, u.ship_date.isoformat() if u.ship_date else None)
+            for _, u in pending
+        ])
+        for (line, u), n in zip(pending, matched):
+            add(BulkRowResult(line=line, order_id=u.order_id, result="updated" if n else "not_found", lines_updated=n))
+        pending.clear()
+
+    batch: List[Tuple[int, str]] = []
+    line_no = 0
+
+    async def parse(last: bool = False) -> None:
+        try:
+            parsed = list(csv_feed.parse(batch) if csv_feed else parse_ndjson(batch))
+            if last and csv_feed:
+                parsed += csv_feed.finish()
+        except ValueError as e:  # bad CSV header
+            raise HTTPException(status_code=400, detail=str(e))
+        batch.clear()
+        for line, row in parsed:
+            counts["received"] += 1
+            if isinstance(row, RowError):
+                add(BulkRowResult(line=line, order_id=row.order_id, result="invalid", error=row.message))
+                continue
+            pending.append((line, row))
+            if len(pending) >= BULK_CHUNK_ROWS:
+                await flush()
+
+    # blank lines are passed on too: in CSV they can be part of a quoted field
+    async for text in iter_lines(request.stream()):
+        line_no += 1
+        batch.append((line_no, text))
+        if len(batch) >= BULK_CHUNK_ROWS:
+            await parse()
+    await parse(last=True)
+    if pending:
+        await flush()
+    results.sort(key=lambda r: r.line)
+    return BulkUpdateResponse(**counts, results=results)
+
+
 # Mount MCP (derives tools from OpenAPI: operation_id, summaries, param schemas)
-mcp = FastApiMCP(app)
+mcp = create_mcp(app)
 mcp.mount()  # serves at /mcp
 
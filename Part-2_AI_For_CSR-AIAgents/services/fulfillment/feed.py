@@ -0,0 +1,119 @@
+"""Parsing of warehouse status feeds (NDJSON or CSV) for the bulk update endpoint.
+
+Both formats carry order_id, status, tracking_nbr and ship_date per row; CSV needs
+a header line naming the columns. Rows are parsed as the request body streams in,
+so a large feed is never held in memory as a whole. A quoted CSV field may span
+lines (a note with a line break); its row is reported under the line it starts on.
+"""
+import csv
+import json
+from typing import AsyncIterator, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from pydantic import ValidationError
+
+from .schemas import StatusUpdate
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines")
+CSV_TYPES = ("text/csv", "application/csv")
+FEED_COLUMNS = ("order_id", "status", "tracking_nbr", "ship_date")
+
+class RowError(NamedTuple):
+    message: str
+    order_id: Optional[str] = None  # when the row named one
+
+
+# (1-based line number, parsed row or why it was rejected)
+ParsedRow = Tuple[int, Union[StatusUpdate, RowError]]
+
+
+def feed_format(content_type: Optional[str]) -> Optional[str]:
+    """'ndjson' / 'csv' for the request's Content-Type, None if unsupported."""
+    media = (content_type or "").split(";")[0].strip().lower()
+    if media in NDJSON_TYPES:
+        return "ndjson"
+    if media in CSV_TYPES:
+        return "csv"
+    return None
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    buf = b""
+    async for chunk in chunks:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if buf:
+        yield buf.decode("utf-8-sig").rstrip("\r")
+
+
+def _error(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc'])) or 'row'}: {err['msg']}" for err in e.errors(include_url=False))
+
+
+def _validate(line: int, data: dict) -> ParsedRow:
+    try:
+        return line, StatusUpdate.model_validate({k: (v if v != "" else None) for k, v in data.items()})
+    except ValidationError as e:
+        order_id = data.get("order_id")
+        return line, RowError(_error(e), order_id if isinstance(order_id, str) and order_id else None)
+
+
+def parse_ndjson(lines: List[Tuple[int, str]]) -> Iterator[ParsedRow]:
+    for line, text in lines:
+        if not text.strip():
+            continue
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            yield line, RowError(f"invalid JSON: {e.msg}")
+            continue
+        if not isinstance(data, dict):
+            yield line, RowError("expected a JSON object")
+            continue
+        yield _validate(line, data)
+
+
+class CsvFeed:
+    """Parses CSV lines as they arrive; the first record is the header.
+
+    A record is complete once its quotes are balanced, so lines of a quoted field
+    are kept (also across `parse` calls) until it closes. Call `finish` at the end
+    of the feed.
+    """
+
+    def __init__(self):
+        self.columns: Optional[List[str]] = None
+        self._lines: List[Tuple[int, str]] = []  # the record read so far, while a quoted field is open
+        self._quotes = 0
+
+    def parse(self, lines: List[Tuple[int, str]]) -> Iterator[ParsedRow]:
+        for line, text in lines:
+            if not self._lines and not text.strip():
+                continue
+            self._lines.append((line, text))
+            self._quotes += text.count('"')
+            if self._quotes % 2:
+                continue  # inside a quoted field: the line break is part of the value
+            start, record = self._lines[0][0], "\n".join(t for _, t in self._lines)
+            self._lines, self._quotes = [], 0
+            yield from self._row(start, next(csv.reader([record])))
+
+    def finish(self) -> Iterator[ParsedRow]:
+        if self._lines:
+            start = self._lines[0][0]
+            self._lines, self._quotes = [], 0
+            yield start, RowError("unterminated quoted field")
+
+    def _row(self, line: int, record: List[str]) -> Iterator[ParsedRow]:
+        if self.columns is None:
+            self.columns = [c.strip().lower() for c in record]
+            missing = {"order_id", "status"} - set(self.columns)
+            if missing:
+                raise ValueError(f"CSV header must name {', '.join(FEED_COLUMNS)}; missing {', '.join(sorted(missing))}")
+            return
+        row = dict(zip(self.columns, record))
+        if len(record) != len(self.columns):
+            yield line, RowError(f"expected {len(self.columns)} fields, got {len(record)}", row.get("order_id") or None)
+            return
+        yield _validate(line, row)
@@ -1,5 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional
+from datetime import date
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Literal, Optional
+from ..common.statuses import FULFILLMENT_STATUS, FulfillmentOrderStatus, UnknownStatus
 
 class FulfillmentDetail(BaseModel):
     order_id: str
@@ -10,4 +12,36 @@ class FulfillmentDetail(BaseModel):
     Ship_Date: Optional[str]
 
 class FulfillmentStatus(BaseModel):
-    Fulfillment_Order_Status: str
\ No newline at end of file
+    Fulfillment_Order_Status: str
+
+# One row of a warehouse status feed (NDJSON object or CSV record)
+class StatusUpdate(BaseModel):
+    order_id: str = Field(..., min_length=1)
+    status: FulfillmentOrderStatus
+    tracking_nbr: Optional[str] = Field(None, description="Left unchanged when empty")
+    ship_date: Optional[date] = Field(None, description="YYYY-MM-DD; left unchanged when empty")
+
+    # any spelling of a known status ("shipped", "IN_PROGRESS") is accepted
+    @field_validator("status", mode="before")
+    @classmethod
+    def _normalize_status(cls, value):
+        try:
+            return FULFILLMENT_STATUS.normalize(value)
+        except UnknownStatus:
+            return value
+
+
+class BulkRowResult(BaseModel):
+    line: int                      # 1-based line of the feed (CSV: header is line 1)
+    order_id: Optional[str] = None
+    result: Literal["updated", "not_found", "invalid"]
+    lines_updated: int = 0         # fulfillment lines of the order that were updated
+    error: Optional[str] = None
+
+
+class BulkUpdateResponse(BaseModel):
+    received: int
+    updated: int
+    not_found: int
+    invalid: int
+    results: List[BulkRowResult]
@@ -1,14 +1,28 @@
-import sqlite3
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
-DB_PATH = "./services/fulfillment/Storage/fulfillment.db"
+from ..common.config import FULFILLMENT_DB
+from ..common.metrics import connect
+from ..common.statuses import FULFILLMENT_STATUS, coded
+
+DB_PATH = FULFILLMENT_DB
+MAX_SQL_VARS = 500  # order ids per IN (...) query
 
 class FulfillmentService:
     def __init__(self, db_path: str = DB_PATH):
         self.db_path = db_path
 
     def _connect(self):
-        return sqlite3.connect(self.db_path)
+        return connect(self.db_path)
+
+    # Readiness probe: the table is there and readable
+    def ping(self) -> None:
+        with self._connect() as conn:
+            conn.execute("SELECT 1 FROM fulfillment LIMIT 1").fetchone()
+
+    # What to store in Fulfillment_Order_Status for a status (text or integer code, see common/statuses.py).
+    # Raises UnknownStatus (a ValueError) for values outside the vocabulary.
+    def _status_value(self, status: str):
+        return FULFILLMENT_STATUS.to_db(status, coded(self.db_path, FULFILLMENT_STATUS))
 
     # Get the fulfillment status by using order_id
     def get_fulfillment_status(self, order_id: str) -> Optional[Dict]:
@@ -24,7 +38,7 @@ class FulfillmentService:
         if not row:
             return None
         return {
-            "Fulfillment_Order_Status": row[0],
+            "Fulfillment_Order_Status": FULFILLMENT_STATUS.from_db(row[0]),
         }
     
     # Update the status of the fulfillment order by using order_id
@@ -34,12 +48,43 @@ class FulfillmentService:
             SET Fulfillment_Order_Status = ?
             WHERE order_id = ?
             """
+        value = self._status_value(status)
         with self._connect() as conn:
             cur = conn.cursor()
-            cur.execute(query, (status, order_id))
+            cur.execute(query, (value, order_id))
             conn.commit()
             return cur.rowcount > 0
         
+    # Apply a batch of (order_id, status name, tracking_nbr, ship_date) updates in one transaction.
+    # Empty tracking_nbr / ship_date keep the current value. Returns the number of
+    # fulfillment lines each update matched (0 = unknown order_id).
+    def bulk_update_status(self, updates: Sequence[Tuple[str, str, Optional[str], Optional[str]]]) -> List[int]:
+        order_ids = list(dict.fromkeys(u[0] for u in updates))
+        lines: Dict[str, int] = {}
+        with self._connect() as conn:
+            cur = conn.cursor()
+            for i in range(0, len(order_ids), MAX_SQL_VARS):
+                chunk = order_ids[i:i + MAX_SQL_VARS]
+                cur.execute(
+                    f"SELECT Order_ID, COUNT(*) FROM fulfillment WHERE Order_ID IN ({', '.join('?' * len(chunk))}) "
+                    f"GROUP BY Order_ID",
+                    chunk,
+                )
+                lines.update(cur.fetchall())
+            cur.executemany(
+                """
+                UPDATE fulfillment
+                SET Fulfillment_Order_Status = ?,
+                    Tracking_Nbr = COALESCE(NULLIF(?, ''), Tracking_Nbr),
+                    Ship_Date = COALESCE(NULLIF(?, ''), Ship_Date)
+                WHERE Order_ID = ?
+                """,
+                [(self._status_value(status), tracking, ship_date, order_id)
+                 for order_id, status, tracking, ship_date in updates if order_id in lines],
+            )
+            conn.commit()
+        return [lines.get(u[0], 0) for u in updates]
+
     # Get the fulfillment details by using order_id
     def get_fulfillment_details(self, order_id: str) -> Optional[Dict]:
         query = """
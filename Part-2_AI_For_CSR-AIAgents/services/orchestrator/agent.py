@@ -0,0 +1,108 @@
+"""The agent loop behind the orchestrator webhook.
+
+One chat turn: load the session history, ask the model, run the tool calls it
+asks for (all calls of a step concurrently), repeat until it answers, then store
+the exchange. Progress is yielded as the chunks n8n's Webhook node streams in
+Response Mode "Streaming" ({"type": "begin" | "item" | "end", ...}), plus a
+"tool" chunk per tool call, which n8n does not send (its tools are nodes with
+their own begin chunks); streamlit_app.py works with either backend.
+"""
+import json
+import time
+from typing import AsyncIterator, Dict, List
+
+from starlette.concurrency import run_in_threadpool
+
+from ..common import tracing
+from .llm import LLMReply
+from .memory import SessionMemory
+from .tools import ToolRegistry
+
+NODE = "CSR Orchestrator"
+MAX_STEPS = 6
+
+SYSTEM_PROMPT = """You are a Customer Service AI Agent that assists human CSRs.
+Use the tools for order details, eligibility, cancellations, returns, fulfillment status,
+tickets and company policies. Call independent lookups together in one step.
+
+Operating rules
+Policy-first: before executing any action (cancel, return, refund, update), check the policy
+(search_policies) and the eligibility tools. If policy disallows the request, explain briefly and
+offer the allowed alternative. Get confirmation from the user before making any update: reply
+with a line `ACTION: {"tool": ..., "args": {...}}` and wait for it to be confirmed.
+If the request is ambiguous or incomplete (e.g. missing order_id), ask one concise clarifying
+question and propose up to 3 quick options as a line
+`OPTIONS: [{"label": ..., "intent": ..., "args": {...}}]`.
+Use exact IDs (e.g. ORD-010, ticket_id=5). Stay strictly within your role as a CSR Assistant.
+Respond in a professional conversational style."""
+
+
+def chunk(kind: str, content: str = None) -> dict:
+    out = {"type": kind, "metadata": {"nodeName": NODE, "itemIndex": 0, "runIndex": 0,
+                                      "timestamp": int(time.time() * 1000)}}
+    if content is not None:
+        out["content"] = content
+    return out
+
+
+def user_text(payload: dict) -> str:
+    """The user turn for a Streamlit payload (sendMessage / confirmAction / quickIntent)."""
+    action = payload.get("action") or "sendMessage"
+    if action == "confirmAction":
+        return f"Confirmed, go ahead with: {json.dumps(payload.get('pendingAction') or {})}"
+    if action == "quickIntent":
+        return f"{payload.get('intent')} {json.dumps(payload.get('args') or {})}"
+    return payload.get("chatInput") or ""
+
+
+def _describe(name: str, args: Dict) -> str:
+    subject = args.get("order_id") or args.get("customer_email") or args.get("ticket_id") or args.get("query")
+    return f"{name}({subject})…" if subject else f"{name}…"
+
+
+class Orchestrator:
+    def __init__(self, llm, tools: ToolRegistry, memory: SessionMemory, max_steps: int = MAX_STEPS):
+        self.llm = llm
+        self.tools = tools
+        self.memory = memory
+        self.max_steps = max_steps
+
+    async def run(self, payload: dict) -> AsyncIterator[dict]:
+        session_id = payload.get("sessionId") or "default"
+        text = user_text(payload)
+        yield chunk("begin")
+        with tracing.start_span("agent turn", session_id=session_id, action=payload.get("action") or "sendMessage"):
+            history = await run_in_threadpool(self.memory.load, session_id)
+            messages: List[dict] = [{"role": "system", "content": SYSTEM_PROMPT}, *history,
+                                    {"role": "user", "content": text}]
+            answer = None
+            for step in range(self.max_steps):
+                # model clients are blocking (HTTP); keep them off the event loop
+                with tracing.start_span("llm complete", step=step) as span:
+                    reply: LLMReply = await run_in_threadpool(self.llm.complete, messages, self.tools.specs)
+                    if span is not None:
+                        span.set(tool_calls=len(reply.tool_calls))
+                if not reply.tool_calls:
+                    answer = reply.content or ""
+                    break
+                messages.append({
+                    "role": "assistant",
+                    "content": reply.content,
+                    "tool_calls": [
+                        {"id": c.id, "type": "function",
+                         "function": {"name": c.name, "arguments": json.dumps(c.arguments)}}
+                        for c in reply.tool_calls
+                    ],
+                })
+                for c in reply.tool_calls:
+                    yield chunk("tool", _describe(c.name, c.arguments))
+                results = await self.tools.call_many(reply.tool_calls)
+                messages.extend(
+                    {"role": "tool", "tool_call_id": c.id, "content": r}
+                    for c, r in zip(reply.tool_calls, results)
+                )
+            if answer is None:
+                answer = "Sorry, I could not complete this request. Could you rephrase it?"
+            await run_in_threadpool(self.memory.append, session_id, text, answer)
+        yield chunk("item", answer)
+        yield chunk("end")
@@ -0,0 +1,46 @@
+import json
+from functools import lru_cache
+from typing import Literal
+
+from fastapi import Body, Depends, FastAPI, Path
+from fastapi.responses import StreamingResponse
+
+from ..common.metrics import instrument, readiness
+from .agent import Orchestrator, chunk
+from .llm import default_llm
+from .memory import SessionMemory
+from .tools import ToolRegistry
+
+app = FastAPI(title="Orchestrator Service", version="1.0.0")
+instrument(app, "orchestrator")
+
+
+# One instance per process: the model client and the tool registry are reused across turns
+@lru_cache(maxsize=1)
+def get_orchestrator() -> Orchestrator:
+    return Orchestrator(default_llm(), ToolRegistry(), SessionMemory())
+
+
+# Readiness: session memory and the service databases the tools read answer a cheap query
+@app.get("/healthz", include_in_schema=False)
+def health(orchestrator: Orchestrator = Depends(get_orchestrator)):
+    return readiness({"memory_db": orchestrator.memory.ping, **orchestrator.tools.readiness_checks()})
+
+
+# Same contract as the n8n Chat Listener webhook, so streamlit_app.py can point at either
+@app.post("/{prefix}/{webhook_id}", include_in_schema=False)
+async def webhook(
+    prefix: Literal["webhook", "webhook-test"] = Path(...),
+    webhook_id: str = Path(...),
+    payload: dict = Body(..., description="{sessionId, action, chatInput | pendingAction | intent, args}"),
+    orchestrator: Orchestrator = Depends(get_orchestrator),
+):
+    async def body():
+        try:
+            async for c in orchestrator.run(payload):
+                yield json.dumps(c, ensure_ascii=False) + "\n"
+        except Exception as e:
+            # the 200 status is already sent: report the failure in the stream, as n8n does
+            yield json.dumps(chunk("error", str(e)), ensure_ascii=False) + "\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
@@ -0,0 +1,118 @@
+"""Chat models for the orchestrator: OpenAI tool calling, or a local stub.
+
+Both take the conversation as OpenAI-style messages plus the tool specs and return
+an `LLMReply`: either tool calls to run or the final answer.
+"""
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+ORDER_RE = re.compile(r"\bORD-\d+\b", re.IGNORECASE)
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+TICKET_RE = re.compile(r"\bticket\s*(?:id\s*)?#?\s*(\d+)\b", re.IGNORECASE)
+POLICY_WORDS = ("policy", "policies", "return", "refund", "cancel", "window")
+
+
+@dataclass
+class ToolCall:
+    id: str
+    name: str
+    arguments: Dict[str, Any]
+
+
+@dataclass
+class LLMReply:
+    content: Optional[str] = None
+    tool_calls: List[ToolCall] = field(default_factory=list)
+
+
+class OpenAIChatLLM:
+    """Chat Completions with tool calling (the model the n8n workflow uses by default)."""
+
+    def __init__(self, model: Optional[str] = None):
+        from openai import OpenAI
+
+        self.client = OpenAI()
+        self.model = model or os.getenv("ORCHESTRATOR_MODEL", "gpt-4.1-mini")
+        self.name = f"openai-{self.model}"
+
+    def complete(self, messages: List[dict], tools: List[dict]) -> LLMReply:
+        resp = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            tools=[{"type": "function", "function": t} for t in tools] or None,
+            parallel_tool_calls=True if tools else None,
+        )
+        msg = resp.choices[0].message
+        calls = [
+            ToolCall(c.id, c.function.name, json.loads(c.function.arguments or "{}"))
+            for c in (msg.tool_calls or [])
+        ]
+        return LLMReply(content=msg.content, tool_calls=calls)
+
+
+class StubLLM:
+    """Deterministic local stand-in for the chat model (offline runs and benchmarks).
+
+    First step: calls the lookups the last user message asks for (order, tickets,
+    policies), all at once. Next step: answers from the tool results. `latency`
+    seconds are slept per call to stand in for the model's response time.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def _plan(self, text: str) -> List[ToolCall]:
+        calls = []
+        for order_id in dict.fromkeys(o.upper() for o in ORDER_RE.findall(text)):
+            calls.append(("get_order_status", {"order_id": order_id}))
+            calls.append(("get_order_details", {"order_id": order_id,
+                                                "fields": "Item_ID,Order_Status,Ship_Date,Returned_qty",
+                                                "format": "table"}))
+            if "return" in text.lower():
+                calls.append(("check_return_eligibility", {"order_id": order_id}))
+            if "cancel" in text.lower():
+                calls.append(("check_cancel_eligibility", {"order_id": order_id}))
+        for email in dict.fromkeys(EMAIL_RE.findall(text)):
+            calls.append(("get_customer_tickets", {"customer_email": email, "format": "table"}))
+        for ticket_id in dict.fromkeys(TICKET_RE.findall(text)):
+            calls.append(("get_ticket_details", {"ticket_id": int(ticket_id)}))
+        if any(w in text.lower() for w in POLICY_WORDS):
+            calls.append(("search_policies", {"query": text, "k": 2}))
+        return [ToolCall(f"call_{i}", name, args) for i, (name, args) in enumerate(calls)]
+
+    def complete(self, messages: List[dict], tools: List[dict]) -> LLMReply:
+        if self.latency:
+            time.sleep(self.latency)
+        last = messages[-1]
+        if last["role"] == "tool":
+            results = []
+            for m in reversed(messages):
+                if m["role"] != "tool":
+                    break
+                results.append(" ".join((m["content"] or "").split())[:160])
+            return LLMReply(content="Here is what I found:\n" + "\n".join(f"- {r}" for r in reversed(results)))
+        available = {t["name"] for t in tools}
+        calls = [c for c in self._plan(last.get("content") or "") if c.name in available]
+        if calls:
+            return LLMReply(tool_calls=calls)
+        return LLMReply(content="Could you share the order id (for example ORD-010) or the customer's email?")
+
+
+def default_llm():
+    """OpenAI when an API key is configured, otherwise the local stub.
+
+    ORCHESTRATOR_LLM=stub forces the stub (e.g. for tests and benchmarks).
+    """
+    choice = os.getenv("ORCHESTRATOR_LLM", "auto").lower()
+    if choice != "stub" and os.getenv("OPENAI_API_KEY"):
+        try:
+            return OpenAIChatLLM()
+        except ImportError:
+            pass
+    return StubLLM()
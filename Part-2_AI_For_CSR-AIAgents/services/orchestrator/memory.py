@@ -0,0 +1,65 @@
+import os
+import time
+from typing import Dict, List
+
+from ..common.config import MEMORY_DB
+from ..common.metrics import connect
+
+DB_PATH = MEMORY_DB
+
+# n8n's Simple Memory (buffer window) keeps the last 5 exchanges
+WINDOW = 5
+
+
+class SessionMemory:
+    """Conversation memory per sessionId in a local SQLite file.
+
+    Replaces the n8n Context Memory node, whose buffer only lives inside n8n: the
+    history survives restarts and can be read by other tools. `load` returns the
+    last `window` user/assistant exchanges as chat messages.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, window: int = WINDOW):
+        self.db_path = db_path
+        self.window = window
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id)")
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    def ping(self) -> None:
+        with self._connect() as conn:
+            conn.execute("SELECT 1 FROM messages LIMIT 1").fetchone()
+
+    def load(self, session_id: str) -> List[Dict[str, str]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, self.window * 2),
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+    def append(self, session_id: str, user_text: str, assistant_text: str) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO messages (session_id, role, content, created) VALUES (?, ?, ?, ?)",
+                [(session_id, "user", user_text, now), (session_id, "assistant", assistant_text, now)],
+            )
+
+    def clear(self, session_id: str) -> int:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,)).rowcount
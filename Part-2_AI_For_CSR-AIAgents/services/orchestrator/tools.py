@@ -0,0 +1,70 @@
+"""The service tools, called in-process.
+
+The registry is the same MCP tool list the gateway serves (one entry per
+operation_id of the four services), dispatched straight to the route functions
+by services/common/direct_mcp.py: same validation and output as an MCP tool call,
+without the n8n MCP Client node, the SSE session and the HTTP hop.
+"""
+import asyncio
+from typing import Callable, Dict, List
+
+from fastapi import FastAPI
+
+from ..common.direct_mcp import DirectFastApiMCP
+from ..common.mcp_registry import combined_tools_app
+from ..fulfillment.app import app as fulfillment_app
+from ..fulfillment.service import FulfillmentService
+from ..orders.app import app as orders_app
+from ..orders.service import OrderService
+from ..policies.app import app as policies_app
+from ..policies.app import get_service as get_policy_service
+from ..tickets.app import app as tickets_app
+from ..tickets.service import TicketService
+from .llm import ToolCall
+
+TOOL_APPS = {
+    "/tickets": tickets_app,
+    "/orders": orders_app,
+    "/fulfillment": fulfillment_app,
+    "/policies": policies_app,
+}
+
+
+def _short_description(text: str) -> str:
+    # fastapi-mcp appends the response schemas; the model only needs what the tool does
+    return (text or "").split("\n\n### Responses")[0].strip()
+
+
+class ToolRegistry:
+    def __init__(self, apps: Dict[str, FastAPI] = TOOL_APPS):
+        tools_app = combined_tools_app(apps)
+        tools_app.state.metrics_service = "orchestrator-tools"
+        self.mcp = DirectFastApiMCP(tools_app, name="CSR Assist Tools")  # always in-process, whatever MCP_DISPATCH says
+        self.specs = [
+            {"name": t.name, "description": _short_description(t.description), "parameters": t.inputSchema}
+            for t in self.mcp.tools
+        ]
+        self.names = {t.name for t in self.mcp.tools}
+
+    @staticmethod
+    def readiness_checks() -> Dict[str, Callable[[], None]]:
+        """Cheap queries against the databases behind the tools (for /healthz)."""
+        return {
+            "orders_db": OrderService().ping,
+            "tickets_db": TicketService().ping,
+            "fulfillment_db": FulfillmentService().ping,
+            "policies_db": get_policy_service().ping,
+        }
+
+    async def call(self, call: ToolCall) -> str:
+        """Tool output as text; errors are returned as text too, for the model to read."""
+        if call.name not in self.names:
+            return f"Unknown tool: {call.name}"
+        try:
+            return await self.mcp.call_tool(call.name, call.arguments)
+        except Exception as e:
+            return str(e)
+
+    async def call_many(self, calls: List[ToolCall]) -> List[str]:
+        """Run the tool calls of one model step concurrently (they don't depend on each other)."""
+        return list(await asyncio.gather(*(self.call(c) for c in calls)))
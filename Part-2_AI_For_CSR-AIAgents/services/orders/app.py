@@ -1,23 +1,32 @@
-from typing import List
+from datetime import date
+from typing import List, Literal, Optional, Union
 from fastapi import FastAPI, Depends, HTTPException, Query, Path
-from fastapi_mcp import FastApiMCP  # NEW
+from ..common.direct_mcp import create_mcp
+from ..common.metrics import instrument, readiness, register_lru_cache
+from ..common.projection import parse_fields, projected, to_table
 from .schemas import (
+    EligibilityBatchIn,
+    EligibilityOut,
     OrderOut,
     OrderStatusOut,
     ReturnCreate,
 )
-from .service import OrderService
+from .eligibility import item_category
+from .service import ORDER_COLUMNS, OrderService
 
 app = FastAPI(title="Orders Service", version="1.0.0")
+instrument(app, "orders")
+register_lru_cache("item_category", item_category)
 
 
 def get_service() -> OrderService:
     return OrderService()
 
 
+# Readiness: orders and (for cancel eligibility) fulfillment tables answer a cheap query
 @app.get("/healthz", include_in_schema=False)
-def health():
-    return {"status": "ok"}
+def health(svc: OrderService = Depends(get_service)):
+    return readiness({"orders_db": svc.ping, "fulfillment_db": svc.ping_fulfillment})
 
 
 @app.get(
@@ -56,19 +65,104 @@ def get_order_status(
 
 @app.get(
     "/orders/{order_id}",
-    response_model=List[OrderOut],
+    response_model=Union[List[OrderOut], str],
     operation_id="get_order_details",
     summary="Get full order details",
-    description="Return all order lines (full detail) for the given order_id.",
+    description=(
+        "Return the order lines for the given order_id. Pass fields= with only the columns "
+        "you need and format=table for a compact header + rows text to keep responses short."
+    ),
 )
 def get_order_details(
     order_id: str = Path(..., description="Order ID (e.g., 'ORD-010')."),
+    fields: Optional[str] = Query(
+        None,
+        description=f"Comma-separated columns to return (default all): {', '.join(ORDER_COLUMNS)}.",
+    ),
+    output: Literal["json", "table"] = Query(
+        "json", alias="format", description="json (one object per line) or table ('|'-separated rows)."
+    ),
     svc: OrderService = Depends(get_service),
 ):
-    lines = svc.get_order_lines(order_id)
+    try:
+        columns = parse_fields(fields, ORDER_COLUMNS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    lines = svc.get_order_lines(order_id, columns)
     if not lines:
         raise HTTPException(status_code=404, detail="Order not found")
-    return lines
+    if output == "table":
+        return to_table(lines, columns)
+    return projected(lines) if fields else lines
+
+
+@app.get(
+    "/orders/{order_id}/return-eligibility",
+    response_model=EligibilityOut,
+    response_model_exclude_none=True,
+    operation_id="check_return_eligibility",
+    summary="Check if an order can be returned",
+    description=(
+        "Evaluate the return policy for every line: Shipped status, units left to return, "
+        "30-day window from Ship_Date and non-returnable items. Returns the verdict, the "
+        "returnable quantity per line and the reasons for any line that is not eligible. "
+        "Use this instead of reading the policy and order details before return_order_create."
+    ),
+)
+def check_return_eligibility(
+    order_id: str = Path(..., description="Order ID (e.g., 'ORD-010')."),
+    as_of: Optional[date] = Query(
+        None, description="Evaluate the policy as of this date (YYYY-MM-DD) instead of today."
+    ),
+    svc: OrderService = Depends(get_service),
+):
+    result = svc.check_return_eligibility(order_id, as_of)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return result
+
+
+@app.get(
+    "/orders/{order_id}/cancel-eligibility",
+    response_model=EligibilityOut,
+    response_model_exclude_none=True,
+    operation_id="check_cancel_eligibility",
+    summary="Check if an order can be cancelled",
+    description=(
+        "Evaluate the cancellation policy for every line: not Shipped/Cancelled, and for "
+        "'Sent To Fulfillment' orders the fulfillment status must still be Created. "
+        "The order is cancellable only if all lines are. Use before cancel_order."
+    ),
+)
+def check_cancel_eligibility(
+    order_id: str = Path(..., description="Order ID (e.g., 'ORD-006')."),
+    as_of: Optional[date] = Query(
+        None, description="Evaluate the policy as of this date (YYYY-MM-DD) instead of today."
+    ),
+    svc: OrderService = Depends(get_service),
+):
+    result = svc.check_cancel_eligibility(order_id, as_of)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return result
+
+
+@app.post(
+    "/orders/eligibility/batch",
+    response_model=List[EligibilityOut],
+    response_model_exclude_none=True,
+    operation_id="check_eligibility_batch",
+    summary="Check return or cancel eligibility for many orders",
+    description=(
+        "Evaluate the return or cancel policy for up to 1000 order IDs in one call. "
+        "Unknown order IDs come back with eligible=false and no lines."
+    ),
+)
+def check_eligibility_batch(
+    payload: EligibilityBatchIn,
+    svc: OrderService = Depends(get_service),
+):
+    return svc.check_eligibility(payload.action, payload.order_ids, payload.as_of)
 
 
 @app.post(
@@ -159,6 +253,6 @@ def get_current_datetime(svc: OrderService = Depends(get_service)):
 
 
 # Mount MCP so your routes become tools (names from operation_id, help from summaries/descriptions)
-mcp = FastApiMCP(app)  # NEW
+mcp = create_mcp(app)  # NEW
 mcp.mount()            # Exposes `/mcp` endpoint automatically  # NEW
 
@@ -0,0 +1,141 @@
+"""Return and cancel eligibility, compiled from the rules in Company Policies.pdf.
+
+The rules are declared as data (RETURN_RULES / CANCEL_RULES) and compiled once per
+evaluation date into plain predicates, so checking an order is a loop over a few
+closures instead of an LLM reading the policy text and the order details.
+"""
+import re
+import string
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+RETURN_WINDOW_DAYS = 30
+
+# Item categories the policy lists as non-returnable. The orders table has no category
+# column, so the category is recognized from keywords in the item name.
+NON_RETURNABLE_KEYWORDS = {
+    "perishable": ("perishable", "food", "snack", "grocery", "flower", "flowers", "plant", "plants"),
+    "personalized": ("personalized", "personalised", "custom", "monogram", "monogrammed", "engraved"),
+    "digital": ("digital", "download", "e-gift", "egift", "gift card", "ebook", "e-book", "subscription"),
+}
+
+# (code, predicate, argument, message shown when the rule is NOT met)
+# Messages are str.format templates over the line fields plus {window_days}.
+RETURN_RULES = (
+    ("not_shipped", "status_in", ("Shipped",),
+     "Returns can be created only when the line is Shipped (line is {Order_Status})."),
+    ("nothing_to_return", "remaining_qty_positive", None,
+     "All {Quantity} unit(s) have already been returned."),
+    ("outside_window", "shipped_within_days", RETURN_WINDOW_DAYS,
+     "Ship date {Ship_Date} is more than {window_days} days ago; a CSR may override in exceptional cases."),
+    ("non_returnable_item", "category_not_in", tuple(NON_RETURNABLE_KEYWORDS),
+     "{Item_Name} is a non-returnable item."),
+)
+CANCEL_RULES = (
+    ("shipped_or_cancelled", "status_not_in", ("Shipped", "Cancelled"),
+     "Line is {Order_Status} and cannot be cancelled; the customer can return it once delivered."),
+    ("fulfillment_started", "fulfillment_in_when_sent", ("Created",),
+     "Order is Sent To Fulfillment and the fulfillment status is {Fulfillment_Status}, not Created."),
+)
+
+_CATEGORY_RES = {
+    category: re.compile(r"\b(?:" + "|".join(re.escape(w) for w in words) + r")\b", re.I)
+    for category, words in NON_RETURNABLE_KEYWORDS.items()
+}
+
+
+@lru_cache(maxsize=4096)
+def item_category(item_name: str) -> Optional[str]:
+    for category, regex in _CATEGORY_RES.items():
+        if regex.search(item_name or ""):
+            return category
+    return None
+
+
+def _predicate(kind: str, arg, as_of: date) -> Callable[[Dict], bool]:
+    if kind == "status_in":
+        allowed = frozenset(arg)
+        return lambda line: line["Order_Status"] in allowed
+    if kind == "status_not_in":
+        blocked = frozenset(arg)
+        return lambda line: line["Order_Status"] not in blocked
+    if kind == "remaining_qty_positive":
+        return lambda line: (line["Quantity"] or 0) - (line["Returned_qty"] or 0) > 0
+    if kind == "shipped_within_days":
+        # ISO dates compare correctly as strings, so no per-line date parsing
+        cutoff = (as_of - timedelta(days=arg)).isoformat()
+        return lambda line: bool(line["Ship_Date"]) and line["Ship_Date"][:10] >= cutoff
+    if kind == "category_not_in":
+        blocked = frozenset(arg)
+        return lambda line: item_category(line["Item_Name"]) not in blocked
+    if kind == "fulfillment_in_when_sent":
+        allowed = frozenset(arg)
+        return lambda line: line["Order_Status"] != "Sent To Fulfillment" or line.get("Fulfillment_Status") in allowed
+    raise ValueError(f"Unknown rule predicate {kind!r}")
+
+
+def _explainer(message: str) -> Callable[[Dict], str]:
+    """Bind the constant placeholders now; only the line fields are filled per call."""
+    message = message.replace("{window_days}", str(RETURN_WINDOW_DAYS))
+    names = [name for _, name, _, _ in string.Formatter().parse(message) if name]
+
+    def explain(line: Dict) -> str:
+        values = {}
+        for name in names:
+            value = line.get(name)
+            values[name] = "unknown" if value is None or value == "" else value
+        return message.format_map(values)
+
+    return explain
+
+
+CompiledRule = Tuple[str, Callable[[Dict], bool], Callable[[Dict], str]]
+
+
+def compile_rules(rules: Iterable[tuple], as_of: date) -> List[CompiledRule]:
+    return [(code, _predicate(kind, arg, as_of), _explainer(message)) for code, kind, arg, message in rules]
+
+
+class EligibilityEngine:
+    def __init__(self, as_of: Optional[date] = None):
+        self.as_of = as_of or date.today()
+        self.rules = {
+            "return": compile_rules(RETURN_RULES, self.as_of),
+            "cancel": compile_rules(CANCEL_RULES, self.as_of),
+        }
+
+    def is_eligible(self, action: str, line: Dict) -> bool:
+        """Verdict only: stops at the first failed rule and builds no explanation."""
+        return all(ok(line) for _, ok, _ in self.rules[action])
+
+    def check_line(self, action: str, line: Dict) -> Dict:
+        failed = [(code, explain) for code, ok, explain in self.rules[action] if not ok(line)]
+        result = {
+            "item_id": line["Item_ID"],
+            "eligible": not failed,
+            "rules_failed": [code for code, _ in failed],
+            "reasons": [explain(line) for _, explain in failed],
+        }
+        if action == "return":
+            result["returnable_qty"] = 0 if failed else line["Quantity"] - (line["Returned_qty"] or 0)
+        return result
+
+    def check_order(self, action: str, order_id: str, lines: List[Dict]) -> Dict:
+        """Order-level verdict: a return needs one eligible line, a cancel needs all of them."""
+        if action not in self.rules:
+            raise ValueError("action must be 'return' or 'cancel'")
+        checked = [self.check_line(action, line) for line in lines]
+        if not checked:
+            eligible = False
+        elif action == "return":
+            eligible = any(c["eligible"] for c in checked)
+        else:
+            eligible = all(c["eligible"] for c in checked)
+        return {
+            "order_id": order_id,
+            "action": action,
+            "eligible": eligible,
+            "as_of": self.as_of.isoformat(),
+            "lines": checked,
+        }
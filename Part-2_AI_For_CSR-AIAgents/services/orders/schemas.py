@@ -1,4 +1,5 @@
-from typing import Optional
+from datetime import date
+from typing import List, Literal, Optional
 from pydantic import BaseModel, EmailStr, Field
 
 
@@ -23,6 +24,7 @@ class OrderOut(BaseModel):
     Refund_Amount: int
 
 
+
 class OrderStatusOut(BaseModel):
     order_id: str
     status: str
@@ -31,3 +33,25 @@ class OrderStatusOut(BaseModel):
 class ReturnCreate(BaseModel):
     line_item_id: str = Field(None, description="item_id of a specific line to return")
     return_qty: int = Field(1, ge=1, description="Units to return (default 1)")
+
+
+class LineEligibility(BaseModel):
+    item_id: str
+    eligible: bool
+    rules_failed: List[str]
+    reasons: List[str]
+    returnable_qty: Optional[int] = None
+
+
+class EligibilityOut(BaseModel):
+    order_id: str
+    action: str
+    eligible: bool
+    as_of: str
+    lines: List[LineEligibility]
+
+
+class EligibilityBatchIn(BaseModel):
+    action: Literal["return", "cancel"]
+    order_ids: List[str] = Field(..., min_length=1, max_length=1000, description="Order IDs to check")
+    as_of: Optional[date] = Field(None, description="Evaluate the policy as of this date instead of today")
@@ -1,101 +1,194 @@
-import sqlite3
-from typing import Dict, List, Optional
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
 
-DB_PATH = "./services/orders/Storage/orders.db"
+from ..common.config import FULFILLMENT_DB, ORDERS_DB
+from ..common.metrics import connect
+from ..common.sharding import ShardSet
+from ..common.statuses import FULFILLMENT_STATUS, ORDER_STATUS, OrderStatus, coded
+from .eligibility import EligibilityEngine
+
+DB_PATH = ORDERS_DB
+FULFILLMENT_DB_PATH = FULFILLMENT_DB
+MAX_SQL_VARS = 500  # order ids per IN (...) query in batch lookups
+
+# Column order of OrderOut; also the whitelist for `fields=` projections
+ORDER_COLUMNS = (
+    "unique_id", "Order_ID", "Cust_Email", "Fulfillment_Order_ID", "Created_Timestamp",
+    "Item_ID", "Item_Name", "Quantity", "Order_Status", "Tracking_Nbr", "Ship_Date",
+    "Item_Price", "Shipping_price", "Discount_Applied", "Total_Price",
+    "Appeasement_Applied", "Returned_qty", "Refund_Amount",
+)
 
 
 class OrderService:
-    def __init__(self, db_path: str = DB_PATH):
+    def __init__(self, db_path: str = DB_PATH, fulfillment_db_path: str = FULFILLMENT_DB_PATH):
         self.db_path = db_path
+        self.fulfillment_db_path = fulfillment_db_path
+        self.shards = ShardSet(db_path)  # see common/sharding.py; one file unless resharded
+
+    def _connect(self, path: Optional[str] = None):
+        return connect(path or self.db_path)
+
+    # The shard holding an order's lines
+    def _path(self, order_id: str) -> str:
+        return self.shards.path(order_id)
+
+    # Readiness probe: the table is there and readable in every shard
+    def ping(self) -> None:
+        def probe(path):
+            with self._connect(path) as conn:
+                conn.execute("SELECT 1 FROM orders LIMIT 1").fetchone()
+        self.shards.gather(probe)
+
+    def ping_fulfillment(self) -> None:
+        with connect(f"file:{self.fulfillment_db_path}?mode=ro", uri=True) as conn:
+            conn.execute("SELECT 1 FROM fulfillment LIMIT 1").fetchone()
 
-    def _connect(self):
-        return sqlite3.connect(self.db_path)
+    @staticmethod
+    def _row_to_dict(r, columns: Sequence[str] = ORDER_COLUMNS) -> Dict:
+        row = dict(zip(columns, r))
+        if "Order_Status" in row:
+            row["Order_Status"] = ORDER_STATUS.from_db(row["Order_Status"])
+        return row
+
+    # What to store in Order_Status for a status name (text or integer code, see common/statuses.py)
+    def _status_value(self, status: OrderStatus, path: str):
+        return ORDER_STATUS.to_db(status, coded(path, ORDER_STATUS))
 
     @staticmethod
-    def _row_to_dict(r) -> Dict:
-        return {
-            "unique_id": r[0],
-            "Order_ID": r[1],
-            "Cust_Email": r[2],
-            "Fulfillment_Order_ID": r[3],
-            "Created_Timestamp": r[4],
-            "Item_ID": r[5],
-            "Item_Name": r[6],
-            "Quantity": r[7],
-            "Order_Status": r[8],
-            "Tracking_Nbr": r[9],
-            "Ship_Date": r[10],
-            "Item_Price": r[11],
-            "Shipping_price": r[12],
-            "Discount_Applied": r[13],
-            "Total_Price": r[14],
-            "Appeasement_Applied": r[15],
-            "Returned_qty": r[16],
-            "Refund_Amount": r[17],
-        }
-
-    def _fetch_lines(self, cur, order_id: str) -> List[Dict]:
+    def _select_list(columns: Sequence[str]) -> str:
+        unknown = set(columns) - set(ORDER_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown order field(s): {', '.join(sorted(unknown))}")
+        return ", ".join(columns)
+
+    def _fetch_lines(self, cur, order_id: str, columns: Sequence[str] = ORDER_COLUMNS) -> List[Dict]:
+        # Only the requested columns are read; names are checked against ORDER_COLUMNS
         cur.execute(
-            """
-            SELECT
-              unique_id, Order_ID, Cust_Email, Fulfillment_Order_ID, Created_Timestamp,
-              Item_ID, Item_Name, Quantity, Order_Status, Tracking_Nbr, Ship_Date,
-              Item_Price, Shipping_price, Discount_Applied, Total_Price,
-              Appeasement_Applied, Returned_qty, Refund_Amount
+            f"""
+            SELECT {self._select_list(columns)}
             FROM orders
             WHERE Order_ID = ?
             ORDER BY unique_id
             """,
             (order_id,),
         )
-        return [self._row_to_dict(r) for r in cur.fetchall()]
+        return [self._row_to_dict(r, columns) for r in cur.fetchall()]
+
+    def _fetch_lines_many(self, cur, order_ids: List[str]) -> Dict[str, List[Dict]]:
+        by_order: Dict[str, List[Dict]] = {}
+        for i in range(0, len(order_ids), MAX_SQL_VARS):
+            chunk = order_ids[i:i + MAX_SQL_VARS]
+            cur.execute(
+                f"""
+                SELECT {self._select_list(ORDER_COLUMNS)}
+                FROM orders
+                WHERE Order_ID IN ({", ".join("?" * len(chunk))})
+                ORDER BY unique_id
+                """,
+                chunk,
+            )
+            for r in cur.fetchall():
+                by_order.setdefault(r[1], []).append(self._row_to_dict(r))
+        return by_order
+
+    # Fulfillment statuses live in the fulfillment service's database (read-only here)
+    def _fulfillment_statuses(self, order_ids: List[str]) -> Dict[Tuple[str, str], str]:
+        if not order_ids or not Path(self.fulfillment_db_path).exists():
+            return {}
+        statuses = {}
+        with connect(f"file:{self.fulfillment_db_path}?mode=ro", uri=True) as conn:
+            cur = conn.cursor()
+            for i in range(0, len(order_ids), MAX_SQL_VARS):
+                chunk = order_ids[i:i + MAX_SQL_VARS]
+                cur.execute(
+                    f"SELECT Order_ID, Item_ID, Fulfillment_Order_Status FROM fulfillment "
+                    f"WHERE Order_ID IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+                statuses.update({(r[0], r[1]): FULFILLMENT_STATUS.from_db(r[2]) for r in cur.fetchall()})
+        return statuses
 
     def order_exists(self, order_id: str) -> bool:
-        with self._connect() as conn:
+        with self._connect(self._path(order_id)) as conn:
             cur = conn.cursor()
             cur.execute("SELECT 1 FROM orders WHERE Order_ID = ? LIMIT 1", (order_id,))
             return cur.fetchone() is not None
 
     def get_order_status(self, order_id: str) -> Optional[str]:
-        with self._connect() as conn:
+        with self._connect(self._path(order_id)) as conn:
             cur = conn.cursor()
             cur.execute("SELECT Order_Status FROM orders WHERE Order_ID = ? LIMIT 1", (order_id,))
-            statuses = [r[0] for r in cur.fetchall()]
+            statuses = [ORDER_STATUS.from_db(r[0]) for r in cur.fetchall()]
         if not statuses:
             return None
-        has_shipped = any(s == "Shipped" for s in statuses)
-        has_stf = any(s == "Sent To Fulfillment" for s in statuses)
-        all_cancel = all(s == "Cancelled" for s in statuses)
-        all_created = all(s == "Created" for s in statuses)
+        has_shipped = any(s == OrderStatus.SHIPPED for s in statuses)
+        has_stf = any(s == OrderStatus.SENT_TO_FULFILLMENT for s in statuses)
+        all_cancel = all(s == OrderStatus.CANCELLED for s in statuses)
+        all_created = all(s == OrderStatus.CREATED for s in statuses)
         if has_shipped:
-            return "Shipped"
+            return OrderStatus.SHIPPED.value
         if has_stf:
-            return "Sent To Fulfillment"
+            return OrderStatus.SENT_TO_FULFILLMENT.value
         if all_cancel:
-            return "Cancelled"
+            return OrderStatus.CANCELLED.value
         if all_created:
-            return "Created"
+            return OrderStatus.CREATED.value
         return statuses[0]
 
-    def get_order_lines(self, order_id: str) -> List[Dict]:
-        with self._connect() as conn:
+    def get_order_lines(self, order_id: str, fields: Optional[Sequence[str]] = None) -> List[Dict]:
+        with self._connect(self._path(order_id)) as conn:
             cur = conn.cursor()
-            return self._fetch_lines(cur, order_id)
+            return self._fetch_lines(cur, order_id, fields or ORDER_COLUMNS)
+
+    def check_eligibility(self, action: str, order_ids: List[str], as_of: Optional[date] = None) -> List[Dict]:
+        """Evaluate the return/cancel policy rules for each order (unknown orders have no lines)."""
+        engine = EligibilityEngine(as_of)
+        ids = list(dict.fromkeys(order_ids))
+        groups = self.shards.group(ids)
+
+        def fetch(path):
+            with self._connect(path) as conn:
+                return self._fetch_lines_many(conn.cursor(), groups[path])
+
+        lines: Dict[str, List[Dict]] = {}
+        for part in self.shards.gather(fetch, list(groups)):
+            lines.update(part)
+        if action == "cancel":
+            sent = [oid for oid, ls in lines.items()
+                    if any(l["Order_Status"] == OrderStatus.SENT_TO_FULFILLMENT for l in ls)]
+            statuses = self._fulfillment_statuses(sent)
+            for oid in sent:
+                for l in lines[oid]:
+                    l["Fulfillment_Status"] = statuses.get((oid, l["Item_ID"]))
+        return [engine.check_order(action, oid, lines.get(oid, [])) for oid in ids]
+
+    def check_return_eligibility(self, order_id: str, as_of: Optional[date] = None) -> Optional[Dict]:
+        result = self.check_eligibility("return", [order_id], as_of)[0]
+        return result if result["lines"] else None
+
+    def check_cancel_eligibility(self, order_id: str, as_of: Optional[date] = None) -> Optional[Dict]:
+        result = self.check_eligibility("cancel", [order_id], as_of)[0]
+        return result if result["lines"] else None
 
     def cancel_order(self, order_id: str) -> bool:
-        with self._connect() as conn:
+        path = self._path(order_id)
+        with self._connect(path) as conn:
             cur = conn.cursor()
             lines = self._fetch_lines(cur, order_id)
             if not lines:
                 return False
-            if any(l["Order_Status"] in ("Shipped", "Cancelled") for l in lines):
+            if any(l["Order_Status"] in (OrderStatus.SHIPPED, OrderStatus.CANCELLED) for l in lines):
                 raise ValueError("Order has Shipped/Cancelled lines and cannot be cancelled.")
-            cur.execute("UPDATE orders SET Order_Status = 'Cancelled' WHERE Order_ID = ?", (order_id,))
+            cur.execute("UPDATE orders SET Order_Status = ? WHERE Order_ID = ?",
+                        (self._status_value(OrderStatus.CANCELLED, path), order_id))
             conn.commit()
             return cur.rowcount > 0
 
     def cancel_order_line(self, order_id: str, line_item_id: str) -> bool:
-        with self._connect() as conn:
+        path = self._path(order_id)
+        with self._connect(path) as conn:
             cur = conn.cursor()
             cur.execute(
                 "SELECT Order_Status FROM orders WHERE Order_ID = ? AND item_id = ?",
@@ -104,12 +197,12 @@ class OrderService:
             row = cur.fetchone()
             if not row:
                 return False
-            status = row[0]
-            if status in ("Shipped", "Cancelled"):
+            status = ORDER_STATUS.from_db(row[0])
+            if status in (OrderStatus.SHIPPED, OrderStatus.CANCELLED):
                 raise ValueError("Line is not in a cancellable state.")
             cur.execute(
-                "UPDATE orders SET Order_Status = 'Cancelled' WHERE Order_ID = ? AND item_id = ?",
-                (order_id, line_item_id),
+                "UPDATE orders SET Order_Status = ? WHERE Order_ID = ? AND item_id = ?",
+                (self._status_value(OrderStatus.CANCELLED, path), order_id, line_item_id),
             )
             conn.commit()
             return cur.rowcount > 0
@@ -119,7 +212,7 @@ class OrderService:
         if return_qty < 1:
             print("Invalid return quantity:", return_qty)
             raise ValueError("return_qty must be >= 1")
-        with self._connect() as conn:
+        with self._connect(self._path(order_id)) as conn:
             cur = conn.cursor()
             print("Fetching order lines for return processing...")
             if line_item_id is not None:
@@ -143,10 +236,11 @@ class OrderService:
             any_updated = False
             print("Processing rows for return...")
             for unique_id, item_id, qty, ret_qty, price, appease, status in rows:
+                status = ORDER_STATUS.from_db(status)
                 print("Evaluating unique_id:", unique_id, "item_id:", item_id, "qty:", qty, "ret_qty:", ret_qty, "status:", status)
                 remaining = qty - ret_qty
                 # Check if there are any remaining units to return or status is not Shipped
-                if remaining <= 0 or status != "Shipped":
+                if remaining <= 0 or status != OrderStatus.SHIPPED:
                     print("Skipping unique_id:", unique_id, "remaining:", remaining, "status:", status)
                     continue
                 if requested_rtn_qty > remaining:
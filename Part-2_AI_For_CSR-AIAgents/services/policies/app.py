@@ -0,0 +1,70 @@
+from functools import lru_cache
+from typing import List, Literal
+from fastapi import FastAPI, Depends, HTTPException, Query
+from ..common.direct_mcp import create_mcp
+from ..common.metrics import instrument, readiness
+from .schemas import PolicyHit, PolicyDocument, IngestResult
+from .service import PolicyService
+
+app = FastAPI(title="Policies Service", version="1.0.0")
+instrument(app, "policies")
+
+
+# One instance per process: the embedder client and the loaded vectors are reused across requests
+@lru_cache(maxsize=1)
+def get_service() -> PolicyService:
+    return PolicyService()
+
+
+# Readiness: the index database answers a cheap query (the index itself is built on first search)
+@app.get("/healthz", include_in_schema=False)
+def health(svc: PolicyService = Depends(get_service)):
+    return readiness({"policies_db": svc.ping})
+
+
+@app.get(
+    "/policies/search",
+    response_model=List[PolicyHit],
+    operation_id="search_policies",
+    summary="Search company policies and FAQ",
+    description=(
+        "Return the policy/FAQ passages most relevant to the query (return, refund, "
+        "cancellation, shipping and ticket-handling rules). Always check policies before "
+        "taking an action on an order."
+    ),
+)
+def search_policies(
+    query: str = Query(..., min_length=1, description="Question or keywords, e.g. 'return window after ship date'."),
+    k: int = Query(4, ge=1, le=20, description="Number of passages to return."),
+    mode: Literal["hybrid", "vector", "bm25"] = Query(
+        "hybrid", description="hybrid (default) combines keyword (BM25) and semantic matching."
+    ),
+    svc: PolicyService = Depends(get_service),
+):
+    try:
+        return svc.search(query, k=k, mode=mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get(
+    "/policies/documents",
+    response_model=List[PolicyDocument],
+    include_in_schema=False,
+)
+def list_documents(svc: PolicyService = Depends(get_service)):
+    return svc.list_documents()
+
+
+# Re-embed changed PDFs (content hash) — an admin operation, hidden from the MCP tool list
+@app.post(
+    "/policies/reindex",
+    response_model=IngestResult,
+    include_in_schema=False,
+)
+def reindex(force: bool = Query(False), svc: PolicyService = Depends(get_service)):
+    return svc.ingest(force=force)
+
+
+mcp = create_mcp(app)
+mcp.mount()  # serves at /mcp
@@ -0,0 +1,53 @@
+import math
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from .embeddings import tokenize
+
+# Words too common in the policy text to say anything about relevance
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how",
+    "i", "if", "in", "is", "it", "its", "my", "of", "on", "or", "should", "that", "the", "their",
+    "this", "to", "was", "what", "when", "which", "will", "with", "you", "your",
+}
+
+
+def terms(text: str) -> List[str]:
+    return [t for t in tokenize(text) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index: term -> [(doc key, term frequency)].
+
+    Scoring touches only the postings of the query terms, so exact terms such as
+    "restocking fee" or "Sent To Fulfillment" score even when the embedding misses them.
+    """
+
+    def __init__(self, docs: Iterable[Tuple[int, str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_len: Dict[int, int] = {}
+        for key, text in docs:
+            words = terms(text)
+            self.doc_len[key] = len(words)
+            for term, tf in Counter(words).items():
+                self.postings[term].append((key, tf))
+        n = len(self.doc_len)
+        self.avg_len = (sum(self.doc_len.values()) / n) if n else 0.0
+        # Lucene-style idf: stays positive for terms found in most chunks
+        self.idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    def scores(self, query: str) -> Dict[int, float]:
+        out: Dict[int, float] = defaultdict(float)
+        for term in set(terms(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for key, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[key] / (self.avg_len or 1))
+                out[key] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return dict(out)
@@ -0,0 +1,79 @@
+import hashlib
+import math
+import os
+import re
+from typing import List, Sequence
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:['’][a-z]+)?")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def normalize(vec: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vec))
+    if norm == 0:
+        return list(vec)
+    return [v / norm for v in vec]
+
+
+def dot(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+class HashingEmbedder:
+    """Deterministic local embedder: signed feature hashing of words and word bigrams.
+
+    Needs no network or model download, so the index can be built and searched offline
+    (and reproducibly in tests). Quality is lexical, not semantic.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        words = tokenize(text)
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed_one(self, text: str) -> List[float]:
+        vec = [0.0] * self.dim
+        for feat in self._features(text):
+            h = int.from_bytes(hashlib.blake2b(feat.encode(), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        return normalize(vec)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_one(t) for t in texts]
+
+
+class OpenAIEmbedder:
+    def __init__(self, model: str = "text-embedding-3-small", batch_size: int = 64):
+        from openai import OpenAI
+
+        self.client = OpenAI()
+        self.model = model
+        self.batch_size = batch_size
+        self.name = f"openai-{model}"
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        out: List[List[float]] = []
+        for i in range(0, len(texts), self.batch_size):
+            resp = self.client.embeddings.create(model=self.model, input=texts[i:i + self.batch_size])
+            out.extend(normalize(d.embedding) for d in resp.data)
+        return out
+
+
+def default_embedder():
+    """OpenAI embeddings when an API key is configured, otherwise the offline hashing embedder.
+
+    POLICY_EMBEDDER=hashing forces the local embedder (e.g. for tests and benchmarks).
+    """
+    choice = os.getenv("POLICY_EMBEDDER", "auto").lower()
+    if choice != "hashing" and os.getenv("OPENAI_API_KEY"):
+        try:
+            return OpenAIEmbedder()
+        except ImportError:
+            pass
+    return HashingEmbedder()
@@ -0,0 +1,33 @@
+"""Build or refresh the persistent policy index offline.
+
+Run from the Part-2 folder:
+    python -m services.policies.ingest            # only re-embeds changed PDFs
+    python -m services.policies.ingest --force    # re-embeds everything
+"""
+import argparse
+import time
+
+from .service import DB_PATH, DOCS_DIR, PolicyService
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--docs", default=DOCS_DIR, help="Folder with the policy PDFs")
+    ap.add_argument("--db", default=DB_PATH, help="SQLite file holding the index")
+    ap.add_argument("--force", action="store_true", help="Re-embed documents even if unchanged")
+    args = ap.parse_args()
+
+    svc = PolicyService(db_path=args.db, docs_dir=args.docs)
+    start = time.perf_counter()
+    stats = svc.ingest(force=args.force)
+    elapsed = time.perf_counter() - start
+    print(f"Embedder: {svc.embedder.name}")
+    print(f"Indexed: {stats['indexed'] or '-'} ({stats['chunks']} chunks)")
+    print(f"Unchanged: {stats['skipped'] or '-'}")
+    if stats["removed"]:
+        print(f"Removed: {stats['removed']}")
+    print(f"Done in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
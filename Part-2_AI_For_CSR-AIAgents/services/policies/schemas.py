@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class PolicyHit(BaseModel):
+    document: str
+    page: int
+    chunk_id: int
+    score: float
+    text: str
+
+
+class PolicyDocument(BaseModel):
+    doc_id: str
+    content_hash: str
+    embedder: str
+    indexed_at: str
+    chunks: int
+
+
+class IngestResult(BaseModel):
+    indexed: List[str]
+    skipped: List[str]
+    removed: List[str]
+    chunks: int
@@ -0,0 +1,282 @@
+import hashlib
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..common.config import POLICIES_DB, POLICY_DOCS_DIR
+from ..common.metrics import connect, record_cache
+from .bm25 import BM25Index
+from .embeddings import default_embedder, dot, tokenize
+
+DB_PATH = POLICIES_DB
+DOCS_DIR = POLICY_DOCS_DIR
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,          -- file name, e.g. 'Company Policies.pdf'
+    content_hash TEXT NOT NULL,       -- sha256 of the file bytes
+    embedder TEXT NOT NULL,           -- embedder that produced the stored vectors
+    indexed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    doc_id TEXT NOT NULL REFERENCES documents(doc_id) ON DELETE CASCADE,
+    page INTEGER NOT NULL,
+    ord INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    embedding BLOB NOT NULL           -- float32 array, L2-normalized
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_doc ON chunks (doc_id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+SEARCH_MODES = ("hybrid", "vector", "bm25")
+RESULT_CACHE_SIZE = 1024
+
+# Vectors loaded from disk, shared by every PolicyService in the process.
+# db_path -> (index_version, [(chunk_id, doc_id, page, text, vector)], BM25Index)
+_VECTOR_CACHE: Dict[str, tuple] = {}
+# (db_path, index_version, embedder, normalized query, k, mode, alpha) -> hits, LRU order
+_RESULT_CACHE: "OrderedDict[tuple, List[Dict]]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+_SCHEMA_READY = set()
+
+
+def normalize_query(query: str) -> str:
+    """Case, punctuation and spacing variants of a question share one cache entry."""
+    return " ".join(tokenize(query))
+
+
+def file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def read_pdf_pages(path: Path) -> List[str]:
+    from pypdf import PdfReader
+
+    return [page.extract_text() or "" for page in PdfReader(str(path)).pages]
+
+
+def chunk_page(text: str, max_chars: int = 500) -> List[str]:
+    """Split a page into paragraph-aligned chunks of at most ~max_chars characters."""
+    paragraphs, current = [], []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            if current:
+                paragraphs.append(" ".join(current))
+                current = []
+            continue
+        current.append(line)
+    if current:
+        paragraphs.append(" ".join(current))
+
+    chunks, buf = [], ""
+    for para in paragraphs:
+        para = re.sub(r"\s+", " ", para)
+        if buf and len(buf) + len(para) + 1 > max_chars:
+            chunks.append(buf)
+            buf = ""
+        buf = f"{buf} {para}".strip()
+        while len(buf) > max_chars:
+            cut = buf.rfind(". ", 0, max_chars)
+            cut = cut + 1 if cut > max_chars // 2 else max_chars
+            chunks.append(buf[:cut].strip())
+            buf = buf[cut:].strip()
+    if buf:
+        chunks.append(buf)
+    return chunks
+
+
+class PolicyService:
+    def __init__(self, db_path: str = DB_PATH, docs_dir: str = DOCS_DIR, embedder=None):
+        self.db_path = db_path
+        self.docs_dir = Path(docs_dir)
+        self.embedder = embedder or default_embedder()
+
+    def _connect(self):
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = connect(self.db_path)
+        conn.execute("PRAGMA foreign_keys = ON")
+        if self.db_path not in _SCHEMA_READY:
+            conn.executescript(SCHEMA)
+            _SCHEMA_READY.add(self.db_path)
+        return conn
+
+    # Readiness probe: the index database opens and answers a cheap query
+    def ping(self) -> None:
+        with self._connect() as conn:
+            conn.execute("SELECT 1 FROM meta LIMIT 1").fetchone()
+
+    @staticmethod
+    def _bump_version(cur) -> None:
+        cur.execute(
+            """
+            INSERT INTO meta (key, value) VALUES ('index_version', '1')
+            ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+            """
+        )
+
+    @staticmethod
+    def _version(cur) -> int:
+        cur.execute("SELECT value FROM meta WHERE key = 'index_version'")
+        row = cur.fetchone()
+        return int(row[0]) if row else 0
+
+    # Parse, chunk and embed the PDFs whose content (or embedder) changed since last run
+    def ingest(self, paths: Optional[List[str]] = None, force: bool = False) -> Dict:
+        files = [Path(p) for p in paths] if paths else sorted(self.docs_dir.glob("*.pdf"))
+        stats = {"indexed": [], "skipped": [], "removed": [], "chunks": 0}
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT doc_id, content_hash, embedder FROM documents")
+            known = {r[0]: (r[1], r[2]) for r in cur.fetchall()}
+            changed = False
+            for path in files:
+                doc_id = path.name
+                digest = file_hash(path)
+                if not force and known.get(doc_id) == (digest, self.embedder.name):
+                    stats["skipped"].append(doc_id)
+                    continue
+                pieces = [
+                    (page_no, ord_, text)
+                    for page_no, page in enumerate(read_pdf_pages(path), start=1)
+                    for ord_, text in enumerate(chunk_page(page))
+                ]
+                vectors = self.embedder.embed([text for _, _, text in pieces]) if pieces else []
+                cur.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+                cur.execute(
+                    """
+                    INSERT INTO documents (doc_id, content_hash, embedder, indexed_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(doc_id) DO UPDATE SET
+                      content_hash = excluded.content_hash,
+                      embedder = excluded.embedder,
+                      indexed_at = excluded.indexed_at
+                    """,
+                    (doc_id, digest, self.embedder.name, datetime.now(timezone.utc).isoformat()),
+                )
+                cur.executemany(
+                    "INSERT INTO chunks (doc_id, page, ord, text, embedding) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (doc_id, page_no, ord_, text, array("f", vec).tobytes())
+                        for (page_no, ord_, text), vec in zip(pieces, vectors)
+                    ],
+                )
+                stats["indexed"].append(doc_id)
+                stats["chunks"] += len(pieces)
+                changed = True
+            if paths is None:
+                # A full-directory run also drops documents that were deleted from disk
+                present = {p.name for p in files}
+                for doc_id in set(known) - present:
+                    cur.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+                    cur.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+                    stats["removed"].append(doc_id)
+                    changed = True
+            if changed:
+                self._bump_version(cur)
+            conn.commit()
+        return stats
+
+    def list_documents(self) -> List[Dict]:
+        with self._connect() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT d.doc_id, d.content_hash, d.embedder, d.indexed_at, COUNT(c.chunk_id)
+                FROM documents d LEFT JOIN chunks c ON c.doc_id = d.doc_id
+                GROUP BY d.doc_id ORDER BY d.doc_id
+                """
+            )
+            rows = cur.fetchall()
+        return [
+            {"doc_id": r[0], "content_hash": r[1], "embedder": r[2], "indexed_at": r[3], "chunks": r[4]}
+            for r in rows
+        ]
+
+    def _ensure_index(self, cur) -> None:
+        cur.execute("SELECT COUNT(*), COUNT(DISTINCT embedder) FROM documents")
+        docs, embedders = cur.fetchone()
+        cur.execute("SELECT 1 FROM documents WHERE embedder != ? LIMIT 1", (self.embedder.name,))
+        if docs == 0 or embedders > 1 or cur.fetchone():
+            self.ingest()
+
+    def _load_index(self) -> tuple:
+        """(index_version, entries, bm25) for the current index, loaded once per version."""
+        with self._connect() as conn:
+            cur = conn.cursor()
+            self._ensure_index(cur)
+            version = self._version(cur)
+            cached = _VECTOR_CACHE.get(self.db_path)
+            record_cache("policy_vectors", bool(cached and cached[0] == version))
+            if cached and cached[0] == version:
+                return cached
+            with _CACHE_LOCK:
+                cur.execute("SELECT chunk_id, doc_id, page, text, embedding FROM chunks ORDER BY chunk_id")
+                entries = [(r[0], r[1], r[2], r[3], array("f", r[4])) for r in cur.fetchall()]
+                bm25 = BM25Index((e[0], e[3]) for e in entries)
+                _VECTOR_CACHE[self.db_path] = (version, entries, bm25)
+        return version, entries, bm25
+
+    def _score(self, query: str, entries: List[tuple], bm25: BM25Index, mode: str, alpha: float) -> List[tuple]:
+        vec: Dict[int, float] = {}
+        if mode != "bm25":
+            qvec = self.embedder.embed([query])[0]
+            vec = {e[0]: dot(qvec, e[4]) for e in entries}
+        lex = bm25.scores(query) if mode != "vector" else {}
+        if mode == "vector":
+            return [(vec[e[0]], e) for e in entries]
+        if mode == "bm25":
+            return [(lex[e[0]], e) for e in entries if e[0] in lex]
+        # Both score sets rescaled to 0..1 before the weighted sum, as BM25 is unbounded
+        lo, hi = min(vec.values(), default=0.0), max(vec.values(), default=0.0)
+        top_lex = max(lex.values(), default=0.0)
+        fused = []
+        for e in entries:
+            v = (vec[e[0]] - lo) / (hi - lo) if hi > lo else 0.0
+            b = lex.get(e[0], 0.0) / top_lex if top_lex else 0.0
+            fused.append((alpha * v + (1 - alpha) * b, e))
+        return fused
+
+    # Load the vectors and BM25 index into this process ahead of the first search
+    def warm_up(self) -> int:
+        return len(self._load_index()[1])
+
+    def search(self, query: str, k: int = 4, mode: str = "hybrid", alpha: float = 0.5) -> List[Dict]:
+        """Top-k chunks for query; hybrid mode fuses vector similarity (weight alpha) with BM25."""
+        if not query or not query.strip():
+            raise ValueError("query must not be empty")
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"mode must be one of {', '.join(SEARCH_MODES)}")
+        version, entries, bm25 = self._load_index()
+        key = (self.db_path, version, self.embedder.name, normalize_query(query), k, mode, alpha)
+        with _CACHE_LOCK:
+            hits = _RESULT_CACHE.get(key)
+            if hits is not None:
+                _RESULT_CACHE.move_to_end(key)
+        record_cache("policy_results", hits is not None)
+        if hits is None:
+            scored = sorted(self._score(query, entries, bm25, mode, alpha), key=lambda x: x[0], reverse=True)
+            hits = [
+                {
+                    "document": e[1],
+                    "page": e[2],
+                    "chunk_id": e[0],
+                    "score": round(score, 4),
+                    "text": e[3],
+                }
+                for score, e in scored[:k]
+            ]
+            with _CACHE_LOCK:
+                _RESULT_CACHE[key] = hits
+                while len(_RESULT_CACHE) > RESULT_CACHE_SIZE:
+                    _RESULT_CACHE.popitem(last=False)
+        return [dict(h) for h in hits]
@@ -0,0 +1,169 @@
+"""Change-data capture between orders.db and fulfillment.db.
+
+Both databases carry the same order lines (Order_ID, Item_ID) with duplicated
+columns: Fulfillment_Order_ID, Quantity, Tracking_Nbr, Ship_Date and the status.
+`install` adds to each database a `change_log` table filled by triggers on the
+line table: one row per insert, and per update that changes a tracked column
+(with only the changed columns in `changes`). services/sync/worker.py applies the
+log of one database to the other incrementally.
+
+A `Link` is one direction of the sync: which source columns map onto which target
+columns, and how status values translate. Orders own the customer side (cancel,
+quantity, new lines sent to fulfillment); fulfillment owns shipping progress
+(status, tracking number, ship date).
+
+Shipped and Cancelled are terminal: a line that reached one never goes back to an
+open status through the sync. A change from the other side that would (fulfillment
+still reporting In-Progress for a line the customer cancelled) is skipped, even when
+it is the most recent one; between two terminal statuses the last writer wins.
+"""
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+KEY = ("Order_ID", "Item_ID")
+TERMINAL = ("Shipped", "Cancelled")
+
+CHANGE_LOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS change_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,                 -- 'I' insert / 'U' update
+    order_id TEXT,
+    item_id TEXT,
+    changes TEXT NOT NULL,            -- JSON {column: new value}
+    changed_at REAL NOT NULL          -- unix time, seconds
+);
+CREATE TABLE IF NOT EXISTS sync_checkpoint (
+    link TEXT PRIMARY KEY,            -- e.g. 'orders->fulfillment', the log applied to this database
+    last_seq INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+
+
+@dataclass(frozen=True)
+class Link:
+    name: str
+    source_table: str
+    target_table: str
+    columns: Dict[str, str]                      # source column -> target column
+    values: Dict[str, Dict[str, str]] = field(default_factory=dict)  # value translation; unmapped values are not synced
+    insert_columns: Tuple[str, ...] = ()         # source inserts create the target line from these
+    insert_defaults: Dict[str, str] = field(default_factory=dict)    # target values when translation drops one
+    insert_when: Optional[str] = None            # source column that must be non-empty to insert
+    terminal: Dict[str, Tuple[str, ...]] = field(default_factory=dict)  # target column -> end states
+
+    def is_terminal(self, column: str, value) -> bool:
+        """Whether value, written to target column, is an end state nothing open may overwrite."""
+        return value in self.terminal.get(column, ())
+
+    def translate(self, changes: Dict) -> Dict:
+        """Target column -> value for the source changes this link syncs."""
+        out = {}
+        for column, value in changes.items():
+            target = self.columns.get(column)
+            if target is None:
+                continue
+            mapping = self.values.get(column)
+            if mapping is not None:
+                if value not in mapping:
+                    continue
+                value = mapping[value]
+            out[target] = value
+        return out
+
+    def insert_row(self, changes: Dict) -> Optional[Dict]:
+        """Target row for a source insert, or None if this line isn't synced."""
+        if not self.insert_columns or (self.insert_when and not changes.get(self.insert_when)):
+            return None
+        row = {c: changes.get(c) for c in KEY}
+        row.update({c: changes[c] for c in self.insert_columns if c in changes and c not in self.columns})
+        row.update(self.translate(changes))
+        for column, default in self.insert_defaults.items():
+            row.setdefault(column, default)
+        return row
+
+
+ORDERS_TO_FULFILLMENT = Link(
+    name="orders->fulfillment",
+    source_table="orders",
+    target_table="fulfillment",
+    columns={
+        "Fulfillment_Order_ID": "Fulfillment_Order_ID",
+        "Quantity": "Quantity",
+        "Order_Status": "Fulfillment_Order_Status",
+        "Tracking_Nbr": "Tracking_Nbr",
+        "Ship_Date": "Ship_Date",
+    },
+    # fulfillment tracks its own progress; only the end states come from the order
+    values={"Order_Status": {"Cancelled": "Cancelled", "Shipped": "Shipped"}},
+    insert_columns=("Cust_Email", "Created_Timestamp", "Item_Name"),
+    insert_defaults={"Fulfillment_Order_Status": "Created"},
+    insert_when="Fulfillment_Order_ID",
+    terminal={"Fulfillment_Order_Status": TERMINAL},
+)
+
+FULFILLMENT_TO_ORDERS = Link(
+    name="fulfillment->orders",
+    source_table="fulfillment",
+    target_table="orders",
+    columns={
+        "Fulfillment_Order_Status": "Order_Status",
+        "Tracking_Nbr": "Tracking_Nbr",
+        "Ship_Date": "Ship_Date",
+    },
+    values={"Fulfillment_Order_Status": {
+        "Created": "Sent To Fulfillment",
+        "In-Progress": "Sent To Fulfillment",
+        "Shipped": "Shipped",
+        "Cancelled": "Cancelled",
+    }},
+    terminal={"Order_Status": TERMINAL},
+)
+
+
+def _json_object(columns, prefix: str = "NEW") -> str:
+    return "json_object(" + ", ".join(f"'{c}', {prefix}.{c}" for c in columns) + ")"
+
+
+def trigger_sql(link: Link) -> str:
+    """Triggers on the link's source table that write its changes to change_log."""
+    table, tracked = link.source_table, list(link.columns)
+    changed = " UNION ALL ".join(
+        f"SELECT '{c}' AS k, NEW.{c} AS v WHERE OLD.{c} IS NOT NEW.{c}" for c in tracked
+    )
+    sql = f"""
+CREATE TRIGGER IF NOT EXISTS {table}_cdc_update AFTER UPDATE ON {table}
+WHEN {" OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in tracked)}
+BEGIN
+    INSERT INTO change_log (op, order_id, item_id, changes, changed_at)
+    VALUES ('U', NEW.Order_ID, NEW.Item_ID, (SELECT json_group_object(k, v) FROM ({changed})), {NOW});
+END;
+"""
+    if link.insert_columns:
+        columns = list(dict.fromkeys([*KEY, *tracked, *link.insert_columns]))
+        sql += f"""
+CREATE TRIGGER IF NOT EXISTS {table}_cdc_insert AFTER INSERT ON {table}
+BEGIN
+    INSERT INTO change_log (op, order_id, item_id, changes, changed_at)
+    VALUES ('I', NEW.Order_ID, NEW.Item_ID, {_json_object(columns)}, {NOW});
+END;
+"""
+    return sql
+
+
+def install(conn: sqlite3.Connection, outgoing: Link) -> None:
+    """Change log, checkpoints, triggers for `outgoing` and the line-key index, in conn's database.
+
+    Also switches the database to WAL, so the sync worker reads the log while the
+    services write.
+    """
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(CHANGE_LOG_SCHEMA + trigger_sql(outgoing))
+    # the worker applies changes by line key
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_{outgoing.source_table}_order_item "
+        f"ON {outgoing.source_table} (Order_ID, Item_ID)"
+    )
+    conn.commit()
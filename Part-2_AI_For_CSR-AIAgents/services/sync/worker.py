@@ -0,0 +1,353 @@
+"""Incremental sync worker: applies each database's change_log to the other one.
+
+Per link and batch (services/sync/cdc.py):
+
+1. read up to `batch_size` log rows after the link's checkpoint (kept in the target);
+2. translate them, and where a line was changed on both sides since the last
+   round keep the most recent change (last writer wins, per column), except that
+   a terminal status (Shipped, Cancelled) always beats an open one; coalesce them
+   per order line;
+3. in one BEGIN IMMEDIATE transaction on the target: insert missing lines, apply
+   the updates with one executemany per set of changed columns (an open status is
+   not written over a line already Shipped or Cancelled: it is skipped and
+   counted), delete the log rows
+   this apply made the target's own triggers write (so changes don't echo back),
+   and move the checkpoint. The batch is applied exactly once even if the worker
+   dies halfway;
+4. prune the applied rows from the source log.
+
+A sharded orders database (services/common/sharding.py) is synced shard by shard:
+each shard file is paired with fulfillment.db under its own links,
+`orders#<i>->fulfillment` and `fulfillment->orders#<i>`, which are also the names
+of their checkpoints. Fulfillment changes are applied by the shard that holds the
+line (shard_index of its Order_ID), and the fulfillment log is pruned only up to
+the change every shard has applied. An unsharded orders.db keeps the plain
+`orders->fulfillment` / `fulfillment->orders` links.
+
+Lag (age of the oldest change in the batch when it was committed), pending
+changes and throughput are exported as Prometheus metrics.
+
+    python -m services.sync.worker [--once] [--interval 0.2] [--batch 5000] [--metrics-port 9105]
+"""
+import argparse
+import json
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, start_http_server
+
+from ..common.metrics import connect
+from ..common.sharding import find_shards, shard_index
+from ..common.statuses import is_coded, status_columns
+from ..fulfillment.service import DB_PATH as FULFILLMENT_DB_PATH
+from ..orders.service import DB_PATH as ORDERS_DB_PATH
+from .cdc import FULFILLMENT_TO_ORDERS, KEY, ORDERS_TO_FULFILLMENT, Link, install
+
+CDC_APPLIED = Counter("csr_cdc_changes_applied_total", "Change-log rows applied to the other database.", ["link"])
+CDC_LAG = Gauge("csr_cdc_lag_seconds", "Age of the oldest change in the last applied batch.", ["link"])
+CDC_PENDING = Gauge("csr_cdc_pending_changes", "Change-log rows not applied yet.", ["link"])
+CDC_SKIPPED = Counter("csr_cdc_terminal_skipped_total",
+                      "Open statuses not applied because the line is already Shipped/Cancelled.", ["link"])
+
+
+@dataclass
+class BatchResult:
+    link: str
+    applied: int = 0
+    pending: int = 0
+    lag: float = 0.0            # seconds, oldest change of the batch
+    newest_lag: float = 0.0     # seconds, newest change of the batch
+    seconds: float = 0.0        # time spent reading and applying
+
+
+class SyncWorker:
+    def __init__(self, orders_db: str = ORDERS_DB_PATH, fulfillment_db: str = FULFILLMENT_DB_PATH,
+                 batch_size: int = 5000, prune: bool = True):
+        self.batch_size = batch_size
+        self.prune = prune
+        self.dbs = {"fulfillment": fulfillment_db}
+        shards = find_shards(orders_db)
+        self.shard_count = len(shards)
+        self.pairs: List[Tuple[Link, Link]] = []  # (orders -> fulfillment, fulfillment -> orders) per orders file
+        self._link_dbs: Dict[str, Tuple[str, str]] = {}  # link name -> (source, target) key in self.dbs
+        self._link_shard: Dict[str, int] = {}  # fulfillment link name -> the orders shard it applies to
+        for i, path in enumerate(shards):
+            orders = "orders" if len(shards) == 1 else f"orders#{i}"
+            self.dbs[orders] = path
+            outgoing = replace(ORDERS_TO_FULFILLMENT, name=f"{orders}->fulfillment")
+            incoming = replace(FULFILLMENT_TO_ORDERS, name=f"fulfillment->{orders}")
+            self._link_dbs[outgoing.name] = (orders, "fulfillment")
+            self._link_dbs[incoming.name] = ("fulfillment", orders)
+            if len(shards) > 1:
+                self._link_shard[incoming.name] = i
+            self.pairs.append((outgoing, incoming))
+        self._conns: Dict[str, object] = {}
+
+    def _conn(self, name: str):
+        if name not in self._conns:
+            # autocommit: transactions are opened explicitly (BEGIN IMMEDIATE)
+            conn = connect(self.dbs[name], isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA busy_timeout = 5000")
+            self._conns[name] = conn
+        return self._conns[name]
+
+    def _source(self, link: Link):
+        return self._conn(self._link_dbs[link.name][0])
+
+    def _target(self, link: Link):
+        return self._conn(self._link_dbs[link.name][1])
+
+    def install(self) -> None:
+        for outgoing, _ in self.pairs:
+            install(self._source(outgoing), outgoing)
+        install(self._conn("fulfillment"), FULFILLMENT_TO_ORDERS)
+
+    def close(self) -> None:
+        for conn in self._conns.values():
+            conn.close()
+        self._conns.clear()
+
+    @staticmethod
+    def _checkpoint(target, link: Link) -> int:
+        row = target.execute("SELECT last_seq FROM sync_checkpoint WHERE link = ?", (link.name,)).fetchone()
+        return row[0] if row else 0
+
+    def _read(self, link: Link, last: int) -> List[tuple]:
+        """(seq, op, key, translated changes, source changes, changed_at) after seq `last`.
+
+        Changes to lines of another orders shard come back with op None and nothing
+        to apply: they only move this link's checkpoint.
+        """
+        shard = self._link_shard.get(link.name)
+        rows = self._source(link).execute(
+            "SELECT seq, op, order_id, item_id, changes, changed_at FROM change_log "
+            "WHERE seq > ? ORDER BY seq LIMIT ?",
+            (last, self.batch_size),
+        ).fetchall()
+        out = []
+        for seq, op, order_id, item_id, changes, changed_at in rows:
+            if shard is not None and shard_index(order_id or "", self.shard_count) != shard:
+                out.append((seq, None, (order_id, item_id), {}, {}, changed_at))
+                continue
+            changes = self._decode(link.source_table, json.loads(changes))
+            out.append((seq, op, (order_id, item_id), link.translate(changes), changes, changed_at))
+        return out
+
+    @staticmethod
+    def _decode(table: str, changes: Dict) -> Dict:
+        # status columns stored as integer codes are logged as codes; links map names
+        for column, vocabulary in status_columns(table).items():
+            if column in changes:
+                changes[column] = vocabulary.from_db(changes[column])
+        return changes
+
+    def _resolve(self, batches: Dict[str, List[tuple]], pair: Tuple[Link, Link]) -> None:
+        """Cut both batches at a common time and drop the losing side of concurrent edits.
+
+        A line changed on both sides since the last round (e.g. cancelled in orders
+        while fulfillment marked it shipped) keeps the most recent value on both sides:
+        the older change is not applied, the newer one overwrites it. A terminal status
+        wins over an open one whatever their order (cancelled in orders, then still
+        In-Progress in fulfillment: the line stays cancelled on both sides).
+        """
+        full = [rows[-1][5] for rows in batches.values() if len(rows) >= self.batch_size]
+        if full:
+            # changes after the earliest cut-off may conflict with rows not read yet
+            horizon = min(full)
+            for name, rows in batches.items():
+                batches[name] = [r for r in rows if r[5] <= horizon]
+        links = {link.name: link for link in pair}
+        latest = {}  # (link, key, target column) -> (terminal, time) of the newest change
+        for name, rows in batches.items():
+            link = links[name]
+            for _, _, key, translated, _, changed_at in rows:
+                for column, value in translated.items():
+                    latest[(name, key, column)] = (link.is_terminal(column, value), changed_at)
+        for name, rows in batches.items():
+            link = links[name]
+            other = next(l for l in pair if l is not link)
+            for _, _, key, translated, _, changed_at in rows:
+                for column, value in list(translated.items()):
+                    # the same field as the other side writes it: this link's target column is its source column
+                    rival = latest.get((other.name, key, other.columns.get(column)))
+                    if rival is None:
+                        continue
+                    mine = (link.is_terminal(column, value), changed_at)
+                    if rival > mine or (rival == mine and link.insert_columns):
+                        del translated[column]
+
+    def sync_link(self, link: Link, other: Link, rows: List[tuple], seen: int) -> BatchResult:
+        """Apply the link's rows of this round; seen = last seq of the target's log read this round."""
+        start = time.perf_counter()
+        source, target = self._source(link), self._target(link)
+        result = BatchResult(link.name)
+        last = self._checkpoint(target, link)
+        if rows:
+            updates: Dict[Tuple, Dict] = defaultdict(dict)
+            inserts: Dict[Tuple, Dict] = {}
+            for _, op, key, translated, changes, _ in rows:
+                new_row = link.insert_row(changes) if op == "I" else None
+                if new_row is not None:
+                    inserts[key] = new_row
+                if translated:
+                    updates[key].update(translated)
+            self._apply(target, link, other, inserts, updates, rows[-1][0], seen)
+            committed = time.time()
+            result.applied = sum(1 for r in rows if r[1] is not None)
+            result.lag = committed - rows[0][5]
+            result.newest_lag = committed - rows[-1][5]
+            last = rows[-1][0]
+            if self.prune:
+                self._prune(link, last)
+        row = source.execute("SELECT COUNT(*) FROM change_log WHERE seq > ?", (last,)).fetchone()
+        result.pending = row[0]
+        result.seconds = time.perf_counter() - start
+        CDC_APPLIED.labels(link.name).inc(result.applied)
+        CDC_PENDING.labels(link.name).set(result.pending)
+        if result.applied:
+            CDC_LAG.labels(link.name).set(result.lag)
+        return result
+
+    def _prune(self, link: Link, last: int) -> None:
+        """Delete the source log up to the change every link reading that log has applied."""
+        source = self._link_dbs[link.name][0]
+        upto = min(last if l is link else self._checkpoint(self._target(l), l)
+                   for pair in self.pairs for l in pair if self._link_dbs[l.name][0] == source)
+        self._source(link).execute("DELETE FROM change_log WHERE seq <= ?", (upto,))
+
+    def _apply(self, target, link: Link, other: Link, inserts: Dict[Tuple, Dict], updates: Dict[Tuple, Dict],
+               last_seq: int, seen: int) -> None:
+        table = link.target_table
+        key_sql = " AND ".join(f"{c} = ?" for c in KEY)
+        target.execute("BEGIN IMMEDIATE")
+        try:
+            # target changes written since this round read its log are newer than the batch: keep them
+            for order_id, item_id, changes in target.execute(
+                "SELECT order_id, item_id, changes FROM change_log WHERE seq > ?", (seen,)
+            ).fetchall():
+                values = updates.get((order_id, item_id))
+                if values:
+                    synced = other.translate(self._decode(table, json.loads(changes)))
+                    for column, target_column in other.columns.items():
+                        if target_column in synced:
+                            values.pop(column, None)
+            skipped = self._keep_terminal(target, link, updates)
+            before = target.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+            for column, vocabulary in status_columns(table).items():
+                if is_coded(target, vocabulary):
+                    for values in (*inserts.values(), *updates.values()):
+                        if values.get(column) is not None:
+                            values[column] = vocabulary.code(values[column])
+            by_columns: Dict[Tuple[str, ...], List[Dict]] = defaultdict(list)
+            for row in inserts.values():
+                by_columns[tuple(row)].append(row)
+            for columns, group in by_columns.items():
+                target.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) SELECT {', '.join('?' * len(columns))} "
+                    f"WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {key_sql})",
+                    [[r[c] for c in columns] + [r[c] for c in KEY] for r in group],
+                )
+            by_columns.clear()
+            for key, values in updates.items():
+                if values:
+                    by_columns[tuple(values)].append({**values, "_key": key})
+            for columns, group in by_columns.items():
+                target.executemany(
+                    f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in columns)} WHERE {key_sql}",
+                    [[r[c] for c in columns] + list(r["_key"]) for r in group],
+                )
+            # what the target's own triggers logged for this apply is not a new change
+            target.execute("DELETE FROM change_log WHERE seq > ?", (before,))
+            target.execute(
+                "INSERT INTO sync_checkpoint (link, last_seq, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(link) DO UPDATE SET last_seq = excluded.last_seq, updated_at = excluded.updated_at",
+                (link.name, last_seq, time.time()),
+            )
+            target.execute("COMMIT")
+        except BaseException:
+            target.execute("ROLLBACK")
+            raise
+        CDC_SKIPPED.labels(link.name).inc(skipped)
+
+    def _keep_terminal(self, target, link: Link, updates: Dict[Tuple, Dict]) -> int:
+        """Drop open statuses bound for lines the target already has Shipped/Cancelled; returns how many."""
+        table, key_sql = link.target_table, " AND ".join(f"{c} = ?" for c in KEY)
+        skipped = 0
+        for column in link.terminal:
+            vocabulary = status_columns(table)[column]
+            for key, values in updates.items():
+                if column not in values or link.is_terminal(column, values[column]):
+                    continue
+                row = target.execute(f"SELECT {column} FROM {table} WHERE {key_sql}", key).fetchone()
+                if row is not None and link.is_terminal(column, vocabulary.from_db(row[0])):
+                    del values[column]
+                    skipped += 1
+        return skipped
+
+    def sync_once(self) -> List[BatchResult]:
+        """One round over every orders file: two results (one per direction) per shard."""
+        results: List[BatchResult] = []
+        for pair in self.pairs:
+            results += self._sync_pair(pair)
+        return results
+
+    def _sync_pair(self, pair: Tuple[Link, Link]) -> List[BatchResult]:
+        start = time.perf_counter()
+        outgoing, incoming = pair
+        checkpoints = {link.name: self._checkpoint(self._target(link), link) for link in pair}
+        batches = {link.name: self._read(link, checkpoints[link.name]) for link in pair}
+        self._resolve(batches, pair)
+        # last seq of each link's source log read this round: the "seen" of the link writing into that database
+        read = {link.name: batches[link.name][-1][0] if batches[link.name] else checkpoints[link.name] for link in pair}
+        results = [self.sync_link(outgoing, incoming, batches[outgoing.name], read[incoming.name]),
+                   self.sync_link(incoming, outgoing, batches[incoming.name], read[outgoing.name])]
+        results[0].seconds += time.perf_counter() - start - sum(r.seconds for r in results)
+        return results
+
+    def run(self, interval: float = 0.2, stop: Optional[threading.Event] = None, on_batch=None) -> None:
+        """Sync until stop is set; polls every `interval` seconds while both logs are drained."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            results = self.sync_once()
+            if on_batch is not None:
+                on_batch(results)
+            if not any(r.pending for r in results):
+                stop.wait(interval)
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Sync order lines between orders.db and fulfillment.db.")
+    ap.add_argument("--orders-db", default=ORDERS_DB_PATH)
+    ap.add_argument("--fulfillment-db", default=FULFILLMENT_DB_PATH)
+    ap.add_argument("--batch", type=int, default=5000, help="change-log rows per transaction")
+    ap.add_argument("--interval", type=float, default=0.2, help="poll interval once caught up (s)")
+    ap.add_argument("--once", action="store_true", help="apply what is pending and exit")
+    ap.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port")
+    args = ap.parse_args(argv)
+
+    worker = SyncWorker(args.orders_db, args.fulfillment_db, batch_size=args.batch)
+    worker.install()
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+    try:
+        if args.once:
+            while True:
+                results = worker.sync_once()
+                for r in results:
+                    if r.applied:
+                        print(f"{r.link}: applied {r.applied}, lag {r.lag:.3f}s, pending {r.pending}")
+                if not any(r.pending for r in results):
+                    break
+        else:
+            worker.run(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.close()
+
+
+if __name__ == "__main__":
+    main()
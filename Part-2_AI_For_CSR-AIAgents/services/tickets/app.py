@@ -1,54 +1,76 @@
 from fastapi import FastAPI, Depends, HTTPException, Query, Path
-from fastapi_mcp import FastApiMCP
-from typing import Optional, List
+from ..common.direct_mcp import create_mcp
+from ..common.metrics import instrument, readiness
+from typing import Optional, List, Literal, Union
+from ..common.projection import parse_fields, projected, to_table
 from .schemas import TicketOut, TicketCreate, TicketUpdate
-from .service import TicketService
+from .service import TICKET_COLUMNS, TicketService
 from datetime import datetime, timezone
 
 app = FastAPI(title="Tickets Service", version="1.0.0")
+instrument(app, "tickets")
 
 def get_service() -> TicketService:
     return TicketService()
 
+# Readiness: the tickets table answers a cheap query
 @app.get("/healthz", include_in_schema=False)
-def health():
-    return {"status": "ok"}
+def health(svc: TicketService = Depends(get_service)):
+    return readiness({"tickets_db": svc.ping})
+
+FIELDS_DESCRIPTION = f"Comma-separated columns to return (default all): {', '.join(TICKET_COLUMNS)}."
+FORMAT_DESCRIPTION = "json (one object per ticket) or table ('|'-separated rows)."
 
 @app.get(
     "/fetchticket/",
-    response_model=List[TicketOut],
+    response_model=Union[List[TicketOut], str],
     operation_id="get_customer_tickets",  # ← tool name
     summary="List tickets for a customer/order",
     description=(
         "Return tickets filtered by customer_email and/or order_id. "
-        "At least one filter should be provided for efficient queries."
+        "At least one filter should be provided for efficient queries. "
+        "Use fields= (e.g. 'Ticket_ID,Call_Timestamp') and format=table to keep the list short."
     ),
 )
 def list_tickets(
     customer_email: Optional[str] = Query(None, description="Customer email to filter by."),
     order_id: Optional[str] = Query(None, description="Order ID to filter by."),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    output: Literal["json", "table"] = Query("json", alias="format", description=FORMAT_DESCRIPTION),
     svc: TicketService = Depends(get_service),
 ):
     try:
-        return svc.get_customer_tickets(customer_email, order_id)
+        columns = parse_fields(fields, TICKET_COLUMNS)
+        tickets = svc.get_customer_tickets(customer_email, order_id, columns)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    if output == "table":
+        return to_table(tickets, columns)
+    return projected(tickets) if fields else tickets
 
 @app.get(
     "/getticket/{ticket_id}",
-    response_model=TicketOut,
+    response_model=Union[TicketOut, str],
     operation_id="get_ticket_details",  # ← tool name
     summary="Get a ticket by ID",
-    description="Return the detailed ticket record for the given Ticket_ID.",
+    description="Return the detailed ticket record for the given Ticket_ID. Use fields= to return only some columns.",
 )
 def get_ticket(
     ticket_id: int = Path(..., ge=1, description="Numeric Ticket_ID."),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    output: Literal["json", "table"] = Query("json", alias="format", description=FORMAT_DESCRIPTION),
     svc: TicketService = Depends(get_service),
 ):
-    t = svc.get_ticket_details(ticket_id)
+    try:
+        columns = parse_fields(fields, TICKET_COLUMNS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    t = svc.get_ticket_details(ticket_id, columns)
     if not t:
         raise HTTPException(status_code=404, detail="Ticket not found")
-    return t
+    if output == "table":
+        return to_table([t], columns)
+    return projected(t) if fields else t
 
 @app.post(
     "/addticket/",
@@ -90,5 +112,5 @@ def update_ticket(
 # mcp = FastApiMCP(app, path="/mcp")
 # mcp.mount()
 
-mcp = FastApiMCP(app)
+mcp = create_mcp(app)
 mcp.mount()              # mounts at default "/mcp"
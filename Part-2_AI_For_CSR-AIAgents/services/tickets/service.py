@@ -1,21 +1,72 @@
-import sqlite3
-from typing import List, Dict, Optional
+import heapq
+from typing import List, Dict, Optional, Sequence
 
-DB_PATH = "./services/tickets/Storage/support_tickets.db"
+from ..common.config import TICKETS_DB
+from ..common.metrics import connect
+from ..common.sharding import ID_BITS, ShardSet
+
+DB_PATH = TICKETS_DB
+
+# Column order of TicketOut; also the whitelist for `fields=` projections
+TICKET_COLUMNS = ("Ticket_ID", "Cust_Email", "Order_ID", "Call_Timestamp", "CSR_Name", "Ticket_Notes")
 
 class TicketService:
     def __init__(self, db_path: str = DB_PATH):
         self.db_path = db_path
+        self.shards = ShardSet(db_path)  # see common/sharding.py; one file unless resharded
+
+    def _connect(self, path: Optional[str] = None):
+        return connect(path or self.db_path)
+
+    # Tickets live with their order; a ticket without one is placed by the customer's email
+    @staticmethod
+    def _shard_key(customer_email: str, order_id: Optional[str]) -> str:
+        return order_id or customer_email
+
+    # Readiness probe: the table is there and readable in every shard
+    def ping(self) -> None:
+        def probe(path):
+            with self._connect(path) as conn:
+                conn.execute("SELECT 1 FROM tickets LIMIT 1").fetchone()
+        self.shards.gather(probe)
+
+    # A Ticket_ID's high bits name the shard that created it: only that one is opened. Tickets
+    # moved by a reshard keep their ids; for those the other shards are asked, in parallel
+    def _find_ticket(self, ticket_id: int, query: str, params=()) -> Optional[tuple]:
+        def fetch(path):
+            with self._connect(path) as conn:
+                return conn.execute(query, (*params, ticket_id)).fetchone()
+
+        home = ticket_id >> ID_BITS
+        paths = list(self.shards.paths)
+        if 0 <= home < len(paths):
+            row = fetch(paths[home])
+            if row:
+                return paths[home], row
+            paths = paths[:home] + paths[home + 1:]
+        if paths:
+            for path, row in zip(paths, self.shards.gather(fetch, paths)):
+                if row:
+                    return path, row
+        return None
 
-    def _connect(self):
-        return sqlite3.connect(self.db_path)
+    @staticmethod
+    def _select_list(columns: Sequence[str]) -> str:
+        unknown = set(columns) - set(TICKET_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown ticket field(s): {', '.join(sorted(unknown))}")
+        return ", ".join(columns)
 
-    def get_customer_tickets(self, customer_email=None, order_id=None):
+    def get_customer_tickets(self, customer_email=None, order_id=None, fields: Optional[Sequence[str]] = None):
         if not customer_email and not order_id:
             raise ValueError("Please pass either a customer_email or order_id.")
 
-        query = """
-            SELECT Ticket_ID, Cust_Email, Order_ID, Call_Timestamp, CSR_Name, Ticket_Notes
+        columns = fields or TICKET_COLUMNS
+        merged = not order_id and len(self.shards) > 1
+        # a merge is on Ticket_ID: read it too, after the requested columns
+        selected = [*columns, "Ticket_ID"] if merged and "Ticket_ID" not in columns else columns
+        query = f"""
+            SELECT {self._select_list(selected)}
             FROM tickets WHERE 1=1
         """
         params = []
@@ -27,42 +78,35 @@ class TicketService:
             params.append(order_id)
         query += " ORDER BY Ticket_ID"
 
-        with self._connect() as conn:
-            cur = conn.cursor()
-            cur.execute(query, params)
-            rows = cur.fetchall()
-
-        return [
-            {
-                "Ticket_ID": r[0],
-                "Cust_Email": r[1],
-                "Order_ID": r[2],
-                "Call_Timestamp": r[3],
-                "CSR_Name": r[4],
-                "Ticket_Notes": r[5],
-            }
-            for r in rows
-        ]
-
-    def get_ticket_details(self, ticket_id: int) -> Optional[Dict]:
-        query = """
-            SELECT Ticket_ID, Cust_Email, Order_ID, Call_Timestamp, CSR_Name, Ticket_Notes
+        def fetch(path):
+            with self._connect(path) as conn:
+                cur = conn.cursor()
+                cur.execute(query, params)
+                return cur.fetchall()
+
+        if order_id:
+            rows = fetch(self.shards.path(order_id))
+        else:
+            # a customer's tickets are spread over the shards by order: ask all of them at once
+            parts = self.shards.gather(fetch)
+            if merged:
+                # each shard's rows come sorted by Ticket_ID: merge them into the single-file order
+                ticket = selected.index("Ticket_ID")
+                rows = list(heapq.merge(*parts, key=lambda r: r[ticket]))
+            else:
+                rows = [r for part in parts for r in part]
+        return [dict(zip(columns, r)) for r in rows]
+
+    def get_ticket_details(self, ticket_id: int, fields: Optional[Sequence[str]] = None) -> Optional[Dict]:
+        columns = fields or TICKET_COLUMNS
+        query = f"""
+            SELECT {self._select_list(columns)}
             FROM tickets WHERE Ticket_ID = ?
         """
-        with self._connect() as conn:
-            cur = conn.cursor()
-            cur.execute(query, (ticket_id,))
-            row = cur.fetchone()
-        if not row:
+        found = self._find_ticket(ticket_id, query)
+        if not found:
             return None
-        return {
-            "Ticket_ID": row[0],
-            "Cust_Email": row[1],
-            "Order_ID": row[2],
-            "Call_Timestamp": row[3],
-            "CSR_Name": row[4],
-            "Ticket_Notes": row[5],
-        }
+        return dict(zip(columns, found[1]))
 
     def add_ticket(
         self,
@@ -72,7 +116,7 @@ class TicketService:
         csr_name: str = "N/A",
         call_timestamp_iso: Optional[str] = None,
     ) -> int:
-        with self._connect() as conn:
+        with self._connect(self.shards.path(self._shard_key(customer_email, order_id))) as conn:
             cur = conn.cursor()
             if call_timestamp_iso:
                 cur.execute(
@@ -94,7 +138,10 @@ class TicketService:
             return int(cur.lastrowid)
 
     def update_ticket(self, ticket_id: int, update_description: str) -> None:
-        with self._connect() as conn:
+        found = self._find_ticket(ticket_id, "SELECT 1 FROM tickets WHERE Ticket_ID = ?")
+        if not found:
+            raise ValueError("Ticket not found")
+        with self._connect(found[0]) as conn:
             cur = conn.cursor()
             cur.execute("SELECT Ticket_Notes FROM tickets WHERE Ticket_ID = ?", (ticket_id,))
             row = cur.fetchone()
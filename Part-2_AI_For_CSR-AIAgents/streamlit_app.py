@@ -1,13 +1,20 @@
 # streamlit_app.py
 import os
-import re
-import json
 import uuid
 import time
-import requests
 import streamlit as st
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from chat_client import (
+    ReplyStats,
+    WebhookClient,
+    dispatch,
+    extract_action_block,
+    extract_options_block,
+)
+
 # =========================
 # Config
 # =========================
@@ -20,10 +27,11 @@ DEFAULT_WEBHOOK_URL_PROD = os.getenv(
     "http://localhost:5678/webhook/fb032013-9f36-4f3b-82f1-33f2fe2e5380"  # paste your exact Production URL if different
 )
 DEFAULT_TIMEOUT_SECS = int(os.getenv("N8N_TIMEOUT_SECS", "120"))
-
-# Regex helpers (optional: parse model-suggested actions/options from text)
-ACTION_RE  = re.compile(r"^ACTION:\s*(\{[\s\S]*\})\s*$",  re.MULTILINE)
-OPTIONS_RE = re.compile(r"^OPTIONS:\s*(\[[\s\S]*\])\s*$", re.MULTILINE)
+HTTP_POOL_SIZE = int(os.getenv("N8N_POOL_SIZE", "10"))
+HTTP_RETRIES = int(os.getenv("N8N_RETRIES", "2"))
+WEBHOOK_WORKERS = int(os.getenv("N8N_WORKERS", "8"))  # webhook calls in flight, all sessions
+POLL_SECS = 0.3  # how often a running call's partial reply is redrawn
+CANCEL_TEXT = "Okay, I’ve canceled that request. How else can I help?"
 
 # =========================
 # Page setup & styles
@@ -113,67 +121,103 @@ if "messages" not in st.session_state:
     st.session_state.messages = []   # [{role, content, ts}]
 if "pending_action" not in st.session_state:
     st.session_state.pending_action = None  # dict or None
+if "options" not in st.session_state:
+    st.session_state.options = []  # quick actions from the last agent reply
+if "events" not in st.session_state:
+    st.session_state.events = []  # UI events (message, button click) not dispatched yet
+if "inflight" not in st.session_state:
+    st.session_state.inflight = None  # PendingCall of the running webhook call
+if "agent_calls" not in st.session_state:
+    st.session_state.agent_calls = Counter()  # webhook round trips by action
 
-def add_message(role: str, content: str):
-    st.session_state.messages.append({"role": role, "content": content, "ts": time.time()})
+def add_message(role: str, content: str, stats: ReplyStats = None):
+    msg = {"role": role, "content": content, "ts": time.time()}
+    if stats is not None:
+        msg["timing"] = stats.summary()  # TTFT / total time of the webhook call
+    st.session_state.messages.append(msg)
 
 def clear_chat():
     st.session_state.messages = []
     st.session_state.pending_action = None
+    st.session_state.options = []
+    st.session_state.events = []
+    st.session_state.inflight = None  # a running call finishes on its own; its reply is dropped
+    st.session_state.agent_calls = Counter()
     st.session_state.session_id = uuid.uuid4().hex  # new session for memory isolation
 
 # =========================
 # HTTP helpers
 # =========================
-def post_webhook(payload: dict, url: str = None):
-    """Send JSON to n8n webhook."""
-    if url is None:
-        url = webhook_url
-    return requests.post(
-        url,
-        json=payload,
-        headers={"Content-Type": "application/json"},
-        timeout=timeout_secs,
-    )
+@st.cache_resource
+def get_webhook_client() -> WebhookClient:
+    """One pooled keep-alive session + circuit breaker per process (shared by all sessions)."""
+    return WebhookClient(pool_size=HTTP_POOL_SIZE, retries=HTTP_RETRIES)
 
-def safe_parse_response(resp):
-    """
-    Returns (agent_text, data_json_or_none).
-    - Accepts JSON arrays like: [{"output": "..."}] and returns the first item's 'output' (or similar)
-    - Accepts JSON dicts and prefers common keys
-    - Falls back to raw text if not JSON
-    """
-    data = None
-    try:
-        data = resp.json()
-    except Exception:
-        data = None
+@st.cache_resource
+def get_executor() -> ThreadPoolExecutor:
+    """Worker threads for webhook calls, so a slow agent run doesn't block the page."""
+    return ThreadPoolExecutor(max_workers=WEBHOOK_WORKERS, thread_name_prefix="n8n-webhook")
 
-    if isinstance(data, list) and len(data) > 0:
-        first = data[0]
-        if isinstance(first, dict):
-            for k in ["output", "answer", "message", "text", "result"]:
-                if k in first and isinstance(first[k], (str, int, float, bool)):
-                    return str(first[k]), data
-            try:
-                return "```json\n" + json.dumps(first, indent=2) + "\n```", data
-            except Exception:
-                return str(first), data
-        try:
-            return "```json\n" + json.dumps(data, indent=2) + "\n```", data
-        except Exception:
-            return str(data), data
+webhook_client = get_webhook_client()
 
-    if isinstance(data, dict):
-        for k in ["output", "answer", "result", "message", "text"]:
-            if k in data and isinstance(data[k], (str, int, float, bool)):
-                return str(data[k]), data
-        try:
-            return "```json\n" + json.dumps(data, indent=2) + "\n```", data
-        except Exception:
-            return str(data), data
+# =========================
+# Event queue
+# =========================
+# Widgets only enqueue events (in their callbacks, which run before the next rerun);
+# the events are handled here at the top of every rerun, so a click is never lost
+# because the block that rendered the button did not run again.
+def enqueue(kind: str, **data):
+    st.session_state.events.append({"kind": kind, **data})
 
-    return resp.text.strip(), None
+def on_chat_submit():
+    text = st.session_state.get("chat_text")
+    if text:
+        enqueue("sendMessage", text=text)
+
+def finish_inflight():
+    """Turn a finished webhook call into chat messages, ACTION and OPTIONS state."""
+    call = st.session_state.inflight
+    if call is None or not call.done:
+        return
+    st.session_state.inflight = None
+    if call.error:
+        add_message("assistant", f"**Error:** {call.error}", call.stats)
+        return
+    agent_text = call.text or "_(No content returned by webhook)_"
+    add_message("assistant", agent_text, call.stats)
+    st.session_state.pending_action = extract_action_block(agent_text)
+    st.session_state.options = extract_options_block(agent_text)
+
+def process_events():
+    """Dispatch queued events, one webhook call at a time (the agent memory is per session)."""
+    while st.session_state.events and st.session_state.inflight is None:
+        event = st.session_state.events.pop(0)
+        kind = event["kind"]
+        if kind == "cancelAction":
+            st.session_state.pending_action = None
+            add_message("assistant", CANCEL_TEXT)
+            continue
+        payload = {"sessionId": st.session_state.session_id, "action": kind}
+        if kind == "sendMessage":
+            add_message("user", event["text"])
+            payload["chatInput"] = event["text"]
+        elif kind == "confirmAction":
+            if not st.session_state.pending_action:
+                continue  # already confirmed or canceled (double click)
+            add_message("user", "✅ Yes, proceed")
+            payload["pendingAction"] = st.session_state.pending_action
+            st.session_state.pending_action = None
+        elif kind == "quickIntent":
+            add_message("user", event["label"])
+            payload.update(intent=event["intent"], args=event.get("args", {}))
+        st.session_state.options = []  # answered by this call
+        st.session_state.agent_calls[kind] += 1
+        st.session_state.inflight = dispatch(
+            get_executor(), webhook_client, webhook_url, timeout_secs, event, payload
+        )
+
+finish_inflight()
+process_events()
 
 # =========================
 # Header actions (now render just below the fixed header)
@@ -184,6 +228,12 @@ with cols[-1]:
         clear_chat()
         st.rerun()
 
+with st.sidebar:
+    calls = st.session_state.agent_calls
+    if calls:
+        detail = ", ".join(f"{n} {kind}" for kind, n in calls.most_common())
+        st.caption(f"Agent round trips this chat: {sum(calls.values())} ({detail})")
+
 # =========================
 # Render history
 # =========================
@@ -191,131 +241,58 @@ for msg in st.session_state.messages:
     avatar = "👤" if msg["role"] == "user" else "🤖"
     with st.chat_message("user" if msg["role"] == "user" else "assistant", avatar=avatar):
         st.markdown(msg["content"])
+        if msg.get("timing"):
+            st.caption(msg["timing"])
 
 # =========================
-# Chat input
+# Running call (redrawn every POLL_SECS until it finishes)
 # =========================
-user_input = st.chat_input("Type your message (e.g., 'Is the order returnable?').")
-if user_input:
-    add_message("user", user_input)
-    with st.chat_message("user", avatar="👤"):
-        st.markdown(user_input)
-
-    payload = {
-        "sessionId": st.session_state.session_id,
-        "action": "sendMessage",
-        "chatInput": user_input,
-    }
-
-    agent_text = None
-    error_text = None
+@st.fragment(run_every=POLL_SECS)
+def render_inflight():
+    call = st.session_state.inflight
+    if call is None:
+        return
+    if call.done:
+        st.rerun()  # full rerun: finish_inflight() adds the reply to the history
     with st.chat_message("assistant", avatar="🤖"):
-        with st.spinner("Agent thinking..."):
-            try:
-                resp = post_webhook(payload, webhook_url)
-                if resp.ok:
-                    agent_text, _ = safe_parse_response(resp)
-                else:
-                    error_text = f"n8n error: {resp.status_code} — {resp.text}"
-            except requests.exceptions.RequestException as e:
-                error_text = f"Request failed: {e}"
+        # Tokens and tool steps are rendered as they arrive (streaming webhook);
+        # a blocking webhook shows the whole answer at once.
+        st.caption(call.status or "Agent thinking...")
+        if call.text:
+            st.markdown(call.text + "▌")
+    queued = len(st.session_state.events)
+    if queued:
+        st.caption(f"{queued} more message(s) queued")
 
-        if error_text:
-            st.error(error_text)
-            add_message("assistant", f"**Error:** {error_text}")
-        else:
-            agent_text = agent_text or "_(No content returned by webhook)_"
-            st.markdown(agent_text)
-            add_message("assistant", agent_text)
+if st.session_state.inflight is not None:
+    render_inflight()
 
-            # ==== ACTION (confirmation for state-changing ops) ====
-            def extract_action_block(text: str):
-                if not text:
-                    return None
-                m = ACTION_RE.search(text)
-                if not m:
-                    return None
-                try:
-                    return json.loads(m.group(1))
-                except json.JSONDecodeError:
-                    return None
+# ==== ACTION (confirmation for state-changing ops) ====
+if st.session_state.pending_action and st.session_state.inflight is None:
+    st.info("Confirmation required before performing this action.")
+    c1, c2 = st.columns(2)
+    with c1:
+        st.button("✅ Yes, proceed", use_container_width=True, key="confirm_yes",
+                  on_click=enqueue, args=("confirmAction",))
+    with c2:
+        st.button("❌ No, cancel", use_container_width=True, key="confirm_no",
+                  on_click=enqueue, args=("cancelAction",))
 
-            action = extract_action_block(agent_text)
-            if action:
-                st.session_state.pending_action = action
-                st.info("Confirmation required before performing this action.")
-                c1, c2 = st.columns(2)
-                with c1:
-                    if st.button("✅ Yes, proceed", use_container_width=True, key="confirm_yes"):
-                        confirm_payload = {
-                            "sessionId": st.session_state.session_id,
-                            "action": "confirmAction",
-                            "pendingAction": st.session_state.pending_action,
-                        }
-                        try:
-                            resp2 = post_webhook(confirm_payload, webhook_url)
-                            if resp2.ok:
-                                result_text, _ = safe_parse_response(resp2)
-                                st.session_state.pending_action = None
-                                add_message("assistant", result_text)
-                                st.markdown(result_text)
-                            else:
-                                st.error(f"n8n error: {resp2.status_code} — {resp2.text}")
-                        except requests.exceptions.RequestException as e:
-                            st.error(f"Request failed: {e}")
-                with c2:
-                    if st.button("❌ No, cancel", use_container_width=True, key="confirm_no"):
-                        st.session_state.pending_action = None
-                        cancel_text = "Okay, I’ve canceled that request. How else can I help?"
-                        add_message("assistant", cancel_text)
-                        st.markdown(cancel_text)
+# ==== OPTIONS (quick actions) ====
+options = st.session_state.options
+if options and st.session_state.inflight is None:
+    st.markdown("**Suggested actions**")
+    grid = st.columns(min(3, len(options)))
+    for idx, opt in enumerate(options):
+        with grid[idx % len(grid)]:
+            st.button(opt["label"], use_container_width=True, key=f"opt_{idx}",
+                      on_click=enqueue, args=("quickIntent",),
+                      kwargs={"label": opt["label"], "intent": opt["intent"], "args": opt.get("args", {})})
 
-            # ==== OPTIONS (quick actions) ====
-            def extract_options_block(text: str):
-                if not text:
-                    return []
-                m = OPTIONS_RE.search(text)
-                if not m:
-                    return []
-                try:
-                    data = json.loads(m.group(1))
-                    if isinstance(data, list):
-                        norm = []
-                        for opt in data:
-                            if isinstance(opt, dict) and "label" in opt and "intent" in opt:
-                                norm.append({
-                                    "label": opt["label"],
-                                    "intent": opt["intent"],
-                                    "args": opt.get("args", {})
-                                })
-                        return norm
-                    return []
-                except Exception:
-                    return []
-
-            options = extract_options_block(agent_text)
-            if options:
-                st.markdown("**Suggested actions**")
-                grid = st.columns(min(3, len(options)))
-                for idx, opt in enumerate(options):
-                    with grid[idx % len(grid)]:
-                        if st.button(opt["label"], use_container_width=True, key=f"opt_{idx}"):
-                            followup_payload = {
-                                "sessionId": st.session_state.session_id,
-                                "action": "quickIntent",
-                                "intent": opt["intent"],
-                                "args": opt.get("args", {}),
-                            }
-                            try:
-                                resp3 = post_webhook(followup_payload, webhook_url)
-                                if resp3.ok:
-                                    text, _ = safe_parse_response(resp3)
-                                    add_message("assistant", text)
-                                    st.markdown(text)
-                                else:
-                                    st.error(f"n8n error: {resp3.status_code} — {resp3.text}")
-                            except requests.exceptions.RequestException as e:
-                                st.error(f"Request failed: {e}")
+# =========================
+# Chat input
+# =========================
+st.chat_input("Type your message (e.g., 'Is the order returnable?').", key="chat_text", on_submit=on_chat_submit)
 
 # Footer (optional)
 # st.markdown(
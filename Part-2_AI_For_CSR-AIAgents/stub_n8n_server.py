@@ -0,0 +1,118 @@
+# stub_n8n_server.py
+"""Local stand-in for the n8n chat webhook, for trying out and benchmarking the UI.
+
+Answers the Streamlit payloads with a scripted agent run: a "thinking" pause, one
+run of the workflow's Orders tool node per order id in the message, then the answer
+token by token. By default the reply is streamed the way n8n's Webhook node does
+in Response Mode "Streaming" (one JSON chunk per line, only the chunk types n8n
+sends: begin / end around each node run, item for the answer); ?format=sse sends the same
+chunks as server-sent events and ?format=json waits for the whole run and answers
+with one JSON document, like Response Mode "When Last Node Finishes".
+
+    uvicorn stub_n8n_server:app --port 5678
+    N8N_WEBHOOK_URL_TEST=http://localhost:5678/webhook-test/stub streamlit run streamlit_app.py
+
+Delays (seconds) come from STUB_THINK_SECS, STUB_TOOL_SECS and STUB_TOKEN_SECS.
+"""
+import asyncio
+import json
+import os
+import re
+import time
+from collections import Counter
+from typing import Literal
+
+from fastapi import Body, FastAPI, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+
+THINK_SECS = float(os.getenv("STUB_THINK_SECS", "0.6"))
+TOOL_SECS = float(os.getenv("STUB_TOOL_SECS", "0.4"))
+TOKEN_SECS = float(os.getenv("STUB_TOKEN_SECS", "0.03"))
+ORDER_RE = re.compile(r"\bORD-\d+\b", re.IGNORECASE)
+NODE = "CSR Assistant"
+TOOL_NODE = "Orders"  # names of the nodes in n8n Workflow/AI_CSR_Agent.json
+CALLS = Counter()  # webhook calls received, by payload action
+
+app = FastAPI(title="Stub n8n webhook", version="1.0.0")
+
+
+def script(payload: dict):
+    """(tool nodes run, answer) for a Streamlit payload."""
+    action = payload.get("action") or "sendMessage"
+    if action == "confirmAction":
+        pending = payload.get("pendingAction") or {}
+        return [TOOL_NODE], f"Done: {json.dumps(pending)} was performed."
+    if action == "quickIntent":
+        text = f"{payload.get('intent')} {json.dumps(payload.get('args') or {})}"
+    else:
+        text = payload.get("chatInput") or ""
+    orders = [o.upper() for o in ORDER_RE.findall(text)]
+    steps = [TOOL_NODE] * len(orders)
+    if orders and "cancel" in text.lower():
+        # state-changing request: ask the CSR to confirm (rendered as Yes/No buttons)
+        action = {"tool": "cancel_order", "args": {"order_id": orders[0]}}
+        answer = f"{orders[0]} can be canceled. Shall I cancel it?\nACTION: {json.dumps(action)}"
+    elif orders:
+        answer = (
+            f"I looked up {', '.join(orders)}. This is a scripted reply from the stub "
+            "server: the agent would summarize the order status, its lines and the next steps here."
+        )
+    else:
+        # ambiguous request: ask and offer quick actions (rendered as buttons)
+        options = [
+            {"label": "Check ORD-010", "intent": "order_status", "args": {"order_id": "ORD-010"}},
+            {"label": "Cancel ORD-007", "intent": "cancel_order", "args": {"order_id": "ORD-007"}},
+        ]
+        answer = (
+            "Could you share the order id (for example ORD-010) or the customer's email?"
+            f"\nOPTIONS: {json.dumps(options)}"
+        )
+    return steps, answer
+
+
+def tokens(answer: str):
+    words = answer.split(" ")
+    return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+
+def chunk(kind: str, content: str = None, node: str = NODE) -> dict:
+    out = {"type": kind, "metadata": {"nodeName": node, "itemIndex": 0, "runIndex": 0,
+                                      "timestamp": int(time.time() * 1000)}}
+    if content is not None:
+        out["content"] = content
+    return out
+
+
+async def run(payload: dict):
+    steps, answer = script(payload)
+    yield chunk("begin")
+    await asyncio.sleep(THINK_SECS)
+    for node in steps:
+        yield chunk("begin", node=node)
+        await asyncio.sleep(TOOL_SECS)
+        yield chunk("end", node=node)
+    for token in tokens(answer):
+        yield chunk("item", token)
+        await asyncio.sleep(TOKEN_SECS)
+    yield chunk("end")
+
+
+@app.post("/{prefix}/{webhook_id}")
+async def webhook(
+    prefix: Literal["webhook", "webhook-test"],
+    webhook_id: str,
+    payload: dict = Body(...),
+    output: Literal["ndjson", "sse", "json"] = Query("ndjson", alias="format"),
+):
+    CALLS[payload.get("action") or "sendMessage"] += 1
+    if output == "json":
+        parts = [c["content"] async for c in run(payload) if c["type"] == "item"]
+        return JSONResponse([{"output": "".join(parts)}])
+
+    async def body():
+        async for c in run(payload):
+            line = json.dumps(c, ensure_ascii=False)
+            yield f"data: {line}\n\n" if output == "sse" else line + "\n"
+
+    media_type = "text/event-stream" if output == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type)
@@ -0,0 +1,19 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# `services` is a namespace package at the project root
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def service_dbs(tmp_path):
+    """Copies of the bundled orders and fulfillment databases: name -> path."""
+    paths = {}
+    for service, name in (("orders", "orders.db"), ("fulfillment", "fulfillment.db")):
+        paths[service] = str(tmp_path / name)
+        shutil.copy(os.path.join(ROOT, "services", service, "Storage", name), paths[service])
+    return paths
@@ -0,0 +1,34 @@
+import json
+
+from chat_client import ReplyStats, parse_stream
+
+
+def lines(*chunks):
+    return [json.dumps(c) for c in chunks]
+
+
+def test_n8n_stream_without_tool_chunks():
+    stats = ReplyStats()
+    events = list(parse_stream(lines(
+        {"type": "begin", "metadata": {"nodeName": "CSR Assistant"}},
+        {"type": "begin", "metadata": {"nodeName": "Orders"}},
+        {"type": "end", "metadata": {"nodeName": "Orders"}},
+        {"type": "item", "content": "ORD-010 "},
+        {"type": "item", "content": "has shipped."},
+        {"type": "end", "metadata": {"nodeName": "CSR Assistant"}},
+    ), stats))
+    assert [e.kind for e in events] == ["status", "status", "token", "token"]
+    assert stats.steps == ["CSR Assistant…", "Orders…"]
+    assert "".join(e.text for e in events if e.kind == "token") == "ORD-010 has shipped."
+
+
+def test_orchestrator_tool_chunks():
+    stats = ReplyStats()
+    events = list(parse_stream(lines(
+        {"type": "begin", "metadata": {"nodeName": "CSR Orchestrator"}},
+        {"type": "tool", "content": "Looking up ORD-010…"},
+        {"type": "item", "content": "Shipped."},
+        {"type": "end"},
+    ), stats))
+    assert [e.kind for e in events] == ["status", "tool", "token"]
+    assert stats.steps == ["CSR Orchestrator…", "Looking up ORD-010…"]
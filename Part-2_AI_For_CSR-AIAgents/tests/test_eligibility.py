@@ -0,0 +1,35 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from services.orders import app as orders_app
+from services.orders.service import OrderService
+
+
+@pytest.fixture
+def client(service_dbs):
+    svc = OrderService(service_dbs["orders"], service_dbs["fulfillment"])
+    orders_app.app.dependency_overrides[orders_app.get_service] = lambda: svc
+    yield TestClient(orders_app.app)
+    orders_app.app.dependency_overrides.clear()
+
+
+def test_return_window_as_of(client):
+    # ORD-003 shipped on 2025-09-09; the return window is 30 days
+    within = client.get("/orders/ORD-003/return-eligibility", params={"as_of": "2025-09-20"}).json()
+    after = client.get("/orders/ORD-003/return-eligibility", params={"as_of": "2025-12-01"}).json()
+    assert within["as_of"] == "2025-09-20" and after["as_of"] == "2025-12-01"
+    assert "outside_window" not in within["lines"][0]["rules_failed"]
+    assert "outside_window" in after["lines"][0]["rules_failed"]
+
+
+def test_batch_and_cancel_as_of(client):
+    batch = client.post("/orders/eligibility/batch",
+                        json={"action": "return", "order_ids": ["ORD-003"], "as_of": "2025-12-01"}).json()
+    single = client.get("/orders/ORD-003/return-eligibility", params={"as_of": "2025-12-01"}).json()
+    assert batch == [single]
+    cancel = client.get("/orders/ORD-003/cancel-eligibility", params={"as_of": "2025-09-20"}).json()
+    assert cancel["as_of"] == "2025-09-20"
+
+
+def test_as_of_must_be_a_date(client):
+    assert client.get("/orders/ORD-003/return-eligibility", params={"as_of": "soon"}).status_code == 422
@@ -0,0 +1,97 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from services.fulfillment import app as fulfillment_app
+from services.fulfillment.feed import CsvFeed, RowError, parse_ndjson
+from services.fulfillment.service import FulfillmentService
+
+
+def numbered(text):
+    return list(enumerate(text.split("\n"), start=1))
+
+
+def test_csv_quoted_field_spans_lines():
+    feed = CsvFeed()
+    rows = list(feed.parse(numbered('order_id,status,tracking_nbr\nORD-002,Shipped,"TRK\n1"\nORD-003,Shipped,TRK2')))
+    rows += feed.finish()
+    assert [(line, row.order_id, row.tracking_nbr) for line, row in rows] == [
+        (2, "ORD-002", "TRK\n1"), (4, "ORD-003", "TRK2")]
+
+
+def test_csv_quoted_field_spans_batches():
+    feed = CsvFeed()
+    lines = numbered('order_id,status,tracking_nbr\nORD-002,Shipped,"TRK\n\n1"')
+    rows = list(feed.parse(lines[:3])) + list(feed.parse(lines[3:]))
+    assert [(line, row.tracking_nbr) for line, row in rows] == [(2, "TRK\n\n1")]
+
+
+def test_csv_rejects_keep_line_and_order_id():
+    feed = CsvFeed()
+    rows = list(feed.parse(numbered("order_id,status\nORD-002,Lost\nORD-003,Shipped,extra\n\nORD-004")))
+    assert [(line, type(row), row.order_id) for line, row in rows] == [
+        (2, RowError, "ORD-002"), (3, RowError, "ORD-003"), (5, RowError, "ORD-004")]
+    assert rows[1][1].message == "expected 2 fields, got 3"
+
+
+def test_csv_unterminated_quote():
+    feed = CsvFeed()
+    assert list(feed.parse(numbered('order_id,status\nORD-002,"Shipped'))) == []
+    assert list(feed.finish()) == [(2, RowError("unterminated quoted field"))]
+
+
+def test_csv_header_must_name_order_id_and_status():
+    with pytest.raises(ValueError):
+        list(CsvFeed().parse(numbered("order,status")))
+
+
+def test_ndjson_rows():
+    rows = list(parse_ndjson(numbered('{"order_id": "ORD-002", "status": "shipped"}\n\nnot json\n[1]\n'
+                                      '{"order_id": "ORD-003", "status": "Lost"}')))
+    assert rows[0][0] == 1 and rows[0][1].status.value == "Shipped"
+    assert [(line, row.order_id) for line, row in rows[1:]] == [(3, None), (4, None), (5, "ORD-003")]
+    assert rows[1][1].message.startswith("invalid JSON")
+
+
+class RecordingService(FulfillmentService):
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.batches = []
+
+    def bulk_update_status(self, updates):
+        self.batches.append(len(updates))
+        return super().bulk_update_status(updates)
+
+
+@pytest.fixture
+def feed_client(service_dbs):
+    svc = RecordingService(service_dbs["fulfillment"])
+    fulfillment_app.app.dependency_overrides[fulfillment_app.get_service] = lambda: svc
+    yield TestClient(fulfillment_app.app), svc
+    fulfillment_app.app.dependency_overrides.clear()
+
+
+def test_bulk_flushes_every_chunk(feed_client):
+    client, svc = feed_client
+    rows = [f'{{"order_id": "ORD-{i % 9 + 2:03d}", "status": "Shipped"}}' for i in range(2500)]
+    response = client.post("/FulfillmentStatus/bulk", content="\n".join(rows),
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert svc.batches == [1000, 1000, 500]
+    assert response.json()["received"] == 2500
+
+
+def test_bulk_echoes_rejected_rows(feed_client):
+    client, _ = feed_client
+    body = 'order_id,status,tracking_nbr\nORD-002,Shipped,"TRK\n1"\nORD-003,Lost,\n'
+    response = client.post("/FulfillmentStatus/bulk", content=body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["invalid"] == 1
+    rejected = [r for r in data["results"] if r["result"] == "invalid"]
+    assert [(r["line"], r["order_id"]) for r in rejected] == [(4, "ORD-003")]
+
+
+def test_bulk_bad_csv_header(feed_client):
+    client, _ = feed_client
+    response = client.post("/FulfillmentStatus/bulk", content="order,state\n", headers={"Content-Type": "text/csv"})
+    assert response.status_code == 400
@@ -0,0 +1,88 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from services.common.reshard import TABLES, ShardedTable, reshard
+from services.common.sharding import ID_BITS, find_shards, shard_file, shard_index, shard_paths
+from services.tickets.service import TicketService
+
+from conftest import ROOT
+
+
+@pytest.fixture
+def tickets_db(tmp_path):
+    path = str(tmp_path / "support_tickets.db")
+    shutil.copy(os.path.join(ROOT, "services", "tickets", "Storage", "support_tickets.db"), path)
+    return path
+
+
+def rows(path, sql, *params):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def split(db_path, count):
+    spec = TABLES["tickets"]
+    lines = reshard(ShardedTable(db_path, spec.table, spec.key_columns), count)
+    shard_paths.cache_clear()  # what restarting the services does
+    return lines
+
+
+def test_shard_index_is_stable_and_in_range():
+    assert shard_index("ORD-004", 1) == 0
+    assert all(0 <= shard_index(f"ORD-{i:03}", 4) < 4 for i in range(100))
+    # a CRC-32, not Python's per-process salted hash
+    assert shard_index("ORD-004", 4) == shard_index("ORD-004", 4) == 2
+
+
+def test_unsharded_path_is_its_own_single_shard(tickets_db):
+    assert find_shards(tickets_db) == [tickets_db]
+
+
+def test_reshard_spreads_rows_by_key_and_merges_back(tickets_db):
+    before = rows(tickets_db, "SELECT * FROM tickets ORDER BY Ticket_ID")
+    split(tickets_db, 3)
+    shards = find_shards(tickets_db)
+    assert shards == [shard_file(tickets_db, i, 3) for i in range(3)]
+    assert os.path.exists(tickets_db + ".old") and not os.path.exists(tickets_db)
+    for i, path in enumerate(shards):
+        for order_id, email in rows(path, "SELECT Order_ID, Cust_Email FROM tickets"):
+            assert shard_index(order_id or email, 3) == i
+        # new ids of shard i come from its own range
+        assert rows(path, "SELECT seq FROM sqlite_sequence WHERE name = 'tickets'")[0][0] >= i << ID_BITS
+        assert rows(path, "SELECT name FROM sqlite_master WHERE name = 'idx_tickets_email'")
+    os.remove(tickets_db + ".old")
+    split(tickets_db, 1)
+    assert find_shards(tickets_db) == [tickets_db]
+    assert rows(tickets_db, "SELECT * FROM tickets ORDER BY Ticket_ID") == before
+
+
+def test_reshard_refuses_a_stray_target(tickets_db):
+    shutil.copy(tickets_db, shard_file(tickets_db, 0, 2))
+    with pytest.raises(RuntimeError):
+        split(tickets_db, 2)
+
+
+def test_ticket_service_on_shards(tickets_db):
+    single = TicketService(tickets_db).get_customer_tickets(customer_email="user004@example.com")
+    split(tickets_db, 3)
+    service = TicketService(tickets_db)
+    assert len(service.shards) == 3
+    # same tickets in the same (Ticket_ID) order as the single file, also with a projection
+    assert service.get_customer_tickets(customer_email="user004@example.com") == single
+    notes = service.get_customer_tickets(customer_email="user004@example.com", fields=["Ticket_Notes"])
+    assert notes == [{"Ticket_Notes": t["Ticket_Notes"]} for t in single]
+
+    ticket_id = service.add_ticket("new@example.com", "ORD-777", "Where is my parcel?")
+    home = shard_index("ORD-777", 3)
+    assert ticket_id >> ID_BITS == home
+    service.update_ticket(ticket_id, "Sent the tracking link.")
+    ticket = service.get_ticket_details(ticket_id)
+    assert ticket["Ticket_Notes"] == "Where is my parcel?\nSent the tracking link."
+    # tickets moved by the reshard keep their ids and are still found
+    assert service.get_ticket_details(single[0]["Ticket_ID"]) == single[0]
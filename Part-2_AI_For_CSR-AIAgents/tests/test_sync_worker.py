@@ -0,0 +1,86 @@
+import sqlite3
+import time
+
+import pytest
+
+from services.sync.worker import SyncWorker
+
+
+@pytest.fixture
+def worker(service_dbs):
+    worker = SyncWorker(service_dbs["orders"], service_dbs["fulfillment"])
+    worker.install()
+    yield worker
+    worker.close()
+
+
+def write(path, sql, *params):
+    with sqlite3.connect(path) as conn:
+        conn.execute(sql, params)
+    conn.close()
+    time.sleep(0.01)  # change times are kept to the millisecond
+
+
+def status(path, table, order_id):
+    column = "Order_Status" if table == "orders" else "Fulfillment_Order_Status"
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT {column} FROM {table} WHERE Order_ID = ?", (order_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def drain(worker):
+    results = worker.sync_once()
+    while any(r.pending for r in results):
+        results = worker.sync_once()
+
+
+def test_changes_flow_both_ways(worker, service_dbs):
+    orders, fulfillment = service_dbs["orders"], service_dbs["fulfillment"]
+    write(orders, "UPDATE orders SET Order_Status = 'Cancelled' WHERE Order_ID = 'ORD-007'")
+    write(fulfillment, "UPDATE fulfillment SET Fulfillment_Order_Status = 'Shipped', Tracking_Nbr = 'TRK9' "
+                       "WHERE Order_ID = 'ORD-006'")
+    drain(worker)
+    assert status(fulfillment, "fulfillment", "ORD-007") == "Cancelled"
+    assert status(orders, "orders", "ORD-006") == "Shipped"
+
+
+def test_open_status_maps_to_sent_to_fulfillment(worker, service_dbs):
+    orders, fulfillment = service_dbs["orders"], service_dbs["fulfillment"]
+    write(fulfillment, "UPDATE fulfillment SET Fulfillment_Order_Status = 'In-Progress' WHERE Order_ID = 'ORD-007'")
+    drain(worker)
+    assert status(orders, "orders", "ORD-007") == "Sent To Fulfillment"
+
+
+def test_open_status_does_not_uncancel(worker, service_dbs):
+    orders, fulfillment = service_dbs["orders"], service_dbs["fulfillment"]
+    # ORD-002 is cancelled in orders while fulfillment still has it Created
+    write(fulfillment, "UPDATE fulfillment SET Fulfillment_Order_Status = 'In-Progress' WHERE Order_ID = 'ORD-002'")
+    drain(worker)
+    assert status(orders, "orders", "ORD-002") == "Cancelled"
+
+
+def test_terminal_status_beats_a_newer_open_one(worker, service_dbs):
+    orders, fulfillment = service_dbs["orders"], service_dbs["fulfillment"]
+    write(orders, "UPDATE orders SET Order_Status = 'Cancelled' WHERE Order_ID = 'ORD-006'")
+    write(fulfillment, "UPDATE fulfillment SET Fulfillment_Order_Status = 'Created' WHERE Order_ID = 'ORD-006'")
+    drain(worker)
+    assert status(orders, "orders", "ORD-006") == "Cancelled"
+    assert status(fulfillment, "fulfillment", "ORD-006") == "Cancelled"
+
+
+def test_between_terminal_statuses_last_writer_wins(worker, service_dbs):
+    orders, fulfillment = service_dbs["orders"], service_dbs["fulfillment"]
+    write(orders, "UPDATE orders SET Order_Status = 'Cancelled' WHERE Order_ID = 'ORD-006'")
+    write(fulfillment, "UPDATE fulfillment SET Fulfillment_Order_Status = 'Shipped' WHERE Order_ID = 'ORD-006'")
+    drain(worker)
+    assert status(orders, "orders", "ORD-006") == "Shipped"
+    assert status(fulfillment, "fulfillment", "ORD-006") == "Shipped"
+
+
+def test_applied_changes_do_not_echo(worker, service_dbs):
+    write(service_dbs["orders"], "UPDATE orders SET Quantity = 3 WHERE Order_ID = 'ORD-007'")
+    drain(worker)
+    results = worker.sync_once()
+    assert not any(r.applied or r.pending for r in results)